@@ -228,6 +228,118 @@ LOGGING = {
     },
 }
 
+# 环境控制台连接配置（Telnet / Redirect）
+ENV_CONSOLE_CONNECT_TIMEOUT = 10  # 建立连接及登录超时（秒）
+ENV_CONSOLE_COMMAND_TIMEOUT = 30  # 单条命令超时（秒）
+ENV_CONSOLE_CONNECT_RETRIES = 2  # 连接失败重试次数
+ENV_CONSOLE_PROBE_INTERVAL = 30  # 会话空闲超过该时间后复用前先探活（秒）
+ENV_CONSOLE_PROBE_TIMEOUT = 5  # 探活等待提示符超时（秒）
+ENV_CONSOLE_IDLE_TIMEOUT = 600  # 空闲会话自动关闭时间（秒）
+ENV_REDIRECT_PORT = 23  # Redirect 方式登录的端口
+ENV_REDIRECT_COMMAND = 'redirect {slot}'  # Redirect 方式切换单板的命令模板
+
+# 环境连通性探测配置
+ENV_PROBE_TIMEOUT = 5  # 单个环境探测超时（秒）
+ENV_PROBE_CONCURRENCY = 256  # 最大并发探测数
+ENV_STATUS_CACHE_TTL = 30  # 环境状态缓存过期时间（秒）
+ENV_READY_TIMEOUT = 300  # 容器启动后等待控制台就绪的最长时间（秒）
+ENV_READY_INTERVAL = 5  # 等待就绪期间的探测间隔（秒）
+
+# Docker 配置
+DOCKER_HEALTHCHECK_INTERVAL = 30  # 共享客户端健康检查间隔（秒）
+DOCKER_MAX_POOL_SIZE = 32  # 客户端 HTTP 连接池大小，需不小于批量操作并发数
+DOCKER_BATCH_PARALLELISM = 8  # 批量容器操作的最大并发数
+ENV_SNAPSHOT_AFTER_CREATE = True  # 容器环境创建成功后自动保存基线快照
+ENV_SNAPSHOT_REPOSITORY = 'autotest-snapshot'  # 基线快照镜像仓库前缀
+WARM_POOL_SIZES = {}  # 预热容器池默认大小，如 {'qemu-arm:latest': 3}；可被系统配置 warm_pool_sizes 覆盖
+WARM_CLAIM_TIMEOUT = 1800  # 预热容器领用后超过该时间（秒）仍未释放时视为领用方已中断，补齐时清理
+
+# 用例日志读取配置
+CASE_LOG_ROOT = BASE_DIR / 'logs' / 'cases'  # 用例日志所在根目录，只允许读取、压缩、归档与清理该目录下的日志；为空时不提供日志访问
+LOG_INDEX_DIR = None  # 行偏移索引存放目录，默认与日志文件同目录（<日志路径>.idx）
+LOG_INDEX_STRIDE = 1000  # 行偏移索引的步长（每隔多少行记录一个偏移）
+LOG_READ_MAX_BYTES = 1024 * 1024  # 单次读取的最大字节数
+LOG_READ_MAX_LINES = 5000  # 单次读取的最大行数
+LOG_READ_DEFAULT_LINES = 500  # 未指定行数时默认返回的行数
+
+# 用例日志压缩配置（任务结束后压缩为分帧格式 <日志路径>.atz）
+LOG_COMPACT_FRAME_SIZE = 256 * 1024  # 每帧的原始字节数，读取时以帧为单位解压
+LOG_COMPACT_LEVEL = 6  # zlib 压缩级别
+LOG_COMPACT_MIN_BYTES = 64 * 1024  # 小于该大小的日志不压缩
+
+# 分层存储配置（热层：数据库与日志原路径；温层：按任务压缩的结果文件；冷层：按日期打包的日志）
+ARCHIVE_ROOT = BASE_DIR / 'archive'  # 温层与冷层文件的根目录
+RESULT_ARCHIVE_DAYS = 365  # 任务开始超过该天数后用例结果移入温层
+LOG_ARCHIVE_DAYS = 90  # 任务开始超过该天数后用例日志移入冷层
+ARCHIVE_BATCH_TASKS = 100  # 每轮每层最多归档的任务数
+
+# 过期任务清理配置（按任务分批删除结果，进度保存在系统配置 task_purge_checkpoint 中）
+TASK_PURGE_DAYS = 730  # 任务开始超过该天数后连同结果与日志一起删除
+PURGE_BATCH_SIZE = 500  # 每个事务最多删除的用例结果数
+PURGE_PAUSE_SECONDS = 0.2  # 批次之间的暂停时间（秒）
+PURGE_MAX_SECONDS = 240  # 每轮清理的时间上限（秒），超过后下一轮从断点继续
+PURGE_LOG_MODE = 'delete'  # 日志处理方式：delete 直接删除，archive 先移入冷层
+
+# 软删除记录清理配置
+SOFT_DELETE_GRACE_DAYS = 30  # 软删除超过该天数后物理删除（删除前写入审计日志）
+SOFT_DELETE_PURGE_BATCH_SIZE = 500  # 每个事务最多物理删除的记录数
+
+# 冗余计数字段校正配置
+COUNTER_RECONCILE_BATCH_SIZE = 1000  # 每批检查的上级记录数
+
+# 测试用例批量导入配置
+CASE_IMPORT_BATCH_SIZE = 1000  # 每批写入（以及查询已存在用例ID）的记录数
+
+# 代码仓特性/用例同步配置（目录约定：CASE_REPO_ROOT/<芯片型号>/<特性>/<用例脚本>）
+CASE_REPO_PATH = ''  # 代码仓本地检出目录，为空时不同步
+CASE_REPO_REF = 'HEAD'  # 同步的分支或提交，如 origin/master
+CASE_REPO_FETCH = False  # 同步前是否先 git fetch
+CASE_REPO_ROOT = 'src/dt'  # 用例目录在代码仓中的位置
+CASE_SCRIPT_SUFFIXES = ('.py', '.sh')  # 用例脚本后缀
+
+# 基于变更的用例选择配置（对比包信息中 base_commit 与 commit 之间的变更，代码仓使用 CASE_REPO_PATH）
+# 用例目录以外的变更按规则映射到模块（chip 分组）或特性（chip、feature 分组），都不匹配时执行全部用例
+CHANGE_SELECTION_RULES = [
+    r'^src/(?P<chip>[^/]+)/(?P<feature>[^/]+)/',
+    r'^src/(?P<chip>[^/]+)/',
+]
+CHANGE_SELECTION_IGNORE = [r'\.md$', r'^docs/']  # 不影响用例选择的文件
+
+# 用例日志全文索引配置
+LOG_SEARCH_INDEX_PATH = BASE_DIR / 'log_search.sqlite3'  # FTS5 索引库路径
+LOG_SEARCH_WORKERS = 4  # 读取日志的进程池大小
+LOG_SEARCH_MAX_LINE_LENGTH = 2000  # 单行最多索引的字符数
+
+# 失败特征聚类配置
+FAILURE_SIGNATURE_TAIL_BYTES = 64 * 1024  # 从日志末尾读取的字节数
+FAILURE_SIGNATURE_MAX_LINES = 3  # 参与计算特征的失败信息行数
+FAILURE_CLUSTER_BATCH_SIZE = 1000  # 补齐失败特征时每批处理的结果数
+FAILURE_SIGNATURE_RETRY_HOURS = 72  # 日志无法读取时在执行后多少小时内重试提取失败特征
+
+# 用例稳定性统计配置
+FLAKINESS_WINDOW = 30  # 统计最近多少次执行（不超过 256）
+FLAKINESS_MIN_RUNS = 5  # 不稳定用例列表默认要求的最少执行次数
+
+# 测试套执行历史矩阵配置
+HISTORY_MATRIX_DEFAULT_RUNS = 100  # 默认返回最近多少次执行
+HISTORY_MATRIX_MAX_RUNS = 500  # 单次请求最多返回的执行次数
+HISTORY_BACKFILL_BATCH_SIZE = 200  # 后台每轮最多补齐的执行历史任务数
+
+# 任务结果对比配置
+TASK_DIFF_CACHE_TIMEOUT = 24 * 3600  # 已结束任务对比结果的缓存时间（秒）
+
+# 用例结果日汇总配置
+ROLLUP_BATCH_SIZE = 200  # 每批重算的 日期 × 测试套 × 环境 组数
+
+# 通过率趋势配置
+TREND_DEFAULT_POINTS = 300  # 默认降采样后的点数
+TREND_MAX_POINTS = 2000  # 单次请求最多返回的点数
+
+# 报告导出配置
+EXPORT_LINK_TTL_HOURS = 24  # 下载链接有效期（小时），与 cleanup_temp_files 的清理周期一致
+EXPORT_CHUNK_SIZE = 2000  # 每次从数据库读取的结果数
+EXPORT_PROGRESS_INTERVAL = 1000  # 每写入多少条结果更新一次进度
+
 # 文件存储配置
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -1,11 +1,56 @@
 from django.db import models
 from django.utils import timezone
 
+class SoftDeleteQuerySet(models.QuerySet):
+    """支持软删除的查询集"""
+
+    def alive(self):
+        """未删除的记录"""
+        return self.filter(is_deleted=False)
+
+    def dead(self):
+        """已软删除的记录"""
+        return self.filter(is_deleted=True)
+
+    def soft_delete(self, stamp=None):
+        """批量软删除，一条 UPDATE 完成；同一次级联删除的记录使用相同的删除时间
+
+        Returns:
+            int: 本次删除的记录数（已删除的记录不计入）
+        """
+        stamp = stamp or timezone.now()
+        return self.filter(is_deleted=False).update(is_deleted=True, delete_time=stamp, update_time=stamp)
+
+    def restore(self):
+        """批量恢复软删除的记录
+
+        Returns:
+            int: 本次恢复的记录数
+        """
+        return self.filter(is_deleted=True).update(is_deleted=False, delete_time=None, update_time=timezone.now())
+
+
+class AliveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """只返回未删除记录的管理器
+
+    查询条件与各模型上 condition=Q(is_deleted=False) 的部分索引一致，列表查询只扫描存活记录的索引。
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class BaseModel(models.Model):
     """基础模型类，包含通用字段"""
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     is_deleted = models.BooleanField(default=False, verbose_name='是否删除')
+    # 软删除时间，超过保留期后由 purge_soft_deleted_task 物理删除
+    delete_time = models.DateTimeField(null=True, blank=True, verbose_name='删除时间')
+
+    # objects 包含已删除的记录（管理后台、唯一性校验与恢复使用），alive 只包含未删除的记录
+    objects = SoftDeleteQuerySet.as_manager()
+    alive = AliveManager()
 
     class Meta:
         abstract = True
@@ -13,6 +58,7 @@ class BaseModel(models.Model):
     def soft_delete(self):
         """软删除"""
         self.is_deleted = True
+        self.delete_time = timezone.now()
         self.save()
 
 class AuditLog(models.Model):
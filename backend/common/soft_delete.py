@@ -0,0 +1,127 @@
+"""软删除记录的物理清理
+
+软删除只设置 is_deleted，记录会一直留在表里。这里定期把删除超过保留期（SOFT_DELETE_GRACE_DAYS）
+的记录物理删除：每个模型按主键分批处理，每批一个短事务，删除前把整行写入审计日志
+（operation_type 为 purge_<模型名>，old_data 为删除前的字段值），可据此追溯或手工恢复。
+
+仍被其他表通过外键引用的记录（如有执行结果的用例、有执行任务的环境）不删除，避免级联删除历史数据；
+从属数据（如环境变量）随主记录一起删除。模块、特性、用例之间通过字符串字段（module_id、feature_id）
+关联，没有外键，按 STRING_REFERENCES 检查；下级记录（包括已软删除、尚未清理的）存在时不删除上级，
+清理顺序为先下级后上级，同一轮中下级清理后上级即可清理。
+"""
+import json
+import time
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from common.models import AuditLog, BaseModel
+
+logger = logging.getLogger('autotestweb')
+
+# 随主记录一起删除的从属表
+OWNED_MODELS = {'env_manager.environmentvariable'}
+# 通过字符串字段（而非外键）引用上级的表: 上级模型 -> [(下级模型, 引用字段)]
+STRING_REFERENCES = {
+    'module_manager.module': [('feature_testcase.feature', 'module_id')],
+    'feature_testcase.feature': [
+        ('feature_testcase.testcase', 'feature_id'),
+        ('feature_testcase.featuretestcaserelation', 'feature_id'),
+    ],
+    'feature_testcase.testcase': [('feature_testcase.featuretestcaserelation', 'test_case_id')],
+}
+
+
+def _setting(name, default):
+    """读取软删除清理相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def _reference_depth(label):
+    """模型在字符串引用关系中的层级（模块为 0，特性为 1，依此类推）"""
+    parents = [parent for parent, children in STRING_REFERENCES.items() if any(child == label for child, _ in children)]
+    return max((_reference_depth(parent) + 1 for parent in parents), default=0)
+
+
+def soft_delete_models():
+    """所有继承 BaseModel 的模型，下级模型排在上级之前"""
+    models = [model for model in apps.get_models() if issubclass(model, BaseModel)]
+    return sorted(models, key=lambda model: -_reference_depth(model._meta.label_lower))
+
+
+def purgeable(model, cutoff):
+    """删除时间早于 cutoff、且没有被历史数据或下级记录引用的已删除记录"""
+    queryset = model.objects.dead().filter(delete_time__lt=cutoff)
+    for relation in model._meta.related_objects:
+        if relation.related_model._meta.label_lower not in OWNED_MODELS:
+            queryset = queryset.filter(**{f'{relation.name}__isnull': True})
+    for label, field in STRING_REFERENCES.get(model._meta.label_lower, []):
+        children = apps.get_model(label).objects.filter(**{field: OuterRef('pk')})
+        queryset = queryset.filter(~Exists(children))
+    return queryset
+
+
+def _audit_entries(model, rows):
+    pk_name = model._meta.pk.attname
+    return [
+        AuditLog(
+            operation_type=f'purge_{model._meta.model_name}',
+            operation_desc=f'物理删除已软删除的{model._meta.verbose_name}: {row[pk_name]}',
+            operated_by='system',
+            module_name=model._meta.app_label,
+            object_id=str(row[pk_name]),
+            old_data=json.loads(json.dumps(row, cls=DjangoJSONEncoder)),
+        )
+        for row in rows
+    ]
+
+
+def purge_model(model, cutoff, batch_size, pause=0):
+    """分批物理删除一个模型的过期软删除记录
+
+    Returns:
+        int: 删除的记录数
+    """
+    purged = 0
+    while True:
+        with transaction.atomic():
+            rows = list(purgeable(model, cutoff).order_by('pk').values()[:batch_size])
+            if not rows:
+                break
+            AuditLog.objects.bulk_create(_audit_entries(model, rows))
+            model.objects.filter(pk__in=[row[model._meta.pk.attname] for row in rows]).delete()
+        purged += len(rows)
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return purged
+
+
+def purge_soft_deleted(grace_days=None, batch_size=None, pause=None):
+    """物理删除所有模型中超过保留期的软删除记录
+
+    Returns:
+        dict: {模型: 删除的记录数}
+    """
+    grace_days = int(grace_days if grace_days is not None else _setting('SOFT_DELETE_GRACE_DAYS', 30))
+    batch_size = int(batch_size or _setting('SOFT_DELETE_PURGE_BATCH_SIZE', 500))
+    pause = float(pause if pause is not None else _setting('PURGE_PAUSE_SECONDS', 0.2))
+    cutoff = timezone.now() - timedelta(days=grace_days)
+    summary = {}
+    for model in soft_delete_models():
+        try:
+            purged = purge_model(model, cutoff, batch_size, pause)
+        except Exception as e:
+            logger.error(f'清理已删除的{model._meta.verbose_name}失败: {str(e)}')
+            continue
+        if purged:
+            summary[model._meta.label] = purged
+            logger.info(f'物理删除已软删除的{model._meta.verbose_name}: {purged} 条')
+    return summary
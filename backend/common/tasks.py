@@ -5,142 +5,582 @@ from common.utils import get_docker_client, logger
 
 logger = logging.getLogger('autotestweb')
 
-@shared_task(name='create_environment_task')
-def create_environment_task(environment_id):
-    """异步创建环境任务"""
-    from env_manager.models import Environment
+def _container_ip(container):
+    """获取容器的 IP 地址（Docker 内部网络）"""
+    container_info = container.attrs
+    if 'NetworkSettings' in container_info and 'IPAddress' in container_info['NetworkSettings']:
+        return container_info['NetworkSettings']['IPAddress'] or None
+    return None
+
+def _container_config(environment):
+    """根据环境配置生成容器启动参数"""
+    container_config = {
+        'image': environment.docker_image or 'ubuntu:latest',
+        'name': f'autotest_{environment.name.lower().replace(" ", "_")}_{environment.id}',
+        'detach': True,
+        'ports': {},
+        'environment': {},
+        'volumes': {},
+    }
     
-    try:
-        environment = Environment.objects.get(id=environment_id)
-        logger.info(f'开始创建环境: {environment.name}')
-        
-        # 调用 Docker 客户端创建容器
-        client = get_docker_client()
-        if not client:
-            environment.status = 'failed'
-            environment.save()
-            logger.error(f'创建环境失败: 无法连接 Docker 引擎')
-            return
-        
-        # 设置容器配置
-        container_config = {
-            'image': environment.docker_image or 'ubuntu:latest',
-            'name': f'autotest_{environment.name.lower().replace(" ", "_")}_{environment_id}',
-            'detach': True,
-            'ports': {},
-            'environment': {},
-            'volumes': {},
-        }
+    # 加载环境的配置信息
+    if environment.configuration:
+        if 'ports' in environment.configuration:
+            # 配置端口映射
+            for host_port, container_port in environment.configuration['ports'].items():
+                container_config['ports'][f'{container_port}/tcp'] = host_port
         
-        # 加载环境的配置信息
-        if environment.configuration:
-            if 'ports' in environment.configuration:
-                # 配置端口映射
-                for host_port, container_port in environment.configuration['ports'].items():
-                    container_config['ports'][f'{container_port}/tcp'] = host_port
-            
-            if 'environment' in environment.configuration:
-                # 配置环境变量
-                container_config['environment'].update(environment.configuration['environment'])
-            
-            if 'volumes' in environment.configuration:
-                # 配置数据卷
-                for host_path, container_path in environment.configuration['volumes'].items():
-                    container_config['volumes'][host_path] = {'bind': container_path, 'mode': 'rw'}
+        if 'environment' in environment.configuration:
+            # 配置环境变量
+            container_config['environment'].update(environment.configuration['environment'])
         
-        # 创建容器
-        container = client.containers.run(**container_config)
-        
-        # 更新环境信息
-        with transaction.atomic():
-            environment.container_id = container.id
-            environment.status = 'running'
-            # 获取容器的 IP 地址（Docker 内部网络）
-            container_info = container.attrs
-            if 'NetworkSettings' in container_info and 'IPAddress' in container_info['NetworkSettings']:
-                environment.ip_address = container_info['NetworkSettings']['IPAddress']
-            environment.save()
-        
-        logger.info(f'环境创建成功: {environment.name}, 容器ID: {container.id}')
-        
-    except Environment.DoesNotExist:
-        logger.error(f'环境不存在: {environment_id}')
-    except Exception as e:
-        # 更新环境状态为失败
+        if 'volumes' in environment.configuration:
+            # 配置数据卷
+            for host_path, container_path in environment.configuration['volumes'].items():
+                container_config['volumes'][host_path] = {'bind': container_path, 'mode': 'rw'}
+    return container_config
+
+def _claim_warm_container(environment):
+    """从预热池领用已启动的容器（只操作数据库，在调用线程中执行）
+    
+    预热容器以镜像默认参数启动，环境配置了端口映射、环境变量或数据卷时无法复用，直接新建。
+    """
+    from env_manager import warm_pool
+    
+    configuration = environment.configuration or {}
+    if not environment.docker_image or any(configuration.get(key) for key in ('ports', 'environment', 'volumes')):
+        return None
+    return warm_pool.claim(environment.docker_image, claimed_by=environment.id)
+
+def _create_container(client, environment, warm=None):
+    """创建并启动容器（有预热容器时直接领用），返回需要更新的环境字段"""
+    container = None
+    if warm is not None:
         try:
-            environment = Environment.objects.get(id=environment_id)
-            environment.status = 'failed'
-            environment.save()
-        except:
+            container = client.containers.get(warm.container_id)
+            container.rename(_container_config(environment)['name'])
+            container.reload()
+            logger.info(f'环境 {environment.name} 领用预热容器: {warm.container_id}')
+        except Exception as e:
+            logger.warning(f'领用预热容器失败，改为新建容器: {warm.container_id}, {str(e)}')
+            container = None
+    if container is None:
+        container = client.containers.run(**_container_config(environment))
+    # 容器已启动，控制台就绪前保持 pending，由 wait_until_ready 改为 available
+    updates = {'container_id': container.id, 'status': 'pending'}
+    ip = _container_ip(container)
+    if ip:
+        updates['ip'] = ip
+    return updates
+
+def _start_container(client, environment):
+    """启动已有容器，返回需要更新的环境字段"""
+    container = client.containers.get(environment.container_id)
+    container.start()
+    container.reload()
+    updates = {'status': 'pending'}
+    ip = _container_ip(container)
+    if ip:
+        updates['ip'] = ip
+    return updates
+
+def _stop_container(client, environment):
+    """停止容器，返回需要更新的环境字段"""
+    container = client.containers.get(environment.container_id)
+    container.stop()
+    return {'status': 'unavailable'}
+
+def _recreate_container(client, environment, warm=None):
+    """删除旧容器后按当前配置重新创建"""
+    import docker
+    
+    if environment.container_id:
+        try:
+            client.containers.get(environment.container_id).remove(force=True)
+        except docker.errors.NotFound:
             pass
-        logger.error(f'创建环境失败: {str(e)}')
+    return _create_container(client, environment, warm)
 
-@shared_task(name='start_environment_task')
-def start_environment_task(environment_id):
-    """异步启动环境任务"""
-    from env_manager.models import Environment
+def _snapshot_container(client, environment):
+    """将容器当前状态提交为基线快照镜像，并删除被替换的旧快照镜像"""
+    import docker
+    from django.conf import settings
     
+    container = client.containers.get(environment.container_id)
+    repository = f'{getattr(settings, "ENV_SNAPSHOT_REPOSITORY", "autotest-snapshot")}/{environment.id.lower()}'
     try:
-        environment = Environment.objects.get(id=environment_id)
-        logger.info(f'开始启动环境: {environment.name}')
-        
-        # 调用 Docker 客户端启动容器
-        client = get_docker_client()
-        if not client:
-            logger.error(f'启动环境失败: 无法连接 Docker 引擎')
-            return
-        
-        # 启动容器
-        container = client.containers.get(environment.container_id)
-        container.start()
-        
-        # 更新环境状态
-        with transaction.atomic():
-            environment.status = 'running'
-            # 获取容器的 IP 地址
-            container.reload()
-            container_info = container.attrs
-            if 'NetworkSettings' in container_info and 'IPAddress' in container_info['NetworkSettings']:
-                environment.ip_address = container_info['NetworkSettings']['IPAddress']
-            environment.save()
+        previous = client.images.get(f'{repository}:baseline').id
+    except docker.errors.ImageNotFound:
+        previous = None
+    image = container.commit(repository=repository, tag='baseline')
+    if previous and previous != image.id:
+        # 旧快照的标签已移到新镜像；仍被容器（如从旧快照复位的当前容器）使用时删除失败，留待下次快照时清理
+        try:
+            client.images.remove(previous)
+        except docker.errors.APIError as e:
+            logger.warning(f'删除旧快照镜像失败: {previous}, {str(e)}')
+    return {'snapshot_image': f'{repository}:baseline'}
+
+def _restore_container(client, environment):
+    """用基线快照镜像替换当前容器，丢弃上一个任务留下的状态
+    
+    快照中已包含准备完成后的系统状态，无需重新拉取镜像和执行环境准备。
+    """
+    import docker
+    
+    if not environment.snapshot_image:
+        raise ValueError('环境没有基线快照')
+    if environment.container_id:
+        try:
+            client.containers.get(environment.container_id).remove(force=True)
+        except docker.errors.NotFound:
+            pass
+    container_config = _container_config(environment)
+    container_config['image'] = environment.snapshot_image
+    container = client.containers.run(**container_config)
+    updates = {'container_id': container.id, 'status': 'pending'}
+    ip = _container_ip(container)
+    if ip:
+        updates['ip'] = ip
+    return updates
+
+# 生命周期操作: (处理函数, 操作名称, 失败时的环境状态)
+# 环境状态只使用模型中的 pending/available/unavailable/occupied：容器启动后为 pending，
+# 控制台就绪后为 available，停止或操作失败为 unavailable
+LIFECYCLE_ACTIONS = {
+    'create': (_create_container, '创建', 'unavailable'),
+    'start': (_start_container, '启动', None),
+    'stop': (_stop_container, '停止', None),
+    'recreate': (_recreate_container, '重建', 'unavailable'),
+    'snapshot': (_snapshot_container, '快照', None),
+    'restore': (_restore_container, '复位', 'unavailable'),
+}
+# 启动容器的操作，成功后等待控制台就绪
+BOOT_ACTIONS = ('create', 'start', 'recreate', 'restore')
+
+def run_environment_lifecycle(action, environments, max_workers=None):
+    """并发执行一批环境的容器生命周期操作
+    
+    Docker 操作在线程池中并发执行（并发数受 DOCKER_BATCH_PARALLELISM 限制），
+    数据库更新在调用线程中批量写回。
+    
+    Args:
+        action: 操作类型（create/start/stop/recreate/snapshot/restore）
+        environments: 环境对象列表
+        max_workers: 最大并发数
         
-        logger.info(f'环境启动成功: {environment.name}')
+    Returns:
+        dict: {'succeeded': [环境ID], 'failed': {环境ID: 失败原因}}；启动容器的操作另有
+              ready: 控制台已就绪的环境ID
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from django.conf import settings
+    from django.utils import timezone
+    from env_manager.models import Environment
+    
+    handler, action_name, failed_status = LIFECYCLE_ACTIONS[action]
+    summary = {'succeeded': [], 'failed': {}}
+    if not environments:
+        return summary
+    
+    client = get_docker_client()
+    if not client:
+        logger.error(f'{action_name}环境失败: 无法连接 Docker 引擎')
+        for environment in environments:
+            summary['failed'][environment.id] = '无法连接 Docker 引擎'
+        if failed_status:
+            Environment.objects.filter(id__in=[e.id for e in environments]).update(
+                status=failed_status, update_time=timezone.now()
+            )
+        return summary
+    
+    # 预热容器的领用与释放都是数据库操作，放在调用线程中完成，工作线程只调用 Docker
+    warm_claims = {}
+    if action in ('create', 'recreate'):
+        for environment in environments:
+            warm = _claim_warm_container(environment)
+            if warm is not None:
+                warm_claims[environment.id] = warm
+    
+    def run(environment):
+        if action in ('start', 'stop', 'snapshot') and not environment.container_id:
+            raise ValueError('环境没有关联的容器')
+        if environment.id in warm_claims:
+            return handler(client, environment, warm_claims[environment.id])
+        return handler(client, environment)
+    
+    if max_workers is None:
+        max_workers = getattr(settings, 'DOCKER_BATCH_PARALLELISM', 8)
+    max_workers = max(1, min(max_workers, len(environments)))
+    
+    changed = []
+    changed_fields = {'update_time'}
+    saved = False
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {environment.id: executor.submit(run, environment) for environment in environments}
+            for environment in environments:
+                try:
+                    updates = futures[environment.id].result()
+                except Exception as e:
+                    summary['failed'][environment.id] = str(e)
+                    logger.error(f'{action_name}环境失败: {environment.name}, {str(e)}')
+                    if not failed_status:
+                        continue
+                    updates = {'status': failed_status}
+                else:
+                    summary['succeeded'].append(environment.id)
+                    logger.info(f'环境{action_name}成功: {environment.name}')
+                for field, value in updates.items():
+                    setattr(environment, field, value)
+                changed_fields.update(updates.keys())
+                changed.append(environment)
         
+        if changed:
+            now = timezone.now()
+            for environment in changed:
+                environment.update_time = now
+            with transaction.atomic():
+                Environment.objects.bulk_update(changed, sorted(changed_fields))
+        saved = True
+    finally:
+        # 环境记录写入容器ID后再移出池记录，补齐任务核对时不会把已接管的容器当作孤儿；
+        # 操作失败、回退为新建容器或环境记录未能写回时，领用的预热容器没有被使用，删除容器而不是只删记录
+        if warm_claims:
+            from env_manager import warm_pool
+            by_id = {environment.id: environment for environment in environments}
+            for env_id, warm in warm_claims.items():
+                if saved and env_id in summary['succeeded'] and by_id[env_id].container_id == warm.container_id:
+                    warm_pool.release(warm.container_id)
+                else:
+                    warm_pool.discard(warm.container_id, client)
+    
+    if action in BOOT_ACTIONS:
+        from env_manager.probe import wait_until_ready
+        booted = [environment for environment in changed if environment.id in summary['succeeded']]
+        summary['ready'] = wait_until_ready(booted) if booted else []
+    return summary
+
+def _run_single_lifecycle(action, environment_id):
+    """对单个环境执行生命周期操作"""
+    from env_manager.models import Environment
+    
+    try:
+        environment = Environment.objects.get(id=environment_id)
+        logger.info(f'开始{LIFECYCLE_ACTIONS[action][1]}环境: {environment.name}')
+        return run_environment_lifecycle(action, [environment], max_workers=1)
     except Environment.DoesNotExist:
         logger.error(f'环境不存在: {environment_id}')
-    except Exception as e:
-        logger.error(f'启动环境失败: {str(e)}')
+
+@shared_task(name='create_environment_task')
+def create_environment_task(environment_id):
+    """异步创建环境任务"""
+    from django.conf import settings
+    
+    summary = _run_single_lifecycle('create', environment_id)
+    # 控制台就绪（系统引导完成、环境可用）后才保存基线快照，供后续任务间快速复位；
+    # 容器刚启动时的快照不包含引导后的系统状态
+    if summary and environment_id in summary.get('ready', []) and getattr(settings, 'ENV_SNAPSHOT_AFTER_CREATE', True):
+        _run_single_lifecycle('snapshot', environment_id)
+    return summary
+
+@shared_task(name='start_environment_task')
+def start_environment_task(environment_id):
+    """异步启动环境任务"""
+    return _run_single_lifecycle('start', environment_id)
 
 @shared_task(name='stop_environment_task')
 def stop_environment_task(environment_id):
     """异步停止环境任务"""
-    from env_manager.models import Environment
+    return _run_single_lifecycle('stop', environment_id)
+
+@shared_task(name='snapshot_environment_task')
+def snapshot_environment_task(environment_id):
+    """异步保存环境基线快照任务"""
+    return _run_single_lifecycle('snapshot', environment_id)
+
+@shared_task(name='restore_environment_task')
+def restore_environment_task(environment_id):
+    """异步将环境复位到基线快照任务"""
+    return _run_single_lifecycle('restore', environment_id)
+
+# 任务启动前复位环境期间持有的锁，避免重复点击启动时重复复位
+TASK_RESET_LOCK_KEY = 'task_start_reset:{task_id}'
+
+@shared_task(name='start_task_after_restore_task')
+def start_task_after_restore_task(task_id):
+    """先将环境复位到基线快照，环境就绪后再启动任务
+    
+    复位会删除并重建容器，任务在复位完成前保持等待执行，避免运行中任务所在的容器被替换；
+    复位失败或环境未在 ENV_READY_TIMEOUT 内就绪时任务标记为执行失败。
+    """
+    from django.core.cache import cache
+    from django.utils import timezone
+    from execution_manager.models import TaskExecution
     
     try:
-        environment = Environment.objects.get(id=environment_id)
-        logger.info(f'开始停止环境: {environment.name}')
-        
-        # 调用 Docker 客户端停止容器
-        client = get_docker_client()
-        if not client:
-            logger.error(f'停止环境失败: 无法连接 Docker 引擎')
-            return
-        
-        # 停止容器
-        container = client.containers.get(environment.container_id)
-        container.stop()
-        
-        # 更新环境状态
-        with transaction.atomic():
-            environment.status = 'stopped'
-            environment.save()
-        
-        logger.info(f'环境停止成功: {environment.name}')
+        try:
+            task = TaskExecution.objects.get(id=task_id, status='pending')
+        except TaskExecution.DoesNotExist:
+            logger.error(f'任务不存在或已不是等待执行状态: {task_id}')
+            return None
+        environment_id = task.env_id_id
+        summary = _run_single_lifecycle('restore', environment_id) or {}
+        now = timezone.now()
+        if environment_id in summary.get('ready', []):
+            TaskExecution.objects.filter(id=task_id, status='pending').update(status='running', start_time=now)
+            logger.info(f'任务 {task_id} 环境复位完成，开始执行')
+            return {'task_id': task_id, 'status': 'running', 'restore': summary}
         
-    except Environment.DoesNotExist:
-        logger.error(f'环境不存在: {environment_id}')
+        error = summary.get('failed', {}).get(environment_id) or '环境未在规定时间内就绪'
+        logger.error(f'任务 {task_id} 环境复位失败: {error}')
+        if TaskExecution.objects.filter(id=task_id, status='pending').update(status='failed', start_time=now, end_time=now):
+            finalize_task_execution_task.delay(task_id)
+        return {'task_id': task_id, 'status': 'failed', 'error': error, 'restore': summary}
+    finally:
+        cache.delete(TASK_RESET_LOCK_KEY.format(task_id=task_id))
+
+@shared_task(name='batch_environment_lifecycle_task')
+def batch_environment_lifecycle_task(action, environment_ids, max_workers=None):
+    """批量启动/停止/重建环境容器任务
+    
+    Args:
+        action: 操作类型（create/start/stop/recreate/snapshot/restore）
+        environment_ids: 环境ID列表
+        max_workers: 最大并发数，默认取 DOCKER_BATCH_PARALLELISM
+    """
+    from env_manager.models import Environment
+    
+    if action not in LIFECYCLE_ACTIONS:
+        logger.error(f'不支持的环境操作: {action}')
+        return {'succeeded': [], 'failed': {}}
+    
+    environments = list(Environment.objects.filter(id__in=environment_ids, is_deleted=False))
+    logger.info(f'开始批量{LIFECYCLE_ACTIONS[action][1]}环境: {len(environments)} 个')
+    try:
+        summary = run_environment_lifecycle(action, environments, max_workers=max_workers)
+    except Exception as e:
+        logger.error(f'批量{LIFECYCLE_ACTIONS[action][1]}环境失败: {str(e)}')
+        return {'succeeded': [], 'failed': {}}
+    logger.info(
+        f'批量{LIFECYCLE_ACTIONS[action][1]}环境完成: 成功 {len(summary["succeeded"])} 个, '
+        f'失败 {len(summary["failed"])} 个'
+    )
+    return summary
+
+@shared_task(name='replenish_warm_pool_task')
+def replenish_warm_pool_task(image=None):
+    """补齐预热容器池任务"""
+    from env_manager.warm_pool import replenish
+    
+    try:
+        return replenish(image)
+    except Exception as e:
+        logger.error(f'补齐预热池失败: {str(e)}')
+
+@shared_task(name='probe_environments_task')
+def probe_environments_task():
+    """批量探测所有环境的连通性并刷新状态缓存"""
+    from env_manager.probe import probe_environments
+
+    try:
+        probe_environments()
+    except Exception as e:
+        logger.error(f'环境连通性探测失败: {str(e)}')
+
+@shared_task(name='ingest_case_log_task')
+def ingest_case_log_task(result_id, created=False):
+    """用例结果入库后处理：生成日志行偏移索引，失败结果提取失败特征并归类、按规则给出建议标记，
+    新结果计入用例稳定性统计
+
+    Args:
+        result_id: 用例结果ID
+        created: 是否为新创建的结果（仅更新日志路径时为 False，不重复计入稳定性统计）
+    """
+    from result_manager.models import CaseResult
+    from result_manager.log_reader import build_index, LogReadError
+    from result_manager.signature import assign_signatures
+    from result_manager.classifier import classify_result
+    from result_manager.flakiness import record_result
+
+    try:
+        case_result = CaseResult.objects.select_related('task_id__env_id').get(id=result_id)
+    except CaseResult.DoesNotExist:
+        logger.error(f'用例结果不存在: {result_id}')
+        return None
+    summary = {}
+    if created:
+        try:
+            stat = record_result(case_result)
+            summary['flakiness_score'] = stat.flakiness_score if stat else None
+        except Exception as e:
+            logger.error(f'用例稳定性统计更新失败: {result_id}, {str(e)}')
+    try:
+        summary['total_lines'] = build_index(case_result.log_path)
+        logger.info(f'用例日志索引生成完成: {result_id}, 共 {summary["total_lines"]} 行')
+    except LogReadError as e:
+        logger.warning(f'用例日志索引生成失败: {result_id}, {str(e)}')
+    if case_result.status == 'failed':
+        try:
+            assign_signatures([case_result])
+            summary['failure_signature'] = case_result.failure_signature
+        except Exception as e:
+            logger.error(f'用例失败特征提取失败: {result_id}, {str(e)}')
+        try:
+            rule = classify_result(case_result)
+            summary['suggested_rule_id'] = rule.id if rule else None
+        except Exception as e:
+            logger.error(f'用例失败自动分类失败: {result_id}, {str(e)}')
+    return summary
+
+@shared_task(name='cluster_failures_task')
+def cluster_failures_task():
+    """补齐未经入库流程的失败结果的失败特征"""
+    from result_manager.signature import cluster_pending
+
+    try:
+        return cluster_pending()
+    except Exception as e:
+        logger.error(f'失败特征补齐失败: {str(e)}')
+
+@shared_task(name='backfill_run_history_task')
+def backfill_run_history_task(suite_id=None):
+    """补齐已结束但尚未写入执行历史的任务"""
+    from result_manager.history import backfill_history
+
+    try:
+        return backfill_history(suite_id)
+    except Exception as e:
+        logger.error(f'执行历史补齐失败: {str(e)}')
+
+@shared_task(name='finalize_task_execution_task')
+def finalize_task_execution_task(task_id):
+    """任务进入结束状态后的结果处理"""
+    from result_manager.search_index import index_task_logs
+    from result_manager.history import pack_task_results
+    from result_manager.rollup import mark_task
+    from result_manager.log_reader import compact_task_logs
+    from execution_manager.models import TaskExecution
+
+    summary = {}
+    try:
+        summary['search_index'] = index_task_logs(task_id)
+    except Exception as e:
+        logger.error(f'任务 {task_id} 日志全文索引失败: {str(e)}')
+    try:
+        summary['history_columns'] = pack_task_results(task_id)
+    except Exception as e:
+        logger.error(f'任务 {task_id} 执行历史写入失败: {str(e)}')
+    try:
+        # 兜底标记未经结果接口写入的结果，实际重算由 rollup_results_task 完成
+        summary['rollup_marks'] = mark_task(TaskExecution.objects.get(id=task_id))
+    except Exception as e:
+        logger.error(f'任务 {task_id} 日汇总标记失败: {str(e)}')
+    try:
+        # 放在最后，前面的步骤直接读取原始日志，无需解压
+        summary['log_compaction'] = compact_task_logs(task_id)
+    except Exception as e:
+        logger.error(f'任务 {task_id} 日志压缩失败: {str(e)}')
+    return summary
+
+@shared_task(name='rollup_results_task')
+def rollup_results_task(start_day=None, end_day=None):
+    """重算被标记的用例结果日汇总
+
+    Args:
+        start_day / end_day: 日期字符串（YYYY-MM-DD），传入时先标记该范围内的所有组，用于全量重建
+    """
+    from django.utils.dateparse import parse_date
+    from result_manager.rollup import mark_range, process_dirty
+
+    try:
+        if start_day and end_day:
+            mark_range(parse_date(start_day), parse_date(end_day))
+        return process_dirty()
+    except Exception as e:
+        logger.error(f'用例结果日汇总失败: {str(e)}')
+
+@shared_task(name='export_report_task')
+def export_report_task(export_id):
+    """后台生成任务报告文件"""
+    from django.utils import timezone
+    from result_manager.models import ReportExport
+    from result_manager.export import generate_report
+
+    try:
+        report_export = ReportExport.objects.select_related('task_id').get(id=export_id)
+    except ReportExport.DoesNotExist:
+        logger.error(f'报告导出记录不存在: {export_id}')
+        return
+    try:
+        generate_report(report_export)
+        return {'processed_rows': report_export.processed_rows, 'file_size': report_export.file_size}
+    except Exception as e:
+        logger.error(f'报告导出失败: {export_id}, {str(e)}')
+        ReportExport.objects.filter(id=export_id).update(
+            status='failed', error_message=str(e), finish_time=timezone.now()
+        )
+
+@shared_task(name='archive_storage_task')
+def archive_storage_task(batch_size=None):
+    """把到期任务的用例日志移入冷层、用例结果移入温层"""
+    from result_manager.archive import run_tiering
+
+    try:
+        return run_tiering(batch_size)
+    except Exception as e:
+        logger.error(f'分层归档失败: {str(e)}')
+
+@shared_task(name='purge_old_tasks_task')
+def purge_old_tasks_task():
+    """分批清理超过保留期的任务、用例结果与日志，每轮有时间上限，从上次的断点继续"""
+    from result_manager.purge import run_purge
+
+    try:
+        return run_purge()
+    except Exception as e:
+        logger.error(f'过期任务清理失败: {str(e)}')
+
+@shared_task(name='purge_soft_deleted_task')
+def purge_soft_deleted_task():
+    """物理删除超过保留期的软删除记录（删除前写入审计日志）"""
+    from common.soft_delete import purge_soft_deleted
+
+    try:
+        return purge_soft_deleted()
+    except Exception as e:
+        logger.error(f'清理软删除记录失败: {str(e)}')
+
+@shared_task(name='reconcile_counters_task')
+def reconcile_counters_task():
+    """校正模块特性数、特性用例数等冗余计数字段"""
+    from feature_testcase.counters import reconcile_counters
+
+    try:
+        return reconcile_counters()
+    except Exception as e:
+        logger.error(f'校正计数字段失败: {str(e)}')
+
+@shared_task(name='sync_case_repository_task')
+def sync_case_repository_task(full: bool = False):
+    """从代码仓增量同步特性与用例（只处理上次同步以来变化的脚本）"""
+    from feature_testcase.repo_sync import sync_repository
+
+    try:
+        return sync_repository(full=full)
+    except Exception as e:
+        logger.error(f'代码仓同步失败: {str(e)}')
+
+@shared_task(name='select_task_cases_task')
+def select_task_cases_task(task_id):
+    """根据包信息中两次提交之间的变更为任务选择用例"""
+    from execution_manager.models import TaskExecution
+    from execution_manager.selection import select_task_cases
+
+    try:
+        return select_task_cases(TaskExecution.objects.get(id=task_id))
     except Exception as e:
-        logger.error(f'停止环境失败: {str(e)}')
+        logger.error(f'任务 {task_id} 用例选择失败: {str(e)}')
 
 @shared_task(name='cleanup_old_logs')
 def cleanup_old_logs(days: int = 90):
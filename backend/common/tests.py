@@ -1,3 +1,127 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch, MagicMock
+from common import utils
+from common.models import AuditLog
+from common.soft_delete import purge_soft_deleted
 
-# Create your tests here.
+
+class DockerClientTestCase(TestCase):
+    """共享 Docker 客户端的测试用例"""
+
+    def setUp(self):
+        utils.reset_docker_client()
+
+    def tearDown(self):
+        utils.reset_docker_client()
+
+    @patch('docker.from_env')
+    def test_client_reused_within_interval(self, mock_from_env):
+        """健康检查间隔内复用同一客户端且不重复 ping"""
+        client = MagicMock()
+        mock_from_env.return_value = client
+        self.assertIs(utils.get_docker_client(), client)
+        self.assertIs(utils.get_docker_client(), client)
+        self.assertEqual(mock_from_env.call_count, 1)
+        self.assertEqual(client.ping.call_count, 1)
+
+    @override_settings(DOCKER_HEALTHCHECK_INTERVAL=0)
+    @patch('docker.from_env')
+    def test_unhealthy_client_replaced(self, mock_from_env):
+        """健康检查失败时重新创建客户端"""
+        stale = MagicMock()
+        fresh = MagicMock()
+        mock_from_env.side_effect = [stale, fresh]
+        self.assertIs(utils.get_docker_client(), stale)
+        stale.ping.side_effect = Exception('connection reset')
+        self.assertIs(utils.get_docker_client(), fresh)
+        stale.close.assert_called_once()
+
+    @patch('docker.from_env', side_effect=Exception('docker not running'))
+    def test_connection_failure_returns_none(self, mock_from_env):
+        """无法连接 Docker 时返回 None"""
+        self.assertIsNone(utils.get_docker_client())
+
+
+@override_settings(SOFT_DELETE_GRACE_DAYS=30, PURGE_PAUSE_SECONDS=0)
+class SoftDeletePurgeTestCase(TestCase):
+    """软删除记录物理清理的测试用例"""
+
+    def setUp(self):
+        from module_manager.models import Module
+        from feature_testcase.models import Feature
+        self.Module = Module
+        self.Feature = Feature
+        self.module = Module.objects.create(id='module-live', module_name='在用模块', chip_model='Chip-A', creator='u')
+        for index in range(3):
+            Feature.objects.create(id=f'feature-old-{index}', feature_name='旧特性', module_id=self.module.id, creator='u')
+        Feature.objects.create(id='feature-recent', feature_name='新删特性', module_id=self.module.id, creator='u')
+        Feature.objects.create(id='feature-live', feature_name='在用特性', module_id=self.module.id, creator='u')
+        for feature in Feature.objects.exclude(id='feature-live'):
+            feature.soft_delete()
+        Feature.objects.filter(id__startswith='feature-old').update(delete_time=timezone.now() - timedelta(days=40))
+
+    def test_alive_manager_excludes_deleted(self):
+        """alive 管理器只返回未删除记录，软删除时记录删除时间"""
+        self.assertEqual(list(self.Feature.alive.values_list('id', flat=True)), ['feature-live'])
+        self.assertEqual(self.Feature.objects.dead().count(), 4)
+        self.assertIsNotNone(self.Feature.objects.get(id='feature-recent').delete_time)
+
+    def test_purge_past_grace_period(self):
+        """只物理删除超过保留期的记录，并逐条写入审计日志"""
+        summary = purge_soft_deleted(batch_size=2)
+        self.assertEqual(summary, {'feature_testcase.Feature': 3})
+        self.assertEqual(
+            set(self.Feature.objects.values_list('id', flat=True)), {'feature-recent', 'feature-live'}
+        )
+        entries = AuditLog.objects.filter(operation_type='purge_feature').order_by('object_id')
+        self.assertEqual([entry.object_id for entry in entries], ['feature-old-0', 'feature-old-1', 'feature-old-2'])
+        self.assertEqual(entries[0].old_data['feature_name'], '旧特性')
+        self.assertTrue(entries[0].old_data['is_deleted'])
+        self.assertEqual(purge_soft_deleted(), {})
+
+    def test_referenced_rows_kept(self):
+        """仍被执行结果引用的已删除用例不清理"""
+        from env_manager.models import Environment
+        from execution_manager.models import TaskExecution
+        from feature_testcase.models import TestCase as Case
+        from result_manager.models import CaseResult
+        from test_suite.models import TestSuite
+        old = timezone.now() - timedelta(days=40)
+        cases = [
+            Case.objects.create(
+                id=f'case-{name}', case_id=f'CASE-{name}', case_name=name, feature_id='feature-live',
+                pre_condition='-', steps='-', expected_result='-', creator='u'
+            )
+            for name in ('used', 'unused')
+        ]
+        environment = Environment.objects.create(id='env-purge', name='清理环境', type='FPGA', owner='u')
+        suite = TestSuite.objects.create(name='清理测试套', visible_scope='private', creator='u')
+        task = TaskExecution.objects.create(
+            id='task-purge', suite_id=suite, env_id=environment, package_info='pkg', status='success', executor='u'
+        )
+        CaseResult.objects.create(id='result-purge', task_id=task, case_id=cases[0], status='success', execute_time=old)
+        for case in cases:
+            case.soft_delete()
+        Case.objects.update(delete_time=old)
+        summary = purge_soft_deleted()
+        self.assertEqual(summary['feature_testcase.TestCase'], 1)
+        self.assertEqual(list(Case.objects.values_list('id', flat=True)), ['case-used'])
+
+    def test_string_referenced_parents_kept(self):
+        """仍有下级特性的模块不清理，下级在同一轮清理后上级随之清理"""
+        old = timezone.now() - timedelta(days=40)
+        orphan = self.Module.objects.create(id='module-old', module_name='旧模块', chip_model='Chip-B', creator='u')
+        parent = self.Module.objects.create(id='module-parent', module_name='有特性模块', chip_model='Chip-C', creator='u')
+        self.Feature.objects.create(id='feature-child', feature_name='下级特性', module_id=parent.id, creator='u')
+        for module in (orphan, parent):
+            module.soft_delete()
+        self.Module.objects.filter(id__in=['module-old', 'module-parent']).update(delete_time=old)
+        self.Feature.objects.filter(id__startswith='feature-old').update(module_id=orphan.id)
+
+        summary = purge_soft_deleted()
+        self.assertEqual(summary['feature_testcase.Feature'], 3)
+        self.assertEqual(summary['module_manager.Module'], 1)
+        self.assertFalse(self.Module.objects.filter(id='module-old').exists())
+        self.assertTrue(self.Module.objects.filter(id='module-parent').exists())
@@ -1,6 +1,8 @@
 from django.http import HttpRequest
 from django.conf import settings
 import logging
+import threading
+import time
 from common.models import AuditLog
 
 logger = logging.getLogger('autotestweb')
@@ -169,23 +171,70 @@ def get_file_path(filename: str, subdir: str = None) -> str:
         return os.path.join(dir_path, filename)
     return os.path.join(base_dir, filename)
 
-def get_docker_client():
+# 进程内共享的 Docker 客户端及最近一次健康检查时间
+_docker_client = None
+_docker_client_checked_at = 0.0
+_docker_client_lock = threading.Lock()
+
+def get_docker_client(force_check: bool = False):
     """获取 Docker 客户端
     
+    客户端在进程内复用，只有距上次健康检查超过 DOCKER_HEALTHCHECK_INTERVAL 秒时才重新 ping；
+    ping 失败时丢弃旧客户端并重新连接。
+    
+    Args:
+        force_check: 是否强制执行健康检查
+        
     Returns:
-        docker.DockerClient: Docker 客户端对象
+        docker.DockerClient: Docker 客户端对象，连接失败时返回 None
     """
     import docker
+    global _docker_client, _docker_client_checked_at
     
-    try:
-        # 连接到本地 Docker 引擎
-        client = docker.from_env()
-        # 测试连接是否成功
-        client.ping()
-        return client
-    except Exception as e:
-        logger.error(f'连接 Docker 失败: {str(e)}')
-        return None
+    interval = getattr(settings, 'DOCKER_HEALTHCHECK_INTERVAL', 30)
+    with _docker_client_lock:
+        now = time.monotonic()
+        if _docker_client is not None:
+            if not force_check and now - _docker_client_checked_at < interval:
+                return _docker_client
+            try:
+                _docker_client.ping()
+                _docker_client_checked_at = now
+                return _docker_client
+            except Exception as e:
+                logger.warning(f'Docker 客户端健康检查失败，重新连接: {str(e)}')
+                reset_docker_client(locked=True)
+        
+        try:
+            # 连接到本地 Docker 引擎，连接池需容纳批量操作的并发线程
+            client = docker.from_env(max_pool_size=getattr(settings, 'DOCKER_MAX_POOL_SIZE', 32))
+            # 测试连接是否成功
+            client.ping()
+            _docker_client = client
+            _docker_client_checked_at = now
+            return client
+        except Exception as e:
+            logger.error(f'连接 Docker 失败: {str(e)}')
+            return None
+
+def reset_docker_client(locked: bool = False):
+    """丢弃进程内缓存的 Docker 客户端
+    
+    Args:
+        locked: 调用方是否已持有客户端锁
+    """
+    global _docker_client, _docker_client_checked_at
+    
+    if not locked:
+        with _docker_client_lock:
+            return reset_docker_client(locked=True)
+    if _docker_client is not None:
+        try:
+            _docker_client.close()
+        except Exception:
+            pass
+    _docker_client = None
+    _docker_client_checked_at = 0.0
 
 def generate_unique_id(prefix: str = '', length: int = 8) -> str:
     """生成唯一 ID
@@ -5,7 +5,7 @@ from django.contrib import admin
 """
 from django.contrib import admin
 from django.http import HttpRequest
-from env_manager.models import Environment, EnvironmentVariable
+from env_manager.models import Environment, EnvironmentVariable, WarmContainer
 
 @admin.register(Environment)
 class EnvironmentAdmin(admin.ModelAdmin):
@@ -61,62 +61,27 @@ class EnvironmentAdmin(admin.ModelAdmin):
     @admin.action(description='启动选中的环境')
     def start_environment(self, request, queryset):
         """启动选中的环境"""
-        from common.utils import get_docker_client
-        client = get_docker_client()
-        if not client:
-            self.message_user(request, '无法连接到 Docker 引擎', level='error')
-            return
-        
-        success_count = 0
-        error_count = 0
-        for environment in queryset:
-            try:
-                if environment.container_id:
-                    container = client.containers.get(environment.container_id)
-                    container.start()
-                    environment.status = 'running'
-                    environment.save()
-                    success_count += 1
-                else:
-                    error_count += 1
-            except Exception as e:
-                error_count += 1
-                self.message_user(request, f'启动环境 {environment.name} 失败: {str(e)}', level='error')
-        
-        if success_count > 0:
-            self.message_user(request, f'成功启动 {success_count} 个环境')
-        if error_count > 0:
-            self.message_user(request, f'有 {error_count} 个环境启动失败，请查看详情', level='error')
+        self._run_lifecycle(request, queryset, 'start', '启动')
     
     @admin.action(description='停止选中的环境')
     def stop_environment(self, request, queryset):
         """停止选中的环境"""
-        from common.utils import get_docker_client
-        client = get_docker_client()
-        if not client:
-            self.message_user(request, '无法连接到 Docker 引擎', level='error')
-            return
+        self._run_lifecycle(request, queryset, 'stop', '停止')
+    
+    def _run_lifecycle(self, request, queryset, action, action_name):
+        """并发执行选中环境的容器操作并汇总结果"""
+        from common.tasks import run_environment_lifecycle
+        environments = list(queryset)
+        summary = run_environment_lifecycle(action, environments)
         
-        success_count = 0
-        error_count = 0
-        for environment in queryset:
-            try:
-                if environment.container_id:
-                    container = client.containers.get(environment.container_id)
-                    container.stop()
-                    environment.status = 'stopped'
-                    environment.save()
-                    success_count += 1
-                else:
-                    error_count += 1
-            except Exception as e:
-                error_count += 1
-                self.message_user(request, f'停止环境 {environment.name} 失败: {str(e)}', level='error')
+        names = {environment.id: environment.name for environment in environments}
+        for env_id, error in summary['failed'].items():
+            self.message_user(request, f'{action_name}环境 {names[env_id]} 失败: {error}', level='error')
         
-        if success_count > 0:
-            self.message_user(request, f'成功停止 {success_count} 个环境')
-        if error_count > 0:
-            self.message_user(request, f'有 {error_count} 个环境停止失败，请查看详情', level='error')
+        if summary['succeeded']:
+            self.message_user(request, f'成功{action_name} {len(summary["succeeded"])} 个环境')
+        if summary['failed']:
+            self.message_user(request, f'有 {len(summary["failed"])} 个环境{action_name}失败，请查看详情', level='error')
 
 @admin.register(EnvironmentVariable)
 class EnvironmentVariableAdmin(admin.ModelAdmin):
@@ -131,3 +96,14 @@ class EnvironmentVariableAdmin(admin.ModelAdmin):
     )
     ordering = ('environment', 'key')
     list_per_page = 20
+
+
+@admin.register(WarmContainer)
+class WarmContainerAdmin(admin.ModelAdmin):
+    """预热容器的管理配置"""
+    list_display = ('id', 'image', 'name', 'container_id', 'ip', 'status', 'claimed_by', 'create_time', 'claim_time')
+    search_fields = ('image', 'name', 'container_id', 'claimed_by')
+    list_filter = ('status', 'image')
+    readonly_fields = ('create_time', 'claim_time')
+    ordering = ('image', 'create_time')
+    list_per_page = 20
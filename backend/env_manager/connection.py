@@ -0,0 +1,394 @@
+"""环境控制台连接管理
+
+为 Telnet / Redirect 连接方式的环境维护已登录的 MML 控制台会话。
+同一进程内对同一环境的多次操作（如同一任务中的多个用例）复用同一个会话，
+只在会话失效时重新登录，避免每个用例都付出数秒的登录开销。
+"""
+import re
+import select
+import socket
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger('autotestweb')
+
+# Telnet 协议控制字符
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+# 登录交互提示符
+USERNAME_PROMPT = re.compile(rb'(?i)(username|login)\s*:\s*$')
+PASSWORD_PROMPT = re.compile(rb'(?i)password\s*:\s*$')
+SHELL_PROMPT = re.compile(rb'[>#$]\s*$')
+LOGIN_FAILED = re.compile(rb'(?i)(login failed|incorrect|authentication failed|denied)')
+
+
+def _setting(name, default):
+    """读取控制台相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+class ConsoleError(Exception):
+    """控制台连接或交互失败"""
+
+
+class ConsoleAuthError(ConsoleError):
+    """控制台登录失败（账号或密码错误），重连无意义"""
+
+
+class ConsoleConnectionError(ConsoleError):
+    """控制台连接建立失败或已断开，重新连接后可以重试"""
+
+
+class ConsoleTimeoutError(ConsoleError):
+    """等待控制台输出超时，连接仍在但命令可能仍在执行，重试可能重复执行命令"""
+
+
+class ConsoleSession:
+    """单个环境的 MML 控制台会话（基于 Telnet 协议）"""
+
+    def __init__(self, env_id, host, port, username, password, redirect_slot=None):
+        self.env_id = env_id
+        self.host = host
+        self.port = int(port)
+        self.username = username or 'admin'
+        self.password = password or ''
+        self.redirect_slot = redirect_slot
+        self.sock = None
+        self.buffer = b''
+        self.last_used = 0.0
+        self.login_count = 0
+
+    @property
+    def signature(self):
+        """连接参数签名，环境配置变更后旧会话不再复用"""
+        return (self.host, self.port, self.username, self.password, self.redirect_slot)
+
+    @property
+    def connected(self):
+        return self.sock is not None
+
+    def connect(self):
+        """建立连接并完成登录"""
+        self.close()
+        timeout = _setting('ENV_CONSOLE_CONNECT_TIMEOUT', 10)
+        try:
+            self.sock = socket.create_connection((self.host, self.port), timeout=timeout)
+        except OSError as e:
+            self.sock = None
+            raise ConsoleConnectionError(f'连接 {self.host}:{self.port} 失败: {str(e)}')
+        try:
+            self._login(timeout)
+            if self.redirect_slot:
+                self._redirect(timeout)
+        except Exception:
+            self.close()
+            raise
+        self.login_count += 1
+        self.last_used = time.monotonic()
+        logger.info(f'环境 {self.env_id} 控制台登录成功: {self.host}:{self.port}')
+
+    def _login(self, timeout):
+        """按提示符依次输入账号和密码"""
+        index, _ = self.expect([USERNAME_PROMPT, PASSWORD_PROMPT, SHELL_PROMPT], timeout)
+        if index == 0:
+            self.write(self.username)
+            index, _ = self.expect([PASSWORD_PROMPT, SHELL_PROMPT], timeout)
+            index += 1
+        if index == 1:
+            self.write(self.password)
+            index, output = self.expect([SHELL_PROMPT, LOGIN_FAILED, USERNAME_PROMPT], timeout)
+            if index != 0:
+                raise ConsoleAuthError(f'环境 {self.env_id} 控制台登录失败: 账号或密码错误')
+
+    def _redirect(self, timeout):
+        """Redirect 方式：登录后切换到指定柜框槽位的单板控制台"""
+        command = _setting('ENV_REDIRECT_COMMAND', 'redirect {slot}').format(slot=self.redirect_slot)
+        self.write(command)
+        self.expect([SHELL_PROMPT], timeout)
+
+    def close(self):
+        """关闭连接"""
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.buffer = b''
+
+    def write(self, line):
+        """发送一行命令"""
+        if self.sock is None:
+            raise ConsoleConnectionError(f'环境 {self.env_id} 控制台未连接')
+        data = line.encode('utf-8').replace(bytes([IAC]), bytes([IAC, IAC])) + b'\r\n'
+        try:
+            self.sock.sendall(data)
+        except OSError as e:
+            self.close()
+            raise ConsoleConnectionError(f'环境 {self.env_id} 控制台发送失败: {str(e)}')
+
+    def expect(self, patterns, timeout):
+        """读取输出直到匹配任一模式，返回 (模式下标, 匹配前的输出)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            for index, pattern in enumerate(patterns):
+                match = pattern.search(self.buffer)
+                if match:
+                    output = self.buffer[:match.start()]
+                    self.buffer = self.buffer[match.end():]
+                    return index, output
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ConsoleTimeoutError(f'环境 {self.env_id} 控制台等待输出超时')
+            self._fill(remaining)
+
+    def _fill(self, timeout):
+        """从套接字读取一批数据并去除 Telnet 协商字符"""
+        if self.sock is None:
+            raise ConsoleConnectionError(f'环境 {self.env_id} 控制台未连接')
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(4096)
+        except socket.timeout:
+            return
+        except OSError as e:
+            self.close()
+            raise ConsoleConnectionError(f'环境 {self.env_id} 控制台读取失败: {str(e)}')
+        if not data:
+            self.close()
+            raise ConsoleConnectionError(f'环境 {self.env_id} 控制台连接已被对端关闭')
+        self.buffer += self._negotiate(data)
+
+    def _negotiate(self, data):
+        """拒绝对端的所有选项协商，返回去除控制序列后的数据"""
+        output = bytearray()
+        replies = bytearray()
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte != IAC:
+                output.append(byte)
+                i += 1
+                continue
+            command = data[i + 1] if i + 1 < len(data) else None
+            if command == IAC:
+                output.append(IAC)
+                i += 2
+            elif command in (DO, DONT, WILL, WONT) and i + 2 < len(data):
+                option = data[i + 2]
+                if command == DO:
+                    replies += bytes([IAC, WONT, option])
+                elif command == WILL:
+                    replies += bytes([IAC, DONT, option])
+                i += 3
+            elif command == SB:
+                end = data.find(bytes([IAC, SE]), i)
+                i = len(data) if end < 0 else end + 2
+            else:
+                i += 2
+        if replies:
+            try:
+                self.sock.sendall(bytes(replies))
+            except OSError:
+                pass
+        return bytes(output)
+
+    def is_alive(self):
+        """探测会话是否可用
+
+        先用非阻塞方式检查套接字是否已被关闭；空闲超过探测间隔的会话
+        再发送空行并等待提示符，确认 MML 仍然响应。
+        """
+        if self.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if readable:
+                self._fill(0.1)
+        except ConsoleError:
+            return False
+        idle = time.monotonic() - self.last_used
+        if idle < _setting('ENV_CONSOLE_PROBE_INTERVAL', 30):
+            return True
+        try:
+            self.buffer = b''
+            self.write('')
+            self.expect([SHELL_PROMPT], _setting('ENV_CONSOLE_PROBE_TIMEOUT', 5))
+        except ConsoleError:
+            self.close()
+            return False
+        self.last_used = time.monotonic()
+        return True
+
+    def execute(self, command, timeout=None):
+        """执行一条命令并返回提示符之前的输出"""
+        if timeout is None:
+            timeout = _setting('ENV_CONSOLE_COMMAND_TIMEOUT', 30)
+        self.buffer = b''
+        self.write(command)
+        _, output = self.expect([SHELL_PROMPT], timeout)
+        self.last_used = time.monotonic()
+        text = output.decode('utf-8', errors='replace')
+        lines = text.splitlines()
+        # 最后一行未换行的内容是提示符本身（如 "MML>" 中的 "MML"）
+        if lines and not text.endswith(('\n', '\r')):
+            lines = lines[:-1]
+        # 去掉终端回显的命令本身
+        if lines and lines[0].strip() == command.strip():
+            lines = lines[1:]
+        return '\n'.join(lines)
+
+
+def create_session(environment):
+    """根据环境的连接方式创建控制台会话
+
+    Redirect 方式优先使用环境配置的端口，未配置时使用 ENV_REDIRECT_PORT。
+    """
+    if environment.conn_type == 'Redirect':
+        return ConsoleSession(
+            env_id=environment.id,
+            host=environment.ip,
+            port=environment.port or _setting('ENV_REDIRECT_PORT', 23),
+            username=environment.admin,
+            password=environment.admin_password,
+            redirect_slot=environment.cabinet_frame_slot,
+        )
+    return ConsoleSession(
+        env_id=environment.id,
+        host=environment.ip,
+        port=environment.port,
+        username=environment.admin,
+        password=environment.admin_password,
+    )
+
+
+class ConsoleSessionPool:
+    """按环境维护的控制台会话池
+
+    每个环境至多保持一个已登录会话；控制台是串行的，
+    同一时刻只允许一个调用方持有某个环境的会话。
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._env_locks = {}
+        self._lock = threading.Lock()
+
+    def _env_lock(self, env_id):
+        with self._lock:
+            if env_id not in self._env_locks:
+                self._env_locks[env_id] = threading.Lock()
+            return self._env_locks[env_id]
+
+    def _get_live_session(self, environment):
+        """返回可用的会话，必要时重新连接"""
+        candidate = create_session(environment)
+        session = self._sessions.get(environment.id)
+        if session is not None:
+            if session.signature == candidate.signature and session.is_alive():
+                return session
+            logger.info(f'环境 {environment.id} 控制台会话失效，重新连接')
+            session.close()
+            candidate.login_count = session.login_count
+
+        retries = _setting('ENV_CONSOLE_CONNECT_RETRIES', 2)
+        for attempt in range(retries + 1):
+            try:
+                candidate.connect()
+                break
+            except ConsoleAuthError:
+                raise
+            except ConsoleError as e:
+                if attempt >= retries:
+                    raise
+                logger.warning(f'环境 {environment.id} 控制台连接失败，第 {attempt + 1} 次重试: {str(e)}')
+                time.sleep(min(2 ** attempt, 5))
+        self._sessions[environment.id] = candidate
+        return candidate
+
+    @contextmanager
+    def session(self, environment):
+        """独占获取环境的控制台会话
+
+        用法:
+            with console_pool.session(environment) as session:
+                session.execute('DSP BRD:;')
+        """
+        self.close_idle()
+        with self._env_lock(environment.id):
+            session = self._get_live_session(environment)
+            try:
+                yield session
+            except ConsoleError:
+                session.close()
+                raise
+
+    def execute(self, environment, command, timeout=None):
+        """在环境控制台执行命令，复用的会话连接中断时透明重连并重试一次
+
+        建立连接的失败已在 _get_live_session 中重试，直接抛出；命令等待输出超时说明命令
+        可能仍在执行，关闭会话后抛出 ConsoleTimeoutError，不重复下发命令。
+        """
+        for attempt in range(2):
+            with self.session(environment) as session:
+                try:
+                    return session.execute(command, timeout)
+                except ConsoleConnectionError as e:
+                    session.close()
+                    if attempt:
+                        raise
+                    logger.warning(f'环境 {environment.id} 执行命令时连接中断，重连后重试: {str(e)}')
+
+    def close(self, env_id):
+        """关闭指定环境的会话（如环境释放或删除时）"""
+        with self._env_lock(env_id):
+            session = self._sessions.pop(env_id, None)
+            if session is not None:
+                session.close()
+
+    def close_idle(self, max_idle=None):
+        """关闭空闲时间超过阈值的会话"""
+        if max_idle is None:
+            max_idle = _setting('ENV_CONSOLE_IDLE_TIMEOUT', 600)
+        now = time.monotonic()
+        for env_id, session in list(self._sessions.items()):
+            if session.connected and now - session.last_used > max_idle:
+                lock = self._env_lock(env_id)
+                if lock.acquire(blocking=False):
+                    try:
+                        session.close()
+                        self._sessions.pop(env_id, None)
+                    finally:
+                        lock.release()
+
+    def close_all(self):
+        """关闭全部会话"""
+        for env_id in list(self._sessions.keys()):
+            self.close(env_id)
+
+    def stats(self):
+        """返回会话池状态，便于监控"""
+        return {
+            env_id: {
+                'host': session.host,
+                'port': session.port,
+                'connected': session.connected,
+                'login_count': session.login_count,
+                'idle_seconds': round(time.monotonic() - session.last_used, 1),
+            }
+            for env_id, session in self._sessions.items()
+        }
+
+
+# 进程级共享的会话池
+console_pool = ConsoleSessionPool()
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('env_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='environment',
+            name='configuration',
+            field=models.JSONField(blank=True, help_text='端口映射(ports)、环境变量(environment)、数据卷(volumes)', null=True, verbose_name='容器配置'),
+        ),
+        migrations.AddField(
+            model_name='environment',
+            name='container_id',
+            field=models.CharField(blank=True, max_length=128, null=True, verbose_name='容器ID'),
+        ),
+        migrations.AddField(
+            model_name='environment',
+            name='docker_image',
+            field=models.CharField(blank=True, help_text='QEMU等容器化环境使用，如 qemu-arm:latest', max_length=256, null=True, verbose_name='容器镜像'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('env_manager', '0002_environment_container_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WarmContainer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=256, verbose_name='容器镜像')),
+                ('container_id', models.CharField(max_length=128, unique=True, verbose_name='容器ID')),
+                ('name', models.CharField(max_length=128, verbose_name='容器名称')),
+                ('ip', models.CharField(blank=True, max_length=32, null=True, verbose_name='容器IP地址')),
+                ('status', models.CharField(choices=[('idle', '空闲'), ('claimed', '已领用')], default='idle', max_length=32, verbose_name='状态')),
+                ('claimed_by', models.CharField(blank=True, help_text='环境ID或任务ID', max_length=64, null=True, verbose_name='领用方')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('claim_time', models.DateTimeField(blank=True, null=True, verbose_name='领用时间')),
+            ],
+            options={
+                'verbose_name': '预热容器',
+                'verbose_name_plural': '预热容器',
+                'db_table': 'tb_warm_container',
+                'ordering': ['create_time'],
+                'indexes': [models.Index(fields=['image', 'status'], name='warm_idx_image_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('env_manager', '0003_warmcontainer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='environment',
+            name='snapshot_image',
+            field=models.CharField(blank=True, help_text='环境准备完成后提交的容器快照，任务间用于快速复位', max_length=256, null=True, verbose_name='基线快照镜像'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+def backfill_delete_time(apps, schema_editor):
+    """已软删除的历史记录以最后更新时间作为删除时间"""
+    for model_name in ['Environment']:
+        model = apps.get_model('env_manager', model_name)
+        model.objects.filter(is_deleted=True, delete_time__isnull=True).update(delete_time=models.F('update_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('env_manager', '0004_environment_snapshot_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='environment',
+            name='delete_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='删除时间'),
+        ),
+        migrations.RunPython(backfill_delete_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='environment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-create_time'], name='env_live_idx_ctime'),
+        ),
+        migrations.AddIndex(
+            model_name='environment',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['delete_time'], name='env_dead_idx_dtime'),
+        ),
+    ]
@@ -47,6 +47,10 @@ class Environment(BaseModel):
     )
     owner = models.CharField(max_length=64, verbose_name='环境负责人', null=False, help_text='关联tb_user.id')
     last_check_time = models.DateTimeField(verbose_name='最后一次状态检查时间', null=True)
+    docker_image = models.CharField(max_length=256, verbose_name='容器镜像', null=True, blank=True, help_text='QEMU等容器化环境使用，如 qemu-arm:latest')
+    container_id = models.CharField(max_length=128, verbose_name='容器ID', null=True, blank=True)
+    configuration = models.JSONField(verbose_name='容器配置', null=True, blank=True, help_text='端口映射(ports)、环境变量(environment)、数据卷(volumes)')
+    snapshot_image = models.CharField(max_length=256, verbose_name='基线快照镜像', null=True, blank=True, help_text='环境准备完成后提交的容器快照，任务间用于快速复位')
     create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True, null=False)
     update_time = models.DateTimeField(verbose_name='更新时间', auto_now=True, null=False)
 
@@ -55,6 +59,11 @@ class Environment(BaseModel):
         verbose_name = '环境信息'
         verbose_name_plural = '环境信息'
         ordering = ['-create_time']
+        # 部分索引：列表查询只扫描未删除的记录，清理任务只扫描已删除的记录（MySQL 不支持，迁移时跳过）
+        indexes = [
+            models.Index(fields=['-create_time'], name='env_live_idx_ctime', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['delete_time'], name='env_dead_idx_dtime', condition=models.Q(is_deleted=True)),
+        ]
 
     def __str__(self):
         return self.name
@@ -74,3 +83,31 @@ class EnvironmentVariable(models.Model):
 
     def __str__(self):
         return f'{self.environment.name} - {self.key}'
+
+
+class WarmContainer(models.Model):
+    """预热容器池表 - 预先启动的 QEMU 等容器，创建环境时直接领用"""
+    STATUS_CHOICES = [
+        ('idle', '空闲'),
+        ('claimed', '已领用'),
+    ]
+    image = models.CharField(max_length=256, verbose_name='容器镜像')
+    container_id = models.CharField(max_length=128, verbose_name='容器ID', unique=True)
+    name = models.CharField(max_length=128, verbose_name='容器名称')
+    ip = models.CharField(max_length=32, verbose_name='容器IP地址', null=True, blank=True)
+    status = models.CharField(max_length=32, verbose_name='状态', choices=STATUS_CHOICES, default='idle')
+    claimed_by = models.CharField(max_length=64, verbose_name='领用方', null=True, blank=True, help_text='环境ID或任务ID')
+    create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+    claim_time = models.DateTimeField(verbose_name='领用时间', null=True, blank=True)
+
+    class Meta:
+        db_table = 'tb_warm_container'
+        verbose_name = '预热容器'
+        verbose_name_plural = '预热容器'
+        ordering = ['create_time']
+        indexes = [
+            models.Index(fields=['image', 'status'], name='warm_idx_image_status'),
+        ]
+
+    def __str__(self):
+        return f'{self.image} - {self.name} ({self.status})'
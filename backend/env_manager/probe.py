@@ -0,0 +1,293 @@
+"""环境连通性批量探测
+
+使用 asyncio 并发探测所有环境的 TCP 端口与控制台可达性，
+探测结果写入缓存（默认 30 秒过期，与监控频率一致），
+只有环境状态真正发生变化时才写回 tb_environment。
+"""
+import asyncio
+import time
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger('autotestweb')
+
+STATUS_CACHE_KEY = 'env_status:{env_id}'
+LATENCY_CACHE_KEY = 'env_latency_hist:{env_id}'
+
+# 延迟直方图分桶上界（毫秒），最后一个桶收集超过上界的样本
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+def _setting(name, default):
+    """读取探测相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def probe_target(environment):
+    """返回环境用于探测的 (host, port)"""
+    if environment.conn_type == 'Redirect':
+        return environment.ip, int(environment.port or _setting('ENV_REDIRECT_PORT', 23))
+    return environment.ip, int(environment.port)
+
+
+async def probe_one(env_id, host, port, timeout, check_console=True):
+    """探测单个环境
+
+    先建立 TCP 连接，再等待控制台输出登录提示等首批数据，
+    两步共用同一个超时时间。
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    result = {
+        'env_id': env_id,
+        'tcp': False,
+        'console': False,
+        'latency_ms': None,
+        'error': None,
+        'checked_at': timezone.now().isoformat(),
+    }
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        result['tcp'] = True
+        result['latency_ms'] = round((loop.time() - started) * 1000, 2)
+        if check_console:
+            remaining = max(timeout - (loop.time() - started), 0.01)
+            data = await asyncio.wait_for(reader.read(1024), remaining)
+            if data:
+                result['console'] = True
+            else:
+                result['error'] = '控制台无响应'
+        else:
+            result['console'] = True
+    except asyncio.TimeoutError:
+        result['error'] = '控制台无响应' if result['tcp'] else '连接超时'
+    except OSError as e:
+        result['error'] = f'端口不通: {str(e)}'
+    finally:
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+    return result
+
+
+async def probe_many(targets, timeout, concurrency):
+    """并发探测多个环境，整体耗时约等于单个超时时间"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(target):
+        async with semaphore:
+            return await probe_one(**target, timeout=timeout)
+
+    results = await asyncio.gather(*(bounded(target) for target in targets), return_exceptions=True)
+    # 单个环境的意外异常只影响该环境，不中断整批探测
+    return [
+        _failed_result(target['env_id'], f'探测异常: {result!r}') if isinstance(result, BaseException) else result
+        for target, result in zip(targets, results)
+    ]
+
+
+def _failed_result(env_id, error):
+    return {
+        'env_id': env_id,
+        'tcp': False,
+        'console': False,
+        'latency_ms': None,
+        'error': error,
+        'checked_at': timezone.now().isoformat(),
+    }
+
+
+def _build_targets(environments):
+    """生成探测目标，配置错误的环境直接记为失败"""
+    targets = []
+    invalid = []
+    for environment in environments:
+        try:
+            host, port = probe_target(environment)
+        except (TypeError, ValueError):
+            invalid.append(_failed_result(environment.id, f'端口配置无效: {environment.port}'))
+            continue
+        targets.append({
+            'env_id': environment.id,
+            'host': host,
+            'port': port,
+            # 占用中的环境控制台可能只允许单个会话，只探测 TCP 端口
+            'check_console': environment.status != 'occupied',
+        })
+    return targets, invalid
+
+
+# 由任务或生命周期操作管理的状态，探测只刷新缓存，不改写数据库中的状态
+MANAGED_STATUSES = ('pending', 'occupied')
+
+
+def resolve_status(current_status, result):
+    """根据探测结果计算环境应处于的状态"""
+    if current_status in MANAGED_STATUSES:
+        return current_status
+    if result['tcp'] and result['console']:
+        return 'available'
+    return 'unavailable'
+
+
+def record_latency(results):
+    """累加各环境的延迟直方图"""
+    keys = {LATENCY_CACHE_KEY.format(env_id=r['env_id']): r for r in results if r['latency_ms'] is not None}
+    if not keys:
+        return
+    histograms = cache.get_many(list(keys.keys()))
+    for key, result in keys.items():
+        histogram = histograms.get(key) or {'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'count': 0, 'sum_ms': 0.0}
+        index = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if result['latency_ms'] <= bound:
+                index = i
+                break
+        histogram['buckets'][index] += 1
+        histogram['count'] += 1
+        histogram['sum_ms'] += result['latency_ms']
+        histograms[key] = histogram
+    cache.set_many({key: histograms[key] for key in keys}, timeout=None)
+
+
+def apply_results(environments, results, stamp_all=False):
+    """写入状态缓存，并只对状态发生变化的环境更新数据库
+
+    环境列表在探测开始前加载，探测期间状态可能已被任务或生命周期操作改写，因此逐条按
+    探测前的状态条件更新（filter(id=..., status=旧状态)），状态已变化的环境不覆盖。
+
+    Args:
+        environments: 被探测的环境列表
+        results: 探测结果列表
+        stamp_all: 是否无论状态是否变化都更新最后检查时间（手动检测时使用）
+
+    Returns:
+        list: 状态发生变化的环境ID
+    """
+    from env_manager.models import Environment
+
+    by_id = {environment.id: environment for environment in environments}
+    now = timezone.now()
+    cache_entries = {}
+    changed = []
+    for result in results:
+        environment = by_id[result['env_id']]
+        old_status = environment.status
+        new_status = resolve_status(old_status, result)
+        result['status'] = new_status
+        cache_entries[STATUS_CACHE_KEY.format(env_id=environment.id)] = result
+        if new_status == old_status:
+            continue
+        updated = Environment.objects.filter(id=environment.id, status=old_status).update(
+            status=new_status, last_check_time=now, update_time=now
+        )
+        if updated:
+            changed.append(environment.id)
+            environment.status, environment.last_check_time = new_status, now
+            logger.info(f'环境 {environment.name} 状态变化: {old_status} -> {new_status}')
+    cache.set_many(cache_entries, timeout=_setting('ENV_STATUS_CACHE_TTL', 30))
+    record_latency(results)
+
+    if stamp_all:
+        stamped = [env_id for env_id in by_id if env_id not in changed]
+        Environment.objects.filter(id__in=stamped).update(last_check_time=now, update_time=now)
+        for env_id in stamped:
+            by_id[env_id].last_check_time = now
+    return changed
+
+
+def probe_environments(environments=None, stamp_all=False):
+    """探测环境并更新状态
+
+    Args:
+        environments: 要探测的环境，默认全部未删除的环境
+        stamp_all: 是否强制更新所有环境的最后检查时间
+
+    Returns:
+        list: 各环境的探测结果
+    """
+    from env_manager.models import Environment
+
+    if environments is None:
+        environments = list(Environment.objects.filter(is_deleted=False))
+    if not environments:
+        return []
+
+    timeout = _setting('ENV_PROBE_TIMEOUT', 5)
+    concurrency = _setting('ENV_PROBE_CONCURRENCY', 256)
+    targets, results = _build_targets(environments)
+
+    started = time.monotonic()
+    if targets:
+        results += asyncio.run(probe_many(targets, timeout, concurrency))
+    changed = apply_results(environments, results, stamp_all=stamp_all)
+    logger.info(
+        f'环境连通性探测完成: {len(results)} 个环境, {len(changed)} 个状态变化, '
+        f'耗时 {time.monotonic() - started:.2f}s'
+    )
+    return results
+
+
+def wait_until_ready(environments, timeout=None, interval=None):
+    """等待容器启动后的环境控制台就绪
+
+    生命周期操作启动容器后环境处于 pending，周期探测不会改变该状态；这里按 ENV_READY_INTERVAL
+    反复探测，控制台有响应的环境改为 available，超过 ENV_READY_TIMEOUT 仍未就绪的改为 unavailable。
+    只更新仍处于 pending 的环境，等待期间状态已被其他操作改写的不覆盖。
+
+    Returns:
+        list: 已就绪的环境ID
+    """
+    from env_manager.models import Environment
+
+    if timeout is None:
+        timeout = _setting('ENV_READY_TIMEOUT', 300)
+    if interval is None:
+        interval = _setting('ENV_READY_INTERVAL', 5)
+    deadline = time.monotonic() + timeout
+    waiting, _ = _build_targets(environments)
+    ready = []
+    while waiting:
+        results = asyncio.run(probe_many(waiting, _setting('ENV_PROBE_TIMEOUT', 5), _setting('ENV_PROBE_CONCURRENCY', 256)))
+        ready += [result['env_id'] for result in results if result['tcp'] and result['console']]
+        waiting = [target for target in waiting if target['env_id'] not in ready]
+        if not waiting or time.monotonic() + interval > deadline:
+            break
+        time.sleep(interval)
+
+    now = timezone.now()
+    env_ids = [environment.id for environment in environments]
+    Environment.objects.filter(id__in=ready, status='pending').update(
+        status='available', last_check_time=now, update_time=now
+    )
+    Environment.objects.filter(id__in=env_ids, status='pending').exclude(id__in=ready).update(
+        status='unavailable', last_check_time=now, update_time=now
+    )
+    if len(ready) < len(env_ids):
+        logger.warning(f'环境未在 {timeout}s 内就绪: {", ".join(sorted(set(env_ids) - set(ready)))}')
+    return ready
+
+
+def get_cached_status(env_id):
+    """获取缓存中的最近一次探测结果"""
+    return cache.get(STATUS_CACHE_KEY.format(env_id=env_id))
+
+
+def get_latency_histogram(env_id):
+    """获取环境的探测延迟直方图"""
+    histogram = cache.get(LATENCY_CACHE_KEY.format(env_id=env_id))
+    if not histogram:
+        return None
+    bounds = [f'<={bound}ms' for bound in LATENCY_BUCKETS] + [f'>{LATENCY_BUCKETS[-1]}ms']
+    return {
+        'buckets': dict(zip(bounds, histogram['buckets'])),
+        'count': histogram['count'],
+        'avg_ms': round(histogram['sum_ms'] / histogram['count'], 2) if histogram['count'] else None,
+    }
@@ -21,9 +21,10 @@ class EnvironmentSerializer(serializers.ModelSerializer):
             'id', 'name', 'type', 'type_display', 'conn_type', 'conn_type_display',
             'ip', 'admin', 'admin_password', 'cabinet_frame_slot', 'port', 'ftp_mask',
             'status', 'status_display', 'owner', 'last_check_time',
+            'docker_image', 'container_id', 'configuration', 'snapshot_image',
             'create_time', 'update_time', 'variables'
         ]
-        read_only_fields = ['id', 'create_time', 'update_time', 'variables', 'owner']
+        read_only_fields = ['id', 'create_time', 'update_time', 'variables', 'owner', 'container_id', 'snapshot_image']
 
     def validate_name(self, value):
         """验证环境名称的唯一性"""
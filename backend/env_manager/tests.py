@@ -7,10 +7,28 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
-from env_manager.models import Environment, EnvironmentVariable
+from env_manager.models import Environment, EnvironmentVariable, WarmContainer
 from common.models import BaseModel
+from django.test import override_settings
+from django.core.cache import cache
+from unittest.mock import patch, MagicMock
+from common.tasks import (
+    batch_environment_lifecycle_task, run_environment_lifecycle, create_environment_task, restore_environment_task,
+)
+from env_manager import warm_pool
+from env_manager.connection import ConsoleSessionPool, ConsoleAuthError, ConsoleTimeoutError
+from env_manager.probe import (
+    apply_results, probe_environments, probe_many, probe_one, get_cached_status, get_latency_histogram
+)
+import asyncio
+import itertools
 import json
 import datetime
+import re
+import socket
+import socketserver
+import threading
+import time
 from django.test import TestCase
 
 
@@ -324,6 +342,15 @@ class EnvironmentAPITestCase(TestCase):
         # 检查返回的状态是否正确
         self.assertEqual(response.data['status'], self.environment.status)
 
+    def test_batch_lifecycle_rejects_non_list_ids(self):
+        """批量操作的 ids 不是列表时返回 400"""
+        self.client.login(username='adminuser', password='adminpassword')
+        url = reverse('environment-batch-lifecycle')
+        with patch('env_manager.views.batch_environment_lifecycle_task.delay') as mock_delay:
+            response = self.client.post(url, {'action': 'start', 'ids': 'env-test-1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+
 class EnvironmentIntegrationTestCase(TestCase):
     """环境管理的集成测试用例"""
     
@@ -646,3 +673,582 @@ class EnvironmentSearchTestCase(TestCase):
         # 检查数据结构是否包含分页所需的字段
         self.assertIn('results', response.data)
         self.assertIn('count', response.data)
+
+
+class FakeMMLHandler(socketserver.StreamRequestHandler):
+    """模拟 MML 控制台：登录后回显命令"""
+
+    def readline_text(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        # 去掉客户端对选项协商的应答
+        return re.sub(rb'\xff[\xfb-\xfe].', b'', line).strip().decode()
+
+    def handle(self):
+        server = self.server
+        # 协商回显选项并提示登录
+        self.wfile.write(b'\xff\xfb\x01Username:')
+        if self.readline_text() is None:
+            return
+        self.wfile.write(b'Password:')
+        if self.readline_text() != 'password123':
+            self.wfile.write(b'\r\nLogin failed\r\n')
+            return
+        server.logins += 1
+        self.wfile.write(b'\r\nMML>')
+        while True:
+            command = self.readline_text()
+            if command is None:
+                return
+            server.commands.append(command)
+            if command == 'DROP':
+                return
+            if command == 'HANG':
+                continue
+            self.wfile.write(f'{command}\r\nRESULT {command}\r\nMML>'.encode())
+
+
+class ConsoleSessionPoolTestCase(TestCase):
+    """控制台会话池的测试用例"""
+
+    def setUp(self):
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), FakeMMLHandler)
+        self.server.daemon_threads = True
+        self.server.logins = 0
+        self.server.commands = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.port = self.server.server_address[1]
+        self.pool = ConsoleSessionPool()
+        self.environment = Environment(
+            id='env-console-1',
+            name='控制台环境',
+            type='FPGA',
+            conn_type='Telnet',
+            ip='127.0.0.1',
+            port=str(self.port),
+            admin='admin',
+            admin_password='password123',
+            owner='testuser'
+        )
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_reused_across_commands(self):
+        """多次执行命令只登录一次"""
+        self.assertEqual(self.pool.execute(self.environment, 'DSP BRD:;'), 'RESULT DSP BRD:;')
+        self.assertEqual(self.pool.execute(self.environment, 'LST VER:;'), 'RESULT LST VER:;')
+        self.assertEqual(self.server.logins, 1)
+        self.assertTrue(self.pool.stats()[self.environment.id]['connected'])
+
+    def test_transparent_reconnect(self):
+        """连接被对端断开后自动重新登录"""
+        self.pool.execute(self.environment, 'DSP BRD:;')
+        with self.pool.session(self.environment) as session:
+            session.write('DROP')
+        time.sleep(0.2)
+        self.assertEqual(self.pool.execute(self.environment, 'LST VER:;'), 'RESULT LST VER:;')
+        self.assertEqual(self.server.logins, 2)
+
+    def test_idle_session_probed_before_reuse(self):
+        """空闲超过探测间隔的会话复用前发送空行探活"""
+        self.pool.execute(self.environment, 'DSP BRD:;')
+        with override_settings(ENV_CONSOLE_PROBE_INTERVAL=0):
+            self.pool.execute(self.environment, 'LST VER:;')
+        self.assertIn('', self.server.commands)
+        self.assertEqual(self.server.logins, 1)
+
+    def test_config_change_creates_new_session(self):
+        """环境连接参数变更后重新登录"""
+        self.pool.execute(self.environment, 'DSP BRD:;')
+        self.environment.admin = 'operator'
+        self.pool.execute(self.environment, 'DSP BRD:;')
+        self.assertEqual(self.server.logins, 2)
+
+    def test_wrong_password(self):
+        """密码错误时抛出登录异常且不重试"""
+        self.environment.admin_password = 'wrong'
+        with self.assertRaises(ConsoleAuthError):
+            self.pool.execute(self.environment, 'DSP BRD:;')
+        self.assertEqual(self.server.logins, 0)
+
+    def test_command_timeout_not_retried(self):
+        """命令等待输出超时时直接抛出，不重连重发命令"""
+        with self.assertRaises(ConsoleTimeoutError):
+            self.pool.execute(self.environment, 'HANG', timeout=0.3)
+        self.assertEqual(self.server.commands.count('HANG'), 1)
+        self.assertEqual(self.server.logins, 1)
+        self.assertFalse(self.pool.stats()[self.environment.id]['connected'])
+
+    @override_settings(ENV_REDIRECT_COMMAND='redirect {slot}')
+    def test_redirect_session(self):
+        """Redirect 方式使用环境配置的端口，登录后切换到指定槽位"""
+        self.environment.conn_type = 'Redirect'
+        self.environment.cabinet_frame_slot = '0-0-3'
+        with override_settings(ENV_REDIRECT_PORT=1):
+            self.pool.execute(self.environment, 'DSP BRD:;')
+        self.assertEqual(self.server.commands[0], 'redirect 0-0-3')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class EnvironmentProbeTestCase(TestCase):
+    """环境连通性批量探测的测试用例"""
+
+    def setUp(self):
+        cache.clear()
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), FakeMMLHandler)
+        self.server.daemon_threads = True
+        self.server.logins = 0
+        self.server.commands = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        # 获取一个当前未被监听的端口
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        self.closed_port = closed.getsockname()[1]
+        closed.close()
+
+        self.online = Environment.objects.create(
+            id='env-probe-1', name='在线环境', type='FPGA', conn_type='Telnet',
+            ip='127.0.0.1', port=str(self.server.server_address[1]),
+            admin_password='password123', owner='testuser', status='unavailable'
+        )
+        self.offline = Environment.objects.create(
+            id='env-probe-2', name='离线环境', type='FPGA', conn_type='Telnet',
+            ip='127.0.0.1', port=str(self.closed_port),
+            admin_password='password123', owner='testuser', status='available'
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_probe_updates_changed_status(self):
+        """探测结果写入缓存，并更新状态变化的环境"""
+        results = {r['env_id']: r for r in probe_environments()}
+        self.assertTrue(results['env-probe-1']['console'])
+        self.assertFalse(results['env-probe-2']['tcp'])
+
+        self.online.refresh_from_db()
+        self.offline.refresh_from_db()
+        self.assertEqual(self.online.status, 'available')
+        self.assertEqual(self.offline.status, 'unavailable')
+        self.assertEqual(get_cached_status('env-probe-1')['status'], 'available')
+        self.assertEqual(get_latency_histogram('env-probe-1')['count'], 1)
+
+    def test_unchanged_status_not_written(self):
+        """状态未变化时不写数据库"""
+        probe_environments()
+        self.online.refresh_from_db()
+        last_update = self.online.update_time
+        with self.assertNumQueries(1):
+            probe_environments()
+        self.online.refresh_from_db()
+        self.assertEqual(self.online.update_time, last_update)
+        self.assertEqual(get_latency_histogram('env-probe-1')['count'], 2)
+
+    def test_occupied_status_kept(self):
+        """占用中的环境只探测端口，不改变状态"""
+        self.online.status = 'occupied'
+        self.online.save()
+        probe_environments([self.online])
+        self.online.refresh_from_db()
+        self.assertEqual(self.online.status, 'occupied')
+
+    def test_pending_status_kept(self):
+        """待就绪的环境由生命周期操作管理，探测不改变状态"""
+        self.offline.status = 'pending'
+        self.offline.save()
+        probe_environments([self.offline])
+        self.offline.refresh_from_db()
+        self.assertEqual(self.offline.status, 'pending')
+
+    def test_stale_status_not_overwritten(self):
+        """探测期间状态被其他操作改写时，不用探测前的状态覆盖"""
+        environments = list(Environment.objects.filter(id='env-probe-2'))
+        results = asyncio.run(probe_many(
+            [{'env_id': 'env-probe-2', 'host': '127.0.0.1', 'port': self.closed_port}], timeout=1, concurrency=4
+        ))
+        Environment.objects.filter(id='env-probe-2').update(status='occupied')
+        self.assertEqual(apply_results(environments, results), [])
+        self.assertEqual(Environment.objects.get(id='env-probe-2').status, 'occupied')
+
+    def test_probe_exception_isolated(self):
+        """单个环境探测异常不影响其他环境"""
+        real_probe_one = probe_one
+
+        async def flaky_probe(env_id, **kwargs):
+            if env_id == 'env-probe-2':
+                raise RuntimeError('boom')
+            return await real_probe_one(env_id, **kwargs)
+
+        targets = [
+            {'env_id': 'env-probe-1', 'host': '127.0.0.1', 'port': self.server.server_address[1]},
+            {'env_id': 'env-probe-2', 'host': '127.0.0.1', 'port': self.closed_port},
+        ]
+        with patch('env_manager.probe.probe_one', side_effect=flaky_probe):
+            results = asyncio.run(probe_many(targets, timeout=1, concurrency=4))
+        self.assertEqual([r['env_id'] for r in results], ['env-probe-1', 'env-probe-2'])
+        self.assertTrue(results[0]['console'])
+        self.assertFalse(results[1]['tcp'])
+        self.assertIn('boom', results[1]['error'])
+
+    @override_settings(ENV_PROBE_TIMEOUT=0.5)
+    def test_probes_run_concurrently(self):
+        """多个无响应的环境总耗时约为一次超时"""
+        silent = socket.socket()
+        silent.bind(('127.0.0.1', 0))
+        silent.listen(20)
+        environments = [
+            Environment(
+                id=f'env-silent-{i}', name=f'无响应环境{i}', type='FPGA', conn_type='Telnet',
+                ip='127.0.0.1', port=str(silent.getsockname()[1]), status='pending'
+            )
+            for i in range(10)
+        ]
+        started = time.monotonic()
+        results = asyncio.run(probe_many(
+            [{'env_id': e.id, 'host': e.ip, 'port': int(e.port)} for e in environments],
+            timeout=0.5, concurrency=64
+        ))
+        silent.close()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertTrue(all(r['tcp'] and not r['console'] for r in results))
+
+
+async def ready_probe(targets, timeout, concurrency):
+    """替代真实探测：所有环境控制台立即就绪"""
+    return [
+        {'env_id': target['env_id'], 'tcp': True, 'console': True, 'latency_ms': 1.0, 'error': None}
+        for target in targets
+    ]
+
+
+class EnvironmentLifecycleTestCase(TestCase):
+    """批量容器生命周期操作的测试用例"""
+
+    def setUp(self):
+        self.environments = [
+            Environment.objects.create(
+                id=f'env-qemu-{i}', name=f'QEMU环境{i}', type='QEMU', conn_type='Telnet',
+                port='23', admin_password='password123', owner='testuser',
+                docker_image='qemu-arm:latest', container_id=f'container-{i}'
+            )
+            for i in range(6)
+        ]
+        self.client_mock = MagicMock()
+
+        def slow_get(container_id):
+            time.sleep(0.2)
+            container = MagicMock()
+            container.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.9'}}
+            if container_id == 'container-5':
+                container.start.side_effect = Exception('no such image')
+            return container
+
+        self.client_mock.containers.get.side_effect = slow_get
+        patcher = patch('env_manager.probe.probe_many', side_effect=ready_probe)
+        self.mock_probe = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_start_runs_concurrently(self):
+        """批量启动并发执行，失败的环境单独汇报"""
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            started = time.monotonic()
+            summary = batch_environment_lifecycle_task(
+                'start', [e.id for e in self.environments], max_workers=6
+            )
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(len(summary['succeeded']), 5)
+        self.assertIn('env-qemu-5', summary['failed'])
+        self.assertEqual(sorted(summary['ready']), [f'env-qemu-{i}' for i in range(5)])
+        environment = Environment.objects.get(id='env-qemu-0')
+        self.assertEqual(environment.status, 'available')
+        self.assertEqual(environment.ip, '172.17.0.9')
+        self.assertEqual(Environment.objects.get(id='env-qemu-5').status, 'pending')
+
+    @override_settings(ENV_READY_TIMEOUT=0)
+    def test_not_ready_marked_unavailable(self):
+        """控制台未在超时时间内就绪的环境标记为不可用"""
+        async def silent_probe(targets, timeout, concurrency):
+            return [
+                {'env_id': target['env_id'], 'tcp': True, 'console': False, 'latency_ms': 1.0, 'error': '控制台无响应'}
+                for target in targets
+            ]
+
+        self.mock_probe.side_effect = silent_probe
+        self.client_mock.containers.get.side_effect = None
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            summary = run_environment_lifecycle('start', self.environments[:1])
+        self.assertEqual(summary['succeeded'], ['env-qemu-0'])
+        self.assertEqual(summary['ready'], [])
+        self.assertEqual(Environment.objects.get(id='env-qemu-0').status, 'unavailable')
+
+    def test_stop_marks_unavailable(self):
+        """停止后的环境状态为不可用，不写入模型之外的状态"""
+        self.client_mock.containers.get.side_effect = None
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            run_environment_lifecycle('stop', self.environments[:1])
+        self.assertEqual(Environment.objects.get(id='env-qemu-0').status, 'unavailable')
+        self.mock_probe.assert_not_called()
+
+    def test_recreate_removes_old_container(self):
+        """重建时删除旧容器并创建新容器"""
+        container = MagicMock()
+        container.id = 'container-new'
+        container.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.10'}}
+        self.client_mock.containers.get.side_effect = None
+        self.client_mock.containers.run.return_value = container
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            summary = run_environment_lifecycle('recreate', self.environments[:1])
+        self.assertEqual(summary['succeeded'], ['env-qemu-0'])
+        self.client_mock.containers.get.return_value.remove.assert_called_once_with(force=True)
+        self.assertEqual(Environment.objects.get(id='env-qemu-0').container_id, 'container-new')
+
+    def test_docker_unavailable(self):
+        """无法连接 Docker 时创建类操作标记为失败"""
+        with patch('common.tasks.get_docker_client', return_value=None):
+            summary = run_environment_lifecycle('create', self.environments[:2])
+        self.assertEqual(len(summary['failed']), 2)
+        self.assertEqual(Environment.objects.get(id='env-qemu-0').status, 'unavailable')
+
+    def test_create_saves_baseline_snapshot(self):
+        """创建成功后自动保存基线快照"""
+        container = MagicMock()
+        container.id = 'container-new'
+        container.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.10'}}
+        self.client_mock.containers.get.side_effect = None
+        self.client_mock.containers.run.return_value = container
+        self.client_mock.containers.get.return_value = container
+        self.client_mock.images.get.return_value.id = 'sha256:old'
+        container.commit.return_value.id = 'sha256:new'
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            create_environment_task('env-qemu-0')
+        container.commit.assert_called_once_with(repository='autotest-snapshot/env-qemu-0', tag='baseline')
+        self.client_mock.images.remove.assert_called_once_with('sha256:old')
+        self.assertEqual(
+            Environment.objects.get(id='env-qemu-0').snapshot_image, 'autotest-snapshot/env-qemu-0:baseline'
+        )
+
+    @override_settings(ENV_READY_TIMEOUT=0)
+    def test_no_snapshot_before_ready(self):
+        """环境未就绪时不保存基线快照"""
+        async def silent_probe(targets, timeout, concurrency):
+            return [
+                {'env_id': target['env_id'], 'tcp': False, 'console': False, 'latency_ms': None, 'error': '连接超时'}
+                for target in targets
+            ]
+
+        self.mock_probe.side_effect = silent_probe
+        container = MagicMock()
+        container.id = 'container-new'
+        container.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.10'}}
+        self.client_mock.containers.get.side_effect = None
+        self.client_mock.containers.run.return_value = container
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            create_environment_task('env-qemu-0')
+        container.commit.assert_not_called()
+        environment = Environment.objects.get(id='env-qemu-0')
+        self.assertEqual(environment.status, 'unavailable')
+        self.assertFalse(environment.snapshot_image)
+
+    def test_restore_from_snapshot(self):
+        """复位时删除旧容器，并从快照镜像启动新容器"""
+        Environment.objects.filter(id='env-qemu-0').update(snapshot_image='autotest-snapshot/env-qemu-0:baseline')
+        container = MagicMock()
+        container.id = 'container-restored'
+        container.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.11'}}
+        self.client_mock.containers.get.side_effect = None
+        self.client_mock.containers.run.return_value = container
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            summary = restore_environment_task('env-qemu-0')
+        self.assertEqual(summary['succeeded'], ['env-qemu-0'])
+        self.client_mock.containers.get.assert_called_once_with('container-0')
+        self.assertEqual(
+            self.client_mock.containers.run.call_args.kwargs['image'], 'autotest-snapshot/env-qemu-0:baseline'
+        )
+        environment = Environment.objects.get(id='env-qemu-0')
+        self.assertEqual(environment.container_id, 'container-restored')
+        self.assertEqual(environment.status, 'available')
+
+    def test_restore_without_snapshot(self):
+        """没有快照的环境复位失败"""
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock):
+            summary = restore_environment_task('env-qemu-1')
+        self.assertIn('env-qemu-1', summary['failed'])
+        self.client_mock.containers.run.assert_not_called()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    WARM_POOL_SIZES={'qemu-arm:latest': 2}
+)
+class WarmPoolTestCase(TestCase):
+    """预热容器池的测试用例"""
+
+    def setUp(self):
+        cache.clear()
+        self.client_mock = MagicMock()
+        self.started = []
+        container_numbers = itertools.count()
+
+        def run(**kwargs):
+            container = MagicMock()
+            container.id = f'warm-{next(container_numbers)}'
+            container.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.20'}}
+            self.started.append(container.id)
+            return container
+
+        self.client_mock.containers.run.side_effect = run
+        self.exited = []
+        self.listed = {}
+
+        def list_containers(**kwargs):
+            for container_id in self.started + self.exited:
+                self.listed.setdefault(container_id, MagicMock(id=container_id))
+                self.listed[container_id].status = 'exited' if container_id in self.exited else 'running'
+            return [self.listed[container_id] for container_id in self.started + self.exited]
+
+        self.client_mock.containers.list.side_effect = list_containers
+        patcher = patch('env_manager.warm_pool.get_docker_client', return_value=self.client_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_replenish_fills_pool(self):
+        """补齐到目标数量，重复补齐不会多建"""
+        self.assertEqual(warm_pool.replenish(), {'qemu-arm:latest': 2})
+        self.assertEqual(warm_pool.replenish(), {})
+        self.assertEqual(WarmContainer.objects.filter(status='idle').count(), 2)
+
+    def test_replenish_drops_dead_and_surplus(self):
+        """清理已失效的记录并删除超出目标数量的容器"""
+        warm_pool.replenish()
+        self.started.remove('warm-0')
+        with override_settings(WARM_POOL_SIZES={'qemu-arm:latest': 0}):
+            warm_pool.replenish()
+        self.assertFalse(WarmContainer.objects.exists())
+        self.client_mock.containers.get.return_value.remove.assert_called_once_with(force=True)
+
+    def test_replenish_removes_exited_and_orphans(self):
+        """删除已退出的预热容器与无记录的孤儿容器，已被环境接管的容器保留"""
+        warm_pool.replenish()
+        self.started.remove('warm-0')
+        self.exited.append('warm-0')
+        self.started += ['orphan-1', 'adopted-1']
+        Environment.objects.create(
+            id='env-adopted-1', name='接管环境', type='QEMU', owner='testuser', container_id='adopted-1'
+        )
+        warm_pool.replenish()
+        self.listed['warm-0'].remove.assert_called_once_with(force=True)
+        self.listed['orphan-1'].remove.assert_called_once_with(force=True)
+        self.listed['adopted-1'].remove.assert_not_called()
+        self.listed['warm-1'].remove.assert_not_called()
+        self.assertFalse(WarmContainer.objects.filter(container_id='warm-0').exists())
+        self.assertEqual(WarmContainer.objects.filter(status='idle').count(), 2)
+
+    def test_replenish_clears_expired_claims(self):
+        """领用超时未释放的记录被清理，未被环境接管的容器一并删除，未超时的领用保留"""
+        warm_pool.replenish()
+        with patch('common.tasks.replenish_warm_pool_task.delay'):
+            for env_id in ('env-1', 'env-2'):
+                warm_pool.claim('qemu-arm:latest', claimed_by=env_id)
+        WarmContainer.objects.update(claim_time=datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1))
+        Environment.objects.create(
+            id='env-adopted-2', name='接管环境', type='QEMU', owner='testuser', container_id='warm-0'
+        )
+        with override_settings(WARM_POOL_SIZES={'qemu-arm:latest': 1}):
+            warm_pool.replenish()
+            self.listed['warm-1'].remove.assert_called_once_with(force=True)
+            self.started.remove('warm-1')
+            with patch('common.tasks.replenish_warm_pool_task.delay'):
+                warm_pool.claim('qemu-arm:latest', claimed_by='env-3')
+            warm_pool.replenish()
+        self.listed['warm-0'].remove.assert_not_called()
+        self.listed['warm-2'].remove.assert_not_called()
+        self.assertEqual(
+            list(WarmContainer.objects.values_list('container_id', 'status')),
+            [('warm-2', 'claimed'), ('warm-3', 'idle')]
+        )
+
+    def test_claim_discarded_when_save_fails(self):
+        """环境记录写回失败时，领用的预热容器被删除，不会一直处于已领用状态"""
+        warm_pool.replenish()
+        adopted = self.client_mock.containers.get.return_value
+        adopted.id = 'warm-0'
+        adopted.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.20'}}
+        environment = Environment.objects.create(
+            id='env-warm-3', name='预热环境3', type='QEMU', conn_type='Telnet', port='23',
+            admin_password='password123', owner='testuser', docker_image='qemu-arm:latest'
+        )
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock), \
+                patch('common.tasks.replenish_warm_pool_task.delay'), \
+                patch.object(Environment.objects, 'bulk_update', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                run_environment_lifecycle('create', [environment])
+        adopted.remove.assert_called_once_with(force=True)
+        self.assertEqual(list(WarmContainer.objects.values_list('container_id', flat=True)), ['warm-1'])
+
+    def test_replenish_skipped_while_locked(self):
+        """已有补齐在进行时跳过，不清理也不新建"""
+        cache.add(warm_pool.LOCK_CACHE_KEY, 1)
+        self.assertEqual(warm_pool.replenish(), {})
+        self.client_mock.containers.run.assert_not_called()
+        cache.delete(warm_pool.LOCK_CACHE_KEY)
+        self.assertEqual(warm_pool.replenish(), {'qemu-arm:latest': 2})
+
+    def test_claim_records_hit_rate(self):
+        """领用命中与未命中都计入统计"""
+        warm_pool.replenish()
+        with patch('common.tasks.replenish_warm_pool_task.delay'):
+            self.assertIsNotNone(warm_pool.claim('qemu-arm:latest', claimed_by='env-1'))
+            self.assertIsNotNone(warm_pool.claim('qemu-arm:latest', claimed_by='env-2'))
+            self.assertIsNone(warm_pool.claim('qemu-arm:latest'))
+        pool = warm_pool.stats()[0]
+        self.assertEqual(pool['hits'], 2)
+        self.assertEqual(pool['misses'], 1)
+        self.assertEqual(pool['claimed'], 2)
+        self.assertAlmostEqual(pool['hit_rate'], 0.6667)
+
+    def test_create_environment_uses_warm_container(self):
+        """创建环境时直接领用预热容器而不是新建"""
+        warm_pool.replenish()
+        self.client_mock.containers.run.reset_mock()
+        adopted = self.client_mock.containers.get.return_value
+        adopted.id = 'warm-0'
+        adopted.attrs = {'NetworkSettings': {'IPAddress': '172.17.0.20'}}
+        environment = Environment.objects.create(
+            id='env-warm-1', name='预热环境', type='QEMU', conn_type='Telnet', port='23',
+            admin_password='password123', owner='testuser', docker_image='qemu-arm:latest'
+        )
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock), \
+                patch('env_manager.probe.probe_many', side_effect=ready_probe), \
+                patch('common.tasks.replenish_warm_pool_task.delay') as mock_replenish:
+            create_environment_task(environment.id)
+        environment.refresh_from_db()
+        self.client_mock.containers.run.assert_not_called()
+        adopted.rename.assert_called_once_with('autotest_预热环境_env-warm-1')
+        self.assertEqual(environment.container_id, 'warm-0')
+        mock_replenish.assert_called_once_with('qemu-arm:latest')
+        self.assertEqual(environment.status, 'available')
+        self.assertEqual(WarmContainer.objects.count(), 1)
+
+    def test_unused_warm_container_discarded(self):
+        """领用的预热容器接管失败、回退为新建容器时，删除预热容器而不是只删除记录"""
+        warm_pool.replenish()
+        self.client_mock.containers.get.return_value.rename.side_effect = Exception('conflict')
+        environment = Environment.objects.create(
+            id='env-warm-2', name='预热环境2', type='QEMU', conn_type='Telnet', port='23',
+            admin_password='password123', owner='testuser', docker_image='qemu-arm:latest'
+        )
+        with patch('common.tasks.get_docker_client', return_value=self.client_mock), \
+                patch('env_manager.probe.probe_many', side_effect=ready_probe), \
+                patch('common.tasks.replenish_warm_pool_task.delay'):
+            summary = run_environment_lifecycle('create', [environment])
+        environment.refresh_from_db()
+        self.assertEqual(summary['succeeded'], ['env-warm-2'])
+        self.assertEqual(environment.container_id, 'warm-2')
+        self.client_mock.containers.get.assert_called_with('warm-0')
+        self.client_mock.containers.get.return_value.remove.assert_called_once_with(force=True)
+        self.assertEqual(list(WarmContainer.objects.values_list('container_id', flat=True)), ['warm-1'])
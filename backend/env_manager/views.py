@@ -9,13 +9,19 @@ from rest_framework import viewsets, filters
 from common.auth import CustomTokenAuthentication
 from common.utils import audit_log, get_current_user, generate_unique_id
 from common.permissions import IsAdminOrReadOnly
+from common.tasks import (
+    batch_environment_lifecycle_task, replenish_warm_pool_task,
+    snapshot_environment_task, restore_environment_task,
+)
+from env_manager.warm_pool import set_pool_sizes, stats as warm_pool_stats
+from env_manager.probe import probe_environments, get_cached_status, get_latency_histogram
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 
 # Create your views here.
 class EnvironmentViewSet(viewsets.ModelViewSet):
     """环境管理视图集"""
-    queryset = Environment.objects.filter(is_deleted=False)
+    queryset = Environment.alive.all()
     serializer_class = EnvironmentSerializer
     permission_classes = [IsAdminOrEnvOwner]
     authentication_classes = [CustomTokenAuthentication, SessionAuthentication, BasicAuthentication]
@@ -78,24 +84,136 @@ class EnvironmentViewSet(viewsets.ModelViewSet):
     def status(self, request, pk=None):
         """获取环境状态"""
         environment = self.get_object()
-        return Response({'status': environment.status, 'message': f'环境 {environment.name} 当前状态为: {environment.get_status_display()}'})
+        return Response({
+            'status': environment.status,
+            'message': f'环境 {environment.name} 当前状态为: {environment.get_status_display()}',
+            'probe': get_cached_status(environment.id),
+            'latency': get_latency_histogram(environment.id),
+        })
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminOrReadOnly])
     def check_connectivity(self, request, pk=None):
         """测试环境连通性"""
         environment = self.get_object()
-        # 更新最后检查时间
-        environment.last_check_time = timezone.now()
-        environment.save()
-        
-        # 这里应该有实际的连通性测试逻辑
-        # 为了示例，我们直接返回成功
+        result = probe_environments([environment], stamp_all=True)[0]
+
+        if result['tcp'] and result['console']:
+            return Response({
+                'status': 'success',
+                'message': f'环境 {environment.name} 连通性测试成功',
+                'environment_status': environment.status,
+                'latency_ms': result['latency_ms'],
+            })
         return Response({
-            'status': 'success', 
-            'message': f'环境 {environment.name} 连通性测试成功',
-            'environment_status': environment.status
+            'status': 'failed',
+            'message': f'环境 {environment.name} 连通性测试失败: {result["error"]}',
+            'environment_status': environment.status,
+            'latency_ms': result['latency_ms'],
         })
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrReadOnly])
+    def batch_lifecycle(self, request):
+        """批量启动/停止/重建环境容器
+
+        请求参数:
+            action: start/stop/recreate/restore
+            ids: 环境ID列表；不传时按 type 过滤所有关联了容器的环境
+            type: 环境类型（可选，如 QEMU）
+        """
+        lifecycle_action = request.data.get('action')
+        if lifecycle_action not in ('start', 'stop', 'recreate', 'restore'):
+            return Response({'error': '不支持的操作，可选值: start, stop, recreate, restore'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Environment.alive.all()
+        ids = request.data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            return Response({'error': 'ids 必须是环境ID列表'}, status=status.HTTP_400_BAD_REQUEST)
+        if ids:
+            queryset = queryset.filter(id__in=ids)
+        else:
+            queryset = queryset.exclude(container_id__isnull=True).exclude(container_id='')
+            if request.data.get('type'):
+                queryset = queryset.filter(type=request.data.get('type'))
+        environment_ids = list(queryset.values_list('id', flat=True))
+        if not environment_ids:
+            return Response({'error': '没有符合条件的环境'}, status=status.HTTP_400_BAD_REQUEST)
+
+        task = batch_environment_lifecycle_task.delay(lifecycle_action, environment_ids)
+        audit_log(
+            operation_type=f'batch_{lifecycle_action}_environment',
+            operation_desc=f'批量操作环境({lifecycle_action}): {len(environment_ids)} 个',
+            operated_by=get_current_user(request),
+            request=request,
+            module_name='env_manager',
+            new_data={'ids': environment_ids}
+        )
+        return Response({
+            'task_id': task.id,
+            'action': lifecycle_action,
+            'environment_ids': environment_ids,
+            'message': f'已提交 {len(environment_ids)} 个环境的批量操作'
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminOrReadOnly])
+    def snapshot(self, request, pk=None):
+        """将环境容器的当前状态保存为基线快照"""
+        environment = self.get_object()
+        if not environment.container_id:
+            return Response({'error': f'环境 {environment.name} 没有关联的容器'}, status=status.HTTP_400_BAD_REQUEST)
+        task = snapshot_environment_task.delay(environment.id)
+        audit_log(
+            operation_type='snapshot_environment',
+            operation_desc=f'保存环境基线快照: {environment.name}',
+            operated_by=get_current_user(request),
+            request=request,
+            module_name='env_manager',
+            object_id=str(environment.id)
+        )
+        return Response({'task_id': task.id, 'message': f'已提交环境 {environment.name} 的快照任务'}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminOrReadOnly])
+    def restore(self, request, pk=None):
+        """将环境复位到基线快照"""
+        environment = self.get_object()
+        if not environment.snapshot_image:
+            return Response({'error': f'环境 {environment.name} 没有基线快照'}, status=status.HTTP_400_BAD_REQUEST)
+        task = restore_environment_task.delay(environment.id)
+        audit_log(
+            operation_type='restore_environment',
+            operation_desc=f'复位环境到基线快照: {environment.name}',
+            operated_by=get_current_user(request),
+            request=request,
+            module_name='env_manager',
+            object_id=str(environment.id)
+        )
+        return Response({'task_id': task.id, 'message': f'已提交环境 {environment.name} 的复位任务'}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get', 'post'], permission_classes=[IsAdminOrReadOnly])
+    def warm_pool(self, request):
+        """查看预热容器池状态，或设置各镜像的池大小
+
+        POST 请求参数:
+            sizes: {"镜像": 数量}
+        """
+        if request.method == 'POST':
+            sizes = request.data.get('sizes')
+            if not isinstance(sizes, dict):
+                return Response({'error': '请提供 sizes，格式为 {"镜像": 数量}'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                set_pool_sizes(sizes, operated_by=get_current_user(request))
+            except (TypeError, ValueError):
+                return Response({'error': '池大小必须为整数'}, status=status.HTTP_400_BAD_REQUEST)
+            audit_log(
+                operation_type='update_warm_pool',
+                operation_desc='设置预热容器池大小',
+                operated_by=get_current_user(request),
+                request=request,
+                module_name='env_manager',
+                new_data=sizes
+            )
+            replenish_warm_pool_task.delay()
+        return Response({'pools': warm_pool_stats()})
+
 class EnvironmentVariableViewSet(viewsets.ModelViewSet):
     """环境变量管理视图集"""
     queryset = EnvironmentVariable.objects.all()
@@ -0,0 +1,251 @@
+"""预热容器池
+
+按镜像预先启动一定数量的容器，创建 QEMU 等容器化环境或分片执行需要额外环境时
+直接领用已启动的容器，跳过镜像启动与系统引导的等待时间；领用后由后台任务补齐。
+
+各镜像的池大小优先读取系统配置 warm_pool_sizes（JSON，如 {"qemu-arm:latest": 3}），
+未配置时使用 settings.WARM_POOL_SIZES。
+"""
+import uuid
+import logging
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from common.utils import get_docker_client, get_system_config, set_system_config
+from env_manager.models import WarmContainer
+
+logger = logging.getLogger('autotestweb')
+
+POOL_SIZES_CONFIG_KEY = 'warm_pool_sizes'
+POOL_LABEL = 'autotest.warm_pool'
+LOCK_CACHE_KEY = 'warm_pool:replenish:lock'
+HIT_CACHE_KEY = 'warm_pool:hits:{image}'
+MISS_CACHE_KEY = 'warm_pool:misses:{image}'
+
+
+def get_pool_sizes():
+    """获取各镜像的目标池大小"""
+    sizes = get_system_config(POOL_SIZES_CONFIG_KEY)
+    if not isinstance(sizes, dict):
+        sizes = getattr(settings, 'WARM_POOL_SIZES', {})
+    return {image: max(int(size), 0) for image, size in sizes.items()}
+
+
+def set_pool_sizes(sizes, operated_by=None):
+    """设置各镜像的目标池大小"""
+    return set_system_config(
+        POOL_SIZES_CONFIG_KEY,
+        {image: max(int(size), 0) for image, size in sizes.items()},
+        description='预热容器池大小（镜像: 数量）',
+        config_type='json',
+        operated_by=operated_by
+    )
+
+
+def _incr(key):
+    """累加命中计数（缓存不存在时初始化）"""
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def claim(image, claimed_by=None):
+    """领用一个空闲的预热容器
+
+    使用条件更新抢占，多个进程同时领用时不会拿到同一个容器。
+
+    Args:
+        image: 容器镜像
+        claimed_by: 领用方（环境ID或任务ID）
+
+    Returns:
+        WarmContainer: 领用到的容器，池为空时返回 None
+    """
+    for candidate_id in WarmContainer.objects.filter(image=image, status='idle').values_list('id', flat=True)[:5]:
+        updated = WarmContainer.objects.filter(id=candidate_id, status='idle').update(
+            status='claimed', claimed_by=claimed_by, claim_time=timezone.now()
+        )
+        if updated:
+            _incr(HIT_CACHE_KEY.format(image=image))
+            _schedule_replenish(image)
+            return WarmContainer.objects.get(id=candidate_id)
+    _incr(MISS_CACHE_KEY.format(image=image))
+    if image in get_pool_sizes():
+        _schedule_replenish(image)
+    return None
+
+
+def release(container_id):
+    """领用方已接管容器后移出池记录（容器本身由领用方负责）"""
+    WarmContainer.objects.filter(container_id=container_id).delete()
+
+
+def discard(container_id, client=None):
+    """领用后未被使用的容器：移出池记录并删除容器
+
+    先删除记录，删除容器失败时容器成为无记录的孤儿，由下一次补齐时清理。
+    """
+    WarmContainer.objects.filter(container_id=container_id).delete()
+    client = client or get_docker_client()
+    if not client:
+        return
+    try:
+        client.containers.get(container_id).remove(force=True)
+    except Exception as e:
+        logger.warning(f'删除未使用的预热容器失败: {container_id}, {str(e)}')
+
+
+def _schedule_replenish(image):
+    """异步补齐预热池"""
+    from common.tasks import replenish_warm_pool_task
+    try:
+        replenish_warm_pool_task.delay(image)
+    except Exception as e:
+        logger.warning(f'提交预热池补齐任务失败: {str(e)}')
+
+
+def _start_warm_container(client, image):
+    """启动一个预热容器"""
+    name = f'autotest_warm_{uuid.uuid4().hex[:12]}'
+    container = client.containers.run(
+        image=image,
+        name=name,
+        detach=True,
+        labels={POOL_LABEL: image},
+    )
+    container.reload()
+    ip = container.attrs.get('NetworkSettings', {}).get('IPAddress') or None
+    return WarmContainer(image=image, container_id=container.id, name=name, ip=ip)
+
+
+def _reconcile(client):
+    """按标签核对预热容器与池记录
+
+    一次性列出所有带池标签的容器（包括已退出的）：
+    - 容器已退出或已不存在的空闲记录删除，已退出的容器一并删除
+    - 领用超过 WARM_CLAIM_TIMEOUT 秒仍未释放的记录（领用方进程被终止等）删除，
+      未被环境接管的容器随后按孤儿删除
+    - 既没有池记录、也没有被环境接管的容器（领用后未使用、启动后未写入记录等）删除
+    被环境接管的容器仍带有池标签，按 Environment.container_id 排除。
+    """
+    from env_manager.models import Environment
+
+    containers = {c.id: c for c in client.containers.list(all=True, filters={'label': POOL_LABEL})}
+    running = {container_id for container_id, container in containers.items() if container.status == 'running'}
+    stale = list(
+        WarmContainer.objects.filter(status='idle').exclude(container_id__in=running).values_list('id', 'container_id')
+    )
+    stale_count = sum(WarmContainer.objects.filter(id=record_id, status='idle').delete()[0] for record_id, _ in stale)
+    if stale_count:
+        logger.warning(f'清理 {stale_count} 个已失效的预热容器记录')
+    expired = timezone.now() - timedelta(seconds=getattr(settings, 'WARM_CLAIM_TIMEOUT', 1800))
+    expired_count = WarmContainer.objects.filter(status='claimed', claim_time__lt=expired).delete()[0]
+    if expired_count:
+        logger.warning(f'清理 {expired_count} 个领用超时未释放的预热容器记录')
+
+    known = set(WarmContainer.objects.filter(container_id__in=list(containers)).values_list('container_id', flat=True))
+    adopted = set(Environment.objects.filter(container_id__in=list(containers)).values_list('container_id', flat=True))
+    for container_id in set(containers) - known - adopted:
+        try:
+            containers[container_id].remove(force=True)
+            logger.warning(f'删除已退出或无记录的预热容器: {container_id}')
+        except Exception as e:
+            logger.warning(f'删除预热容器失败: {container_id}, {str(e)}')
+
+
+def replenish(image=None):
+    """补齐预热池，并清理已失效或超出目标数量的空闲容器
+
+    多个补齐任务（每次领用都会提交一个）可能同时运行，用缓存锁保证同一时间只有一个在核对与补齐，
+    避免一个任务把另一个任务刚创建、尚未写入记录的容器当作孤儿删除，或重复补齐。
+
+    Args:
+        image: 只处理指定镜像，默认处理全部配置的镜像
+
+    Returns:
+        dict: 各镜像新启动的容器数；已有补齐在进行时返回空字典
+    """
+    sizes = get_pool_sizes()
+    if image is not None:
+        sizes = {image: sizes.get(image, 0)}
+    if not sizes:
+        return {}
+
+    client = get_docker_client()
+    if not client:
+        logger.error('补齐预热池失败: 无法连接 Docker 引擎')
+        return {}
+
+    if not cache.add(LOCK_CACHE_KEY, 1, timeout=600):
+        logger.info('预热池补齐正在进行，跳过本次')
+        return {}
+    try:
+        _reconcile(client)
+        return _fill(client, sizes)
+    finally:
+        cache.delete(LOCK_CACHE_KEY)
+
+
+def _fill(client, sizes):
+    """删除超出目标数量的空闲容器，并启动缺少的容器"""
+    jobs = []
+    for pool_image, size in sizes.items():
+        idle_ids = list(
+            WarmContainer.objects.filter(image=pool_image, status='idle')
+            .order_by('-create_time').values_list('id', 'container_id')
+        )
+        if len(idle_ids) > size:
+            for record_id, container_id in idle_ids[size:]:
+                # 先删除记录，避免删除容器时被领用
+                if WarmContainer.objects.filter(id=record_id, status='idle').delete()[0]:
+                    try:
+                        client.containers.get(container_id).remove(force=True)
+                    except Exception as e:
+                        logger.warning(f'删除多余预热容器失败: {container_id}, {str(e)}')
+        jobs += [pool_image] * max(size - len(idle_ids), 0)
+
+    created = {}
+    if jobs:
+        max_workers = min(getattr(settings, 'DOCKER_BATCH_PARALLELISM', 8), len(jobs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(pool_image, executor.submit(_start_warm_container, client, pool_image)) for pool_image in jobs]
+        records = []
+        for pool_image, future in futures:
+            try:
+                records.append(future.result())
+                created[pool_image] = created.get(pool_image, 0) + 1
+            except Exception as e:
+                logger.error(f'启动预热容器失败: {pool_image}, {str(e)}')
+        WarmContainer.objects.bulk_create(records)
+        logger.info(f'预热池补齐完成: {created}')
+    return created
+
+
+def stats():
+    """返回各镜像预热池的状态与命中率"""
+    sizes = get_pool_sizes()
+    images = set(sizes) | set(WarmContainer.objects.values_list('image', flat=True).distinct())
+    counters = cache.get_many(
+        [HIT_CACHE_KEY.format(image=image) for image in images]
+        + [MISS_CACHE_KEY.format(image=image) for image in images]
+    )
+    result = []
+    for image in sorted(images):
+        hits = counters.get(HIT_CACHE_KEY.format(image=image), 0)
+        misses = counters.get(MISS_CACHE_KEY.format(image=image), 0)
+        result.append({
+            'image': image,
+            'target_size': sizes.get(image, 0),
+            'idle': WarmContainer.objects.filter(image=image, status='idle').count(),
+            'claimed': WarmContainer.objects.filter(image=image, status='claimed').count(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        })
+    return result
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('execution_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskexecution',
+            name='case_selection',
+            field=models.JSONField(blank=True, null=True, verbose_name='用例选择结果'),
+        ),
+    ]
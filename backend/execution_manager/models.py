@@ -62,6 +62,8 @@ class TaskExecution(models.Model):
         default='pending',
         verbose_name='任务状态'
     )
+    # 结束状态，任务进入这些状态后触发结果处理
+    FINAL_STATUSES = ('success', 'failed', 'terminated')
     
     # 开始时间
     start_time = models.DateTimeField(
@@ -108,7 +110,14 @@ class TaskExecution(models.Model):
         default=0,
         verbose_name='失败用例数'
     )
-    
+
+    # 用例选择结果（根据包信息中两次提交之间的变更选择用例，见 selection.py）
+    case_selection = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='用例选择结果'
+    )
+
     class Meta:
         db_table = 'tb_execution_task'
         verbose_name = '任务执行信息'
@@ -0,0 +1,249 @@
+"""基于变更的用例选择
+
+任务的包信息（package_info，JSON）中记录了基线提交 base_commit 与本次提交 commit 时，对比两次提交
+在代码仓中的变化，只选择受影响的用例：
+- 用例目录（CASE_REPO_ROOT/<芯片型号>/<特性>/...）下的脚本变化：选择 script_path 相同的用例
+- 用例目录下特性目录中的其他文件变化（数据、公共脚本）：选择该特性的全部用例
+- 用例目录下芯片型号目录中的其他文件变化：选择该模块的全部用例
+- 产品代码按 CHANGE_SELECTION_RULES（带 chip/feature 命名分组的正则）映射到模块或特性
+- 匹配 CHANGE_SELECTION_IGNORE 的文件（文档等）不影响选择
+
+有任何无法映射的变化、缺少提交信息或读取代码仓失败时回退为全量执行，结果中说明原因。
+选择结果（选中的用例及原因、按特性汇总的跳过用例）保存在 TaskExecution.case_selection 中。
+"""
+import re
+import json
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from feature_testcase.models import Feature, TestCase
+from feature_testcase.repo_sync import RepoSyncError, changed_paths
+from module_manager.models import Module
+
+logger = logging.getLogger('autotestweb')
+
+MODE_CHANGED = 'changed'
+MODE_FULL = 'full'
+MAX_REPORTED_PATHS = 50
+# 包信息来自用户输入，提交号只接受十六进制，避免被 git 当作参数解析
+COMMIT_PATTERN = re.compile(r'^[0-9a-fA-F]{7,40}$')
+REASONS = {
+    'script': '用例脚本有变更',
+    'feature': '所属特性有变更',
+    'module': '所属模块有变更',
+}
+SKIP_REASON = '所属模块与特性没有相关变更'
+
+
+def _setting(name, default):
+    """读取用例选择相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def package_commits(package_info):
+    """从包信息中取出 (基线提交, 本次提交)，没有或不是 7-40 位十六进制提交号时返回 None"""
+    try:
+        info = json.loads(package_info or '')
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(info, dict):
+        return None
+    base = info.get('base_commit')
+    head = info.get('commit') or info.get('head_commit')
+    if not all(isinstance(commit, str) and COMMIT_PATTERN.match(commit) for commit in (base, head)):
+        return None
+    return base, head
+
+
+def _candidates():
+    """全量执行时的用例范围：未删除且启用的用例"""
+    return TestCase.alive.filter(status='active')
+
+
+def classify_paths(paths):
+    """把变化的路径映射到脚本、特性与模块
+
+    Returns:
+        dict: scripts {路径}、features {(芯片型号, 特性名称): 路径}、modules {芯片型号: 路径}、
+              ignored [路径]、unmapped [路径]
+    """
+    root = str(_setting('CASE_REPO_ROOT', 'src/dt')).strip('/')
+    suffixes = tuple(_setting('CASE_SCRIPT_SUFFIXES', ('.py', '.sh')))
+    ignore = [re.compile(pattern) for pattern in _setting('CHANGE_SELECTION_IGNORE', [])]
+    rules = [re.compile(pattern) for pattern in _setting('CHANGE_SELECTION_RULES', [])]
+    result = {'scripts': set(), 'features': {}, 'modules': {}, 'ignored': [], 'unmapped': []}
+    for path in paths:
+        if any(pattern.search(path) for pattern in ignore):
+            result['ignored'].append(path)
+            continue
+        if not root or path.startswith(f'{root}/'):
+            parts = path[len(root) + 1:].split('/') if root else path.split('/')
+            if len(parts) >= 3 and path.endswith(suffixes):
+                result['scripts'].add(path)
+            elif len(parts) >= 3:
+                result['features'].setdefault((parts[0], parts[1]), path)
+            elif len(parts) == 2:
+                result['modules'].setdefault(parts[0], path)
+            else:
+                result['unmapped'].append(path)
+            continue
+        for rule in rules:
+            match = rule.search(path)
+            if match is None:
+                continue
+            groups = match.groupdict()
+            if groups.get('feature'):
+                result['features'].setdefault((groups['chip'], groups['feature']), path)
+            else:
+                result['modules'].setdefault(groups['chip'], path)
+            break
+        else:
+            result['unmapped'].append(path)
+    return result
+
+
+def _full(base, head, reason, **extra):
+    return {
+        'mode': MODE_FULL,
+        'base_commit': base,
+        'head_commit': head,
+        'reason': reason,
+        'selected_count': _candidates().count(),
+        'skipped_count': 0,
+        'selected': [],
+        'skipped': [],
+        'select_time': timezone.now().isoformat(),
+        **extra,
+    }
+
+
+def select_cases(base, head):
+    """根据两次提交之间的变化选择用例
+
+    Returns:
+        dict: 选择结果（mode 为 changed 时只执行 selected 中的用例，为 full 时执行全部用例）
+    """
+    repo = _setting('CASE_REPO_PATH', None)
+    if not repo:
+        return _full(base, head, '未配置代码仓，无法分析变更')
+    try:
+        changed, removed = changed_paths(str(repo), base, head, '')
+    except RepoSyncError as e:
+        return _full(base, head, f'读取代码仓变更失败: {str(e)}')
+    # 删除的脚本不再执行，但删除的公共文件会影响所在特性或模块
+    paths = changed + removed
+    mapped = classify_paths(paths)
+    report = {
+        'changed_paths': len(paths),
+        'ignored_paths': mapped['ignored'][:MAX_REPORTED_PATHS],
+        'unmapped_paths': mapped['unmapped'][:MAX_REPORTED_PATHS],
+    }
+    if mapped['unmapped']:
+        return _full(base, head, f'{len(mapped["unmapped"])} 个变更文件无法映射到模块或特性', **report)
+
+    chips = {chip for chip, _ in mapped['features']} | set(mapped['modules'])
+    modules = {}
+    for module_id, chip in Module.alive.filter(chip_model__in=chips).values_list('id', 'chip_model'):
+        modules.setdefault(chip, set()).add(module_id)
+    unknown = sorted(chip for chip in chips if chip not in modules)
+    if unknown:
+        return _full(base, head, f'芯片型号没有对应的模块: {", ".join(unknown)}', **report)
+
+    # 特性目录在数据库中不存在时（如新增的产品代码目录）按模块处理
+    module_sources = {module_id: path for chip, path in mapped['modules'].items() for module_id in modules[chip]}
+    feature_sources = {}
+    found = {
+        (module_id, name): feature_id
+        for feature_id, module_id, name in Feature.alive.filter(
+            module_id__in={module_id for chip, _ in mapped['features'] for module_id in modules[chip]},
+            feature_name__in={name for _, name in mapped['features']},
+        ).values_list('id', 'module_id', 'feature_name')
+    }
+    for (chip, name), path in mapped['features'].items():
+        matched = [found[(module_id, name)] for module_id in modules[chip] if (module_id, name) in found]
+        for feature_id in matched:
+            feature_sources.setdefault(feature_id, path)
+        if not matched:
+            for module_id in modules[chip]:
+                module_sources.setdefault(module_id, path)
+
+    affected = Q(script_path__in=mapped['scripts']) | Q(feature_id__in=list(feature_sources)) | Q(
+        feature_id__in=Feature.alive.filter(module_id__in=list(module_sources)).values('id')
+    )
+    feature_modules = dict(Feature.objects.filter(
+        Q(id__in=list(feature_sources)) | Q(module_id__in=list(module_sources))
+    ).values_list('id', 'module_id'))
+    selected = []
+    for case in _candidates().filter(affected).order_by('case_id').values('id', 'case_id', 'feature_id', 'script_path'):
+        if case['script_path'] in mapped['scripts']:
+            reason, source = 'script', case['script_path']
+        elif case['feature_id'] in feature_sources:
+            reason, source = 'feature', feature_sources[case['feature_id']]
+        else:
+            reason, source = 'module', module_sources[feature_modules[case['feature_id']]]
+        selected.append({
+            'id': case['id'], 'case_id': case['case_id'], 'reason': reason,
+            'reason_display': REASONS[reason], 'source': source,
+        })
+
+    skipped_counts = Counter(dict(
+        _candidates().exclude(affected).order_by().values('feature_id').annotate(total=Count('id'))
+        .values_list('feature_id', 'total')
+    ))
+    features = {
+        row['id']: row for row in Feature.objects.filter(id__in=list(skipped_counts)).values(
+            'id', 'feature_name', 'module_id'
+        )
+    }
+    skipped = [
+        {
+            'feature_id': feature_id,
+            'feature_name': features.get(feature_id, {}).get('feature_name'),
+            'module_id': features.get(feature_id, {}).get('module_id'),
+            'count': count,
+            'reason': SKIP_REASON,
+        }
+        for feature_id, count in sorted(skipped_counts.items())
+    ]
+    return {
+        'mode': MODE_CHANGED,
+        'base_commit': base,
+        'head_commit': head,
+        'reason': f'根据 {len(paths)} 个变更文件选择用例',
+        'selected_count': len(selected),
+        'skipped_count': sum(skipped_counts.values()),
+        'selected': selected,
+        'skipped': skipped,
+        'select_time': timezone.now().isoformat(),
+        **report,
+    }
+
+
+def select_task_cases(task):
+    """为任务选择用例并保存到 case_selection
+
+    Returns:
+        dict: 选择结果
+    """
+    commits = package_commits(task.package_info)
+    if commits is None:
+        selection = _full(None, None, '包信息中没有有效的基线提交与本次提交（base_commit/commit，7-40 位十六进制）')
+    else:
+        selection = select_cases(*commits)
+    # 总用例数未填写，或来自上一次选择时，按本次选择结果更新
+    previous = task.case_selection or {}
+    task.case_selection = selection
+    update_fields = ['case_selection']
+    if not task.total_case or task.total_case == previous.get('selected_count'):
+        task.total_case = selection['selected_count']
+        update_fields.append('total_case')
+    task.save(update_fields=update_fields)
+    logger.info(
+        f"任务 {task.id} 用例选择完成: {selection['mode']}, 选中 {selection['selected_count']} 个, "
+        f"跳过 {selection['skipped_count']} 个"
+    )
+    return selection
@@ -1,3 +1,204 @@
-from django.test import TestCase
+import os
+import json
+import tempfile
+import subprocess
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from common.tasks import start_task_after_restore_task
+from env_manager.models import Environment
+from execution_manager.models import TaskExecution
+from execution_manager.selection import select_task_cases
+from feature_testcase.models import Feature, TestCase as Case
+from feature_testcase.repo_sync import RepoSyncError, changed_paths
+from module_manager.models import Module
+from test_suite.models import TestSuite
+
+
+class CaseSelectionTestCase(TestCase):
+    """基于变更的用例选择测试"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = self.tmpdir.name
+        self._git('init', '-q')
+        self.settings_override = override_settings(CASE_REPO_PATH=self.repo, CASE_REPO_ROOT='src/dt')
+        self.settings_override.enable()
+
+        Module.objects.create(id='module-a', module_name='模块A', chip_model='Chip-A', creator='testuser')
+        Module.objects.create(id='module-b', module_name='模块B', chip_model='Chip-B', creator='testuser')
+        for feature_id, name, module_id in [
+            ('feature-usb', 'usb', 'module-a'), ('feature-pcie', 'pcie', 'module-a'), ('feature-spi', 'spi', 'module-b'),
+        ]:
+            Feature.objects.create(id=feature_id, feature_name=name, module_id=module_id, creator='testuser')
+        for case_id, feature, script in [
+            ('TC-USB-1', 'usb', 'test_enum.py'), ('TC-USB-2', 'usb', 'test_speed.py'),
+            ('TC-PCIE-1', 'pcie', 'test_link.py'), ('TC-SPI-1', 'spi', 'test_spi.py'),
+        ]:
+            chip = 'Chip-B' if feature == 'spi' else 'Chip-A'
+            Case.objects.create(
+                id=f'case-{case_id}', case_id=case_id, case_name=case_id, feature_id=f'feature-{feature}',
+                pre_condition='无', steps='执行脚本', expected_result='通过',
+                script_path=f'src/dt/{chip}/{feature}/{script}', creator='testuser'
+            )
+            self._write(f'src/dt/{chip}/{feature}/{script}')
+        self._write('src/Chip-A/usb/driver.c')
+        self._write('src/Chip-B/board.c')
+        self._write('build.sh')
+        self.base = self._commit()
+
+        environment = Environment.objects.create(
+            id='env-test-1', name='测试环境', type='FPGA', status='available', owner='testuser'
+        )
+        suite = TestSuite.objects.create(name='测试套', visible_scope='private', creator='testuser')
+        self.task = TaskExecution.objects.create(
+            suite_id=suite, env_id=environment, package_info='', executor='testuser'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+    def _git(self, *args):
+        return subprocess.run(
+            ['git', '-C', self.repo, '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+    def _write(self, path, content=''):
+        full_path = os.path.join(self.repo, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _commit(self):
+        self._git('add', '-A')
+        self._git('commit', '-q', '-m', 'update')
+        return self._git('rev-parse', 'HEAD')
+
+    def _select(self, head):
+        self.task.package_info = json.dumps({'version': '1.0', 'base_commit': self.base, 'commit': head})
+        return select_task_cases(self.task)
+
+    def test_select_changed_cases(self):
+        """脚本变更选择对应用例，产品代码按规则映射到特性或模块，文档变更忽略"""
+        self._write('src/dt/Chip-A/usb/test_enum.py', 'changed')
+        self._write('src/Chip-B/board.c', 'changed')
+        self._write('docs/guide.md', '说明')
+        selection = self._select(self._commit())
+
+        self.assertEqual(selection['mode'], 'changed')
+        self.assertEqual(
+            [(case['case_id'], case['reason']) for case in selection['selected']],
+            [('TC-SPI-1', 'module'), ('TC-USB-1', 'script')]
+        )
+        self.assertEqual(selection['ignored_paths'], ['docs/guide.md'])
+        self.assertEqual(selection['skipped_count'], 2)
+        self.assertEqual(
+            {item['feature_id']: item['count'] for item in selection['skipped']},
+            {'feature-usb': 1, 'feature-pcie': 1}
+        )
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_case, 2)
+        self.assertEqual(self.task.case_selection['selected_count'], 2)
+
+        # 特性目录下的产品代码变更选择整个特性
+        self._write('src/Chip-A/usb/driver.c', 'changed')
+        selection = self._select(self._commit())
+        self.assertEqual(
+            {case['case_id']: case['reason'] for case in selection['selected']},
+            {'TC-USB-1': 'script', 'TC-USB-2': 'feature', 'TC-SPI-1': 'module'}
+        )
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_case, 3)
+
+    def test_fallback_to_full(self):
+        """无法映射的变更或缺少提交信息时执行全部用例并说明原因"""
+        self._write('build.sh', 'changed')
+        selection = self._select(self._commit())
+        self.assertEqual(selection['mode'], 'full')
+        self.assertEqual(selection['unmapped_paths'], ['build.sh'])
+        self.assertEqual(selection['selected_count'], 4)
+
+        self.task.package_info = json.dumps({'version': '1.0'})
+        selection = select_task_cases(self.task)
+        self.assertEqual(selection['mode'], 'full')
+        self.assertIn('base_commit', selection['reason'])
+
+        selection = self._select('0' * 40)
+        self.assertEqual(selection['mode'], 'full')
+        self.assertIn('读取代码仓变更失败', selection['reason'])
+
+    def test_reject_option_like_commits(self):
+        """包信息中的提交号不是十六进制时不调用 git"""
+        target = os.path.join(self.tmpdir.name, 'created-by-git')
+        self.task.package_info = json.dumps({'base_commit': f'--output={target}', 'commit': self.base})
+        selection = select_task_cases(self.task)
+        self.assertEqual(selection['mode'], 'full')
+        self.assertFalse(os.path.exists(target))
+        with self.assertRaises(RepoSyncError):
+            changed_paths(self.repo, f'--output={target}', self.base, '')
+        self.assertFalse(os.path.exists(target))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TaskStartResetTestCase(TestCase):
+    """启动任务前复位环境的测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='testpassword'))
+        self.environment = Environment.objects.create(
+            id='env-qemu-1', name='QEMU环境', type='QEMU', status='available', owner='testuser',
+            container_id='container-1', snapshot_image='autotest-snapshot/env-qemu-1:baseline'
+        )
+        suite = TestSuite.objects.create(name='测试套', visible_scope='private', creator='testuser')
+        TaskExecution.objects.create(
+            suite_id=suite, env_id=self.environment, package_info='', executor='testuser', status='success',
+            end_time='2026-01-01T00:00:00Z'
+        )
+        self.task = TaskExecution.objects.create(
+            suite_id=suite, env_id=self.environment, package_info='', executor='testuser'
+        )
+
+    def test_start_waits_for_restore(self):
+        """需要复位时任务保持等待执行，复位提交在事务提交后执行，重复启动被拒绝"""
+        url = reverse('taskexecution-start', args=[self.task.id])
+        with patch('execution_manager.views.start_task_after_restore_task.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['environment_reset'])
+            self.assertEqual(response.data['status'], 'pending')
+            mock_delay.assert_called_once_with(self.task.id)
+            self.assertEqual(self.client.post(url).status_code, 400)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'pending')
+
+    def test_task_runs_after_environment_ready(self):
+        """复位完成且环境就绪后任务才进入运行中"""
+        summary = {'succeeded': ['env-qemu-1'], 'failed': {}, 'ready': ['env-qemu-1']}
+        with patch('common.tasks._run_single_lifecycle', return_value=summary) as mock_lifecycle:
+            result = start_task_after_restore_task(self.task.id)
+        mock_lifecycle.assert_called_once_with('restore', 'env-qemu-1')
+        self.assertEqual(result['status'], 'running')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'running')
+        self.assertIsNotNone(self.task.start_time)
+
+    def test_task_failed_when_restore_fails(self):
+        """复位失败时任务标记为执行失败"""
+        summary = {'succeeded': [], 'failed': {'env-qemu-1': 'no such image'}, 'ready': []}
+        with patch('common.tasks._run_single_lifecycle', return_value=summary), \
+                patch('common.tasks.finalize_task_execution_task.delay') as mock_finalize:
+            result = start_task_after_restore_task(self.task.id)
+        self.assertEqual(result['error'], 'no such image')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'failed')
+        mock_finalize.assert_called_once_with(self.task.id)
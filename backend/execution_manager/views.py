@@ -6,6 +6,15 @@ from .serializers import TaskExecutionSerializer
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from common.auth import CustomTokenAuthentication
 from common.utils import audit_log, get_current_user
+from common.tasks import (
+    TASK_RESET_LOCK_KEY, start_task_after_restore_task, finalize_task_execution_task, select_task_cases_task
+)
+from .selection import package_commits, select_task_cases
+from result_manager.models import CaseResult
+from result_manager.signature import release_results
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 
@@ -50,6 +59,10 @@ class TaskExecutionViewSet(viewsets.ModelViewSet):
         # 使用单一的字典参数调用save方法，避免参数重复
         task = serializer.save(**validated_data)
         
+        # 包信息中带有基线提交与本次提交时，根据两次提交之间的变更选择用例
+        if package_commits(task.package_info):
+            transaction.on_commit(lambda: select_task_cases_task.delay(task.id))
+        
         # 记录审计日志
         audit_log(
             operation_type='create_execution_task',
@@ -68,6 +81,10 @@ class TaskExecutionViewSet(viewsets.ModelViewSet):
         old_data = TaskExecutionSerializer(self.get_object()).data
         task = serializer.save()
         
+        # 任务进入结束状态时触发结果处理（日志索引等）
+        if old_data['status'] not in TaskExecution.FINAL_STATUSES and task.status in TaskExecution.FINAL_STATUSES:
+            transaction.on_commit(lambda: finalize_task_execution_task.delay(task.id))
+        
         # 记录审计日志
         audit_log(
             operation_type='update_execution_task',
@@ -85,7 +102,10 @@ class TaskExecutionViewSet(viewsets.ModelViewSet):
         """删除任务执行记录时的处理"""
         user = get_current_user(self.request)
         old_data = TaskExecutionSerializer(instance).data
-        instance.delete()
+        # 级联删除的失败结果从所属聚类中扣除
+        with transaction.atomic():
+            release_results(CaseResult.objects.filter(task_id=instance.id))
+            instance.delete()
         
         # 记录审计日志
         audit_log(
@@ -124,10 +144,22 @@ class TaskExecutionViewSet(viewsets.ModelViewSet):
                 status=400
             )
         
-        # 更新任务状态和开始时间
-        task.status = 'running'
-        task.start_time = timezone.now()
-        task.save()
+        # 环境执行过其他任务时，先复位到基线快照，清除上一个测试套留下的状态
+        environment = task.env_id
+        environment_reset = bool(environment.snapshot_image) and TaskExecution.objects.filter(
+            env_id=environment.id, end_time__isnull=False
+        ).exclude(id=task.id).exists()
+        if environment_reset:
+            # 复位会删除并重建容器，任务保持等待执行，由后台任务复位、等待环境就绪后再改为运行中
+            lock_timeout = getattr(settings, 'ENV_READY_TIMEOUT', 300) + 600
+            if not cache.add(TASK_RESET_LOCK_KEY.format(task_id=task.id), 1, timeout=lock_timeout):
+                return Response({'error': '任务正在复位环境，复位完成后自动开始执行'}, status=400)
+            transaction.on_commit(lambda: start_task_after_restore_task.delay(task.id))
+        else:
+            # 更新任务状态和开始时间
+            task.status = 'running'
+            task.start_time = timezone.now()
+            task.save()
         
         # 记录审计日志
         user = get_current_user(self.request)
@@ -144,7 +176,8 @@ class TaskExecutionViewSet(viewsets.ModelViewSet):
             'task_id': task.id,
             'status': task.status,
             'start_time': task.start_time,
-            'message': '任务已成功启动'
+            'environment_reset': environment_reset,
+            'message': '正在复位环境，复位完成后任务自动开始执行' if environment_reset else '任务已成功启动'
         })
 
     @action(detail=True, methods=['post'])
@@ -223,6 +256,7 @@ class TaskExecutionViewSet(viewsets.ModelViewSet):
         task.status = 'terminated'
         task.end_time = timezone.now()
         task.save()
+        transaction.on_commit(lambda: finalize_task_execution_task.delay(task.id))
         
         # 记录审计日志
         user = get_current_user(self.request)
@@ -242,6 +276,31 @@ class TaskExecutionViewSet(viewsets.ModelViewSet):
             'message': '任务已成功终止'
         })
 
+    @action(detail=True, methods=['get', 'post'])
+    def selection(self, request, pk=None):
+        """查看任务的用例选择结果（POST 重新选择，仅限等待执行的任务）"""
+        task = self.get_object()
+        if request.method == 'POST':
+            if task.status != 'pending':
+                return Response(
+                    {'error': f'任务当前状态为{task.get_status_display()}，无法重新选择用例'},
+                    status=400
+                )
+            select_task_cases(task)
+            audit_log(
+                operation_type='select_execution_cases',
+                operation_desc=f'重新选择执行任务用例: {task.id}',
+                operated_by=get_current_user(self.request),
+                request=self.request,
+                module_name='execution_manager',
+                object_id=str(task.id)
+            )
+        return Response({
+            'task_id': task.id,
+            'total_case': task.total_case,
+            'selection': task.case_selection
+        })
+
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
         """获取任务执行统计信息"""
@@ -0,0 +1,132 @@
+"""模块 → 特性 → 用例的级联软删除与恢复
+
+特性、用例通过 module_id / feature_id 字符串关联上级，没有数据库外键。这里用少量基于集合的 UPDATE
+标记整棵子树（关联关系、用例、特性各一条），同一次删除的记录使用相同的 delete_time；恢复时只恢复
+删除时间与上级一致的下级记录，在此之前单独删除的记录保持删除状态。
+
+上级的计数字段（Module.feature_count、Feature.case_count）按变化量增减，不再重新统计。随上级一起
+删除的下级不改变上级自身的计数，恢复后计数保持一致。
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from feature_testcase.counters import adjust_counter
+from feature_testcase.models import Feature, FeatureTestCaseRelation, TestCase
+from module_manager.models import Module
+
+
+class CascadeError(Exception):
+    """上级已删除，无法单独恢复"""
+
+
+def delete_subtree(features, cases, stamp):
+    """用同一删除时间软删除特性、用例及涉及它们的关联关系
+
+    子查询引用的是存活记录，按 关联关系 → 用例 → 特性 的顺序执行。
+
+    Returns:
+        dict: 删除的特性数与用例数
+    """
+    FeatureTestCaseRelation.alive.filter(
+        Q(feature_id__in=features.values('id')) | Q(test_case_id__in=cases.values('id'))
+    ).soft_delete(stamp)
+    deleted_cases = cases.soft_delete(stamp)
+    return {'features': features.soft_delete(stamp), 'cases': deleted_cases}
+
+
+def _restore_subtree(features, cases, stamp):
+    """恢复删除时间为 stamp 的特性、用例及涉及它们的关联关系
+
+    Returns:
+        dict: 恢复的特性数与用例数
+    """
+    features = features.filter(is_deleted=True, delete_time=stamp)
+    cases = cases.filter(is_deleted=True, delete_time=stamp)
+    FeatureTestCaseRelation.objects.filter(is_deleted=True, delete_time=stamp).filter(
+        Q(feature_id__in=features.values('id')) | Q(test_case_id__in=cases.values('id'))
+    ).restore()
+    restored_cases = cases.restore()
+    return {'features': features.restore(), 'cases': restored_cases}
+
+
+def delete_module(module):
+    """软删除模块及其下全部特性、用例"""
+    stamp = timezone.now()
+    with transaction.atomic():
+        features = Feature.alive.filter(module_id=module.id)
+        summary = delete_subtree(features, TestCase.alive.filter(feature_id__in=features.values('id')), stamp)
+        Module.alive.filter(pk=module.pk).soft_delete(stamp)
+    module.is_deleted, module.delete_time = True, stamp
+    return summary
+
+
+def delete_feature(feature):
+    """软删除特性及其下全部用例，模块的特性计数减一"""
+    stamp = timezone.now()
+    with transaction.atomic():
+        summary = delete_subtree(
+            Feature.alive.filter(pk=feature.pk), TestCase.alive.filter(feature_id=feature.pk), stamp
+        )
+        adjust_counter(Module.objects.filter(pk=feature.module_id), 'feature_count', -summary['features'])
+    feature.is_deleted, feature.delete_time = True, stamp
+    return summary
+
+
+def delete_case(case):
+    """软删除用例，特性的用例计数减一"""
+    stamp = timezone.now()
+    with transaction.atomic():
+        summary = delete_subtree(Feature.objects.none(), TestCase.alive.filter(pk=case.pk), stamp)
+        adjust_counter(Feature.objects.filter(pk=case.feature_id), 'case_count', -summary['cases'])
+    case.is_deleted, case.delete_time = True, stamp
+    return summary
+
+
+def restore_module(module):
+    """恢复模块及与其同时删除的特性、用例"""
+    stamp = module.delete_time
+    with transaction.atomic():
+        summary = {'features': 0, 'cases': 0}
+        # 没有删除时间的历史记录无法区分哪些下级是随它一起删除的，只恢复模块本身
+        if stamp is not None:
+            features = Feature.objects.filter(module_id=module.id)
+            cases = TestCase.objects.filter(
+                feature_id__in=features.filter(is_deleted=True, delete_time=stamp).values('id')
+            )
+            summary = _restore_subtree(features, cases, stamp)
+        Module.objects.filter(pk=module.pk).restore()
+    module.is_deleted, module.delete_time = False, None
+    return summary
+
+
+def restore_feature(feature):
+    """恢复特性及与其同时删除的用例，模块的特性计数加一"""
+    if Module.objects.dead().filter(pk=feature.module_id).exists():
+        raise CascadeError('所属模块已删除，请先恢复模块')
+    stamp = feature.delete_time
+    with transaction.atomic():
+        if stamp is not None:
+            summary = _restore_subtree(
+                Feature.objects.filter(pk=feature.pk), TestCase.objects.filter(feature_id=feature.pk), stamp
+            )
+        else:
+            summary = {'features': Feature.objects.filter(pk=feature.pk).restore(), 'cases': 0}
+        adjust_counter(Module.objects.filter(pk=feature.module_id), 'feature_count', summary['features'])
+    feature.is_deleted, feature.delete_time = False, None
+    return summary
+
+
+def restore_case(case):
+    """恢复用例，特性的用例计数加一"""
+    if Feature.objects.dead().filter(pk=case.feature_id).exists():
+        raise CascadeError('所属特性已删除，请先恢复特性')
+    stamp = case.delete_time
+    with transaction.atomic():
+        if stamp is not None:
+            summary = _restore_subtree(Feature.objects.none(), TestCase.objects.filter(pk=case.pk), stamp)
+        else:
+            summary = {'features': 0, 'cases': TestCase.objects.filter(pk=case.pk).restore()}
+        adjust_counter(Feature.objects.filter(pk=case.feature_id), 'case_count', summary['cases'])
+    case.is_deleted, case.delete_time = False, None
+    return summary
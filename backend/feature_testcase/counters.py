@@ -0,0 +1,90 @@
+"""冗余计数字段的增量维护与定期校正
+
+Module.feature_count、Feature.case_count 记录未删除的下级数量。增删、移动下级时用 F() 表达式按变化量
+原子增减（adjust_counter），不再重新统计再整行保存；并发修改不会互相覆盖。
+
+增量维护无法覆盖绕过接口的改动（管理后台、手工 SQL、导入脚本等），由 reconcile_counters_task 定期
+按批找出计数与实际不符的记录，并用一条带相关子查询的 UPDATE 修正。只校正未删除的上级：随上级一起
+删除的下级不改变上级的计数，恢复后依然一致。
+"""
+import logging
+
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from feature_testcase.models import Feature, TestCase
+from module_manager.models import Module
+
+logger = logging.getLogger('autotestweb')
+
+
+def _setting(name, default):
+    """读取计数校正相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def adjust_counter(queryset, field, delta):
+    """按变化量调整计数字段，结果不小于 0"""
+    if delta:
+        queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def _child_count(child_model, parent_field):
+    """上级未删除下级数量的相关子查询"""
+    counts = (
+        child_model.alive.filter(**{parent_field: OuterRef('pk')})
+        .order_by()
+        .values(parent_field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+# (上级模型, 计数字段, 下级模型, 下级中指向上级的字段)
+COUNTERS = [
+    (Module, 'feature_count', Feature, 'module_id'),
+    (Feature, 'case_count', TestCase, 'feature_id'),
+]
+
+
+def reconcile_counter(model, field, child_model, parent_field, batch_size):
+    """校正一个计数字段
+
+    Returns:
+        int: 修正的记录数
+    """
+    actual = _child_count(child_model, parent_field)
+    repaired = 0
+    last_pk = ''
+    while True:
+        # 按主键分批扫描，只取计数不一致的记录
+        batch = list(
+            model.alive.filter(pk__gt=last_pk).order_by('pk').annotate(actual=actual)
+            .values_list('pk', field, 'actual')[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        drifted = [pk for pk, stored, counted in batch if stored != counted]
+        if drifted:
+            model.objects.filter(pk__in=drifted).update(**{field: _child_count(child_model, parent_field)})
+            repaired += len(drifted)
+            logger.warning(f'{model._meta.verbose_name}计数 {field} 与实际不一致，已修正 {len(drifted)} 条')
+        if len(batch) < batch_size:
+            break
+    return repaired
+
+
+def reconcile_counters(batch_size=None):
+    """校正所有冗余计数字段
+
+    Returns:
+        dict: {模型.字段: 修正的记录数}
+    """
+    batch_size = int(batch_size or _setting('COUNTER_RECONCILE_BATCH_SIZE', 1000))
+    summary = {}
+    for model, field, child_model, parent_field in COUNTERS:
+        summary[f'{model._meta.label}.{field}'] = reconcile_counter(model, field, child_model, parent_field, batch_size)
+    return summary
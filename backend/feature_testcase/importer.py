@@ -0,0 +1,259 @@
+"""测试用例批量导入
+
+支持 CSV（含 Excel 另存的 UTF-8/GBK 编码 CSV）、JSON 与 xlsx 文件；表头可以是字段名或字段中文名。
+
+校验基于集合：整份文件先在内存中逐行检查格式与取值，再用一次查询取出已存在的用例ID（按批拆分以
+满足数据库参数个数限制）、一次查询取出存在的特性，不再逐行 exists()。通过校验的行按批 bulk_create /
+bulk_update，特性的用例计数按变化量每个特性更新一次。有错误的行不导入，错误按行返回。
+"""
+import io
+import csv
+import json
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from feature_testcase.counters import adjust_counter
+from feature_testcase.models import Feature, TestCase
+
+FORMATS = ('csv', 'json', 'xlsx')
+MODES = ('create', 'upsert')
+IMPORT_FIELDS = [
+    'case_id', 'case_name', 'feature_id', 'description', 'pre_condition', 'steps', 'expected_result',
+    'script_path', 'status', 'priority', 'test_type', 'test_phase',
+]
+REQUIRED_FIELDS = ['case_id', 'case_name', 'feature_id', 'pre_condition', 'steps', 'expected_result']
+CSV_ENCODINGS = ('utf-8-sig', 'gb18030')
+
+
+class CaseImportError(Exception):
+    """导入文件无法解析"""
+
+
+def _setting(name, default):
+    """读取用例导入相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def header_aliases():
+    """表头到字段名的映射：字段名、字段中文名都可以作为表头"""
+    aliases = {'用例ID': 'case_id', '特性ID': 'feature_id'}
+    for name in IMPORT_FIELDS:
+        field = TestCase._meta.get_field(name)
+        aliases[name] = name
+        aliases[str(field.verbose_name)] = name
+    return aliases
+
+
+def detect_format(filename):
+    """根据扩展名判断文件格式"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in FORMATS:
+        raise CaseImportError(f'不支持的文件格式: {extension or filename}，可选值: {", ".join(FORMATS)}')
+    return extension
+
+
+def _decode(content):
+    if isinstance(content, str):
+        return content
+    for encoding in CSV_ENCODINGS:
+        try:
+            return content.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise CaseImportError('无法识别文件编码，请使用 UTF-8 或 GBK 编码')
+
+
+def _read_csv(content):
+    return list(csv.DictReader(io.StringIO(_decode(content))))
+
+
+def _read_json(content):
+    try:
+        data = json.loads(_decode(content))
+    except ValueError as e:
+        raise CaseImportError(f'JSON 解析失败: {str(e)}')
+    if isinstance(data, dict):
+        data = data.get('cases')
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise CaseImportError('JSON 内容应为用例对象数组，或 {"cases": [...]}')
+    return data
+
+
+def _read_xlsx(content):
+    try:
+        import openpyxl
+    except ImportError:
+        raise CaseImportError('导入 xlsx 文件需要安装 openpyxl，或另存为 CSV 后导入')
+    try:
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    except Exception as e:
+        raise CaseImportError(f'xlsx 解析失败: {str(e)}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, [])]
+        return [
+            dict(zip(header, row)) for row in rows
+            if any(cell not in (None, '') for cell in row)
+        ]
+    finally:
+        workbook.close()
+
+
+def read_rows(content, file_format):
+    """把文件内容解析为 {字段名: 值} 的列表，无法识别的列忽略"""
+    readers = {'csv': _read_csv, 'json': _read_json, 'xlsx': _read_xlsx}
+    if file_format not in readers:
+        raise CaseImportError(f'不支持的文件格式: {file_format}，可选值: {", ".join(FORMATS)}')
+    aliases = header_aliases()
+    rows = []
+    for raw in readers[file_format](content):
+        row = {}
+        for key, value in raw.items():
+            name = aliases.get(str(key).strip()) if key is not None else None
+            if name:
+                row[name] = value
+        rows.append(row)
+    return rows
+
+
+def clean_row(row):
+    """校验单行的格式与取值
+
+    Returns:
+        tuple: (清洗后的字段, {字段: 错误信息})
+    """
+    data = {}
+    errors = {}
+    for name in IMPORT_FIELDS:
+        value = row.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            continue
+        data[name] = value
+
+    for name in REQUIRED_FIELDS:
+        if name not in data:
+            errors[name] = '不能为空'
+    for name in IMPORT_FIELDS:
+        field = TestCase._meta.get_field(name)
+        if name not in data:
+            continue
+        if name == 'priority':
+            try:
+                priority = float(data[name])
+                if not priority.is_integer():
+                    raise ValueError
+                data[name] = int(priority)
+            except (TypeError, ValueError):
+                errors[name] = '应为整数'
+                continue
+            if not 1 <= data[name] <= 100:
+                errors[name] = '应在 1-100 之间'
+            continue
+        data[name] = str(data[name])
+        if field.max_length and len(data[name]) > field.max_length:
+            errors[name] = f'长度不能超过 {field.max_length}'
+        elif field.choices and data[name] not in {choice[0] for choice in field.choices}:
+            errors[name] = f'无效的取值，允许的值为: {", ".join(choice[0] for choice in field.choices)}'
+    return data, errors
+
+
+def existing_cases(case_ids, batch_size):
+    """已存在的用例（含已删除），按批查询；更新时文件中未提供的字段保留原值"""
+    existing = {}
+    case_ids = list(case_ids)
+    for start in range(0, len(case_ids), batch_size):
+        for case in TestCase.objects.filter(case_id__in=case_ids[start:start + batch_size]).values(
+            'id', 'is_deleted', *IMPORT_FIELDS
+        ):
+            existing[case['case_id']] = case
+    return existing
+
+
+def import_cases(rows, creator, mode='create', batch_size=None, dry_run=False):
+    """批量导入测试用例
+
+    Args:
+        rows: read_rows 返回的行列表
+        creator: 创建人
+        mode: create 只新增，已存在的用例ID报错；upsert 已存在时更新（已删除的用例会被恢复）
+        dry_run: 只校验不写入
+
+    Returns:
+        dict: 总行数、新增数、更新数与按行的错误列表（行号从 1 开始，不含表头）
+    """
+    if mode not in MODES:
+        raise CaseImportError(f'不支持的导入模式: {mode}，可选值: {", ".join(MODES)}')
+    batch_size = int(batch_size or _setting('CASE_IMPORT_BATCH_SIZE', 1000))
+
+    cleaned = []
+    errors = []
+    seen = {}
+    for number, row in enumerate(rows, start=1):
+        data, row_errors = clean_row(row)
+        case_id = data.get('case_id')
+        if case_id and 'case_id' not in row_errors:
+            if case_id in seen:
+                row_errors['case_id'] = f'与第 {seen[case_id]} 行重复'
+            else:
+                seen[case_id] = number
+        if row_errors:
+            errors.append({'row': number, 'case_id': case_id, 'errors': row_errors})
+        else:
+            cleaned.append((number, data))
+
+    features = set(Feature.alive.filter(
+        id__in={data['feature_id'] for _, data in cleaned}
+    ).values_list('id', flat=True))
+    existing = existing_cases((data['case_id'] for _, data in cleaned), batch_size)
+
+    now = timezone.now()
+    timestamp = int(time.time() * 1000)
+    to_create = []
+    to_update = []
+    deltas = Counter()
+    for number, data in cleaned:
+        row_errors = {}
+        if data['feature_id'] not in features:
+            row_errors['feature_id'] = '关联的特性不存在'
+        current = existing.get(data['case_id'])
+        if current and mode == 'create':
+            row_errors['case_id'] = '用例ID已被已删除的用例占用' if current['is_deleted'] else '用例ID已存在'
+        if row_errors:
+            errors.append({'row': number, 'case_id': data['case_id'], 'errors': row_errors})
+            continue
+        if current is None:
+            data.setdefault('script_path', '')
+            to_create.append(TestCase(id=f'case-{timestamp}-{uuid.uuid4().hex[:8]}', creator=creator, **data))
+            deltas[data['feature_id']] += 1
+            continue
+        fields = {name: current[name] for name in IMPORT_FIELDS}
+        fields.update(data)
+        to_update.append(TestCase(id=current['id'], is_deleted=False, delete_time=None, update_time=now, **fields))
+        if not current['is_deleted']:
+            deltas[current['feature_id']] -= 1
+        deltas[data['feature_id']] += 1
+
+    summary = {
+        'total': len(rows),
+        'created': len(to_create),
+        'updated': len(to_update),
+        'errors': sorted(errors, key=lambda error: error['row']),
+    }
+    if dry_run:
+        return summary
+    with transaction.atomic():
+        TestCase.objects.bulk_create(to_create, batch_size=batch_size)
+        TestCase.objects.bulk_update(
+            to_update, IMPORT_FIELDS + ['is_deleted', 'delete_time', 'update_time'], batch_size=batch_size
+        )
+        # 每个特性只更新一次计数
+        for feature_id, delta in deltas.items():
+            adjust_counter(Feature.alive.filter(id=feature_id), 'case_count', delta)
+    return summary
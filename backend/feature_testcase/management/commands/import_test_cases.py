@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from feature_testcase.importer import FORMATS, MODES, CaseImportError, detect_format, import_cases, read_rows
+
+
+class Command(BaseCommand):
+    help = '从 CSV/JSON/xlsx 文件批量导入测试用例（基于集合校验，分批写入）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='用例文件路径')
+        parser.add_argument('--format', choices=FORMATS, help='文件格式，默认按扩展名判断')
+        parser.add_argument('--mode', choices=MODES, default='create', help='create 只新增，upsert 已存在时更新')
+        parser.add_argument('--creator', default='system', help='新增用例的创建人')
+        parser.add_argument('--batch-size', type=int, help='每批写入的用例数，默认使用 CASE_IMPORT_BATCH_SIZE')
+        parser.add_argument('--dry-run', action='store_true', help='只校验不写入')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = read_rows(f.read(), options['format'] or detect_format(options['path']))
+            summary = import_cases(
+                rows, creator=options['creator'], mode=options['mode'],
+                batch_size=options['batch_size'], dry_run=options['dry_run'],
+            )
+        except (OSError, CaseImportError) as e:
+            raise CommandError(str(e))
+        for error in summary['errors']:
+            details = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+            self.stderr.write(f"第 {error['row']} 行 ({error['case_id'] or '-'}): {details}")
+        self.stdout.write(
+            f"共 {summary['total']} 行, 新增 {summary['created']} 条, 更新 {summary['updated']} 条, "
+            f"错误 {len(summary['errors'])} 行{'（仅校验，未写入）' if options['dry_run'] else ''}"
+        )
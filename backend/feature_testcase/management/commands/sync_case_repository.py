@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from feature_testcase.repo_sync import RepoSyncError, sync_repository
+
+
+class Command(BaseCommand):
+    help = '从代码仓同步特性与用例（默认只处理上次同步以来变化的脚本）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='忽略上次同步的提交，全量扫描代码仓')
+
+    def handle(self, *args, **options):
+        try:
+            summary = sync_repository(full=options['full'])
+        except RepoSyncError as e:
+            raise CommandError(str(e))
+        if summary is None:
+            self.stdout.write('未配置 CASE_REPO_PATH 或同步正在进行，未执行')
+            return
+        for error in summary.get('errors', []):
+            details = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+            self.stderr.write(f"{error['path']}: {details}")
+        self.stdout.write(
+            f"{summary['previous'] or '-'} → {summary['commit']}{'（全量）' if summary['full'] else ''}: "
+            f"新增用例 {summary.get('created', 0)}, 更新 {summary.get('updated', 0)}, 删除 {summary.get('deleted', 0)}, "
+            f"新建特性 {summary.get('features_created', 0)}, 删除特性 {summary.get('features_deleted', 0)}"
+        )
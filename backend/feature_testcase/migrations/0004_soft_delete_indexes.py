@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+def backfill_delete_time(apps, schema_editor):
+    """已软删除的历史记录以最后更新时间作为删除时间"""
+    for model_name in ['Feature', 'TestCase', 'FeatureTestCaseRelation']:
+        model = apps.get_model('feature_testcase', model_name)
+        model.objects.filter(is_deleted=True, delete_time__isnull=True).update(delete_time=models.F('update_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_testcase', '0003_testcase_creator_testcase_priority_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feature',
+            name='delete_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='删除时间'),
+        ),
+        migrations.AddField(
+            model_name='featuretestcaserelation',
+            name='delete_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='删除时间'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='delete_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='删除时间'),
+        ),
+        migrations.RunPython(backfill_delete_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['module_id', '-create_time'], name='feature_live_idx_module'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-create_time'], name='feature_live_idx_ctime'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['delete_time'], name='feature_dead_idx_dtime'),
+        ),
+        migrations.AddIndex(
+            model_name='featuretestcaserelation',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['feature_id'], name='relation_live_idx_feature'),
+        ),
+        migrations.AddIndex(
+            model_name='featuretestcaserelation',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['test_case_id'], name='relation_live_idx_case'),
+        ),
+        migrations.AddIndex(
+            model_name='featuretestcaserelation',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['delete_time'], name='relation_dead_idx_dtime'),
+        ),
+        migrations.AddIndex(
+            model_name='testcase',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['feature_id', '-create_time'], name='case_live_idx_feature'),
+        ),
+        migrations.AddIndex(
+            model_name='testcase',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-create_time'], name='case_live_idx_ctime'),
+        ),
+        migrations.AddIndex(
+            model_name='testcase',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['delete_time'], name='case_dead_idx_dtime'),
+        ),
+    ]
@@ -21,6 +21,10 @@ class Feature(BaseModel):
         indexes = [
             models.Index(fields=['module_id'], name='idx_module'),
             models.Index(fields=['creator'], name='feature_idx_creator'),
+            # 部分索引：列表查询只扫描未删除的记录，清理任务只扫描已删除的记录（MySQL 不支持，迁移时跳过）
+            models.Index(fields=['module_id', '-create_time'], name='feature_live_idx_module', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['-create_time'], name='feature_live_idx_ctime', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['delete_time'], name='feature_dead_idx_dtime', condition=models.Q(is_deleted=True)),
         ]
 
     def __str__(self):
@@ -68,6 +72,9 @@ class TestCase(BaseModel):
         indexes = [
             models.Index(fields=['feature_id'], name='idx_feature'),
             models.Index(fields=['status'], name='idx_status'),
+            models.Index(fields=['feature_id', '-create_time'], name='case_live_idx_feature', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['-create_time'], name='case_live_idx_ctime', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['delete_time'], name='case_dead_idx_dtime', condition=models.Q(is_deleted=True)),
         ]
 
     def __str__(self):
@@ -91,6 +98,9 @@ class FeatureTestCaseRelation(BaseModel):
             models.Index(fields=['feature_id'], name='idx_feature_relation'),
             models.Index(fields=['test_case_id'], name='idx_testcase_relation'),
             models.Index(fields=['is_primary'], name='idx_is_primary'),
+            models.Index(fields=['feature_id'], name='relation_live_idx_feature', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['test_case_id'], name='relation_live_idx_case', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['delete_time'], name='relation_dead_idx_dtime', condition=models.Q(is_deleted=True)),
         ]
 
     def __str__(self):
@@ -0,0 +1,435 @@
+"""代码仓特性与用例增量同步
+
+代码仓目录约定（设计文档 4.3/4.5）：CASE_REPO_ROOT/<芯片型号>/<特性>/.../<用例脚本>
+- 芯片型号目录对应 chip_model 相同的模块（同一芯片型号对应多个模块时跳过并报错）
+- 特性目录对应模块下同名的特性，不存在时自动创建
+- 后缀在 CASE_SCRIPT_SUFFIXES 中的文件为用例脚本，script_path 为脚本在代码仓中的相对路径；
+  脚本开头的注释可以声明 用例ID/用例名称/前置条件 等字段（如 ``# case_id: TC-USB-001``），
+  未声明用例ID时使用文件名。用例按用例ID识别，同一用例移动或改名只更新路径与所属特性
+
+上次同步的提交保存在系统配置 case_repo_sync 中。每次只对比上次提交与当前提交的差异
+（git diff --name-status），只读取变化的脚本（一次 git cat-file --batch），按批 upsert，
+删除的脚本对应的用例软删除，目录已不存在且没有剩余用例的特性随之软删除。首次同步或上次的
+提交已不存在时全量扫描一次。同步失败的脚本（如芯片型号没有对应的模块、用例ID冲突）记录在
+同步进度中，下一轮即使脚本没有变化也会重新处理，直到成功或脚本被删除。
+"""
+import re
+import time
+import uuid
+import logging
+import posixpath
+import subprocess
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from common.utils import get_system_config, set_system_config
+from feature_testcase.cascade import delete_subtree
+from feature_testcase.counters import adjust_counter
+from feature_testcase.importer import IMPORT_FIELDS, clean_row, existing_cases, header_aliases
+from feature_testcase.models import Feature, TestCase
+from module_manager.models import Module
+
+logger = logging.getLogger('autotestweb')
+
+SYNC_CONFIG_KEY = 'case_repo_sync'
+LOCK_CACHE_KEY = 'case_repo_sync:lock'
+SYNC_CREATOR = 'repo-sync'
+HEADER_LINES = 50
+DEFAULT_TEXT = '见用例脚本'
+HEADER_PATTERN = re.compile(r'^\s*(?:#+|//|--|\*|;)?\s*([A-Za-z_\u4e00-\u9fff]+)\s*[:：]\s*(.+?)\s*$')
+# 所属特性与脚本路径由目录结构决定，不能在脚本中声明
+HEADER_KEYS = {
+    key: name for key, name in header_aliases().items() if name not in ('feature_id', 'script_path')
+}
+
+
+class RepoSyncError(Exception):
+    """代码仓读取失败"""
+
+
+def _setting(name, default):
+    """读取代码仓同步相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def _git(repo, *args, input=None, check=True):
+    try:
+        result = subprocess.run(['git', '-C', repo, *args], input=input, capture_output=True, check=check)
+    except FileNotFoundError:
+        raise RepoSyncError('未找到 git 命令')
+    except subprocess.CalledProcessError as e:
+        raise RepoSyncError(f'git {args[0]} 失败: {e.stderr.decode("utf-8", "replace").strip()}')
+    return result.stdout
+
+
+def _commit_exists(repo, commit):
+    result = subprocess.run(
+        ['git', '-C', repo, 'cat-file', '-e', f'{commit}^{{commit}}'], capture_output=True
+    )
+    return result.returncode == 0
+
+
+def resolve_commit(repo, ref):
+    """把分支名、提交号解析为完整的提交号，以 - 开头的值不会被当作 git 参数
+
+    Raises:
+        RepoSyncError: 提交不存在
+    """
+    commit = _git(repo, 'rev-parse', '--verify', '--quiet', '--end-of-options', f'{ref}^{{commit}}', check=False)
+    if not commit:
+        raise RepoSyncError(f'提交不存在: {ref}')
+    return commit.decode().strip()
+
+
+def _split_z(output):
+    return [item.decode('utf-8', 'surrogateescape') for item in output.split(b'\0') if item]
+
+
+def changed_paths(repo, old, new, root):
+    """两次提交之间脚本的变化
+
+    Returns:
+        tuple: (新增或修改的路径列表, 删除或被改名的旧路径列表)
+    """
+    old, new = resolve_commit(repo, old), resolve_commit(repo, new)
+    pathspec = [root] if root else []
+    items = _split_z(_git(
+        repo, 'diff', '--name-status', '-z', '-M', '--diff-filter=ADMRT', '--end-of-options', old, new, '--', *pathspec
+    ))
+    changed, removed = [], []
+    index = 0
+    while index < len(items):
+        status = items[index]
+        if status.startswith('R'):
+            removed.append(items[index + 1])
+            changed.append(items[index + 2])
+            index += 3
+            continue
+        (removed if status == 'D' else changed).append(items[index + 1])
+        index += 2
+    return changed, removed
+
+
+def existing_paths(repo, commit, paths):
+    """给定路径中在提交里仍然存在的文件"""
+    if not paths:
+        return []
+    return _split_z(_git(repo, 'ls-tree', '-r', '-z', '--name-only', commit, '--', *paths))
+
+
+def read_blobs(repo, commit, paths):
+    """一次 git cat-file --batch 读取多个文件开头的内容"""
+    if not paths:
+        return {}
+    request = ''.join(f'{commit}:{path}\n' for path in paths).encode('utf-8', 'surrogateescape')
+    output = _git(repo, 'cat-file', '--batch', input=request)
+    blobs = {}
+    offset = 0
+    for path in paths:
+        end = output.index(b'\n', offset)
+        header = output[offset:end].split()
+        offset = end + 1
+        if len(header) < 3 or header[1] != b'blob':
+            continue
+        size = int(header[2])
+        blobs[path] = output[offset:offset + size]
+        offset += size + 1
+    return blobs
+
+
+def parse_header(content):
+    """解析脚本开头注释中声明的用例字段"""
+    fields = {}
+    for line in content.decode('utf-8', 'replace').splitlines()[:HEADER_LINES]:
+        match = HEADER_PATTERN.match(line)
+        if match and match.group(1) in HEADER_KEYS:
+            fields.setdefault(HEADER_KEYS[match.group(1)], match.group(2))
+    return fields
+
+
+def _locate(path, root):
+    """脚本路径 → (芯片型号, 特性名称)，不是用例脚本时返回 None"""
+    relative = posixpath.relpath(path, root) if root else path
+    parts = relative.split('/')
+    suffixes = tuple(_setting('CASE_SCRIPT_SUFFIXES', ('.py', '.sh')))
+    if len(parts) < 3 or parts[0] == '..' or not path.endswith(suffixes):
+        return None
+    return parts[0], parts[1]
+
+
+def _feature_dir(root, chip, feature_name):
+    return posixpath.join(root, chip, feature_name) if root else posixpath.join(chip, feature_name)
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _ensure_features(locations, now):
+    """找到或创建脚本所在的特性，已删除的同名特性恢复使用
+
+    Returns:
+        tuple: ({(芯片型号, 特性名称): 特性ID}, {(芯片型号, 特性名称) 或芯片型号: 错误信息}, 新建数, 模块计数变化)
+    """
+    chips = {chip for chip, _ in locations}
+    modules = {}
+    ambiguous = set()
+    for module in Module.alive.filter(chip_model__in=chips).values('id', 'chip_model'):
+        if module['chip_model'] in modules:
+            ambiguous.add(module['chip_model'])
+        modules[module['chip_model']] = module['id']
+    errors = {}
+    for chip in chips:
+        if chip in ambiguous:
+            errors[chip] = f'芯片型号 {chip} 对应多个模块'
+        elif chip not in modules:
+            errors[chip] = f'芯片型号 {chip} 没有对应的模块'
+
+    wanted = {
+        (modules[chip], name): (chip, name) for chip, name in locations if chip in modules and chip not in ambiguous
+    }
+    found = {}
+    for feature in Feature.objects.filter(
+        module_id__in={module_id for module_id, _ in wanted}, feature_name__in={name for _, name in wanted}
+    ).order_by('is_deleted', '-delete_time').values('id', 'module_id', 'feature_name', 'is_deleted'):
+        found.setdefault((feature['module_id'], feature['feature_name']), feature)
+
+    feature_ids = {}
+    module_deltas = Counter()
+    revive = []
+    to_create = []
+    timestamp = int(time.time() * 1000)
+    max_length = Feature._meta.get_field('feature_name').max_length
+    for key, location in wanted.items():
+        module_id, name = key
+        feature = found.get(key)
+        if feature is None:
+            if len(name) > max_length:
+                errors[location] = f'特性目录名长度不能超过 {max_length}'
+                continue
+            feature = {'id': f'feature-{timestamp}-{uuid.uuid4().hex[:8]}', 'is_deleted': False}
+            to_create.append(Feature(
+                id=feature['id'], feature_name=name, module_id=module_id, creator=SYNC_CREATOR,
+                description='由代码仓同步创建',
+            ))
+            module_deltas[module_id] += 1
+        elif feature['is_deleted']:
+            revive.append(feature['id'])
+            module_deltas[module_id] += 1
+        feature_ids[location] = feature['id']
+    Feature.objects.bulk_create(to_create)
+    if revive:
+        # 恢复的特性下原有用例仍是删除状态，计数从 0 开始随同步的用例增加
+        Feature.objects.filter(pk__in=revive).update(is_deleted=False, delete_time=None, case_count=0, update_time=now)
+    return feature_ids, errors, len(to_create), module_deltas
+
+
+def _paths_with_cases(paths, batch_size):
+    """script_path 在给定路径中的未删除用例"""
+    rows = {}
+    for chunk in _chunks(paths, batch_size):
+        for row in TestCase.alive.filter(script_path__in=chunk).values('id', 'script_path', 'feature_id'):
+            rows[row['id']] = row
+    return rows
+
+
+def apply_changes(repo, commit, changed, removed, root, full=False, tree=None, batch_size=None):
+    """把脚本变化写入数据库，调用方负责事务
+
+    Returns:
+        dict: 新建特性数、删除特性数、新增/更新/删除用例数与按脚本的错误列表
+    """
+    batch_size = int(batch_size or _setting('CASE_IMPORT_BATCH_SIZE', 1000))
+    now = timezone.now()
+    scripts = {path: _locate(path, root) for path in changed}
+    scripts = {path: location for path, location in scripts.items() if location}
+    removed = [path for path in removed if _locate(path, root)]
+    blobs = read_blobs(repo, commit, list(scripts))
+
+    summary = {'features_created': 0, 'features_deleted': 0, 'created': 0, 'updated': 0, 'deleted': 0, 'errors': []}
+    case_deltas = Counter()
+    feature_ids, location_errors, summary['features_created'], module_deltas = _ensure_features(
+        set(scripts.values()), now
+    )
+
+    parsed = {}
+    seen = {}
+    for path, location in sorted(scripts.items()):
+        error = location_errors.get(location[0]) or location_errors.get(location)
+        if error or path not in blobs:
+            summary['errors'].append({'path': path, 'errors': {'feature_id': error or '读取脚本失败'}})
+            continue
+        declared = parse_header(blobs[path])
+        stem = posixpath.splitext(posixpath.basename(path))[0]
+        declared.setdefault('case_id', stem)
+        if declared['case_id'] in seen:
+            summary['errors'].append({'path': path, 'errors': {'case_id': f'与 {seen[declared["case_id"]]} 重复'}})
+            continue
+        seen[declared['case_id']] = path
+        declared.update(feature_id=feature_ids[location], script_path=path)
+        parsed[path] = (stem, declared)
+
+    existing = existing_cases((declared['case_id'] for _, declared in parsed.values()), batch_size)
+    replaced = _paths_with_cases(list(scripts) + removed, batch_size)
+    moving_away = set(removed) | set(scripts)
+    matched = set()
+    to_create = []
+    to_update = []
+    timestamp = int(time.time() * 1000)
+    for path, (stem, declared) in parsed.items():
+        current = existing.get(declared['case_id'])
+        if current and not current['is_deleted'] and current['script_path'] != path \
+                and current['script_path'] not in moving_away:
+            summary['errors'].append({
+                'path': path, 'errors': {'case_id': f'用例ID已被 {current["script_path"] or "手工创建的用例"} 使用'}
+            })
+            continue
+        if current is None:
+            fields = {
+                'case_name': stem, 'pre_condition': DEFAULT_TEXT, 'steps': DEFAULT_TEXT,
+                'expected_result': DEFAULT_TEXT, 'test_type': 'automated',
+            }
+        else:
+            fields = {name: current[name] for name in IMPORT_FIELDS}
+        fields.update(declared)
+        data, row_errors = clean_row(fields)
+        if row_errors:
+            summary['errors'].append({'path': path, 'errors': row_errors})
+            continue
+        if current is None:
+            to_create.append(TestCase(
+                id=f'case-{timestamp}-{uuid.uuid4().hex[:8]}', creator=SYNC_CREATOR, sync_time=now, **data
+            ))
+            case_deltas[data['feature_id']] += 1
+            continue
+        matched.add(current['id'])
+        to_update.append(TestCase(
+            id=current['id'], is_deleted=False, delete_time=None, update_time=now, sync_time=now, **data
+        ))
+        if not current['is_deleted']:
+            case_deltas[current['feature_id']] -= 1
+        case_deltas[data['feature_id']] += 1
+
+    # 脚本已删除，或同一路径改为声明了其他用例ID的旧用例
+    stale = {row_id: row for row_id, row in replaced.items() if row_id not in matched}
+    if full:
+        # 全量同步时，代码仓中已不存在的已同步用例（sync_time 非空）也要删除
+        synced_paths = set(TestCase.alive.filter(
+            sync_time__isnull=False, script_path__startswith=f'{root}/' if root else ''
+        ).values_list('script_path', flat=True))
+        for chunk in _chunks(synced_paths - set(tree), batch_size):
+            stale.update(_paths_with_cases(chunk, batch_size))
+
+    # 目录已不存在的特性，在其用例删除后没有剩余用例时一并删除
+    gone_locations = {_locate(row['script_path'], root) for row in stale.values()} - {None}
+    if full:
+        present = {_locate(path, root) for path in tree}
+        gone_locations -= present
+    elif gone_locations:
+        present_dirs = set(_split_z(_git(repo, 'ls-tree', '-z', '--name-only', commit, '--', *sorted(
+            _feature_dir(root, chip, name) for chip, name in gone_locations
+        ))))
+        gone_locations = {
+            location for location in gone_locations if _feature_dir(root, *location) not in present_dirs
+        }
+
+    TestCase.objects.bulk_create(to_create, batch_size=batch_size)
+    TestCase.objects.bulk_update(
+        to_update, IMPORT_FIELDS + ['is_deleted', 'delete_time', 'update_time', 'sync_time'], batch_size=batch_size
+    )
+    for chunk in _chunks(stale, batch_size):
+        summary['deleted'] += delete_subtree(
+            Feature.objects.none(), TestCase.alive.filter(pk__in=chunk), now
+        )['cases']
+
+    gone_features = {}
+    if gone_locations:
+        modules = dict(Module.alive.filter(
+            chip_model__in={chip for chip, _ in gone_locations}
+        ).values_list('chip_model', 'id'))
+        candidates = Feature.alive.filter(
+            module_id__in=set(modules.values()), feature_name__in={name for _, name in gone_locations}
+        ).exclude(id__in=TestCase.alive.values('feature_id')).values_list('id', 'module_id', 'feature_name')
+        reverse_modules = {module_id: chip for chip, module_id in modules.items()}
+        gone_features = {
+            feature_id: module_id for feature_id, module_id, name in candidates
+            if (reverse_modules.get(module_id), name) in gone_locations
+        }
+        if gone_features:
+            summary['features_deleted'] = delete_subtree(
+                Feature.alive.filter(pk__in=list(gone_features)), TestCase.objects.none(), now
+            )['features']
+    for row in stale.values():
+        if row['feature_id'] not in gone_features:
+            case_deltas[row['feature_id']] -= 1
+    for module_id in gone_features.values():
+        module_deltas[module_id] -= 1
+
+    for feature_id, delta in case_deltas.items():
+        adjust_counter(Feature.alive.filter(id=feature_id), 'case_count', delta)
+    for module_id, delta in module_deltas.items():
+        adjust_counter(Module.alive.filter(id=module_id), 'feature_count', delta)
+
+    summary['created'] = len(to_create)
+    summary['updated'] = len(to_update)
+    return summary
+
+
+def sync_repository(full=False):
+    """把代码仓自上次同步以来的变化同步到特性与用例
+
+    Returns:
+        dict | None: 同步结果；未配置代码仓或已有同步在进行时返回 None
+    """
+    repo = _setting('CASE_REPO_PATH', None)
+    if not repo:
+        return None
+    root = str(_setting('CASE_REPO_ROOT', 'src/dt')).strip('/')
+    if not cache.add(LOCK_CACHE_KEY, 1, timeout=3600):
+        logger.info('代码仓同步正在进行，跳过本轮')
+        return None
+    try:
+        repo = str(repo)
+        if _setting('CASE_REPO_FETCH', False):
+            _git(repo, 'fetch', '--quiet', '--prune')
+        commit = resolve_commit(repo, _setting('CASE_REPO_REF', 'HEAD'))
+        state = get_system_config(SYNC_CONFIG_KEY)
+        previous = state.get('commit') if isinstance(state, dict) else None
+        failed = state.get('failed_paths', []) if isinstance(state, dict) else []
+        if previous == commit and not full and not failed:
+            return {'commit': commit, 'previous': previous, 'full': False, 'changed': 0}
+
+        tree = None
+        if full or not previous or not _commit_exists(repo, previous):
+            full = True
+            tree = _split_z(_git(repo, 'ls-tree', '-r', '-z', '--name-only', commit, '--', root))
+            changed, removed = tree, []
+        else:
+            changed, removed = changed_paths(repo, previous, commit, root)
+            # 上次同步失败的脚本没有变化时也重新处理，已删除的由 removed 处理
+            retry = set(failed) - set(changed) - set(removed)
+            changed += existing_paths(repo, commit, sorted(retry))
+        # 特性、用例、计数与同步进度在同一事务中提交，失败时下一轮从同一提交重新同步
+        with transaction.atomic():
+            summary = apply_changes(repo, commit, changed, removed, root, full=full, tree=tree)
+            summary.update(commit=commit, previous=previous, full=full, changed=len(changed) + len(removed))
+            set_system_config(SYNC_CONFIG_KEY, {
+                'commit': commit,
+                'sync_time': timezone.now().isoformat(),
+                'failed_paths': sorted({error['path'] for error in summary['errors']}),
+                'summary': {key: value for key, value in summary.items() if key != 'errors'},
+            }, description='代码仓同步进度', config_type='json')
+        logger.info(
+            f"代码仓同步完成: {previous or '-'} → {commit}, 新增用例 {summary['created']}, 更新 {summary['updated']}, "
+            f"删除 {summary['deleted']}, 新建特性 {summary['features_created']}, 删除特性 {summary['features_deleted']}, "
+            f"错误 {len(summary['errors'])}"
+        )
+        return summary
+    finally:
+        cache.delete(LOCK_CACHE_KEY)
@@ -1,6 +1,8 @@
 import time
 import random
+from django.db import transaction
 from rest_framework import serializers
+from .counters import adjust_counter
 from .models import Feature, TestCase, FeatureTestCaseRelation
 from module_manager.models import Module
 
@@ -48,16 +50,10 @@ class FeatureSerializer(serializers.ModelSerializer):
         random_num = random.randint(1000, 9999)
         validated_data['id'] = f'feature-{timestamp}-{random_num}'
         
-        # 创建特性
-        feature = super().create(validated_data)
-        
-        # 更新模块的特性计数
-        try:
-            module = Module.objects.get(id=feature.module_id, is_deleted=False)
-            module.feature_count = Feature.objects.filter(module_id=feature.module_id, is_deleted=False).count()
-            module.save()
-        except Module.DoesNotExist:
-            pass
+        # 创建特性并原子地增加模块的特性计数
+        with transaction.atomic():
+            feature = super().create(validated_data)
+            adjust_counter(Module.alive.filter(id=feature.module_id), 'feature_count', 1)
         
         return feature
         
@@ -66,26 +62,14 @@ class FeatureSerializer(serializers.ModelSerializer):
         old_module_id = instance.module_id
         new_module_id = validated_data.get('module_id', old_module_id)
         
-        # 更新特性
-        feature = super().update(instance, validated_data)
-        
-        # 如果模块ID发生变化，更新旧模块和新模块的特性计数
-        if old_module_id != new_module_id:
-            # 更新旧模块
-            try:
-                old_module = Module.objects.get(id=old_module_id, is_deleted=False)
-                old_module.feature_count = Feature.objects.filter(module_id=old_module_id, is_deleted=False).count()
-                old_module.save()
-            except Module.DoesNotExist:
-                pass
+        with transaction.atomic():
+            # 更新特性
+            feature = super().update(instance, validated_data)
             
-            # 更新新模块
-            try:
-                new_module = Module.objects.get(id=new_module_id, is_deleted=False)
-                new_module.feature_count = Feature.objects.filter(module_id=new_module_id, is_deleted=False).count()
-                new_module.save()
-            except Module.DoesNotExist:
-                pass
+            # 如果模块ID发生变化，旧模块计数减一、新模块计数加一
+            if old_module_id != new_module_id:
+                adjust_counter(Module.alive.filter(id=old_module_id), 'feature_count', -1)
+                adjust_counter(Module.alive.filter(id=new_module_id), 'feature_count', 1)
         
         return feature
 
@@ -146,16 +130,10 @@ class TestCaseSerializer(serializers.ModelSerializer):
         # 这里只是临时解决方案，确保测试能够运行
         validated_data['case_id'] = f'TC-{timestamp}-{random_num}'
         
-        # 创建测试用例
-        test_case = super().create(validated_data)
-        
-        # 更新特性的用例计数
-        try:
-            feature = Feature.objects.get(id=test_case.feature_id, is_deleted=False)
-            feature.case_count = TestCase.objects.filter(feature_id=test_case.feature_id, is_deleted=False).count()
-            feature.save()
-        except Feature.DoesNotExist:
-            pass
+        # 创建测试用例并原子地增加特性的用例计数
+        with transaction.atomic():
+            test_case = super().create(validated_data)
+            adjust_counter(Feature.alive.filter(id=test_case.feature_id), 'case_count', 1)
         
         return test_case
         
@@ -164,26 +142,14 @@ class TestCaseSerializer(serializers.ModelSerializer):
         old_feature_id = instance.feature_id
         new_feature_id = validated_data.get('feature_id', old_feature_id)
         
-        # 更新测试用例
-        test_case = super().update(instance, validated_data)
-        
-        # 如果特性ID发生变化，更新旧特性和新特性的用例计数
-        if old_feature_id != new_feature_id:
-            # 更新旧特性
-            try:
-                old_feature = Feature.objects.get(id=old_feature_id, is_deleted=False)
-                old_feature.case_count = TestCase.objects.filter(feature_id=old_feature_id, is_deleted=False).count()
-                old_feature.save()
-            except Feature.DoesNotExist:
-                pass
+        with transaction.atomic():
+            # 更新测试用例
+            test_case = super().update(instance, validated_data)
             
-            # 更新新特性
-            try:
-                new_feature = Feature.objects.get(id=new_feature_id, is_deleted=False)
-                new_feature.case_count = TestCase.objects.filter(feature_id=new_feature_id, is_deleted=False).count()
-                new_feature.save()
-            except Feature.DoesNotExist:
-                pass
+            # 如果特性ID发生变化，旧特性计数减一、新特性计数加一
+            if old_feature_id != new_feature_id:
+                adjust_counter(Feature.alive.filter(id=old_feature_id), 'case_count', -1)
+                adjust_counter(Feature.alive.filter(id=new_feature_id), 'case_count', 1)
         
         return test_case
 
@@ -247,18 +213,8 @@ class FeatureTestCaseRelationSerializer(serializers.ModelSerializer):
             # 设置creator为当前登录用户的用户名
             validated_data['creator'] = request.user.username
         
-        # 创建关联关系
-        relation = super().create(validated_data)
-        
-        # 更新特性的用例计数
-        try:
-            feature = Feature.objects.get(id=relation.feature_id, is_deleted=False)
-            feature.case_count = TestCase.objects.filter(feature_id=relation.feature_id, is_deleted=False).count()
-            feature.save()
-        except Feature.DoesNotExist:
-            pass
-        
-        return relation
+        # 创建关联关系（用例计数按用例的 feature_id 统计，关联关系不影响计数）
+        return super().create(validated_data)
 
     def update(self, instance, validated_data):
         """更新关联关系"""
@@ -1,13 +1,27 @@
 from django.test import TestCase
 
 from django.test import TestCase
+from django.test import TestCase as DjangoTestCase
+from django.test import override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from rest_framework.test import APIClient
 from django.urls import reverse
 from rest_framework import status
 from module_manager.models import Module
-from .models import Feature, TestCase
+from .models import Feature, TestCase, FeatureTestCaseRelation
+from .cascade import delete_case, delete_feature, delete_module
+from .counters import reconcile_counters
+from .importer import import_cases, read_rows
+from .repo_sync import SYNC_CONFIG_KEY, sync_repository
+from .tree import MODULE_FIELDS, build_tree
+from common.utils import get_system_config
 from django.contrib.auth.models import User
+import io
+import os
 import json
+import tempfile
+import subprocess
 
 class FeatureTestCase(TestCase):
     """特性管理API测试"""
@@ -290,3 +304,407 @@ class TestCaseTestCase(TestCase):
         # 检查特性的用例计数是否更新
         feature = Feature.objects.get(id=self.feature.id)
         self.assertEqual(feature.case_count, 0)
+
+
+class CascadeSoftDeleteTestCase(DjangoTestCase):
+    """模块 → 特性 → 用例级联软删除与恢复的测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cascadeuser', password='testpassword')
+        self.client = APIClient()
+        self.client.login(username='cascadeuser', password='testpassword')
+        self.module = Module.objects.create(
+            id='module-cascade', module_name='级联模块', chip_model='Chip-A-1.0', creator='cascadeuser', feature_count=2
+        )
+        for feature_index in range(2):
+            Feature.objects.create(
+                id=f'feature-cascade-{feature_index}', feature_name=f'特性{feature_index}', module_id=self.module.id,
+                creator='cascadeuser', case_count=5
+            )
+            for case_index in range(5):
+                TestCase.objects.create(
+                    id=f'case-cascade-{feature_index}-{case_index}', case_id=f'TC-CASCADE-{feature_index}-{case_index}',
+                    case_name='级联用例', feature_id=f'feature-cascade-{feature_index}',
+                    pre_condition='-', steps='-', expected_result='-', creator='cascadeuser'
+                )
+        FeatureTestCaseRelation.objects.create(
+            id='relation-cascade', feature_id='feature-cascade-1', test_case_id='case-cascade-0-0', creator='cascadeuser'
+        )
+
+    def test_delete_module_cascades(self):
+        """删除模块时特性、用例、关联关系使用同一删除时间，计数不变"""
+        with self.assertNumQueries(6):
+            summary = delete_module(self.module)
+        self.assertEqual(summary, {'features': 2, 'cases': 10})
+        self.assertFalse(Feature.alive.exists())
+        self.assertFalse(TestCase.alive.exists())
+        self.assertFalse(FeatureTestCaseRelation.alive.exists())
+        stamps = set(TestCase.objects.values_list('delete_time', flat=True))
+        self.assertEqual(stamps, {Module.objects.get(id=self.module.id).delete_time})
+        self.assertEqual(Module.objects.get(id=self.module.id).feature_count, 2)
+
+    def test_restore_module_keeps_earlier_deletions(self):
+        """恢复模块只恢复随模块一起删除的记录"""
+        delete_case(TestCase.objects.get(id='case-cascade-0-0'))
+        self.assertEqual(Feature.objects.get(id='feature-cascade-0').case_count, 4)
+        delete_module(self.module)
+
+        response = self.client.post(reverse('module-restore', args=[self.module.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['restored_features'], 2)
+        self.assertEqual(response.data['restored_cases'], 9)
+        self.assertTrue(TestCase.objects.get(id='case-cascade-0-0').is_deleted)
+        self.assertEqual(TestCase.alive.count(), 9)
+        self.assertEqual(Feature.objects.get(id='feature-cascade-0').case_count, 4)
+        self.assertFalse(FeatureTestCaseRelation.alive.exists())
+
+    def test_delete_and_restore_feature(self):
+        """删除、恢复特性时模块计数按变化量增减"""
+        response = self.client.delete(reverse('feature-detail', args=['feature-cascade-1']))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Module.objects.get(id=self.module.id).feature_count, 1)
+        self.assertEqual(TestCase.alive.filter(feature_id='feature-cascade-1').count(), 0)
+        self.assertFalse(FeatureTestCaseRelation.alive.exists())
+
+        response = self.client.post(reverse('testcase-restore', args=['case-cascade-1-0']))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(reverse('feature-restore', args=['feature-cascade-1']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['restored_cases'], 5)
+        self.assertEqual(Module.objects.get(id=self.module.id).feature_count, 2)
+        self.assertTrue(FeatureTestCaseRelation.alive.exists())
+
+        # 未删除的记录不能恢复
+        response = self.client.post(reverse('feature-restore', args=['feature-cascade-1']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_feature_restore_requires_module(self):
+        """所属模块已删除时不能单独恢复特性"""
+        delete_feature(Feature.objects.get(id='feature-cascade-0'))
+        delete_module(self.module)
+        response = self.client.post(reverse('feature-restore', args=['feature-cascade-0']))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Feature.objects.get(id='feature-cascade-0').is_deleted)
+
+
+class CounterMaintenanceTestCase(DjangoTestCase):
+    """冗余计数字段增量维护与校正的测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='counteruser', password='testpassword')
+        self.client = APIClient()
+        self.client.login(username='counteruser', password='testpassword')
+        for index in range(2):
+            Module.objects.create(
+                id=f'module-counter-{index}', module_name=f'计数模块{index}', chip_model='Chip-A-1.0', creator='counteruser'
+            )
+
+    def test_delta_updates(self):
+        """创建、移动特性与用例时计数按变化量增减"""
+        response = self.client.post(reverse('feature-list'), {
+            'feature_name': '计数特性', 'module_id': 'module-counter-0', 'case_count': 0
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        feature_id = response.data['id']
+        self.assertEqual(Module.objects.get(id='module-counter-0').feature_count, 1)
+
+        response = self.client.post(reverse('testcase-list'), {
+            'case_id': 'TC-COUNTER', 'case_name': '计数用例', 'feature_id': feature_id, 'pre_condition': '-',
+            'steps': '-', 'expected_result': '-', 'script_path': '/cases/counter.py', 'status': 'active',
+            'creator': 'counteruser'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Feature.objects.get(id=feature_id).case_count, 1)
+
+        response = self.client.patch(
+            reverse('feature-detail', args=[feature_id]), {'module_id': 'module-counter-1'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Module.objects.get(id='module-counter-0').feature_count, 0)
+        self.assertEqual(Module.objects.get(id='module-counter-1').feature_count, 1)
+
+    def test_reconcile_repairs_drift(self):
+        """校正任务分批修正与实际不一致的计数"""
+        for index in range(3):
+            Feature.objects.create(
+                id=f'feature-counter-{index}', feature_name='特性', module_id='module-counter-0', creator='counteruser'
+            )
+        TestCase.objects.create(
+            id='case-counter-0', case_id='TC-COUNTER-0', case_name='用例', feature_id='feature-counter-0',
+            pre_condition='-', steps='-', expected_result='-', creator='counteruser'
+        )
+        Feature.objects.filter(id='feature-counter-2').update(case_count=7)
+        Module.objects.filter(id='module-counter-1').update(feature_count=2)
+
+        summary = reconcile_counters(batch_size=2)
+        self.assertEqual(summary, {'module_manager.Module.feature_count': 2, 'feature_testcase.Feature.case_count': 2})
+        self.assertEqual(
+            dict(Feature.objects.values_list('id', 'case_count')),
+            {'feature-counter-0': 1, 'feature-counter-1': 0, 'feature-counter-2': 0}
+        )
+        self.assertEqual(
+            dict(Module.objects.values_list('id', 'feature_count')), {'module-counter-0': 3, 'module-counter-1': 0}
+        )
+        self.assertEqual(reconcile_counters(), {'module_manager.Module.feature_count': 0, 'feature_testcase.Feature.case_count': 0})
+
+
+class CaseImportTestCase(DjangoTestCase):
+    """测试用例批量导入的测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importuser', password='testpassword')
+        self.client = APIClient()
+        self.client.login(username='importuser', password='testpassword')
+        Module.objects.create(id='module-import', module_name='导入模块', chip_model='Chip-A-1.0', creator='importuser')
+        Feature.objects.create(id='feature-import', feature_name='导入特性', module_id='module-import', creator='importuser')
+        Feature.objects.create(id='feature-other', feature_name='其他特性', module_id='module-import', creator='importuser')
+        TestCase.objects.create(
+            id='case-existing', case_id='TC-EXIST', case_name='已有用例', feature_id='feature-other',
+            pre_condition='-', steps='-', expected_result='-', script_path='/cases/exist.py', creator='importuser'
+        )
+        Feature.objects.filter(id='feature-other').update(case_count=1)
+
+    def _csv(self, count, extra=''):
+        lines = ['用例ID,用例名称,所属特性ID,前置条件,执行步骤,预期结果,优先级']
+        lines += [f'TC-IMP-{index},导入用例{index},feature-import,-,-,-,10' for index in range(count)]
+        return ('\n'.join(lines) + extra).encode('utf-8-sig')
+
+    def test_bulk_import_query_count(self):
+        """查询与写入次数与行数无关，计数每个特性更新一次"""
+        rows = read_rows(self._csv(40), 'csv')
+        with self.assertNumQueries(6):
+            summary = import_cases(rows, creator='importuser', batch_size=1000)
+        self.assertEqual(summary['created'], 40)
+        self.assertEqual(summary['errors'], [])
+        self.assertEqual(Feature.objects.get(id='feature-import').case_count, 40)
+        case = TestCase.objects.get(case_id='TC-IMP-0')
+        self.assertEqual((case.priority, case.creator, case.script_path), (10, 'importuser', ''))
+
+    def test_row_errors(self):
+        """错误按行返回，其余行正常导入"""
+        extra = '\nTC-IMP-0,重复,feature-import,-,-,-,10\nTC-EXIST,已有,feature-import,-,-,-,10' \
+                '\nTC-BAD,缺特性,feature-missing,-,-,-,101\n,无ID,feature-import,-,-,-,1'
+        upload = SimpleUploadedFile('cases.csv', self._csv(2, extra), content_type='text/csv')
+        response = self.client.post(reverse('testcase-import-cases'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(errors[3], {'case_id': '与第 1 行重复'})
+        self.assertEqual(errors[4], {'case_id': '用例ID已存在'})
+        self.assertEqual(errors[5], {'priority': '应在 1-100 之间'})
+        self.assertEqual(errors[6], {'case_id': '不能为空'})
+
+    def test_upsert_moves_and_keeps_fields(self):
+        """upsert 更新已有用例，未提供的字段保留原值，两个特性的计数按变化量调整"""
+        response = self.client.post(reverse('testcase-import-cases'), {
+            'mode': 'upsert',
+            'cases': [{
+                'case_id': 'TC-EXIST', 'case_name': '改名', 'feature_id': 'feature-import',
+                'pre_condition': '-', 'steps': '-', 'expected_result': '-'
+            }],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 1)
+        case = TestCase.objects.get(case_id='TC-EXIST')
+        self.assertEqual((case.case_name, case.feature_id, case.script_path), ('改名', 'feature-import', '/cases/exist.py'))
+        self.assertEqual(Feature.objects.get(id='feature-import').case_count, 1)
+        self.assertEqual(Feature.objects.get(id='feature-other').case_count, 0)
+
+    def test_management_command_dry_run(self):
+        """管理命令 --dry-run 只校验不写入"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cases.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'cases': [{
+                    'case_id': 'TC-JSON', 'case_name': 'JSON 用例', 'feature_id': 'feature-import',
+                    'pre_condition': '-', 'steps': '-', 'expected_result': '-', 'test_type': 'automated'
+                }]}, f)
+            out = io.StringIO()
+            call_command('import_test_cases', path, '--dry-run', stdout=out)
+            self.assertIn('新增 1 条', out.getvalue())
+            self.assertFalse(TestCase.objects.filter(case_id='TC-JSON').exists())
+            call_command('import_test_cases', path, stdout=io.StringIO())
+            self.assertTrue(TestCase.objects.filter(case_id='TC-JSON', test_type='automated').exists())
+
+
+class RepoSyncTestCase(DjangoTestCase):
+    """代码仓增量同步的测试"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = self.tmpdir.name
+        self._git('init', '-q')
+        self.settings_override = override_settings(CASE_REPO_PATH=self.repo, CASE_REPO_ROOT='src/dt')
+        self.settings_override.enable()
+        self.module = Module.objects.create(
+            id='module-sync', module_name='同步模块', chip_model='Chip-S', creator='syncuser'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+    def _git(self, *args):
+        subprocess.run(
+            ['git', '-C', self.repo, '-c', 'user.name=sync', '-c', 'user.email=sync@example.com', *args],
+            check=True, capture_output=True
+        )
+
+    def _write(self, path, content=''):
+        full_path = os.path.join(self.repo, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _commit(self):
+        self._git('add', '-A')
+        self._git('commit', '-q', '-m', 'update')
+
+    def _feature(self, name):
+        return Feature.objects.get(module_id=self.module.id, feature_name=name)
+
+    def test_full_then_incremental_sync(self):
+        """首次全量同步，之后只处理变化的脚本"""
+        self._write('src/dt/Chip-S/usb/test_enum.py', '# case_id: TC-USB-1\n# 用例名称: USB 枚举\n# priority: 10\n')
+        self._write('src/dt/Chip-S/usb/test_speed.sh', 'echo speed\n')
+        self._write('src/dt/Chip-S/pcie/test_link.py', '')
+        self._write('src/dt/Chip-S/i2c/test_bus.py', '')
+        self._write('src/dt/Chip-S/usb/README.md', '说明')
+        self._write('src/dt/Chip-X/spi/test_spi.py', '')
+        self._commit()
+
+        summary = sync_repository()
+        self.assertTrue(summary['full'])
+        self.assertEqual((summary['features_created'], summary['created']), (3, 4))
+        self.assertEqual([error['path'] for error in summary['errors']], ['src/dt/Chip-X/spi/test_spi.py'])
+        case = TestCase.objects.get(case_id='TC-USB-1')
+        self.assertEqual((case.case_name, case.priority, case.test_type), ('USB 枚举', 10, 'automated'))
+        self.assertEqual(case.script_path, 'src/dt/Chip-S/usb/test_enum.py')
+        self.assertIsNotNone(case.sync_time)
+        self.assertEqual(self._feature('usb').case_count, 2)
+        self.assertEqual(Module.objects.get(id=self.module.id).feature_count, 3)
+
+        self._write('src/dt/Chip-S/usb/test_enum.py', '# case_id: TC-USB-1\n# 用例名称: USB 重新枚举\n')
+        self._git('mv', 'src/dt/Chip-S/usb/test_speed.sh', 'src/dt/Chip-S/pcie/test_speed.sh')
+        self._git('rm', '-q', 'src/dt/Chip-S/pcie/test_link.py', 'src/dt/Chip-S/i2c/test_bus.py')
+        self._write('src/dt/Chip-S/usb/test_new.py', '')
+        self._commit()
+
+        summary = sync_repository()
+        self.assertFalse(summary['full'])
+        # 上次同步失败的 Chip-X 脚本也重新处理
+        self.assertEqual(summary['changed'], 7)
+        self.assertEqual([error['path'] for error in summary['errors']], ['src/dt/Chip-X/spi/test_spi.py'])
+        self.assertEqual(
+            (summary['created'], summary['updated'], summary['deleted'], summary['features_deleted']), (1, 2, 2, 1)
+        )
+        self.assertEqual(TestCase.objects.get(case_id='TC-USB-1').case_name, 'USB 重新枚举')
+        moved = TestCase.objects.get(case_id='test_speed')
+        self.assertEqual((moved.feature_id, moved.script_path), (self._feature('pcie').id, 'src/dt/Chip-S/pcie/test_speed.sh'))
+        self.assertTrue(TestCase.objects.get(case_id='test_link').is_deleted)
+        self.assertTrue(self._feature('i2c').is_deleted)
+        self.assertEqual(self._feature('usb').case_count, 2)
+        self.assertEqual(self._feature('pcie').case_count, 1)
+        self.assertEqual(Module.objects.get(id=self.module.id).feature_count, 2)
+
+        head = subprocess.run(['git', '-C', self.repo, 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+        self.assertEqual(get_system_config(SYNC_CONFIG_KEY)['commit'], head)
+        self.assertEqual(get_system_config(SYNC_CONFIG_KEY)['failed_paths'], ['src/dt/Chip-X/spi/test_spi.py'])
+        self.assertEqual(sync_repository()['changed'], 1)
+
+        self._git('rm', '-q', 'src/dt/Chip-X/spi/test_spi.py')
+        self._commit()
+        self.assertEqual(sync_repository()['errors'], [])
+        self.assertEqual(get_system_config(SYNC_CONFIG_KEY)['failed_paths'], [])
+        self.assertEqual(sync_repository()['changed'], 0)
+
+    def test_failed_scripts_retried(self):
+        """同步失败的脚本没有变化时，下一轮增量同步也重新处理"""
+        self._write('src/dt/Chip-S/usb/test_enum.py', '')
+        self._write('src/dt/Chip-Y/spi/test_spi.py', '# case_id: TC-SPI-1\n')
+        self._commit()
+        summary = sync_repository()
+        self.assertEqual([error['path'] for error in summary['errors']], ['src/dt/Chip-Y/spi/test_spi.py'])
+        self.assertFalse(TestCase.objects.filter(case_id='TC-SPI-1').exists())
+
+        Module.objects.create(id='module-sync-y', module_name='同步模块Y', chip_model='Chip-Y', creator='syncuser')
+        self._write('src/dt/Chip-S/usb/test_enum.py', 'changed')
+        self._commit()
+        summary = sync_repository()
+        self.assertFalse(summary['full'])
+        self.assertEqual((summary['changed'], summary['created'], summary['errors']), (2, 1, []))
+        case = TestCase.objects.get(case_id='TC-SPI-1')
+        self.assertEqual(case.feature_id, Feature.objects.get(module_id='module-sync-y', feature_name='spi').id)
+
+    @override_settings(CASE_REPO_PATH='')
+    def test_disabled_without_repo(self):
+        """未配置代码仓时不同步"""
+        self.assertIsNone(sync_repository())
+
+
+class ModuleTreeTestCase(DjangoTestCase):
+    """模块 → 特性 → 用例树的测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='treeuser', password='testpassword')
+        self.client = APIClient()
+        self.client.login(username='treeuser', password='testpassword')
+        for module_index in range(2):
+            module_id = f'module-tree-{module_index}'
+            Module.objects.create(
+                id=module_id, module_name=f'树模块{module_index}', chip_model='Chip-T', creator='treeuser', feature_count=3
+            )
+            for feature_index in range(3):
+                feature_id = f'feature-tree-{module_index}-{feature_index}'
+                Feature.objects.create(
+                    id=feature_id, feature_name=f'特性{feature_index}', module_id=module_id, creator='treeuser', case_count=4
+                )
+                for case_index in range(4):
+                    TestCase.objects.create(
+                        id=f'case-tree-{module_index}-{feature_index}-{case_index}',
+                        case_id=f'TC-TREE-{module_index}-{feature_index}-{case_index}', case_name='树用例',
+                        feature_id=feature_id, pre_condition='-', steps='-', expected_result='-', creator='treeuser'
+                    )
+
+    def test_build_tree_constant_queries(self):
+        """整棵树按层各一条查询，与特性、用例数量无关"""
+        modules = list(Module.alive.values(*MODULE_FIELDS))
+        with self.assertNumQueries(2):
+            tree = build_tree(modules, 2)
+        self.assertEqual(len(tree), 2)
+        self.assertEqual([len(module['features']) for module in tree], [3, 3])
+        self.assertEqual(
+            [case['case_id'] for case in tree[0]['features'][0]['cases']],
+            [f'TC-TREE-{tree[0]["id"][-1]}-0-{index}' for index in range(4)]
+        )
+        with self.assertNumQueries(1):
+            tree = build_tree(modules, 1)
+        self.assertNotIn('cases', tree[0]['features'][0])
+        with self.assertNumQueries(0):
+            self.assertNotIn('features', build_tree(modules, 0)[0])
+
+    def test_tree_etag(self):
+        """ETag 未变化时返回 304，修改或删除用例后重新返回整棵树"""
+        url = reverse('module-tree', args=['module-tree-0'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data[0]['features']), 3)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        # 不同深度的 ETag 不同
+        self.assertNotEqual(self.client.get(url, {'depth': 1})['ETag'], etag)
+
+        delete_case(TestCase.objects.get(id='case-tree-0-0-0'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data[0]['features'][0]['cases']), 3)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.get(reverse('module-full-tree'), {'depth': 1})
+        self.assertEqual([len(module['features']) for module in response.data], [3, 3])
+        self.assertEqual(self.client.get(url, {'depth': 3}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('module-tree', args=['module-missing'])).status_code, 404)
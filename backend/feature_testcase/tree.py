@@ -0,0 +1,88 @@
+"""模块 → 特性 → 用例树
+
+特性、用例通过 module_id / feature_id 字符串关联上级，前端原来按上级逐个请求列表。这里按层各用一条
+查询取出整棵子树（模块、特性、用例），在内存中按上级ID分组组装，查询次数与模块、特性数量无关。
+
+depth 控制展开的层数：0 只返回模块，1 展开到特性，2 展开到用例；前端可以先取浅层，展开时再取深层。
+
+ETag 由各层的记录数与最新的 update_time（以及计数字段）计算，只需要两条聚合查询；与请求中的
+If-None-Match 一致时不再加载特性与用例，直接返回 304。软删除、恢复、导入与同步都会更新
+update_time 或改变存活记录数，ETag 随之变化。
+"""
+import hashlib
+
+from django.db.models import Count, Max, Sum
+
+from feature_testcase.models import Feature, TestCase
+
+MAX_DEPTH = 2
+MODULE_FIELDS = ['id', 'module_name', 'chip_model', 'description', 'feature_count', 'update_time']
+FEATURE_FIELDS = ['id', 'feature_name', 'module_id', 'description', 'case_count', 'update_time']
+CASE_FIELDS = ['id', 'case_id', 'case_name', 'feature_id', 'status', 'priority', 'test_type', 'script_path', 'update_time']
+
+
+def parse_depth(value):
+    """解析 depth 参数，缺省时展开到用例
+
+    Raises:
+        ValueError: 不是 0-2 之间的整数
+    """
+    if value in (None, ''):
+        return MAX_DEPTH
+    depth = int(value)
+    if not 0 <= depth <= MAX_DEPTH:
+        raise ValueError(depth)
+    return depth
+
+
+def _features(module_ids):
+    return Feature.alive.filter(module_id__in=module_ids)
+
+
+def _cases(module_ids):
+    return TestCase.alive.filter(feature_id__in=_features(module_ids).values('id'))
+
+
+def tree_etag(modules, depth):
+    """根据各层的记录数与最新更新时间计算 ETag
+
+    Args:
+        modules: 已加载的模块记录（values() 的结果，包含 MODULE_FIELDS）
+    """
+    module_ids = [module['id'] for module in modules]
+    parts = [str(depth)] + [f"{module['id']}:{module['update_time']}:{module['feature_count']}" for module in modules]
+    if depth >= 1:
+        parts.append(str(_features(module_ids).aggregate(
+            total=Count('id'), latest=Max('update_time'), cases=Sum('case_count')
+        )))
+    if depth >= 2:
+        parts.append(str(_cases(module_ids).aggregate(total=Count('id'), latest=Max('update_time'))))
+    return '"%s"' % hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def build_tree(modules, depth):
+    """组装模块树
+
+    Args:
+        modules: 已加载的模块记录（values() 的结果，包含 MODULE_FIELDS）
+
+    Returns:
+        list: 模块列表，depth >= 1 时每个模块带 features，depth >= 2 时每个特性带 cases
+    """
+    tree = [dict(module) for module in modules]
+    if depth < 1:
+        return tree
+    module_ids = [module['id'] for module in tree]
+    features = {}
+    children = {module['id']: [] for module in tree}
+    for feature in _features(module_ids).order_by('feature_name', 'id').values(*FEATURE_FIELDS):
+        if depth >= 2:
+            feature['cases'] = []
+        features[feature['id']] = feature
+        children[feature['module_id']].append(feature)
+    if depth >= 2:
+        for case in _cases(module_ids).order_by('case_id').values(*CASE_FIELDS):
+            features[case['feature_id']]['cases'].append(case)
+    for module in tree:
+        module['features'] = children[module['id']]
+    return tree
@@ -1,14 +1,19 @@
+import json
+
 from django.shortcuts import render
 
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .cascade import CascadeError, delete_case, delete_feature, restore_case, restore_feature
+from .importer import CaseImportError, detect_format, import_cases, read_rows
 from .models import Feature, TestCase, FeatureTestCaseRelation
 from .serializers import FeatureSerializer, TestCaseSerializer, FeatureTestCaseRelationSerializer
 from common.permissions import IsAdminOrOwner
-from module_manager.models import Module
 
 class FeatureViewSet(viewsets.ModelViewSet):
     """特性信息视图集，提供标准的CRUD操作"""
-    queryset = Feature.objects.filter(is_deleted=False)
+    queryset = Feature.alive.all()
     serializer_class = FeatureSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrOwner]
     
@@ -17,11 +22,10 @@ class FeatureViewSet(viewsets.ModelViewSet):
         # 获取查询参数
         module_id = self.request.query_params.get('module_id', None)
         
-        # 基础查询集
-        if self.request.user.is_staff:
-            queryset = Feature.objects.filter(is_deleted=False)
-        else:
-            queryset = Feature.objects.filter(creator=self.request.user.username, is_deleted=False)
+        # 基础查询集，恢复操作在已删除的特性中查找
+        queryset = Feature.objects.dead() if self.action == 'restore' else Feature.alive.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(creator=self.request.user.username)
         
         # 根据模块ID过滤
         if module_id:
@@ -43,24 +47,25 @@ class FeatureViewSet(viewsets.ModelViewSet):
         serializer.save()
         
     def perform_destroy(self, instance):
-        """软删除特性，并更新对应模块的特性计数"""
-        # 记录模块ID
-        module_id = instance.module_id
-        
-        # 软删除特性
-        instance.soft_delete()
-        
-        # 更新模块的特性计数
+        """软删除特性及其下的用例，并更新对应模块的特性计数"""
+        delete_feature(instance)
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """恢复已删除的特性，以及随特性一起删除的用例"""
+        feature = self.get_object()
         try:
-            module = Module.objects.get(id=module_id, is_deleted=False)
-            module.feature_count = Feature.objects.filter(module_id=module_id, is_deleted=False).count()
-            module.save()
-        except Module.DoesNotExist:
-            pass
+            restored = restore_feature(feature)
+        except CascadeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'message': f'特性 {feature.feature_name} 已恢复',
+            'restored_cases': restored['cases'],
+        }, status=status.HTTP_200_OK)
 
 class TestCaseViewSet(viewsets.ModelViewSet):
     """测试用例视图集，提供标准的CRUD操作"""
-    queryset = TestCase.objects.filter(is_deleted=False)
+    queryset = TestCase.alive.all()
     serializer_class = TestCaseSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -70,8 +75,8 @@ class TestCaseViewSet(viewsets.ModelViewSet):
         feature_id = self.request.query_params.get('feature_id', None)
         status = self.request.query_params.get('status', None)
         
-        # 基础查询集
-        queryset = TestCase.objects.filter(is_deleted=False)
+        # 基础查询集，恢复操作在已删除的用例中查找
+        queryset = TestCase.objects.dead() if self.action == 'restore' else TestCase.alive.all()
         
         # 根据特性ID过滤
         if feature_id:
@@ -95,23 +100,48 @@ class TestCaseViewSet(viewsets.ModelViewSet):
         
     def perform_destroy(self, instance):
         """软删除测试用例，并更新对应特性的用例计数"""
-        # 记录特性ID
-        feature_id = instance.feature_id
-        
-        # 软删除测试用例
-        instance.soft_delete()
-        
-        # 更新特性的用例计数
+        delete_case(instance)
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """恢复已删除的测试用例"""
+        test_case = self.get_object()
         try:
-            feature = Feature.objects.get(id=feature_id, is_deleted=False)
-            feature.case_count = TestCase.objects.filter(feature_id=feature_id, is_deleted=False).count()
-            feature.save()
-        except Feature.DoesNotExist:
-            pass
+            restore_case(test_case)
+        except CascadeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': f'测试用例 {test_case.case_name} 已恢复'}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_cases(self, request):
+        """批量导入测试用例
+
+        请求参数:
+            file: CSV/JSON/xlsx 文件（multipart 上传），或在 JSON 请求体中直接传 cases 数组
+            mode: create（默认，已存在的用例ID报错）/ upsert（已存在时更新）
+            dry_run: 为 true 时只校验不写入
+        """
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                rows = read_rows(upload.read(), request.data.get('format') or detect_format(upload.name))
+            elif isinstance(request.data.get('cases'), list):
+                rows = read_rows(json.dumps(request.data['cases']), 'json')
+            else:
+                return Response({'error': '请上传用例文件或提供 cases 数组'}, status=status.HTTP_400_BAD_REQUEST)
+            summary = import_cases(
+                rows,
+                creator=request.user.username,
+                mode=request.data.get('mode') or 'create',
+                dry_run=str(request.data.get('dry_run', '')).lower() == 'true',
+            )
+        except CaseImportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_200_OK)
 
 class FeatureTestCaseRelationViewSet(viewsets.ModelViewSet):
     """特性-测试用例关联视图集，提供标准的CRUD操作"""
-    queryset = FeatureTestCaseRelation.objects.filter(is_deleted=False)
+    queryset = FeatureTestCaseRelation.alive.all()
     serializer_class = FeatureTestCaseRelationSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrOwner]
     
@@ -124,9 +154,9 @@ class FeatureTestCaseRelationViewSet(viewsets.ModelViewSet):
         
         # 基础查询集
         if self.request.user.is_staff:
-            queryset = FeatureTestCaseRelation.objects.filter(is_deleted=False)
+            queryset = FeatureTestCaseRelation.alive.all()
         else:
-            queryset = FeatureTestCaseRelation.objects.filter(creator=self.request.user.username, is_deleted=False)
+            queryset = FeatureTestCaseRelation.alive.filter(creator=self.request.user.username)
         
         # 根据特性ID过滤
         if feature_id:
@@ -156,17 +186,5 @@ class FeatureTestCaseRelationViewSet(viewsets.ModelViewSet):
         serializer.save()
         
     def perform_destroy(self, instance):
-        """软删除关联关系，并更新对应特性的用例计数"""
-        # 记录特性ID
-        feature_id = instance.feature_id
-        
-        # 软删除关联关系
+        """软删除关联关系（用例计数按用例的 feature_id 统计，关联关系不影响计数）"""
         instance.soft_delete()
-        
-        # 更新特性的用例计数
-        try:
-            feature = Feature.objects.get(id=feature_id, is_deleted=False)
-            feature.case_count = TestCase.objects.filter(feature_id=feature_id, is_deleted=False).count()
-            feature.save()
-        except Feature.DoesNotExist:
-            pass
@@ -23,6 +23,9 @@ class Module(BaseModel):
         indexes = [
             models.Index(fields=['creator'], name='module_idx_creator'),
             models.Index(fields=['chip_model'], name='idx_chip'),
+            # 部分索引：列表查询只扫描未删除的记录，清理任务只扫描已删除的记录（MySQL 不支持，迁移时跳过）
+            models.Index(fields=['-create_time'], name='module_live_idx_ctime', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['delete_time'], name='module_dead_idx_dtime', condition=models.Q(is_deleted=True)),
         ]
 
     def __str__(self):
@@ -1,23 +1,31 @@
 from django.shortcuts import render
 
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import Module
 from .serializers import ModuleSerializer
 from common.permissions import IsAdminOrOwner
+from feature_testcase.cascade import delete_module, restore_module
+from feature_testcase.tree import MODULE_FIELDS, build_tree, parse_depth, tree_etag
+from django.http import Http404
+from django.utils.cache import get_conditional_response
 
 class ModuleViewSet(viewsets.ModelViewSet):
     """模块信息视图集，提供标准的CRUD操作"""
-    queryset = Module.objects.filter(is_deleted=False)
+    queryset = Module.alive.all()
     serializer_class = ModuleSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrOwner]
     
     def get_queryset(self):
         """根据用户权限返回模块列表"""
+        # 恢复操作在已删除的模块中查找
+        queryset = Module.objects.dead() if self.action == 'restore' else Module.alive.all()
         # 管理员可以查看所有模块
         if self.request.user.is_staff:
-            return Module.objects.filter(is_deleted=False)
+            return queryset
         # 普通用户只能查看自己创建的模块
-        return Module.objects.filter(creator=self.request.user.username, is_deleted=False)
+        return queryset.filter(creator=self.request.user.username)
     
     def perform_create(self, serializer):
         """创建模块时自动设置创建者信息"""
@@ -33,5 +41,45 @@ class ModuleViewSet(viewsets.ModelViewSet):
         serializer.save()
         
     def perform_destroy(self, instance):
-        """软删除模块"""
-        instance.soft_delete()
+        """软删除模块，其下的特性与用例一并删除"""
+        delete_module(instance)
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """恢复已删除的模块，以及随模块一起删除的特性与用例"""
+        module = self.get_object()
+        restored = restore_module(module)
+        return Response({
+            'message': f'模块 {module.module_name} 已恢复',
+            'restored_features': restored['features'],
+            'restored_cases': restored['cases'],
+        }, status=status.HTTP_200_OK)
+
+    def _tree_response(self, request, modules):
+        """返回模块树；ETag 与 If-None-Match 一致时返回 304，不再加载特性与用例"""
+        try:
+            depth = parse_depth(request.query_params.get('depth'))
+        except ValueError:
+            return Response({'error': 'depth 应为 0-2 之间的整数'}, status=status.HTTP_400_BAD_REQUEST)
+        etag = tree_etag(modules, depth)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        response = Response(build_tree(modules, depth))
+        response['ETag'] = etag
+        return response
+
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """模块 → 特性 → 用例树（depth: 0 模块，1 特性，2 用例，默认 2）"""
+        modules = list(self.get_queryset().filter(pk=pk).values(*MODULE_FIELDS))
+        if not modules:
+            raise Http404
+        return self._tree_response(request, modules)
+
+    @action(detail=False, methods=['get'], url_path='tree', url_name='full-tree')
+    def full_tree(self, request):
+        """当前用户可见的全部模块树，参数同 tree"""
+        modules = list(self.filter_queryset(self.get_queryset()).values(*MODULE_FIELDS))
+        return self._tree_response(request, modules)
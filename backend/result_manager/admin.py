@@ -1,3 +1,65 @@
 from django.contrib import admin
+from .models import (
+    FailureCluster, ClassificationRule, CaseFlakinessStat, SuiteRunHistory, DailyResultRollup, ArchivedTask,
+    TaskResultRollup,
+)
 
 # Register your models here.
+
+
+@admin.register(FailureCluster)
+class FailureClusterAdmin(admin.ModelAdmin):
+    """失败聚类的管理配置"""
+    list_display = ('id', 'result_count', 'mark_status', 'first_seen', 'last_seen', 'last_task_id')
+    search_fields = ('id', 'signature', 'sample_text')
+    list_filter = ('mark_status',)
+    readonly_fields = ('signature', 'sample_text', 'sample_result_id', 'result_count',
+                       'first_seen', 'last_seen', 'last_task_id', 'create_time', 'update_time')
+
+
+@admin.register(ClassificationRule)
+class ClassificationRuleAdmin(admin.ModelAdmin):
+    """失败分类规则的管理配置"""
+    list_display = ('id', 'name', 'match_type', 'pattern', 'mark_status', 'priority', 'is_active', 'is_deleted')
+    search_fields = ('id', 'name', 'pattern')
+    list_filter = ('match_type', 'mark_status', 'is_active', 'is_deleted')
+
+
+@admin.register(CaseFlakinessStat)
+class CaseFlakinessStatAdmin(admin.ModelAdmin):
+    """用例稳定性统计的管理配置"""
+    list_display = ('case_id', 'env_type', 'flakiness_score', 'current_fail_streak', 'total_runs', 'last_status')
+    search_fields = ('case_id__id', 'case_id__case_name')
+    list_filter = ('env_type', 'last_status')
+
+
+@admin.register(SuiteRunHistory)
+class SuiteRunHistoryAdmin(admin.ModelAdmin):
+    """测试套执行历史的管理配置"""
+    list_display = ('task_id', 'suite_id', 'env_id', 'task_status', 'run_time')
+    search_fields = ('task_id__id', 'suite_id__id')
+    list_filter = ('task_status',)
+    exclude = ('statuses',)
+
+
+@admin.register(DailyResultRollup)
+class DailyResultRollupAdmin(admin.ModelAdmin):
+    """用例结果日汇总的管理配置"""
+    list_display = ('day', 'suite_id', 'env_id', 'module_id', 'feature_id', 'total', 'success', 'failed', 'skipped')
+    search_fields = ('suite_id', 'env_id', 'module_id', 'feature_id')
+    list_filter = ('day',)
+
+
+@admin.register(TaskResultRollup)
+class TaskResultRollupAdmin(admin.ModelAdmin):
+    """用例结果任务汇总的管理配置"""
+    list_display = ('task_id', 'day', 'suite_id', 'env_id', 'feature_id', 'total', 'success', 'failed', 'skipped')
+    search_fields = ('task_id', 'suite_id', 'env_id', 'feature_id')
+    list_filter = ('day',)
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    """归档任务的管理配置"""
+    list_display = ('task_id', 'result_count', 'results_file', 'results_time', 'log_count', 'logs_file', 'logs_time')
+    search_fields = ('task_id__id',)
@@ -0,0 +1,338 @@
+"""用例结果与日志分层存储
+
+- 热层：tb_case_result 与日志原路径，近期任务的读写都在这里
+- 温层：结束超过 RESULT_ARCHIVE_DAYS 天的任务，用例结果移出 tb_case_result，按任务写入
+  ARCHIVE_ROOT/results/<年>/<月>/<任务ID>.jsonl.gz（每行一条结果），归档索引见 ArchivedTask
+- 冷层：结束超过 LOG_ARCHIVE_DAYS 天的任务，用例日志按任务开始日期追加到
+  ARCHIVE_ROOT/logs/<年>/<月>/logs-<日期>.tar，原日志删除，单个日志的位置见 ArchivedLog
+
+按任务读取结果、读取日志时透明回退到温层/冷层：结果从归档文件读出为未保存的 CaseResult 实例；
+日志按记录的包内偏移取回到 MEDIA_ROOT/temp/archived_logs 下，由 cleanup_temp_files 清理。
+"""
+import os
+import gzip
+import zlib
+import json
+import hashlib
+import logging
+import tarfile
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from execution_manager.models import TaskExecution
+from feature_testcase.models import TestCase
+from result_manager import search_index, signature
+from result_manager.log_compress import COMPACT_SUFFIX
+from result_manager.log_reader import LogAccessError, check_log_path, index_path_for
+from result_manager.models import ArchivedLog, ArchivedTask, CaseResult
+
+logger = logging.getLogger('autotestweb')
+
+RESULT_FIELDS = [field.attname for field in CaseResult._meta.concrete_fields]
+DATETIME_FIELDS = [
+    field.attname for field in CaseResult._meta.concrete_fields if isinstance(field, models.DateTimeField)
+]
+RESTORE_DIR = os.path.join('temp', 'archived_logs')
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """归档或读取归档失败"""
+
+
+def _setting(name, default):
+    """读取分层存储相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def archive_root():
+    return str(_setting('ARCHIVE_ROOT', os.path.join(str(settings.BASE_DIR), 'archive')))
+
+
+def _absolute(relative_path):
+    return os.path.join(archive_root(), relative_path)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def path_hash(path):
+    return hashlib.sha1(os.path.realpath(path).encode('utf-8')).hexdigest()
+
+
+def _task_day(task):
+    return timezone.localtime(task.start_time or task.end_time or timezone.now()).date()
+
+
+def _due_tasks(days, archived_field):
+    """结束超过指定天数、对应层尚未归档的任务"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return (
+        TaskExecution.objects.filter(status__in=TaskExecution.FINAL_STATUSES, start_time__lt=cutoff)
+        .exclude(**{f'archivedtask__{archived_field}__isnull': False})
+        .order_by('start_time')
+    )
+
+
+def archive_task_results(task):
+    """把任务的用例结果移入温层
+
+    先写归档文件再在同一事务中登记并删除原结果；归档期间结果数发生变化时放弃本次归档。
+
+    Returns:
+        int: 归档的结果数
+    """
+    day = _task_day(task)
+    relative_path = os.path.join('results', f'{day:%Y}', f'{day:%m}', f'{task.id}.jsonl.gz')
+    path = _absolute(relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = f'{path}.part'
+    count = 0
+    rows = (
+        CaseResult.objects.filter(task_id=task.id)
+        .order_by('execute_time', 'id')
+        .values(*RESULT_FIELDS)
+        .iterator(chunk_size=2000)
+    )
+    try:
+        with gzip.open(part_path, 'wt', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+                f.write('\n')
+                count += 1
+        os.replace(part_path, path)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    # 删除原结果前完整读回一次核对条数与 gzip CRC，之后读取时不再校验整个文件
+    if sum(1 for _ in _read_results(relative_path)) != count:
+        raise ArchiveError(f'任务 {task.id} 结果归档文件校验失败')
+
+    with transaction.atomic():
+        result_ids = list(CaseResult.objects.select_for_update().filter(task_id=task.id).values_list('id', flat=True))
+        if len(result_ids) != count:
+            raise ArchiveError(f'任务 {task.id} 归档期间用例结果有变化')
+        ArchivedTask.objects.update_or_create(task_id=task, defaults={
+            'results_file': relative_path,
+            'result_count': count,
+            'results_size': os.path.getsize(path),
+            'results_checksum': _sha256(path),
+            'results_time': timezone.now(),
+        })
+        signature.release_results(CaseResult.objects.filter(task_id=task.id))
+        CaseResult.objects.filter(task_id=task.id).delete()
+        transaction.on_commit(lambda: search_index.remove_results(result_ids))
+    return count
+
+
+def _read_results(relative_path):
+    """逐行读取结果归档文件，gzip 读到末尾时校验 CRC，文件损坏或截断时抛出 ArchiveError"""
+    try:
+        with gzip.open(_absolute(relative_path), 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                for field in DATETIME_FIELDS:
+                    if row.get(field):
+                        row[field] = parse_datetime(row[field])
+                yield CaseResult(**row)
+    except (OSError, EOFError, zlib.error, ValueError) as e:
+        raise ArchiveError(f'读取结果归档文件失败: {relative_path}, {str(e)}')
+
+
+def iter_archived_results(task_id):
+    """逐条读取温层中任务的用例结果，内存占用与结果数无关
+
+    归档文件的校验和只在归档时核对一次，读取时不再整文件计算哈希。
+
+    Returns:
+        iterator | None: 按执行时间升序的 CaseResult 实例（未保存），任务结果未归档时返回 None
+    """
+    archived = ArchivedTask.objects.filter(task_id=task_id, results_file__isnull=False).first()
+    if archived is None:
+        return None
+    return _read_results(archived.results_file)
+
+
+def archived_results(task_id):
+    """读取温层中任务的全部用例结果（需要整体统计的场景使用）
+
+    Returns:
+        list | None: 按执行时间升序的 CaseResult 实例（未保存），任务结果未归档时返回 None
+    """
+    results = iter_archived_results(task_id)
+    return None if results is None else list(results)
+
+
+def archived_task_ids(task_ids):
+    """返回结果已移入温层的任务ID"""
+    return set(
+        ArchivedTask.objects.filter(task_id__in=task_ids, results_file__isnull=False).values_list('task_id', flat=True)
+    )
+
+
+def find_archived_result(task_id, result_id):
+    """在温层中查找单条结果（逐行读取，找到即停止），找不到时返回 None"""
+    if not task_id:
+        return None
+    return next((result for result in iter_archived_results(task_id) or [] if result.id == result_id), None)
+
+
+def archived_values(task_id, fields, chunk_size=None):
+    """以 values_list 的形式逐块读取温层结果，支持 case_id__<字段> 的用例字段（每块查询一次用例）"""
+    chunk_size = int(chunk_size or _setting('EXPORT_CHUNK_SIZE', 2000))
+    results = iter_archived_results(task_id) or iter(())
+    case_fields = [field.split('__', 1)[1] for field in fields if field.startswith('case_id__')]
+    getters = []
+    for field in fields:
+        if field.startswith('case_id__'):
+            name = field.split('__', 1)[1]
+            getters.append(lambda result, name=name: cases.get(result.case_id_id, {}).get(name))
+        else:
+            attname = CaseResult._meta.get_field(field).attname
+            getters.append(lambda result, attname=attname: getattr(result, attname))
+    while True:
+        chunk = list(islice(results, chunk_size))
+        if not chunk:
+            break
+        cases = {}
+        if case_fields:
+            cases = {
+                row['id']: row
+                for row in TestCase.objects.filter(id__in={result.case_id_id for result in chunk})
+                .values('id', *case_fields)
+            }
+        for result in chunk:
+            yield tuple(getter(result) for getter in getters)
+
+
+def archive_task_logs(task):
+    """把任务的用例日志追加到冷层 tar 包，登记包内位置后删除原日志
+
+    Returns:
+        int: 归档的日志数
+    """
+    results = iter_archived_results(task.id)
+    if results is not None:
+        log_paths = {result.log_path for result in results}
+    else:
+        log_paths = set(CaseResult.objects.filter(task_id=task.id).values_list('log_path', flat=True))
+    day = _task_day(task)
+    relative_path = os.path.join('logs', f'{day:%Y}', f'{day:%m}', f'logs-{day:%Y%m%d}.tar')
+    path = _absolute(relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    entries = []
+    with tarfile.open(path, 'a') as tar:
+        for log_path in sorted(filter(None, log_paths)):
+            try:
+                real_path = check_log_path(log_path)
+            except LogAccessError as e:
+                logger.warning(f'任务 {task.id} 跳过归档日志: {str(e)}')
+                continue
+            if os.path.isfile(real_path):
+                source = real_path
+            elif os.path.isfile(real_path + COMPACT_SUFFIX):
+                source = real_path + COMPACT_SUFFIX
+            else:
+                continue
+            digest = path_hash(real_path)
+            member = f'{task.id}/{digest[:16]}-{os.path.basename(source)}'
+            tar.add(source, arcname=member, recursive=False)
+            size = tar.members[-1].size
+            # 追加写入的成员没有 offset_data，内容紧挨在按块补齐后的写入位置之前
+            offset = tar.offset - -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            entries.append((source, ArchivedLog(
+                path_hash=digest, log_path=real_path, task_id=task.id, archive_file=relative_path,
+                member=member, offset=offset, size=size, compressed=source.endswith(COMPACT_SUFFIX),
+            )))
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+    with transaction.atomic():
+        ArchivedLog.objects.filter(path_hash__in=[entry.path_hash for _, entry in entries]).delete()
+        ArchivedLog.objects.bulk_create([entry for _, entry in entries])
+        ArchivedTask.objects.update_or_create(task_id=task, defaults={
+            'logs_file': relative_path,
+            'log_count': len(entries),
+            'logs_time': timezone.now(),
+        })
+    for source, entry in entries:
+        for obsolete in (source, index_path_for(entry.log_path)):
+            if os.path.exists(obsolete):
+                os.remove(obsolete)
+    return len(entries)
+
+
+def restore_log(log_path):
+    """从冷层取回日志
+
+    Returns:
+        str | None: 取回后的本地路径，日志未归档时返回 None
+    """
+    digest = path_hash(log_path)
+    archived = ArchivedLog.objects.filter(path_hash=digest).first()
+    if archived is None:
+        return None
+    suffix = '.log' + COMPACT_SUFFIX if archived.compressed else '.log'
+    target = os.path.join(str(settings.MEDIA_ROOT), RESTORE_DIR, digest + suffix)
+    if os.path.isfile(target):
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    part_path = f'{target}.{os.getpid()}.part'
+    try:
+        with open(_absolute(archived.archive_file), 'rb') as src, open(part_path, 'wb') as dst:
+            src.seek(archived.offset)
+            remaining = archived.size
+            while remaining > 0:
+                chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ArchiveError(f'日志归档包不完整: {archived.archive_file}')
+                dst.write(chunk)
+                remaining -= len(chunk)
+        os.replace(part_path, target)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return target
+
+
+def run_tiering(batch_size=None):
+    """把到期任务的日志移入冷层、结果移入温层，单个任务失败不影响其他任务
+
+    Returns:
+        dict: 本轮归档的任务数与结果数、日志数
+    """
+    if batch_size is None:
+        batch_size = int(_setting('ARCHIVE_BATCH_TASKS', 100))
+    summary = {'log_tasks': 0, 'logs': 0, 'result_tasks': 0, 'results': 0}
+    for task in _due_tasks(int(_setting('LOG_ARCHIVE_DAYS', 90)), 'logs_file')[:batch_size]:
+        try:
+            summary['logs'] += archive_task_logs(task)
+            summary['log_tasks'] += 1
+        except Exception as e:
+            logger.error(f'任务 {task.id} 日志归档失败: {str(e)}')
+    for task in _due_tasks(int(_setting('RESULT_ARCHIVE_DAYS', 365)), 'results_file')[:batch_size]:
+        try:
+            summary['results'] += archive_task_results(task)
+            summary['result_tasks'] += 1
+        except Exception as e:
+            logger.error(f'任务 {task.id} 结果归档失败: {str(e)}')
+    if summary['log_tasks'] or summary['result_tasks']:
+        logger.info(
+            f"分层归档完成: 日志 {summary['log_tasks']} 个任务 {summary['logs']} 个文件, "
+            f"结果 {summary['result_tasks']} 个任务 {summary['results']} 条"
+        )
+    return summary
@@ -0,0 +1,281 @@
+"""失败自动分类规则引擎
+
+把所有启用的 ClassificationRule 编译成一个多模式匹配器，对失败用例日志做一次流式扫描，
+命中规则时写入建议标记（suggested_mark_status / suggested_note），不覆盖人工标记。
+
+匹配耗时与日志长度成线性关系，与规则数量无关：
+- 关键字规则全部放入一个 Aho-Corasick 自动机，每行只扫描一遍
+- 正则规则提取必须出现的字面量（如 "slot \\d+ timeout" 中的 " timeout"）放入同一个自动机作为预过滤，
+  只有字面量命中的行才执行对应正则
+- 提取不到字面量的正则合并为一个正则做预过滤，命中的行再逐条确认
+- 既提取不到字面量、又含反向引用或命名分组（不能合并）的正则只能逐行执行，保存时拒绝，
+  已保存的此类规则编译时跳过并记录警告
+"""
+import re
+import logging
+from collections import deque
+
+from django.db.models import Count, Max
+
+from result_manager.log_reader import open_log, resolve_log_path, LogReadError
+from result_manager.models import CaseResult, ClassificationRule
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+logger = logging.getLogger('autotestweb')
+
+# 预过滤字面量的最小长度，过短的字面量几乎每行都会命中
+MIN_LITERAL_LENGTH = 3
+# 正则开头的全局内联标志，如 (?i)、(?mx)
+GLOBAL_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式字符串匹配自动机"""
+
+    def __init__(self, words):
+        """
+        Args:
+            words: [(字符串, 负载)] 列表，命中时返回对应负载
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for word, payload in words:
+            state = 0
+            for ch in word:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(payload)
+
+        # 广度优先计算失败指针，并把失败链上的输出合并到当前状态，匹配时无需回溯输出链
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """返回文本中命中的所有负载"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+def _walk(parsed):
+    """遍历正则语法树的所有节点"""
+    for op, av in parsed:
+        yield op, av
+        if isinstance(av, (list, tuple)):
+            for item in av:
+                if isinstance(item, sre_parse.SubPattern):
+                    yield from _walk(item)
+                elif isinstance(item, (list, tuple)):
+                    for sub in item:
+                        if isinstance(sub, sre_parse.SubPattern):
+                            yield from _walk(sub)
+
+
+def scoped_pattern(pattern, flags=0):
+    """把正则包装为带作用域标志的分组，用于合并；开头的全局内联标志移入分组标志"""
+    inline = 'i' if flags & re.IGNORECASE else ''
+    match = GLOBAL_FLAGS.match(pattern)
+    while match:
+        inline += match.group(1)
+        pattern = pattern[match.end():]
+        match = GLOBAL_FLAGS.match(pattern)
+    inline = ''.join(sorted(set(inline)))
+    # verbose 模式下末尾的注释会吞掉右括号，先换行
+    return f'(?{inline}:{pattern}\n)' if 'x' in inline else f'(?{inline}:{pattern})'
+
+
+def analyze_regex(pattern, flags=0):
+    """分析正则表达式
+
+    Returns:
+        tuple: (必须出现的最长字面量（小写，可能为 None）, 是否可以与其他正则合并)
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None, False
+    # 含反向引用或命名分组的正则合并后分组编号/名称会冲突，不参与合并
+    combinable = not any(
+        op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS) for op, _ in _walk(parsed)
+    ) and not getattr(parsed, 'state', getattr(parsed, 'pattern', None)).groupdict
+    if combinable:
+        try:
+            re.compile(scoped_pattern(pattern, flags))
+        except re.error:
+            combinable = False
+
+    best, run = '', []
+    # 只有顶层顺序结构中的字面量才是每次匹配必须出现的
+    for op, av in list(parsed) + [(None, None)]:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if len(run) > len(best):
+            best = ''.join(run)
+        run = []
+    literal = best.lower() if len(best) >= MIN_LITERAL_LENGTH else None
+    return literal, combinable
+
+
+def regex_prefilter_error(pattern, flags=0):
+    """正则规则无法预过滤时返回原因，可以预过滤时返回 None"""
+    literal, combinable = analyze_regex(pattern, flags)
+    if literal or combinable:
+        return None
+    return f'正则表达式需包含至少 {MIN_LITERAL_LENGTH} 个字符的固定文本，或不使用反向引用、命名分组与无法移入分组的内联标志'
+
+
+class RuleMatcher:
+    """编译后的规则集"""
+
+    def __init__(self, rules):
+        # 规则按优先级排序，下标越小优先级越高
+        self.rules = list(rules)
+        self.checks = []
+        words = []
+        unfiltered = []
+        for index, rule in enumerate(self.rules):
+            if rule.match_type == 'keyword':
+                # 自动机统一按小写匹配，区分大小写的关键字命中后再确认原文
+                self.checks.append(None if rule.ignore_case else (lambda line, kw=rule.pattern: kw in line))
+                if rule.pattern:
+                    words.append((rule.pattern.lower(), index))
+                continue
+            flags = re.IGNORECASE if rule.ignore_case else 0
+            try:
+                regex = re.compile(rule.pattern, flags)
+            except re.error as e:
+                logger.warning(f'分类规则 {rule.id} 正则无效，已跳过: {str(e)}')
+                self.checks.append(None)
+                continue
+            literal, combinable = analyze_regex(rule.pattern, flags)
+            if not literal and not combinable:
+                logger.warning(f'分类规则 {rule.id} {regex_prefilter_error(rule.pattern, flags)}，已跳过')
+                self.checks.append(None)
+                continue
+            self.checks.append(regex.search)
+            if literal:
+                words.append((literal, index))
+                continue
+            scoped = scoped_pattern(rule.pattern, flags)
+            try:
+                re.compile(scoped)
+            except re.error as e:
+                logger.warning(f'分类规则 {rule.id} 正则无法合并预过滤，已跳过: {str(e)}')
+                self.checks[index] = None
+                continue
+            unfiltered.append((index, scoped))
+
+        self.automaton = AhoCorasick(words) if words else None
+        # 提取不到字面量的正则合并为一个预过滤正则
+        self.combined = [index for index, _ in unfiltered]
+        self.combined_prefilter = None
+        if self.combined:
+            self.combined_prefilter = re.compile('|'.join(scoped for _, scoped in unfiltered))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match_line(self, line, below=None):
+        """返回该行命中的优先级最高的规则下标
+
+        Args:
+            below: 只关心下标小于该值的规则（已有更高优先级的命中时用于剪枝）
+        """
+        candidates = set()
+        if self.automaton is not None:
+            candidates = self.automaton.search(line.lower())
+        if self.combined_prefilter is not None and self.combined_prefilter.search(line):
+            candidates.update(self.combined)
+        best = None
+        for index in sorted(candidates):
+            if below is not None and index >= below:
+                break
+            check = self.checks[index]
+            if check is None or check(line):
+                best = index
+                break
+        return best
+
+    def match_lines(self, lines):
+        """流式匹配多行，返回命中的优先级最高的规则（未命中返回 None）"""
+        best = None
+        for line in lines:
+            index = self.match_line(line, below=best)
+            if index is not None:
+                best = index
+                if best == 0:
+                    break
+        return self.rules[best] if best is not None else None
+
+
+_matcher_cache = {'key': None, 'matcher': None}
+
+
+def get_matcher():
+    """获取编译后的规则集，规则有变更时重新编译"""
+    active = ClassificationRule.alive.filter(is_active=True)
+    key = tuple(active.aggregate(count=Count('id'), latest=Max('update_time')).values())
+    if _matcher_cache['key'] != key:
+        _matcher_cache['matcher'] = RuleMatcher(active.order_by('-priority', 'create_time'))
+        _matcher_cache['key'] = key
+    return _matcher_cache['matcher']
+
+
+def _iter_log_lines(path):
+    with open_log(path) as f:
+        for raw in f:
+            yield raw.decode('utf-8', errors='replace').rstrip('\r\n')
+
+
+def classify_result(case_result, matcher=None):
+    """对失败结果的日志做一次流式扫描，写入建议标记
+
+    Returns:
+        ClassificationRule: 命中的规则，未命中或日志不可读时返回 None
+    """
+    if matcher is None:
+        matcher = get_matcher()
+    rule = None
+    if matcher:
+        try:
+            rule = matcher.match_lines(_iter_log_lines(resolve_log_path(case_result.log_path)))
+        except (LogReadError, OSError) as e:
+            logger.warning(f'用例日志无法读取，跳过自动分类: {case_result.id}, {str(e)}')
+    updates = {
+        'suggested_mark_status': rule.mark_status if rule else None,
+        'suggested_note': rule.note if rule else None,
+        'suggested_rule_id': rule.id if rule else None,
+    }
+    CaseResult.objects.filter(id=case_result.id).update(**updates)
+    for field, value in updates.items():
+        setattr(case_result, field, value)
+    return rule
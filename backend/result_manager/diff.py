@@ -0,0 +1,119 @@
+"""任务结果对比
+
+对比两个任务中每个用例最近一次的结果，分为新增失败、修复、持续失败、新增用例、移除用例五类。
+两个任务的结果用一次按用例ID排序的查询读出，按用例分组流式归类，不在内存中构建两份完整结果集。
+结果已移入温层的任务从归档文件读取后与数据库中的结果合并排序。
+
+已结束任务的结果不再变化，对比结果按任务对缓存。
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from execution_manager.models import TaskExecution
+from result_manager import archive
+from result_manager.models import CaseResult
+
+logger = logging.getLogger('autotestweb')
+
+CATEGORIES = ('newly_failing', 'newly_passing', 'still_failing', 'added', 'removed')
+DIFF_CACHE_KEY = 'task_diff:{base}:{target}'
+
+
+def _classify(base_status, target_status):
+    """返回用例所属的对比分类，结果无实质变化时返回 None"""
+    if base_status is None:
+        return 'added'
+    if target_status is None:
+        return 'removed'
+    if target_status == 'failed':
+        return 'still_failing' if base_status == 'failed' else 'newly_failing'
+    if base_status == 'failed' and target_status == 'success':
+        return 'newly_passing'
+    return None
+
+
+def _merge_archived(base_task_id, target_task_id, archived):
+    """有任务的结果已移入温层时，合并两个任务的结果并按与数据库查询相同的顺序排列"""
+    rows = list(
+        CaseResult.objects.filter(task_id__in=[base_task_id, target_task_id])
+        .values_list('case_id', 'task_id', 'id', 'status', 'execute_time')
+    )
+    for task_id in archived:
+        rows.extend(archive.archived_values(task_id, ['case_id', 'task_id', 'id', 'status', 'execute_time']))
+    rows.sort(key=lambda row: (row[0], row[4], row[2]))
+    return (row[:4] for row in rows)
+
+
+def compute_diff(base_task_id, target_task_id):
+    """对比两个任务的用例结果
+
+    Returns:
+        dict: categories 为 {分类: [(用例ID, 基准结果ID, 基准状态, 目标结果ID, 目标状态)]}，
+              unchanged 为结果无实质变化的用例数
+    """
+    categories = {category: [] for category in CATEGORIES}
+    unchanged = 0
+    rows = (
+        CaseResult.objects.filter(task_id__in=[base_task_id, target_task_id])
+        .order_by('case_id', 'execute_time', 'id')
+        .values_list('case_id', 'task_id', 'id', 'status')
+        .iterator(chunk_size=2000)
+    )
+    archived = archive.archived_task_ids([base_task_id, target_task_id])
+    if archived:
+        rows = _merge_archived(base_task_id, target_task_id, archived)
+
+    def flush(case_id, base, target):
+        nonlocal unchanged
+        category = _classify(base[1], target[1])
+        if category is None:
+            unchanged += 1
+        else:
+            categories[category].append((case_id, base[0], base[1], target[0], target[1]))
+
+    current_case = None
+    base = target = (None, None)
+    for case_id, task_id, result_id, status in rows:
+        if case_id != current_case:
+            if current_case is not None:
+                flush(current_case, base, target)
+            current_case = case_id
+            base = target = (None, None)
+        # 同一用例按执行时间排序，保留每个任务中最近一次的结果
+        if task_id == target_task_id:
+            target = (result_id, status)
+        else:
+            base = (result_id, status)
+    if current_case is not None:
+        flush(current_case, base, target)
+    return {'categories': categories, 'unchanged': unchanged}
+
+
+def get_diff(base_task, target_task):
+    """获取对比结果，两个任务都已结束时使用缓存"""
+    cacheable = base_task.status in TaskExecution.FINAL_STATUSES and target_task.status in TaskExecution.FINAL_STATUSES
+    key = DIFF_CACHE_KEY.format(base=base_task.id, target=target_task.id)
+    if cacheable:
+        diff = cache.get(key)
+        if diff is not None:
+            return diff
+    diff = compute_diff(base_task.id, target_task.id)
+    if cacheable:
+        cache.set(key, diff, timeout=getattr(settings, 'TASK_DIFF_CACHE_TIMEOUT', 24 * 3600))
+    return diff
+
+
+def last_green_task(task):
+    """返回同一测试套在该任务之前最近一次全部通过的已完成任务，不存在时返回 None"""
+    tasks = TaskExecution.objects.filter(suite_id=task.suite_id_id, status='success').exclude(id=task.id)
+    if task.start_time is not None:
+        tasks = tasks.filter(start_time__lt=task.start_time)
+    return (
+        tasks.exclude(caseresult__status='failed')
+        .filter(caseresult__isnull=False)
+        .distinct()
+        .order_by('-start_time')
+        .first()
+    )
@@ -0,0 +1,183 @@
+"""任务报告导出
+
+在 Celery 任务中按 (执行时间, 结果ID) 键集分页逐批读取用例结果，边读边写入 MEDIA_ROOT/temp/exports
+下的 gzip 文件，内存占用只与每批条数（EXPORT_CHUNK_SIZE）有关；不使用 iterator()，MySQL 下它不是
+服务端游标，会把整个结果集读入客户端。写入过程中按固定间隔更新进度。
+
+下载链接使用带时间戳的签名，有效期为 EXPORT_LINK_TTL_HOURS；签名未过期但导出记录已过期（expire_time）
+的链接同样拒绝，过期文件由 cleanup_temp_files 清理。
+"""
+import os
+import csv
+import gzip
+import html
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from result_manager import archive
+from result_manager.models import CaseResult, ReportExport
+
+logger = logging.getLogger('autotestweb')
+
+EXPORT_DIR = os.path.join('temp', 'exports')
+SIGNING_SALT = 'result_manager.report_export'
+COLUMNS = [
+    ('id', '结果ID'),
+    ('case_id', '用例ID'),
+    ('case_id__case_name', '用例名称'),
+    ('status', '用例状态'),
+    ('mark_status', '标记状态'),
+    ('execute_time', '执行时间'),
+    ('duration', '执行耗时（秒）'),
+    ('analysis_note', '分析备注'),
+    ('log_path', '日志路径'),
+]
+
+
+def _setting(name, default):
+    """读取报告导出相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def link_ttl_seconds():
+    return int(_setting('EXPORT_LINK_TTL_HOURS', 24)) * 3600
+
+
+def make_token(export_id):
+    """生成下载签名"""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(export_id)
+
+
+def check_token(export_id, token):
+    """校验下载签名是否属于该导出且未过期"""
+    try:
+        return signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=link_ttl_seconds()) == export_id
+    except signing.BadSignature:
+        return False
+
+
+def absolute_path(report_export):
+    return os.path.join(str(settings.MEDIA_ROOT), report_export.file_path)
+
+
+def _keyset_rows(task_id, fields, chunk_size):
+    """按 (执行时间, 结果ID) 键集分页逐批读取，每批是一条带 LIMIT 的独立查询"""
+    time_index, id_index = fields.index('execute_time'), fields.index('id')
+    queryset = CaseResult.objects.filter(task_id=task_id).order_by('execute_time', 'id').values_list(*fields)
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(Q(execute_time__gt=last[0]) | Q(execute_time=last[0], id__gt=last[1]))
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1][time_index], rows[-1][id_index])
+
+
+def iter_rows(task_id):
+    """逐行读取任务的用例结果，结果已移入温层时从归档文件读取"""
+    fields = [field for field, _ in COLUMNS]
+    if archive.archived_task_ids([task_id]):
+        return archive.archived_values(task_id, fields)
+    return _keyset_rows(task_id, fields, int(_setting('EXPORT_CHUNK_SIZE', 2000)))
+
+
+def _format_cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return timezone.localtime(value).isoformat()
+    return str(value)
+
+
+class CsvWriter:
+    """CSV 报告，首行为列名"""
+
+    def __init__(self, f, task):
+        self.writer = csv.writer(f)
+        self.writer.writerow([title for _, title in COLUMNS])
+
+    def write(self, row):
+        self.writer.writerow([_format_cell(value) for value in row])
+
+    def close(self):
+        pass
+
+
+class HtmlWriter:
+    """HTML 报告，逐行输出表格，不在内存中拼接整个文档"""
+
+    def __init__(self, f, task):
+        self.f = f
+        title = html.escape(f'任务 {task.id} 测试报告')
+        f.write(
+            f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title></head><body>\n'
+            f'<h1>{title}</h1>\n<p>测试套: {html.escape(task.suite_id_id)}，环境: {html.escape(task.env_id_id)}，'
+            f'状态: {html.escape(task.status)}</p>\n<table border="1">\n<tr>'
+            + ''.join(f'<th>{html.escape(column)}</th>' for _, column in COLUMNS) + '</tr>\n'
+        )
+
+    def write(self, row):
+        self.f.write('<tr>' + ''.join(f'<td>{html.escape(_format_cell(value))}</td>' for value in row) + '</tr>\n')
+
+    def close(self):
+        self.f.write('</table>\n</body></html>\n')
+
+
+WRITERS = {'csv': CsvWriter, 'html': HtmlWriter}
+
+
+def generate_report(report_export):
+    """生成报告文件，先写入临时文件，完成后原子替换
+
+    Returns:
+        ReportExport: 更新后的导出记录
+    """
+    task = report_export.task_id
+    total = CaseResult.objects.filter(task_id=task.id).count()
+    if not total and hasattr(task, 'archivedtask'):
+        total = task.archivedtask.result_count
+    relative_path = os.path.join(EXPORT_DIR, f'{report_export.id}.{report_export.format}.gz')
+    path = os.path.join(str(settings.MEDIA_ROOT), relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    ReportExport.objects.filter(id=report_export.id).update(status='running', total_rows=total)
+
+    interval = int(_setting('EXPORT_PROGRESS_INTERVAL', 1000))
+    processed = 0
+    part_path = f'{path}.part'
+    try:
+        with gzip.open(part_path, 'wt', encoding='utf-8', newline='') as f:
+            writer = WRITERS[report_export.format](f, task)
+            for row in iter_rows(task.id):
+                writer.write(row)
+                processed += 1
+                if processed % interval == 0:
+                    ReportExport.objects.filter(id=report_export.id).update(
+                        processed_rows=processed, progress=min(99, processed * 100 // max(total, 1))
+                    )
+            writer.close()
+        os.replace(part_path, path)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    now = timezone.now()
+    report_export.status = 'success'
+    report_export.total_rows = max(total, processed)
+    report_export.processed_rows = processed
+    report_export.progress = 100
+    report_export.file_path = relative_path
+    report_export.file_size = os.path.getsize(path)
+    report_export.finish_time = now
+    report_export.expire_time = now + timedelta(seconds=link_ttl_seconds())
+    report_export.save()
+    logger.info(f'报告导出完成: {report_export.id}, {processed} 条结果, {report_export.file_size} 字节')
+    return report_export
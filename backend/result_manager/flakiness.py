@@ -0,0 +1,94 @@
+"""用例稳定性（flaky）统计
+
+按用例和环境类型维护最近 FLAKINESS_WINDOW 次执行结果的滑动窗口。每个新结果入库时只对对应的
+一行统计做增量更新：追加到窗口末尾、淘汰最旧的结果，同时增减翻转次数与失败次数，
+不回溯 tb_case_result 历史数据。
+
+翻转率 = 窗口内相邻两次结果不同的次数 / (窗口长度 - 1)。真实回归表现为连续失败（翻转少、
+连续失败次数高），不稳定用例表现为成功失败交替（翻转率高）。
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from result_manager.models import CaseFlakinessStat
+
+logger = logging.getLogger('autotestweb')
+
+PASS = 'P'
+FAIL = 'F'
+STATUS_CODES = {'success': PASS, 'failed': FAIL}
+
+
+def _window_size():
+    return int(getattr(settings, 'FLAKINESS_WINDOW', 30))
+
+
+def apply_status(stat, code, window_size):
+    """把一次执行结果计入统计（只做增量计算）"""
+    window = stat.window
+    if window and window[-1] != code:
+        stat.flip_count += 1
+    window += code
+    if code == FAIL:
+        stat.fail_count += 1
+        stat.current_fail_streak += 1
+        stat.max_fail_streak = max(stat.max_fail_streak, stat.current_fail_streak)
+    else:
+        stat.current_fail_streak = 0
+    # 淘汰超出窗口的最旧结果
+    while len(window) > window_size:
+        if window[0] != window[1]:
+            stat.flip_count -= 1
+        if window[0] == FAIL:
+            stat.fail_count -= 1
+        window = window[1:]
+    stat.window = window
+    stat.total_runs += 1
+    stat.flakiness_score = round(stat.flip_count / (len(window) - 1), 4) if len(window) > 1 else 0
+    return stat
+
+
+def record_result(case_result, env_type=None):
+    """结果入库时更新对应用例、环境类型的稳定性统计
+
+    跳过的结果不参与统计。
+
+    Returns:
+        CaseFlakinessStat: 更新后的统计，结果不参与统计时返回 None
+    """
+    code = STATUS_CODES.get(case_result.status)
+    if code is None:
+        return None
+    if env_type is None:
+        env_type = case_result.task_id.env_id.type
+    with transaction.atomic():
+        stat, _ = CaseFlakinessStat.objects.select_for_update().get_or_create(
+            case_id_id=case_result.case_id_id, env_type=env_type
+        )
+        apply_status(stat, code, _window_size())
+        stat.last_status = case_result.status
+        stat.last_result_id = case_result.id
+        stat.last_execute_time = case_result.execute_time
+        stat.save()
+    return stat
+
+
+def get_scores(pairs):
+    """批量查询不稳定度
+
+    Args:
+        pairs: (用例ID, 环境类型) 集合
+
+    Returns:
+        dict: {(用例ID, 环境类型): 不稳定度}
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    rows = CaseFlakinessStat.objects.filter(
+        case_id__in={case_id for case_id, _ in pairs},
+        env_type__in={env_type for _, env_type in pairs}
+    ).values_list('case_id', 'env_type', 'flakiness_score')
+    return {(case_id, env_type): score for case_id, env_type, score in rows if (case_id, env_type) in pairs}
@@ -0,0 +1,175 @@
+"""测试套执行历史矩阵
+
+任务结束时把该任务所有用例的状态压缩为一行字节串（SuiteRunHistory.statuses），第 i 个字节
+对应 SuiteCaseIndex 中列位置为 i 的用例。列位置按用例首次出现的顺序只追加分配，历史行无需改写。
+
+查询最近 N 次执行 × 全部用例的矩阵只需读取 N 行历史与一次列索引，不再逐条读取
+tb_case_result；返回时每次执行编码为一个字符串（P 成功 / F 失败 / S 跳过 / - 未执行）。
+查询只读取已写入的历史；功能上线前的任务、结束处理失败的任务由 backfill_run_history_task 在后台补齐。
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from execution_manager.models import TaskExecution
+from feature_testcase.models import TestCase
+from result_manager.models import CaseResult, SuiteCaseIndex, SuiteRunHistory
+from test_suite.models import TestSuite
+
+logger = logging.getLogger('autotestweb')
+
+CELL_NONE = '-'
+CELL_LEGEND = {'P': 'success', 'F': 'failed', 'S': 'skipped', CELL_NONE: 'none'}
+# 状态字节到单元格字符的转换表（0 未执行/1 成功/2 失败/3 跳过）
+_CELL_TABLE = bytes.maketrans(b'\x00\x01\x02\x03', b'-PFS')
+
+
+def _assign_positions(suite_id, case_ids):
+    """返回用例的列位置，未出现过的用例追加到末尾"""
+    positions = dict(
+        SuiteCaseIndex.objects.filter(suite_id=suite_id, case_id__in=case_ids).values_list('case_id', 'position')
+    )
+    new_cases = sorted(set(case_ids) - positions.keys())
+    if new_cases:
+        next_position = SuiteCaseIndex.objects.filter(suite_id=suite_id).aggregate(
+            last=Max('position')
+        )['last']
+        next_position = 0 if next_position is None else next_position + 1
+        created = [
+            SuiteCaseIndex(suite_id_id=suite_id, case_id=case_id, position=next_position + i)
+            for i, case_id in enumerate(new_cases)
+        ]
+        SuiteCaseIndex.objects.bulk_create(created, batch_size=500)
+        positions.update((item.case_id, item.position) for item in created)
+    return positions
+
+
+def pack_task(task):
+    """把任务的用例结果压缩为一行执行历史（重复调用会覆盖该任务的历史行）
+
+    同一用例在任务中有多条结果时取执行时间最晚的一条。
+
+    Returns:
+        SuiteRunHistory: 历史行
+    """
+    latest = {}
+    for case_id, status in (
+        CaseResult.objects.filter(task_id=task.id).order_by('execute_time').values_list('case_id', 'status')
+    ):
+        latest[case_id] = status
+
+    with transaction.atomic():
+        # 锁定测试套，串行化同一测试套的列位置分配
+        TestSuite.objects.select_for_update().filter(id=task.suite_id_id).exists()
+        positions = _assign_positions(task.suite_id_id, list(latest.keys()))
+        statuses = bytearray(max(positions.values()) + 1 if positions else 0)
+        for case_id, status in latest.items():
+            statuses[positions[case_id]] = SuiteRunHistory.STATUS_CODES.get(status, SuiteRunHistory.STATUS_NONE)
+        history, _ = SuiteRunHistory.objects.update_or_create(
+            task_id=task,
+            defaults={
+                'suite_id_id': task.suite_id_id,
+                'env_id': task.env_id_id,
+                'task_status': task.status,
+                'run_time': task.start_time or task.end_time or timezone.now(),
+                'statuses': bytes(statuses),
+            }
+        )
+    return history
+
+
+def pack_task_results(task_id):
+    """任务结束后追加执行历史
+
+    Returns:
+        int: 历史行中的用例列数
+    """
+    task = TaskExecution.objects.get(id=task_id)
+    history = pack_task(task)
+    logger.info(f'任务 {task_id} 执行历史已写入: {len(history.statuses)} 列')
+    return len(history.statuses)
+
+
+def unpacked_tasks(suite_id=None, env_id=None):
+    """已结束但尚未写入历史的任务（功能上线前的任务、结束处理失败的任务）"""
+    tasks = TaskExecution.objects.filter(status__in=TaskExecution.FINAL_STATUSES, suiterunhistory__isnull=True)
+    if suite_id:
+        tasks = tasks.filter(suite_id=suite_id)
+    if env_id:
+        tasks = tasks.filter(env_id=env_id)
+    return tasks
+
+
+def backfill_history(suite_id=None, limit=None):
+    """补齐尚未写入历史的任务，最近的任务优先
+
+    Returns:
+        int: 补齐的任务数
+    """
+    limit = int(limit or getattr(settings, 'HISTORY_BACKFILL_BATCH_SIZE', 200))
+    packed = 0
+    for task in unpacked_tasks(suite_id).order_by('-start_time')[:limit]:
+        try:
+            pack_task(task)
+            packed += 1
+        except Exception as e:
+            logger.error(f'任务 {task.id} 执行历史补齐失败: {str(e)}')
+    if packed:
+        logger.info(f'执行历史补齐完成: {packed} 个任务')
+    return packed
+
+
+def build_matrix(suite_id, runs=100, env_id=None, hide_unused=True):
+    """构建最近若干次执行的用例状态矩阵
+
+    Args:
+        runs: 最近执行次数
+        env_id: 只看某个环境上的执行
+        hide_unused: 隐藏窗口内从未执行过的用例列
+
+    Returns:
+        dict: cases（列，按列位置排列）与 runs（行，按执行时间倒序，每行 cells 为状态字符串）
+    """
+    rows = SuiteRunHistory.objects.filter(suite_id=suite_id)
+    if env_id:
+        rows = rows.filter(env_id=env_id)
+    rows = list(
+        rows.order_by('-run_time', 'task_id')
+        .values_list('task_id', 'env_id', 'task_status', 'run_time', 'statuses')[:runs]
+    )
+    width = max((len(row[4]) for row in rows), default=0)
+    cells = [bytes(row[4]).ljust(width, b'\x00') for row in rows]
+
+    columns = list(range(width))
+    if hide_unused and cells:
+        # 按位或合并所有行，结果中为 0 的字节即窗口内从未执行的列
+        used = 0
+        for packed in cells:
+            used |= int.from_bytes(packed, 'big')
+        columns = [i for i, value in enumerate(used.to_bytes(width, 'big')) if value]
+    if len(columns) < width:
+        cells = [bytes(map(packed.__getitem__, columns)) for packed in cells]
+
+    case_ids = dict(
+        SuiteCaseIndex.objects.filter(suite_id=suite_id, position__lt=width).values_list('position', 'case_id')
+    )
+    case_ids = [case_ids.get(position, '') for position in columns]
+    case_names = dict(TestCase.objects.filter(id__in=case_ids).values_list('id', 'case_name'))
+    return {
+        'suite_id': suite_id,
+        'legend': CELL_LEGEND,
+        'cases': [{'case_id': case_id, 'case_name': case_names.get(case_id)} for case_id in case_ids],
+        'runs': [
+            {
+                'task_id': task_id,
+                'env_id': row_env_id,
+                'task_status': task_status,
+                'run_time': run_time,
+                'cells': packed.translate(_CELL_TABLE).decode('ascii'),
+            }
+            for (task_id, row_env_id, task_status, run_time, _), packed in zip(rows, cells)
+        ],
+    }
@@ -0,0 +1,216 @@
+"""用例日志分帧压缩格式
+
+任务结束后把原始日志压缩为 <日志路径>.atz：原始内容按固定大小切分为帧，每帧独立 zlib 压缩，
+文件末尾保存帧偏移表与稀疏行偏移索引。按字节范围或行号读取时只解压涉及的帧，
+倒读末尾若干行只解压最后几帧。
+
+文件布局：
+    [帧 0][帧 1]...[帧 N-1][帧偏移表 (N+1) × Q][行偏移索引 M × Q][尾部 TRAILER]
+
+本模块不依赖 Django，可在进程池子进程中使用。
+"""
+import io
+import os
+import zlib
+import struct
+from array import array
+from collections import OrderedDict
+
+COMPACT_SUFFIX = '.atz'
+MAGIC = b'ATZ1'
+VERSION = 1
+# 魔数, 版本, 帧大小, 行索引步长, 帧数, 原始大小, 换行数, 帧偏移表位置
+TRAILER = struct.Struct('<4sHIIIQQQ')
+# 每个打开的日志缓存最近解压的帧数
+FRAME_CACHE_SIZE = 4
+
+
+class CompressedLogError(Exception):
+    """压缩日志格式无效"""
+
+
+def is_compressed(path):
+    return path.endswith(COMPACT_SUFFIX)
+
+
+class CompressedLog:
+    """压缩日志的随机读取
+
+    提供 mmap 只读接口的子集（len、切片、find、rfind、close），原有按 mmap 实现的读取逻辑可直接复用。
+    find / rfind 只用于查找单字节分隔符（换行符），不处理跨帧的多字节匹配。
+    """
+
+    def __init__(self, path):
+        self.f = open(path, 'rb')
+        try:
+            self._load_trailer()
+        except (OSError, struct.error, CompressedLogError):
+            self.f.close()
+            raise
+        self._cache = OrderedDict()
+
+    def _load_trailer(self):
+        file_size = os.fstat(self.f.fileno()).st_size
+        if file_size < TRAILER.size:
+            raise CompressedLogError('压缩日志文件不完整')
+        self.f.seek(file_size - TRAILER.size)
+        (magic, version, self.frame_size, self.stride, frame_count,
+         self.size, self.newlines, meta_offset) = TRAILER.unpack(self.f.read(TRAILER.size))
+        if magic != MAGIC or version != VERSION:
+            raise CompressedLogError('不是有效的压缩日志文件')
+        self.f.seek(meta_offset)
+        meta = self.f.read(file_size - TRAILER.size - meta_offset)
+        self.frame_offsets = array('Q')
+        self.frame_offsets.frombytes(meta[:(frame_count + 1) * 8])
+        self.line_offsets = array('Q')
+        self.line_offsets.frombytes(meta[(frame_count + 1) * 8:])
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def _frame(self, k):
+        """解压第 k 帧（带 LRU 缓存）"""
+        data = self._cache.get(k)
+        if data is not None:
+            self._cache.move_to_end(k)
+            return data
+        start, end = self.frame_offsets[k], self.frame_offsets[k + 1]
+        self.f.seek(start)
+        data = zlib.decompress(self.f.read(end - start))
+        self._cache[k] = data
+        if len(self._cache) > FRAME_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return data
+
+    def read_at(self, offset, length):
+        """读取原始内容 [offset, offset + length)，只解压涉及的帧"""
+        end = min(offset + length, self.size)
+        if offset >= end:
+            return b''
+        parts = []
+        for k in range(offset // self.frame_size, (end - 1) // self.frame_size + 1):
+            base = k * self.frame_size
+            parts.append(self._frame(k)[max(offset - base, 0):end - base])
+        return b''.join(parts)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('压缩日志只支持切片读取')
+        start, stop, step = key.indices(self.size)
+        if step != 1:
+            raise ValueError('压缩日志不支持步长切片')
+        return self.read_at(start, stop - start)
+
+    def find(self, sub, start=0, end=None):
+        end = self.size if end is None else min(end, self.size)
+        while start < end:
+            k = start // self.frame_size
+            base = k * self.frame_size
+            pos = self._frame(k).find(sub, start - base, end - base)
+            if pos >= 0:
+                return base + pos
+            start = base + self.frame_size
+        return -1
+
+    def rfind(self, sub, start=0, end=None):
+        end = self.size if end is None else min(end, self.size)
+        while end > start:
+            k = (end - 1) // self.frame_size
+            base = k * self.frame_size
+            pos = self._frame(k).rfind(sub, max(start - base, 0), end - base)
+            if pos >= 0:
+                return base + pos
+            end = base
+        return -1
+
+
+class CompressedLogIO(io.RawIOBase):
+    """把压缩日志包装为可 seek 的二进制文件对象"""
+
+    def __init__(self, log):
+        self.log = log
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.log.read_at(self.pos, len(b))
+        b[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.log.size
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        if not self.closed:
+            self.log.close()
+        super().close()
+
+
+def open_compressed(path):
+    """以二进制文件对象方式打开压缩日志（支持 seek、read 与按行迭代）"""
+    log = CompressedLog(path)
+    return io.BufferedReader(CompressedLogIO(log), buffer_size=log.frame_size or io.DEFAULT_BUFFER_SIZE)
+
+
+def compress_file(src, dst, frame_size, stride, level=6):
+    """把原始日志压缩为分帧格式，先写临时文件再原子替换
+
+    Returns:
+        tuple: (原始大小, 压缩后大小)
+    """
+    frame_offsets = array('Q')
+    line_offsets = array('Q', [0])
+    newlines = 0
+    raw_size = 0
+    tmp = f'{dst}.{os.getpid()}.tmp'
+    try:
+        with open(src, 'rb') as fin, open(tmp, 'wb') as fout:
+            while True:
+                chunk = fin.read(frame_size)
+                if not chunk:
+                    break
+                pos = chunk.find(b'\n')
+                while pos >= 0:
+                    newlines += 1
+                    if newlines % stride == 0:
+                        line_offsets.append(raw_size + pos + 1)
+                    pos = chunk.find(b'\n', pos + 1)
+                frame_offsets.append(fout.tell())
+                fout.write(zlib.compress(chunk, level))
+                raw_size += len(chunk)
+            frame_count = len(frame_offsets)
+            meta_offset = fout.tell()
+            frame_offsets.append(meta_offset)
+            frame_offsets.tofile(fout)
+            line_offsets.tofile(fout)
+            fout.write(TRAILER.pack(MAGIC, VERSION, frame_size, stride, frame_count, raw_size, newlines, meta_offset))
+            compressed_size = fout.tell()
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return raw_size, compressed_size
@@ -0,0 +1,437 @@
+"""用例日志分段读取
+
+用例日志可达数百 MB，查看时不能整文件加载。本模块提供：
+- 按字节范围读取（mmap 切片，只映射不拷贝整个文件）
+- 按行范围读取（借助稀疏行偏移索引，定位第 N 行只需一次查表加少量扫描）
+- 从末尾倒读最后 N 行
+- 原始内容分块流式输出
+- 任务结束后把日志压缩为分帧格式（见 log_compress），以上读取方式对压缩日志同样适用
+
+行偏移索引每隔 LOG_INDEX_STRIDE 行记录一次行首字节偏移，在日志入库时生成并持久化为
+<日志路径>.idx（或 LOG_INDEX_DIR 目录下）；日志追加写入后再次读取时只增量扫描新增部分。
+压缩日志自带行偏移索引，压缩后删除原始日志与 .idx 文件。
+"""
+import os
+import mmap
+import struct
+import hashlib
+import logging
+from array import array
+
+from django.conf import settings
+
+from result_manager.log_compress import (
+    COMPACT_SUFFIX, CompressedLog, CompressedLogError, compress_file, is_compressed, open_compressed
+)
+
+logger = logging.getLogger('autotestweb')
+
+INDEX_MAGIC = b'ATLI'
+INDEX_VERSION = 1
+# 魔数, 版本, 步长, inode, 已索引字节数, 已索引换行数
+INDEX_HEADER = struct.Struct('<4sHIQQQ')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _setting(name, default):
+    """读取日志相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+class LogReadError(Exception):
+    """日志读取失败"""
+
+
+class LogNotFoundError(LogReadError):
+    """日志文件不存在"""
+
+
+class LogAccessError(LogReadError):
+    """日志路径不在允许访问的目录内"""
+
+
+def check_log_path(log_path):
+    """返回日志路径的真实路径，只允许 CASE_LOG_ROOT 目录内的路径
+
+    读取、建索引、压缩、归档与清理日志前都要经过这里，避免按结果中记录的任意路径读写文件。
+
+    Raises:
+        LogAccessError: 未配置 CASE_LOG_ROOT，或路径不在该目录内
+    """
+    root = _setting('CASE_LOG_ROOT', None)
+    if not root:
+        raise LogAccessError('未配置用例日志根目录 CASE_LOG_ROOT，不提供日志访问')
+    root = os.path.realpath(str(root))
+    path = os.path.realpath(log_path)
+    if os.path.commonpath([root, path]) != root:
+        raise LogAccessError(f'日志路径不在允许访问的目录内: {log_path}')
+    return path
+
+
+def resolve_log_path(log_path):
+    """校验并返回日志文件的真实路径，原始日志已压缩时返回压缩文件路径，已归档时返回取回后的路径"""
+    if not log_path:
+        raise LogNotFoundError('未记录日志文件路径')
+    path = check_log_path(log_path)
+    if not os.path.isfile(path):
+        if os.path.isfile(path + COMPACT_SUFFIX):
+            return path + COMPACT_SUFFIX
+        # 已移入冷层的日志取回到临时目录后读取
+        from result_manager.archive import restore_log
+        restored = restore_log(path)
+        if restored:
+            return restored
+        raise LogNotFoundError(f'日志文件不存在: {log_path}')
+    return path
+
+
+def open_log(path):
+    """以二进制只读方式打开日志（已校验的路径），压缩日志按需解压"""
+    if is_compressed(path):
+        return open_compressed(path)
+    return open(path, 'rb')
+
+
+def log_size(path):
+    """返回日志原始内容的字节数"""
+    if is_compressed(path):
+        with CompressedLog(path) as log:
+            return len(log)
+    return os.path.getsize(path)
+
+
+def index_path_for(path):
+    """返回日志对应的行偏移索引文件路径"""
+    index_dir = _setting('LOG_INDEX_DIR', None)
+    if index_dir:
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        return os.path.join(str(index_dir), f'{digest}.idx')
+    return f'{path}.idx'
+
+
+class LineIndex:
+    """稀疏行偏移索引
+
+    offsets[k] 为第 k * stride 行（从 0 开始计数）的行首字节偏移。
+    """
+
+    def __init__(self, stride, inode=0, size=0, newlines=0, offsets=None):
+        self.stride = stride
+        self.inode = inode
+        self.size = size
+        self.newlines = newlines
+        self.offsets = offsets if offsets is not None else array('Q', [0])
+
+    def line_count(self, ends_with_newline):
+        """日志总行数（最后一行没有换行符时也计为一行）"""
+        if self.size == 0:
+            return 0
+        return self.newlines if ends_with_newline else self.newlines + 1
+
+    def extend(self, mm, start, end):
+        """扫描 [start, end) 区间的换行符，追加索引点"""
+        stride = self.stride
+        pos = mm.find(b'\n', start, end)
+        while pos >= 0:
+            self.newlines += 1
+            if self.newlines % stride == 0:
+                self.offsets.append(pos + 1)
+            pos = mm.find(b'\n', pos + 1, end)
+        self.size = end
+
+    def dump(self, index_file):
+        """原子写入索引文件"""
+        os.makedirs(os.path.dirname(index_file) or '.', exist_ok=True)
+        tmp_file = f'{index_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.stride, self.inode, self.size, self.newlines))
+            self.offsets.tofile(f)
+        os.replace(tmp_file, index_file)
+
+    @classmethod
+    def load(cls, index_file):
+        """读取索引文件，文件不存在或格式不符时返回 None"""
+        try:
+            with open(index_file, 'rb') as f:
+                header = f.read(INDEX_HEADER.size)
+                if len(header) != INDEX_HEADER.size:
+                    return None
+                magic, version, stride, inode, size, newlines = INDEX_HEADER.unpack(header)
+                if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                    return None
+                offsets = array('Q')
+                offsets.frombytes(f.read())
+        except OSError:
+            return None
+        return cls(stride, inode, size, newlines, offsets)
+
+
+def _open_map(path):
+    """以只读方式映射日志文件，空文件返回 None；压缩日志返回接口一致的 CompressedLog"""
+    if is_compressed(path):
+        log = CompressedLog(path)
+        if len(log) == 0:
+            log.close()
+            return None
+        return log
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def ensure_index(path, persist=True):
+    """加载日志的行偏移索引，必要时增量更新或重建
+
+    Args:
+        path: 日志文件路径（已校验）
+        persist: 索引有更新时是否写回索引文件
+
+    Returns:
+        LineIndex: 与当前文件内容一致的索引
+    """
+    if is_compressed(path):
+        with CompressedLog(path) as log:
+            return LineIndex(log.stride, size=log.size, newlines=log.newlines, offsets=log.line_offsets)
+    stat = os.stat(path)
+    stride = int(_setting('LOG_INDEX_STRIDE', 1000))
+    index_file = index_path_for(path)
+    index = LineIndex.load(index_file)
+    # 文件被替换、截断或索引步长变更时重建
+    if index is None or index.stride != stride or index.inode != stat.st_ino or index.size > stat.st_size:
+        index = LineIndex(stride, inode=stat.st_ino)
+    if index.size == stat.st_size:
+        return index
+
+    mm = _open_map(path)
+    if mm is None:
+        return index
+    try:
+        # 映射后文件可能仍在追加，以映射长度为准
+        index.extend(mm, index.size, len(mm))
+    finally:
+        mm.close()
+    if persist:
+        try:
+            index.dump(index_file)
+        except OSError as e:
+            logger.warning(f'写入日志行索引失败: {index_file}, {str(e)}')
+    return index
+
+
+def build_index(log_path):
+    """日志入库时生成行偏移索引，返回总行数"""
+    path = resolve_log_path(log_path)
+    index = ensure_index(path)
+    ends_with_newline = _ends_with_newline(path)
+    return index.line_count(ends_with_newline)
+
+
+def _ends_with_newline(path):
+    with open_log(path) as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _decode(data):
+    return data.decode('utf-8', errors='replace')
+
+
+def _split_line(data):
+    return _decode(data.rstrip(b'\r'))
+
+
+def read_range(log_path, offset, length):
+    """按字节范围读取日志
+
+    Returns:
+        dict: offset, length, next_offset, size, content
+    """
+    path = resolve_log_path(log_path)
+    length = max(0, min(int(length), int(_setting('LOG_READ_MAX_BYTES', 1024 * 1024))))
+    offset = max(0, int(offset))
+    mm = _open_map(path)
+    if mm is None:
+        return {'offset': 0, 'length': 0, 'next_offset': 0, 'size': 0, 'content': ''}
+    try:
+        size = len(mm)
+        data = mm[offset:offset + length] if offset < size else b''
+    finally:
+        mm.close()
+    return {
+        'offset': offset,
+        'length': len(data),
+        'next_offset': offset + len(data),
+        'size': size,
+        'content': _decode(data),
+    }
+
+
+def read_lines(log_path, start_line=1, count=None):
+    """按行范围读取日志（行号从 1 开始）
+
+    Returns:
+        dict: start_line, lines, next_line（读到末尾时为 None）, total_lines
+    """
+    path = resolve_log_path(log_path)
+    max_lines = int(_setting('LOG_READ_MAX_LINES', 5000))
+    count = max_lines if count is None else max(0, min(int(count), max_lines))
+    start_line = max(1, int(start_line))
+    max_bytes = int(_setting('LOG_READ_MAX_BYTES', 1024 * 1024))
+
+    index = ensure_index(path)
+    mm = _open_map(path)
+    if mm is None:
+        return {'start_line': start_line, 'lines': [], 'next_line': None, 'total_lines': 0}
+    try:
+        size = len(mm)
+        total_lines = index.line_count(mm[size - 1:size] == b'\n')
+        lines = []
+        target = start_line - 1
+        mark = target // index.stride
+        if target < total_lines and mark < len(index.offsets):
+            # 查表定位到最近的索引点，再跳过不足一个步长的行
+            pos = index.offsets[mark]
+            for _ in range(target - mark * index.stride):
+                pos = mm.find(b'\n', pos) + 1
+            read_bytes = 0
+            while len(lines) < count and pos < size and read_bytes < max_bytes:
+                end = mm.find(b'\n', pos)
+                if end < 0:
+                    end = size
+                lines.append(_split_line(mm[pos:end]))
+                read_bytes += end - pos + 1
+                pos = end + 1
+    finally:
+        mm.close()
+    next_line = start_line + len(lines)
+    return {
+        'start_line': start_line,
+        'lines': lines,
+        'next_line': next_line if next_line <= total_lines else None,
+        'total_lines': total_lines,
+    }
+
+
+def tail(log_path, count):
+    """从末尾倒读最后 N 行
+
+    Returns:
+        dict: start_line, lines, next_line, total_lines
+    """
+    path = resolve_log_path(log_path)
+    count = max(0, min(int(count), int(_setting('LOG_READ_MAX_LINES', 5000))))
+    index = ensure_index(path)
+    mm = _open_map(path)
+    if mm is None:
+        return {'start_line': 1, 'lines': [], 'next_line': None, 'total_lines': 0}
+    try:
+        size = len(mm)
+        ends_with_newline = mm[size - 1:size] == b'\n'
+        total_lines = index.line_count(ends_with_newline)
+        end = size - 1 if ends_with_newline else size
+        lines = []
+        while len(lines) < count and end >= 0:
+            start = mm.rfind(b'\n', 0, end) + 1
+            lines.append(_split_line(mm[start:end]))
+            if start == 0:
+                break
+            end = start - 1
+    finally:
+        mm.close()
+    lines.reverse()
+    return {
+        'start_line': total_lines - len(lines) + 1,
+        'lines': lines,
+        'next_line': None,
+        'total_lines': total_lines,
+    }
+
+
+def iter_range(log_path, offset=0, length=None, chunk_size=STREAM_CHUNK_SIZE):
+    """分块读取日志原始内容，用于流式响应"""
+    path = resolve_log_path(log_path)
+
+    def generate():
+        remaining = length
+        with open_log(path) as f:
+            f.seek(offset)
+            while remaining is None or remaining > 0:
+                data = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+
+    return generate()
+
+
+def compact_log(log_path):
+    """把原始日志压缩为分帧格式，压缩成功后删除原始日志与行索引
+
+    只处理 CASE_LOG_ROOT 内的原始日志（未配置根目录时抛出 LogAccessError），不会删除根目录以外的文件；
+    已压缩、已归档、过小或压缩后没有变小的日志保持原样；压缩期间原始日志被改写时放弃本次压缩。
+
+    Returns:
+        tuple | None: (原始大小, 压缩后大小)，未压缩时返回 None
+    """
+    if not log_path:
+        raise LogNotFoundError('未记录日志文件路径')
+    path = check_log_path(log_path)
+    if not os.path.isfile(path) or is_compressed(path):
+        return None
+    before = os.stat(path)
+    if before.st_size < int(_setting('LOG_COMPACT_MIN_BYTES', 64 * 1024)):
+        return None
+    target = path + COMPACT_SUFFIX
+    raw_size, compressed_size = compress_file(
+        path, target,
+        frame_size=int(_setting('LOG_COMPACT_FRAME_SIZE', 256 * 1024)),
+        stride=int(_setting('LOG_INDEX_STRIDE', 1000)),
+        level=int(_setting('LOG_COMPACT_LEVEL', 6)),
+    )
+    after = os.stat(path)
+    if compressed_size >= raw_size or raw_size != after.st_size or before.st_mtime_ns != after.st_mtime_ns:
+        os.remove(target)
+        return None
+    os.remove(path)
+    index_file = index_path_for(path)
+    if os.path.exists(index_file):
+        os.remove(index_file)
+    return raw_size, compressed_size
+
+
+def compact_task_logs(task_id):
+    """压缩任务下所有用例日志
+
+    Returns:
+        dict: 压缩的日志数与压缩前后的字节数
+    """
+    from result_manager.models import CaseResult
+
+    summary = {'compacted': 0, 'raw_bytes': 0, 'compressed_bytes': 0}
+    log_paths = (
+        CaseResult.objects.filter(task_id=task_id)
+        .exclude(log_path__isnull=True).exclude(log_path='')
+        .values_list('log_path', flat=True).distinct()
+    )
+    for log_path in log_paths:
+        try:
+            sizes = compact_log(log_path)
+        except (LogReadError, CompressedLogError, OSError) as e:
+            logger.warning(f'压缩用例日志失败: {log_path}, {str(e)}')
+            continue
+        if sizes:
+            summary['compacted'] += 1
+            summary['raw_bytes'] += sizes[0]
+            summary['compressed_bytes'] += sizes[1]
+    if summary['compacted']:
+        logger.info(
+            f"任务 {task_id} 日志压缩完成: {summary['compacted']} 个文件, "
+            f"{summary['raw_bytes']} -> {summary['compressed_bytes']} 字节"
+        )
+    return summary
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from result_manager.purge import LOG_MODES, reset_checkpoint, run_purge
+
+
+class Command(BaseCommand):
+    help = '分批清理超过保留期的任务、用例结果与日志（中断后从断点继续）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='保留天数，默认使用 TASK_PURGE_DAYS')
+        parser.add_argument('--batch-size', type=int, help='每个事务最多删除的用例结果数')
+        parser.add_argument('--pause', type=float, help='批次之间的暂停时间（秒）')
+        parser.add_argument('--max-seconds', type=float, help='本次运行的时间上限（秒）')
+        parser.add_argument('--log-mode', choices=LOG_MODES, help='日志处理方式：delete 直接删除，archive 先移入冷层')
+        parser.add_argument('--reset', action='store_true', help='丢弃上次的断点，按新的截止时间重新开始')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_checkpoint()
+        try:
+            summary = run_purge(
+                days=options['days'], batch_size=options['batch_size'], pause=options['pause'],
+                max_seconds=options['max_seconds'], log_mode=options['log_mode'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"删除任务 {summary['tasks']} 个, 用例结果 {summary['results']} 条, "
+            f"{'已全部完成' if summary['finished'] else '未完成，下次从断点继续'}"
+        )
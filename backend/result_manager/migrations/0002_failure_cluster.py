@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:22
+
+import result_manager.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('execution_manager', '0001_initial'),
+        ('feature_testcase', '0003_testcase_creator_testcase_priority_and_more'),
+        ('result_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailureCluster',
+            fields=[
+                ('id', models.CharField(default=result_manager.models.generate_failure_cluster_id, max_length=64, primary_key=True, serialize=False, verbose_name='聚类唯一ID')),
+                ('signature', models.CharField(max_length=64, unique=True, verbose_name='失败特征')),
+                ('sample_text', models.TextField(verbose_name='失败信息')),
+                ('sample_result_id', models.CharField(max_length=64, verbose_name='示例结果ID')),
+                ('result_count', models.IntegerField(default=0, verbose_name='结果数')),
+                ('first_seen', models.DateTimeField(verbose_name='首次出现时间')),
+                ('last_seen', models.DateTimeField(verbose_name='最近出现时间')),
+                ('last_task_id', models.CharField(max_length=64, verbose_name='最近出现的任务ID')),
+                ('mark_status', models.CharField(choices=[('none', '无标记'), ('to_analyze', '待分析'), ('located', '已定位'), ('no_need', '无需处理')], default='none', max_length=32, verbose_name='标记状态')),
+                ('analysis_note', models.TextField(blank=True, null=True, verbose_name='分析备注')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '失败聚类',
+                'verbose_name_plural': '失败聚类',
+                'db_table': 'tb_failure_cluster',
+                'ordering': ['-last_seen'],
+            },
+        ),
+        migrations.AddField(
+            model_name='caseresult',
+            name='failure_signature',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='失败特征'),
+        ),
+        migrations.AddIndex(
+            model_name='caseresult',
+            index=models.Index(fields=['failure_signature'], name='result_idx_signature'),
+        ),
+        migrations.AddIndex(
+            model_name='failurecluster',
+            index=models.Index(fields=['last_seen'], name='cluster_idx_last_seen'),
+        ),
+        migrations.AddIndex(
+            model_name='failurecluster',
+            index=models.Index(fields=['mark_status'], name='cluster_idx_mark'),
+        ),
+    ]
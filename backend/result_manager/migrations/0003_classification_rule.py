@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:24
+
+import result_manager.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('result_manager', '0002_failure_cluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationRule',
+            fields=[
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='是否删除')),
+                ('id', models.CharField(default=result_manager.models.generate_classification_rule_id, max_length=64, primary_key=True, serialize=False, verbose_name='规则唯一ID')),
+                ('name', models.CharField(max_length=128, verbose_name='规则名称')),
+                ('match_type', models.CharField(choices=[('keyword', '关键字'), ('regex', '正则表达式')], default='keyword', max_length=16, verbose_name='匹配方式')),
+                ('pattern', models.CharField(max_length=1024, verbose_name='匹配内容')),
+                ('ignore_case', models.BooleanField(default=True, verbose_name='忽略大小写')),
+                ('mark_status', models.CharField(choices=[('to_analyze', '待分析'), ('located', '已定位'), ('no_need', '无需处理')], max_length=32, verbose_name='建议标记状态')),
+                ('note', models.TextField(blank=True, null=True, verbose_name='建议分析备注')),
+                ('priority', models.IntegerField(default=0, verbose_name='优先级')),
+                ('is_active', models.BooleanField(default=True, verbose_name='是否启用')),
+                ('creator', models.CharField(blank=True, max_length=64, null=True, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '失败分类规则',
+                'verbose_name_plural': '失败分类规则',
+                'db_table': 'tb_classification_rule',
+                'ordering': ['-priority', 'create_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='caseresult',
+            name='suggested_mark_status',
+            field=models.CharField(blank=True, choices=[('none', '无标记'), ('to_analyze', '待分析'), ('located', '已定位'), ('no_need', '无需处理')], max_length=32, null=True, verbose_name='建议标记状态'),
+        ),
+        migrations.AddField(
+            model_name='caseresult',
+            name='suggested_note',
+            field=models.TextField(blank=True, null=True, verbose_name='建议分析备注'),
+        ),
+        migrations.AddField(
+            model_name='caseresult',
+            name='suggested_rule_id',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='命中规则ID'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_testcase', '0003_testcase_creator_testcase_priority_and_more'),
+        ('result_manager', '0003_classification_rule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseFlakinessStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('env_type', models.CharField(max_length=64, verbose_name='环境类型')),
+                ('window', models.CharField(default='', max_length=256, verbose_name='最近执行结果')),
+                ('flip_count', models.IntegerField(default=0, verbose_name='翻转次数')),
+                ('fail_count', models.IntegerField(default=0, verbose_name='失败次数')),
+                ('flakiness_score', models.FloatField(default=0, verbose_name='不稳定度')),
+                ('current_fail_streak', models.IntegerField(default=0, verbose_name='当前连续失败次数')),
+                ('max_fail_streak', models.IntegerField(default=0, verbose_name='最长连续失败次数')),
+                ('total_runs', models.IntegerField(default=0, verbose_name='累计执行次数')),
+                ('last_status', models.CharField(blank=True, max_length=32, null=True, verbose_name='最近状态')),
+                ('last_result_id', models.CharField(blank=True, max_length=64, null=True, verbose_name='最近结果ID')),
+                ('last_execute_time', models.DateTimeField(blank=True, null=True, verbose_name='最近执行时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('case_id', models.ForeignKey(db_column='case_id', on_delete=django.db.models.deletion.CASCADE, to='feature_testcase.testcase', verbose_name='用例ID')),
+            ],
+            options={
+                'verbose_name': '用例稳定性统计',
+                'verbose_name_plural': '用例稳定性统计',
+                'db_table': 'tb_case_flakiness_stat',
+                'ordering': ['-flakiness_score'],
+                'indexes': [models.Index(fields=['flakiness_score'], name='flaky_idx_score'), models.Index(fields=['env_type', 'flakiness_score'], name='flaky_idx_env_score')],
+                'unique_together': {('case_id', 'env_type')},
+            },
+        ),
+    ]
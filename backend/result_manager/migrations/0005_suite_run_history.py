@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('execution_manager', '0001_initial'),
+        ('result_manager', '0004_case_flakiness_stat'),
+        ('test_suite', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuiteCaseIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.CharField(max_length=64, verbose_name='用例ID')),
+                ('position', models.IntegerField(verbose_name='列位置')),
+                ('suite_id', models.ForeignKey(db_column='suite_id', on_delete=django.db.models.deletion.CASCADE, to='test_suite.testsuite', verbose_name='关联测试套ID')),
+            ],
+            options={
+                'verbose_name': '测试套用例列索引',
+                'verbose_name_plural': '测试套用例列索引',
+                'db_table': 'tb_suite_case_index',
+                'ordering': ['suite_id', 'position'],
+                'unique_together': {('suite_id', 'case_id'), ('suite_id', 'position')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SuiteRunHistory',
+            fields=[
+                ('task_id', models.OneToOneField(db_column='task_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='execution_manager.taskexecution', verbose_name='关联任务ID')),
+                ('env_id', models.CharField(max_length=64, verbose_name='环境ID')),
+                ('task_status', models.CharField(max_length=32, verbose_name='任务状态')),
+                ('run_time', models.DateTimeField(verbose_name='执行时间')),
+                ('statuses', models.BinaryField(default=b'', verbose_name='用例状态')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('suite_id', models.ForeignKey(db_column='suite_id', on_delete=django.db.models.deletion.CASCADE, to='test_suite.testsuite', verbose_name='关联测试套ID')),
+            ],
+            options={
+                'verbose_name': '测试套执行历史',
+                'verbose_name_plural': '测试套执行历史',
+                'db_table': 'tb_suite_run_history',
+                'ordering': ['-run_time'],
+                'indexes': [models.Index(fields=['suite_id', 'run_time'], name='run_history_idx_suite_time')],
+            },
+        ),
+    ]
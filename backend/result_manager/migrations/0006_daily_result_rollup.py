@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('result_manager', '0005_suite_run_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caseresult',
+            name='duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='执行耗时'),
+        ),
+        migrations.CreateModel(
+            name='DailyResultRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('suite_id', models.CharField(max_length=64, verbose_name='测试套ID')),
+                ('env_id', models.CharField(max_length=64, verbose_name='环境ID')),
+                ('module_id', models.CharField(default='', max_length=64, verbose_name='模块ID')),
+                ('feature_id', models.CharField(default='', max_length=64, verbose_name='特性ID')),
+                ('total', models.IntegerField(default=0, verbose_name='结果总数')),
+                ('success', models.IntegerField(default=0, verbose_name='成功数')),
+                ('failed', models.IntegerField(default=0, verbose_name='失败数')),
+                ('skipped', models.IntegerField(default=0, verbose_name='跳过数')),
+                ('duration_sum', models.FloatField(default=0, verbose_name='耗时合计')),
+                ('duration_count', models.IntegerField(default=0, verbose_name='有耗时的结果数')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '用例结果日汇总',
+                'verbose_name_plural': '用例结果日汇总',
+                'db_table': 'tb_daily_result_rollup',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['suite_id', 'day'], name='rollup_idx_suite_day'), models.Index(fields=['env_id', 'day'], name='rollup_idx_env_day'), models.Index(fields=['module_id', 'day'], name='rollup_idx_module_day'), models.Index(fields=['day'], name='rollup_idx_day')],
+                'unique_together': {('day', 'suite_id', 'env_id', 'feature_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupDirtyMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('suite_id', models.CharField(max_length=64, verbose_name='测试套ID')),
+                ('env_id', models.CharField(max_length=64, verbose_name='环境ID')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='标记时间')),
+            ],
+            options={
+                'verbose_name': '日汇总待重算标记',
+                'verbose_name_plural': '日汇总待重算标记',
+                'db_table': 'tb_rollup_dirty_mark',
+                'unique_together': {('day', 'suite_id', 'env_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:37
+
+import django.db.models.deletion
+import result_manager.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('execution_manager', '0001_initial'),
+        ('result_manager', '0006_daily_result_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportExport',
+            fields=[
+                ('id', models.CharField(default=result_manager.models.generate_report_export_id, max_length=64, primary_key=True, serialize=False, verbose_name='导出唯一ID')),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('html', 'HTML')], default='csv', max_length=16, verbose_name='报告格式')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '生成中'), ('success', '已完成'), ('failed', '失败')], default='pending', max_length=32, verbose_name='导出状态')),
+                ('total_rows', models.IntegerField(default=0, verbose_name='结果总数')),
+                ('processed_rows', models.IntegerField(default=0, verbose_name='已写入结果数')),
+                ('progress', models.IntegerField(default=0, verbose_name='进度（%）')),
+                ('file_path', models.CharField(blank=True, max_length=256, null=True, verbose_name='文件路径')),
+                ('file_size', models.BigIntegerField(default=0, verbose_name='文件大小（字节）')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='失败原因')),
+                ('creator', models.CharField(max_length=64, verbose_name='创建人')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finish_time', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('expire_time', models.DateTimeField(blank=True, null=True, verbose_name='过期时间')),
+                ('task_id', models.ForeignKey(db_column='task_id', on_delete=django.db.models.deletion.CASCADE, to='execution_manager.taskexecution', verbose_name='关联任务ID')),
+            ],
+            options={
+                'verbose_name': '报告导出',
+                'verbose_name_plural': '报告导出',
+                'db_table': 'tb_report_export',
+                'ordering': ['-create_time'],
+                'indexes': [models.Index(fields=['task_id'], name='export_idx_task'), models.Index(fields=['creator', 'create_time'], name='export_idx_creator')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('execution_manager', '0001_initial'),
+        ('result_manager', '0007_report_export'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('task_id', models.OneToOneField(db_column='task_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='execution_manager.taskexecution', verbose_name='关联任务ID')),
+                ('results_file', models.CharField(blank=True, max_length=256, null=True, verbose_name='结果归档文件')),
+                ('result_count', models.IntegerField(default=0, verbose_name='归档结果数')),
+                ('results_size', models.BigIntegerField(default=0, verbose_name='结果归档文件大小（字节）')),
+                ('results_checksum', models.CharField(blank=True, max_length=64, null=True, verbose_name='结果归档校验和')),
+                ('results_time', models.DateTimeField(blank=True, null=True, verbose_name='结果归档时间')),
+                ('logs_file', models.CharField(blank=True, max_length=256, null=True, verbose_name='日志归档包')),
+                ('log_count', models.IntegerField(default=0, verbose_name='归档日志数')),
+                ('logs_time', models.DateTimeField(blank=True, null=True, verbose_name='日志归档时间')),
+            ],
+            options={
+                'verbose_name': '归档任务',
+                'verbose_name_plural': '归档任务',
+                'db_table': 'tb_archived_task',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path_hash', models.CharField(max_length=40, unique=True, verbose_name='路径哈希')),
+                ('log_path', models.CharField(max_length=256, verbose_name='日志文件路径')),
+                ('task_id', models.CharField(max_length=64, verbose_name='任务ID')),
+                ('archive_file', models.CharField(max_length=256, verbose_name='日志归档包')),
+                ('member', models.CharField(max_length=256, verbose_name='包内文件名')),
+                ('offset', models.BigIntegerField(verbose_name='包内偏移')),
+                ('size', models.BigIntegerField(verbose_name='文件大小（字节）')),
+                ('compressed', models.BooleanField(default=False, verbose_name='是否压缩格式')),
+                ('archive_time', models.DateTimeField(auto_now_add=True, verbose_name='归档时间')),
+            ],
+            options={
+                'verbose_name': '归档日志',
+                'verbose_name_plural': '归档日志',
+                'db_table': 'tb_archived_log',
+                'indexes': [models.Index(fields=['task_id'], name='archived_log_idx_task')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+def backfill_delete_time(apps, schema_editor):
+    """已软删除的历史记录以最后更新时间作为删除时间"""
+    for model_name in ['ClassificationRule']:
+        model = apps.get_model('result_manager', model_name)
+        model.objects.filter(is_deleted=True, delete_time__isnull=True).update(delete_time=models.F('update_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('result_manager', '0008_storage_tiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classificationrule',
+            name='delete_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='删除时间'),
+        ),
+        migrations.RunPython(backfill_delete_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='classificationrule',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['delete_time'], name='rule_dead_idx_dtime'),
+        ),
+    ]
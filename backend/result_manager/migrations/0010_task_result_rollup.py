@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('result_manager', '0009_soft_delete_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskResultRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(max_length=64, verbose_name='任务ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('suite_id', models.CharField(max_length=64, verbose_name='测试套ID')),
+                ('env_id', models.CharField(max_length=64, verbose_name='环境ID')),
+                ('feature_id', models.CharField(default='', max_length=64, verbose_name='特性ID')),
+                ('start_time', models.DateTimeField(blank=True, null=True, verbose_name='任务开始时间')),
+                ('total', models.IntegerField(default=0, verbose_name='结果总数')),
+                ('success', models.IntegerField(default=0, verbose_name='成功数')),
+                ('failed', models.IntegerField(default=0, verbose_name='失败数')),
+                ('skipped', models.IntegerField(default=0, verbose_name='跳过数')),
+                ('duration_sum', models.FloatField(default=0, verbose_name='耗时合计')),
+                ('duration_count', models.IntegerField(default=0, verbose_name='有耗时的结果数')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '用例结果任务汇总',
+                'verbose_name_plural': '用例结果任务汇总',
+                'db_table': 'tb_task_result_rollup',
+                'indexes': [models.Index(fields=['day', 'suite_id', 'env_id'], name='task_rollup_idx_group'), models.Index(fields=['suite_id', 'start_time'], name='task_rollup_idx_suite_time'), models.Index(fields=['env_id', 'start_time'], name='task_rollup_idx_env_time'), models.Index(fields=['feature_id', 'start_time'], name='task_rollup_idx_feature_time')],
+                'unique_together': {('task_id', 'day', 'feature_id')},
+            },
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 import uuid
 from execution_manager.models import TaskExecution
+from test_suite.models import TestSuite
 from feature_testcase.models import TestCase
+from common.models import BaseModel
 
 
 def generate_case_result_id():
@@ -87,6 +89,45 @@ class CaseResult(models.Model):
         verbose_name='日志文件路径'
     )
     
+    # 执行耗时（秒），执行框架未上报时为空
+    duration = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='执行耗时'
+    )
+    
+    # 规则引擎给出的建议标记（不覆盖人工标记）
+    suggested_mark_status = models.CharField(
+        max_length=32,
+        null=True,
+        blank=True,
+        choices=MARK_STATUS_CHOICES,
+        verbose_name='建议标记状态'
+    )
+    
+    # 建议的分析备注
+    suggested_note = models.TextField(
+        null=True,
+        blank=True,
+        verbose_name='建议分析备注'
+    )
+    
+    # 命中的分类规则ID（关联tb_classification_rule.id）
+    suggested_rule_id = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        verbose_name='命中规则ID'
+    )
+    
+    # 失败特征（归一化失败信息的哈希，关联tb_failure_cluster.signature；空字符串表示无法提取）
+    failure_signature = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        verbose_name='失败特征'
+    )
+    
     class Meta:
         db_table = 'tb_case_result'
         verbose_name = '用例结果'
@@ -97,7 +138,583 @@ class CaseResult(models.Model):
             models.Index(fields=['task_id'], name='result_idx_task'),
             models.Index(fields=['case_id'], name='result_idx_case'),
             models.Index(fields=['mark_status'], name='result_idx_mark'),
+            models.Index(fields=['failure_signature'], name='result_idx_signature'),
         ]
     
     def __str__(self):
         return f'{self.id} - 任务:{self.task_id.id} 用例:{self.case_id.id} 状态:{self.status}'
+
+
+
+def generate_failure_cluster_id():
+    """生成失败聚类唯一ID（格式：cluster-xxx）"""
+    return f'cluster-{uuid.uuid4().hex[:8]}'
+
+
+class FailureCluster(models.Model):
+    """失败聚类表 - 失败特征相同的用例结果归为一类，按类统一分析"""
+    # 聚类唯一ID（格式：cluster-xxx）
+    id = models.CharField(
+        max_length=64,
+        primary_key=True,
+        default=generate_failure_cluster_id,
+        verbose_name='聚类唯一ID'
+    )
+    
+    # 失败特征哈希
+    signature = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='失败特征'
+    )
+    
+    # 归一化后的失败信息（去除时间戳、地址、ID 等易变内容）
+    sample_text = models.TextField(
+        verbose_name='失败信息'
+    )
+    
+    # 最早归入该类的用例结果
+    sample_result_id = models.CharField(
+        max_length=64,
+        verbose_name='示例结果ID'
+    )
+    
+    # 归入该类的用例结果数
+    result_count = models.IntegerField(
+        default=0,
+        verbose_name='结果数'
+    )
+    
+    # 首次出现时间
+    first_seen = models.DateTimeField(
+        verbose_name='首次出现时间'
+    )
+    
+    # 最近出现时间
+    last_seen = models.DateTimeField(
+        verbose_name='最近出现时间'
+    )
+    
+    # 最近出现的任务ID
+    last_task_id = models.CharField(
+        max_length=64,
+        verbose_name='最近出现的任务ID'
+    )
+    
+    # 标记状态，新归入的未标记结果继承该状态
+    mark_status = models.CharField(
+        max_length=32,
+        default='none',
+        choices=CaseResult.MARK_STATUS_CHOICES,
+        verbose_name='标记状态'
+    )
+    
+    # 分析备注
+    analysis_note = models.TextField(
+        null=True,
+        blank=True,
+        verbose_name='分析备注'
+    )
+    
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'tb_failure_cluster'
+        verbose_name = '失败聚类'
+        verbose_name_plural = '失败聚类'
+        ordering = ['-last_seen']
+        indexes = [
+            models.Index(fields=['last_seen'], name='cluster_idx_last_seen'),
+            models.Index(fields=['mark_status'], name='cluster_idx_mark'),
+        ]
+    
+    def __str__(self):
+        return f'{self.id} - {self.result_count} 个结果'
+
+
+
+def generate_classification_rule_id():
+    """生成分类规则唯一ID（格式：rule-xxx）"""
+    return f'rule-{uuid.uuid4().hex[:8]}'
+
+
+class ClassificationRule(BaseModel):
+    """失败分类规则表 - 日志命中关键字或正则时给出建议标记"""
+    # 规则唯一ID（格式：rule-xxx）
+    id = models.CharField(
+        max_length=64,
+        primary_key=True,
+        default=generate_classification_rule_id,
+        verbose_name='规则唯一ID'
+    )
+    
+    # 规则名称
+    name = models.CharField(
+        max_length=128,
+        verbose_name='规则名称'
+    )
+    
+    # 匹配方式（keyword/regex）
+    MATCH_TYPE_CHOICES = [
+        ('keyword', '关键字'),
+        ('regex', '正则表达式'),
+    ]
+    match_type = models.CharField(
+        max_length=16,
+        choices=MATCH_TYPE_CHOICES,
+        default='keyword',
+        verbose_name='匹配方式'
+    )
+    
+    # 关键字或正则表达式（按行匹配）
+    pattern = models.CharField(
+        max_length=1024,
+        verbose_name='匹配内容'
+    )
+    
+    # 是否忽略大小写
+    ignore_case = models.BooleanField(
+        default=True,
+        verbose_name='忽略大小写'
+    )
+    
+    # 命中后建议的标记状态
+    mark_status = models.CharField(
+        max_length=32,
+        choices=[choice for choice in CaseResult.MARK_STATUS_CHOICES if choice[0] != 'none'],
+        verbose_name='建议标记状态'
+    )
+    
+    # 命中后建议的分析备注
+    note = models.TextField(
+        null=True,
+        blank=True,
+        verbose_name='建议分析备注'
+    )
+    
+    # 优先级，同一日志命中多条规则时取优先级最高的
+    priority = models.IntegerField(
+        default=0,
+        verbose_name='优先级'
+    )
+    
+    # 是否启用
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name='是否启用'
+    )
+    
+    # 创建人
+    creator = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        verbose_name='创建人'
+    )
+    
+    class Meta:
+        db_table = 'tb_classification_rule'
+        verbose_name = '失败分类规则'
+        verbose_name_plural = '失败分类规则'
+        ordering = ['-priority', 'create_time']
+        indexes = [
+            models.Index(fields=['delete_time'], name='rule_dead_idx_dtime', condition=models.Q(is_deleted=True)),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+
+
+class CaseFlakinessStat(models.Model):
+    """用例稳定性统计表 - 按用例和环境类型增量维护最近若干次执行的翻转率与连续失败次数"""
+    # 用例ID（关联tb_test_case.id）
+    case_id = models.ForeignKey(
+        TestCase,
+        on_delete=models.CASCADE,
+        to_field='id',
+        db_column='case_id',
+        verbose_name='用例ID'
+    )
+    
+    # 环境类型（FPGA/仿真/测试床/QEMU等）
+    env_type = models.CharField(
+        max_length=64,
+        verbose_name='环境类型'
+    )
+    
+    # 滑动窗口内的执行结果，按时间顺序排列，P 为成功、F 为失败
+    window = models.CharField(
+        max_length=256,
+        default='',
+        verbose_name='最近执行结果'
+    )
+    
+    # 滑动窗口内相邻两次结果不同的次数
+    flip_count = models.IntegerField(default=0, verbose_name='翻转次数')
+    
+    # 滑动窗口内的失败次数
+    fail_count = models.IntegerField(default=0, verbose_name='失败次数')
+    
+    # 翻转率：翻转次数 / (窗口长度 - 1)，越接近 1 越不稳定
+    flakiness_score = models.FloatField(default=0, verbose_name='不稳定度')
+    
+    # 当前连续失败次数
+    current_fail_streak = models.IntegerField(default=0, verbose_name='当前连续失败次数')
+    
+    # 历史最长连续失败次数
+    max_fail_streak = models.IntegerField(default=0, verbose_name='最长连续失败次数')
+    
+    # 累计执行次数
+    total_runs = models.IntegerField(default=0, verbose_name='累计执行次数')
+    
+    # 最近一次执行结果
+    last_status = models.CharField(max_length=32, null=True, blank=True, verbose_name='最近状态')
+    last_result_id = models.CharField(max_length=64, null=True, blank=True, verbose_name='最近结果ID')
+    last_execute_time = models.DateTimeField(null=True, blank=True, verbose_name='最近执行时间')
+    
+    update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'tb_case_flakiness_stat'
+        verbose_name = '用例稳定性统计'
+        verbose_name_plural = '用例稳定性统计'
+        ordering = ['-flakiness_score']
+        unique_together = ('case_id', 'env_type')
+        indexes = [
+            models.Index(fields=['flakiness_score'], name='flaky_idx_score'),
+            models.Index(fields=['env_type', 'flakiness_score'], name='flaky_idx_env_score'),
+        ]
+    
+    def __str__(self):
+        return f'{self.case_id_id} - {self.env_type} - {self.flakiness_score:.2f}'
+
+
+class SuiteCaseIndex(models.Model):
+    """测试套用例列索引表 - 只追加，记录用例在执行历史矩阵中的列位置"""
+    # 关联测试套ID（外键：tb_test_suite.id）
+    suite_id = models.ForeignKey(
+        TestSuite,
+        on_delete=models.CASCADE,
+        to_field='id',
+        db_column='suite_id',
+        verbose_name='关联测试套ID'
+    )
+    
+    # 用例ID（不使用外键，用例删除后历史列位置保持不变）
+    case_id = models.CharField(max_length=64, verbose_name='用例ID')
+    
+    # 列位置，从 0 开始按首次出现顺序分配，分配后不再变化
+    position = models.IntegerField(verbose_name='列位置')
+    
+    class Meta:
+        db_table = 'tb_suite_case_index'
+        verbose_name = '测试套用例列索引'
+        verbose_name_plural = '测试套用例列索引'
+        ordering = ['suite_id', 'position']
+        unique_together = [('suite_id', 'case_id'), ('suite_id', 'position')]
+    
+    def __str__(self):
+        return f'{self.suite_id_id} - {self.position} - {self.case_id}'
+
+
+class SuiteRunHistory(models.Model):
+    """测试套执行历史表 - 每个结束的任务一行，用例状态按列位置压缩为字节串"""
+    # 状态编码，每个用例占一个字节
+    STATUS_NONE = 0
+    STATUS_CODES = {'success': 1, 'failed': 2, 'skipped': 3}
+    
+    # 关联任务ID（外键：tb_execution_task.id）
+    task_id = models.OneToOneField(
+        TaskExecution,
+        on_delete=models.CASCADE,
+        to_field='id',
+        db_column='task_id',
+        primary_key=True,
+        verbose_name='关联任务ID'
+    )
+    
+    # 关联测试套ID（外键：tb_test_suite.id）
+    suite_id = models.ForeignKey(
+        TestSuite,
+        on_delete=models.CASCADE,
+        to_field='id',
+        db_column='suite_id',
+        verbose_name='关联测试套ID'
+    )
+    
+    # 环境ID，冗余保存便于过滤
+    env_id = models.CharField(max_length=64, verbose_name='环境ID')
+    
+    # 任务状态
+    task_status = models.CharField(max_length=32, verbose_name='任务状态')
+    
+    # 执行时间（任务开始时间，没有开始时间时取结束时间或写入时间）
+    run_time = models.DateTimeField(verbose_name='执行时间')
+    
+    # 用例状态字节串，第 i 个字节对应列位置 i（0 未执行/1 成功/2 失败/3 跳过）
+    statuses = models.BinaryField(default=b'', verbose_name='用例状态')
+    
+    update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'tb_suite_run_history'
+        verbose_name = '测试套执行历史'
+        verbose_name_plural = '测试套执行历史'
+        ordering = ['-run_time']
+        indexes = [
+            models.Index(fields=['suite_id', 'run_time'], name='run_history_idx_suite_time'),
+        ]
+    
+    def __str__(self):
+        return f'{self.suite_id_id} - {self.task_id_id}'
+
+
+class DailyResultRollup(models.Model):
+    """用例结果日汇总表 - 按 日期 × 测试套 × 环境 × 特性 预聚合，趋势与看板只读该表"""
+    # 日期（按 TIME_ZONE 划分）
+    day = models.DateField(verbose_name='日期')
+    
+    # 测试套ID、环境ID、模块ID、特性ID（不使用外键，删除后历史统计保持不变）
+    suite_id = models.CharField(max_length=64, verbose_name='测试套ID')
+    env_id = models.CharField(max_length=64, verbose_name='环境ID')
+    module_id = models.CharField(max_length=64, default='', verbose_name='模块ID')
+    feature_id = models.CharField(max_length=64, default='', verbose_name='特性ID')
+    
+    # 结果数
+    total = models.IntegerField(default=0, verbose_name='结果总数')
+    success = models.IntegerField(default=0, verbose_name='成功数')
+    failed = models.IntegerField(default=0, verbose_name='失败数')
+    skipped = models.IntegerField(default=0, verbose_name='跳过数')
+    
+    # 执行耗时合计（秒）与有耗时的结果数，平均耗时 = duration_sum / duration_count
+    duration_sum = models.FloatField(default=0, verbose_name='耗时合计')
+    duration_count = models.IntegerField(default=0, verbose_name='有耗时的结果数')
+    
+    update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'tb_daily_result_rollup'
+        verbose_name = '用例结果日汇总'
+        verbose_name_plural = '用例结果日汇总'
+        ordering = ['-day']
+        unique_together = ('day', 'suite_id', 'env_id', 'feature_id')
+        indexes = [
+            models.Index(fields=['suite_id', 'day'], name='rollup_idx_suite_day'),
+            models.Index(fields=['env_id', 'day'], name='rollup_idx_env_day'),
+            models.Index(fields=['module_id', 'day'], name='rollup_idx_module_day'),
+            models.Index(fields=['day'], name='rollup_idx_day'),
+        ]
+    
+    def __str__(self):
+        return f'{self.day} - {self.suite_id} - {self.env_id} - {self.feature_id}'
+
+
+class TaskResultRollup(models.Model):
+    """用例结果任务汇总表 - 按 任务 × 日期 × 特性 预聚合，按任务的通过率趋势只读该表
+
+    与日汇总在同一次分组重算中写入；日汇总由该表按特性相加得到。
+    """
+    # 任务ID、测试套ID、环境ID、特性ID（不使用外键，任务清理后历史统计保持不变）
+    task_id = models.CharField(max_length=64, verbose_name='任务ID')
+    day = models.DateField(verbose_name='日期')
+    suite_id = models.CharField(max_length=64, verbose_name='测试套ID')
+    env_id = models.CharField(max_length=64, verbose_name='环境ID')
+    feature_id = models.CharField(max_length=64, default='', verbose_name='特性ID')
+    
+    # 任务开始时间（趋势中每个任务一个点的横坐标）
+    start_time = models.DateTimeField(null=True, blank=True, verbose_name='任务开始时间')
+    
+    # 结果数
+    total = models.IntegerField(default=0, verbose_name='结果总数')
+    success = models.IntegerField(default=0, verbose_name='成功数')
+    failed = models.IntegerField(default=0, verbose_name='失败数')
+    skipped = models.IntegerField(default=0, verbose_name='跳过数')
+    
+    # 执行耗时合计（秒）与有耗时的结果数
+    duration_sum = models.FloatField(default=0, verbose_name='耗时合计')
+    duration_count = models.IntegerField(default=0, verbose_name='有耗时的结果数')
+    
+    update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'tb_task_result_rollup'
+        verbose_name = '用例结果任务汇总'
+        verbose_name_plural = '用例结果任务汇总'
+        unique_together = ('task_id', 'day', 'feature_id')
+        indexes = [
+            models.Index(fields=['day', 'suite_id', 'env_id'], name='task_rollup_idx_group'),
+            models.Index(fields=['suite_id', 'start_time'], name='task_rollup_idx_suite_time'),
+            models.Index(fields=['env_id', 'start_time'], name='task_rollup_idx_env_time'),
+            models.Index(fields=['feature_id', 'start_time'], name='task_rollup_idx_feature_time'),
+        ]
+    
+    def __str__(self):
+        return f'{self.task_id} - {self.day} - {self.feature_id}'
+
+
+class RollupDirtyMark(models.Model):
+    """日汇总待重算标记表 - 结果写入、修改或删除时标记对应的 日期 × 测试套 × 环境，由定时任务重算"""
+    day = models.DateField(verbose_name='日期')
+    suite_id = models.CharField(max_length=64, verbose_name='测试套ID')
+    env_id = models.CharField(max_length=64, verbose_name='环境ID')
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name='标记时间')
+    
+    class Meta:
+        db_table = 'tb_rollup_dirty_mark'
+        verbose_name = '日汇总待重算标记'
+        verbose_name_plural = '日汇总待重算标记'
+        unique_together = ('day', 'suite_id', 'env_id')
+    
+    def __str__(self):
+        return f'{self.day} - {self.suite_id} - {self.env_id}'
+
+
+def generate_report_export_id():
+    """生成报告导出唯一ID（格式：export-xxx）"""
+    return f'export-{uuid.uuid4().hex[:8]}'
+
+
+class ReportExport(models.Model):
+    """报告导出表 - 后台生成的任务报告文件（MEDIA_ROOT/temp 下的压缩文件）与下载链接"""
+    # 导出唯一ID（格式：export-xxx）
+    id = models.CharField(
+        max_length=64,
+        primary_key=True,
+        default=generate_report_export_id,
+        verbose_name='导出唯一ID'
+    )
+    
+    # 关联任务ID（外键：tb_execution_task.id）
+    task_id = models.ForeignKey(
+        TaskExecution,
+        on_delete=models.CASCADE,
+        to_field='id',
+        db_column='task_id',
+        verbose_name='关联任务ID'
+    )
+    
+    # 报告格式（csv/html）
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('html', 'HTML'),
+    ]
+    format = models.CharField(max_length=16, choices=FORMAT_CHOICES, default='csv', verbose_name='报告格式')
+    
+    # 导出状态（pending/running/success/failed）
+    STATUS_CHOICES = [
+        ('pending', '等待中'),
+        ('running', '生成中'),
+        ('success', '已完成'),
+        ('failed', '失败'),
+    ]
+    status = models.CharField(max_length=32, choices=STATUS_CHOICES, default='pending', verbose_name='导出状态')
+    
+    # 进度
+    total_rows = models.IntegerField(default=0, verbose_name='结果总数')
+    processed_rows = models.IntegerField(default=0, verbose_name='已写入结果数')
+    progress = models.IntegerField(default=0, verbose_name='进度（%）')
+    
+    # 生成的文件（相对 MEDIA_ROOT 的路径）
+    file_path = models.CharField(max_length=256, null=True, blank=True, verbose_name='文件路径')
+    file_size = models.BigIntegerField(default=0, verbose_name='文件大小（字节）')
+    
+    # 失败原因
+    error_message = models.TextField(null=True, blank=True, verbose_name='失败原因')
+    
+    # 创建人（关联 tb_user.id）
+    creator = models.CharField(max_length=64, verbose_name='创建人')
+    
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    finish_time = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    
+    # 下载链接过期时间，过期后文件由 cleanup_temp_files 清理
+    expire_time = models.DateTimeField(null=True, blank=True, verbose_name='过期时间')
+    
+    class Meta:
+        db_table = 'tb_report_export'
+        verbose_name = '报告导出'
+        verbose_name_plural = '报告导出'
+        ordering = ['-create_time']
+        indexes = [
+            models.Index(fields=['task_id'], name='export_idx_task'),
+            models.Index(fields=['creator', 'create_time'], name='export_idx_creator'),
+        ]
+    
+    def __str__(self):
+        return f'{self.id} - {self.task_id_id} - {self.status}'
+
+
+class ArchivedTask(models.Model):
+    """归档任务表 - 记录任务的用例结果与日志所在的存储层
+
+    - 温层：用例结果从 tb_case_result 移出，按任务写入 gzip 压缩的 JSON Lines 文件
+    - 冷层：用例日志写入按日期划分的 tar 包，单个日志的位置见 tb_archived_log
+    """
+    # 关联任务ID（外键：tb_execution_task.id）
+    task_id = models.OneToOneField(
+        TaskExecution,
+        on_delete=models.CASCADE,
+        to_field='id',
+        db_column='task_id',
+        primary_key=True,
+        verbose_name='关联任务ID'
+    )
+    
+    # 结果归档文件（相对 ARCHIVE_ROOT 的路径），为空表示结果仍在 tb_case_result
+    results_file = models.CharField(max_length=256, null=True, blank=True, verbose_name='结果归档文件')
+    result_count = models.IntegerField(default=0, verbose_name='归档结果数')
+    results_size = models.BigIntegerField(default=0, verbose_name='结果归档文件大小（字节）')
+    # 结果归档文件的 SHA-256，读取时校验
+    results_checksum = models.CharField(max_length=64, null=True, blank=True, verbose_name='结果归档校验和')
+    results_time = models.DateTimeField(null=True, blank=True, verbose_name='结果归档时间')
+    
+    # 日志归档包（相对 ARCHIVE_ROOT 的路径），为空表示日志仍在原路径
+    logs_file = models.CharField(max_length=256, null=True, blank=True, verbose_name='日志归档包')
+    log_count = models.IntegerField(default=0, verbose_name='归档日志数')
+    logs_time = models.DateTimeField(null=True, blank=True, verbose_name='日志归档时间')
+    
+    class Meta:
+        db_table = 'tb_archived_task'
+        verbose_name = '归档任务'
+        verbose_name_plural = '归档任务'
+    
+    def __str__(self):
+        return f'{self.task_id_id} - 结果:{self.results_file or "-"} 日志:{self.logs_file or "-"}'
+
+
+class ArchivedLog(models.Model):
+    """归档日志表 - 用例日志在冷层 tar 包中的位置，按原日志路径查找"""
+    # 原日志路径（真实路径）的 SHA-1
+    path_hash = models.CharField(max_length=40, unique=True, verbose_name='路径哈希')
+    
+    # 原日志路径
+    log_path = models.CharField(max_length=256, verbose_name='日志文件路径')
+    
+    # 所属任务ID
+    task_id = models.CharField(max_length=64, verbose_name='任务ID')
+    
+    # 归档包（相对 ARCHIVE_ROOT 的路径）与包内文件名
+    archive_file = models.CharField(max_length=256, verbose_name='日志归档包')
+    member = models.CharField(max_length=256, verbose_name='包内文件名')
+    
+    # 文件内容在归档包中的字节偏移与大小，取回时直接定位，不扫描整个 tar 包
+    offset = models.BigIntegerField(verbose_name='包内偏移')
+    size = models.BigIntegerField(verbose_name='文件大小（字节）')
+    
+    # 归档的是否为分帧压缩格式（<日志路径>.atz）
+    compressed = models.BooleanField(default=False, verbose_name='是否压缩格式')
+    
+    archive_time = models.DateTimeField(auto_now_add=True, verbose_name='归档时间')
+    
+    class Meta:
+        db_table = 'tb_archived_log'
+        verbose_name = '归档日志'
+        verbose_name_plural = '归档日志'
+        indexes = [
+            models.Index(fields=['task_id'], name='archived_log_idx_task'),
+        ]
+    
+    def __str__(self):
+        return f'{self.log_path} - {self.archive_file}:{self.member}'
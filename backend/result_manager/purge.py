@@ -0,0 +1,177 @@
+"""过期任务分批清理
+
+删除任务会级联删除其全部用例结果，一次删除数千个任务会长时间持有锁并产生巨大的事务日志。
+这里按任务逐个清理：先按主键顺序分批删除用例结果（每批一个短事务，批间暂停），最后删除
+已经没有结果的任务本身；日志文件随结果一起删除，或先移入冷层再删除。
+
+清理进度（截止时间、已处理到的任务ID、累计删除数）保存在系统配置 task_purge_checkpoint 中，
+中断后下一轮从断点继续；每轮有时间上限，可以在工作时间低强度地持续运行。
+"""
+import os
+import time
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from common.utils import get_system_config, set_system_config
+from execution_manager.models import TaskExecution
+from result_manager import archive, search_index, signature
+from result_manager.log_compress import COMPACT_SUFFIX
+from result_manager.log_reader import LogAccessError, check_log_path, index_path_for
+from result_manager.models import ArchivedLog, ArchivedTask, CaseResult
+
+logger = logging.getLogger('autotestweb')
+
+CHECKPOINT_CONFIG_KEY = 'task_purge_checkpoint'
+LOCK_CACHE_KEY = 'task_purge:lock'
+LOG_MODES = ('delete', 'archive')
+
+
+def _setting(name, default):
+    """读取清理相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def load_checkpoint():
+    checkpoint = get_system_config(CHECKPOINT_CONFIG_KEY)
+    return checkpoint if isinstance(checkpoint, dict) else {}
+
+
+def save_checkpoint(checkpoint):
+    return set_system_config(
+        CHECKPOINT_CONFIG_KEY, checkpoint, description='过期任务清理进度', config_type='json'
+    )
+
+
+def reset_checkpoint():
+    return save_checkpoint({})
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f'删除文件失败: {path}, {str(e)}')
+
+
+def _log_files(log_path):
+    """日志本身及其压缩文件、行偏移索引；不在 CASE_LOG_ROOT 内的路径不处理"""
+    if not log_path:
+        return []
+    try:
+        path = check_log_path(log_path)
+    except LogAccessError as e:
+        logger.warning(f'跳过删除日志: {str(e)}')
+        return []
+    return [path, path + COMPACT_SUFFIX, index_path_for(path)]
+
+
+def _purge_archives(task_id):
+    """删除任务在温层与冷层中的文件，冷层 tar 包不再被任何日志引用时整包删除"""
+    archived = ArchivedTask.objects.filter(task_id=task_id).first()
+    if archived and archived.results_file:
+        _remove_files([os.path.join(archive.archive_root(), archived.results_file)])
+    archive_files = set(ArchivedLog.objects.filter(task_id=task_id).values_list('archive_file', flat=True))
+    ArchivedLog.objects.filter(task_id=task_id).delete()
+    for archive_file in archive_files:
+        if not ArchivedLog.objects.filter(archive_file=archive_file).exists():
+            _remove_files([os.path.join(archive.archive_root(), archive_file)])
+
+
+def purge_task(task, batch_size, pause, log_mode='delete', deadline=None):
+    """分批删除任务的用例结果与日志，全部删除后删除任务
+
+    Returns:
+        tuple: (删除的结果数, 任务是否已删除)；超过 deadline 时中途返回，下一轮继续
+    """
+    if log_mode == 'archive' and not ArchivedTask.objects.filter(task_id=task.id, logs_file__isnull=False).exists():
+        archive.archive_task_logs(task)
+    deleted = 0
+    while True:
+        rows = list(CaseResult.objects.filter(task_id=task.id).order_by('id').values_list('id', 'log_path')[:batch_size])
+        if not rows:
+            break
+        result_ids = [result_id for result_id, _ in rows]
+        if log_mode == 'delete':
+            # 先删文件再删记录，中断后重试时记录仍在，不会留下无人引用的日志
+            _remove_files(path for _, log_path in rows for path in _log_files(log_path))
+        with transaction.atomic():
+            signature.release_results(CaseResult.objects.filter(id__in=result_ids))
+            deleted += CaseResult.objects.filter(id__in=result_ids).delete()[1].get(CaseResult._meta.label, 0)
+        search_index.remove_results(result_ids)
+        if pause:
+            time.sleep(pause)
+        if deadline is not None and time.monotonic() >= deadline:
+            return deleted, False
+
+    if log_mode == 'delete':
+        _purge_archives(task.id)
+    # 结果已清空，级联删除的只剩少量汇总行
+    TaskExecution.objects.filter(id=task.id).delete()
+    return deleted, True
+
+
+def run_purge(days=None, batch_size=None, pause=None, max_seconds=None, log_mode=None):
+    """清理开始时间早于保留期的已结束任务，从断点继续
+
+    Returns:
+        dict: 本轮删除的任务数、结果数，以及是否已全部清理完成
+    """
+    days = int(days if days is not None else _setting('TASK_PURGE_DAYS', 730))
+    batch_size = int(batch_size or _setting('PURGE_BATCH_SIZE', 500))
+    pause = float(pause if pause is not None else _setting('PURGE_PAUSE_SECONDS', 0.2))
+    max_seconds = float(max_seconds if max_seconds is not None else _setting('PURGE_MAX_SECONDS', 240))
+    log_mode = log_mode or _setting('PURGE_LOG_MODE', 'delete')
+    if log_mode not in LOG_MODES:
+        raise ValueError(f'不支持的日志处理方式: {log_mode}')
+
+    summary = {'tasks': 0, 'results': 0, 'finished': False}
+    if not cache.add(LOCK_CACHE_KEY, 1, timeout=int(max_seconds) * 2 + 60):
+        logger.info('过期任务清理正在进行，跳过本轮')
+        return summary
+    try:
+        checkpoint = load_checkpoint()
+        cutoff = parse_datetime(checkpoint['cutoff']) if checkpoint.get('cutoff') else None
+        if cutoff is None:
+            # 截止时间在一次完整清理内保持不变，断点续跑时处理的是同一批任务
+            cutoff = timezone.now() - timedelta(days=days)
+            checkpoint = {'cutoff': cutoff.isoformat(), 'last_task_id': '', 'tasks': 0, 'results': 0}
+        deadline = time.monotonic() + max_seconds
+        tasks = TaskExecution.objects.filter(
+            status__in=TaskExecution.FINAL_STATUSES, start_time__lt=cutoff, id__gt=checkpoint.get('last_task_id', '')
+        ).order_by('id')
+        while time.monotonic() < deadline:
+            task = tasks.first()
+            if task is None:
+                summary['finished'] = True
+                break
+            try:
+                deleted, done = purge_task(task, batch_size, pause, log_mode, deadline)
+            except Exception as e:
+                logger.error(f'清理任务 {task.id} 失败: {str(e)}')
+                deleted, done = 0, True
+            summary['results'] += deleted
+            checkpoint['results'] = checkpoint.get('results', 0) + deleted
+            if done:
+                summary['tasks'] += 1
+                checkpoint['tasks'] = checkpoint.get('tasks', 0) + 1
+                checkpoint['last_task_id'] = task.id
+                tasks = tasks.filter(id__gt=task.id)
+            save_checkpoint(checkpoint)
+        if summary['finished']:
+            logger.info(
+                f"过期任务清理完成: 截止 {checkpoint['cutoff']}, 共 {checkpoint.get('tasks', 0)} 个任务, "
+                f"{checkpoint.get('results', 0)} 条结果"
+            )
+            reset_checkpoint()
+    finally:
+        cache.delete(LOCK_CACHE_KEY)
+    return summary
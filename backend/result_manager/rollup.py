@@ -0,0 +1,241 @@
+"""用例结果日汇总
+
+按 日期 × 测试套 × 环境 × 特性 预聚合结果数与执行耗时（DailyResultRollup），趋势与看板只读汇总表，
+查询耗时只与天数、维度数有关，与 tb_case_result 的规模无关。按任务的趋势读取同时写入的
+任务 × 日期 × 特性 汇总（TaskResultRollup）。
+
+汇总是增量维护的：结果写入、修改、删除时对所属的 日期 × 测试套 × 环境 打上待重算标记
+（RollupDirtyMark），定时任务只重算被标记的组。补传的历史结果（执行时间早于当天）同样会
+标记其所属日期，迟到的数据不会漏算。
+
+结果已移入温层、任务已清理或正在被清理时，原始结果不在 tb_case_result 中，重算时保留这些任务
+原有的任务汇总，只重算其他任务，日汇总不会因归档或清理变为零。
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from execution_manager.models import TaskExecution
+from feature_testcase.models import Feature
+from result_manager.models import CaseResult, DailyResultRollup, RollupDirtyMark, TaskResultRollup
+
+logger = logging.getLogger('autotestweb')
+
+SUM_FIELDS = ('total', 'success', 'failed', 'skipped', 'duration_sum', 'duration_count')
+# 看板支持的分组维度
+GROUP_FIELDS = ('suite_id', 'env_id', 'module_id', 'feature_id')
+
+
+def day_of(value):
+    """返回时间所属的日期（按 TIME_ZONE 划分）"""
+    return timezone.localtime(value).date()
+
+
+def day_range(day):
+    """返回日期对应的时间区间 [开始, 结束)"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def mark_dirty(groups):
+    """标记需要重算的 (日期, 测试套ID, 环境ID)"""
+    marks = [RollupDirtyMark(day=day, suite_id=suite_id, env_id=env_id) for day, suite_id, env_id in set(groups)]
+    if marks:
+        RollupDirtyMark.objects.bulk_create(marks, ignore_conflicts=True)
+    return len(marks)
+
+
+def mark_results(case_results):
+    """标记一批结果所属的组（结果需可访问 task_id）"""
+    return mark_dirty(
+        (day_of(result.execute_time), result.task_id.suite_id_id, result.task_id.env_id_id)
+        for result in case_results
+    )
+
+
+def mark_task(task):
+    """标记任务下所有结果所属的日期"""
+    days = (
+        CaseResult.objects.filter(task_id=task.id)
+        .annotate(day=TruncDate('execute_time'))
+        .values_list('day', flat=True)
+        .distinct()
+    )
+    return mark_dirty((day, task.suite_id_id, task.env_id_id) for day in days)
+
+
+def _live_tasks(tasks):
+    """过滤出原始结果仍完整保存在 tb_case_result 中的任务（结果未归档、不在本轮清理范围内）"""
+    from result_manager.purge import load_checkpoint
+
+    tasks = tasks.filter(archivedtask__results_file__isnull=True)
+    cutoff = parse_datetime(load_checkpoint().get('cutoff') or '')
+    if cutoff is not None:
+        tasks = tasks.exclude(start_time__lt=cutoff)
+    return tasks
+
+
+def rebuild_group(day, suite_id, env_id):
+    """从原始结果重算一组汇总
+
+    一次按 任务 × 特性 分组的聚合写入任务汇总（TaskResultRollup），日汇总由任务汇总按特性相加得到。
+    原始结果已归档或已清理的任务保留原有的任务汇总，不参与重算。
+
+    Returns:
+        int: 写入的日汇总行数；无法重算而保留原有汇总时为 0
+    """
+    start, end = day_range(day)
+    group = {'day': day, 'suite_id': suite_id, 'env_id': env_id}
+    recorded = set(TaskResultRollup.objects.filter(**group).values_list('task_id', flat=True))
+    if not recorded and DailyResultRollup.objects.filter(**group).exists():
+        # 任务汇总上线前生成的日汇总，无法区分各任务的贡献；当天有结果已归档或正在清理的任务时保留原有汇总
+        day_tasks = TaskExecution.objects.filter(
+            suite_id=suite_id, env_id=env_id, start_time__gte=start, start_time__lt=end
+        )
+        if day_tasks.exclude(id__in=_live_tasks(day_tasks).values('id')).exists():
+            logger.warning(f'日汇总 {day} {suite_id} {env_id} 的部分原始结果已归档或清理，保留原有汇总')
+            return 0
+    frozen = recorded - set(_live_tasks(TaskExecution.objects.filter(id__in=recorded)).values_list('id', flat=True))
+    rows = (
+        CaseResult.objects.filter(
+            execute_time__gte=start, execute_time__lt=end,
+            task_id__suite_id=suite_id, task_id__env_id=env_id
+        )
+        .values('task_id', 'task_id__start_time', 'case_id__feature_id')
+        .annotate(
+            total=Count('id'),
+            success=Count('id', filter=Q(status='success')),
+            failed=Count('id', filter=Q(status='failed')),
+            skipped=Count('id', filter=Q(status='skipped')),
+            duration_sum=Sum('duration'),
+            duration_count=Count('duration'),
+        )
+        .order_by()
+    )
+    task_rollups = [
+        TaskResultRollup(
+            task_id=row['task_id'], day=day, suite_id=suite_id, env_id=env_id,
+            feature_id=row['case_id__feature_id'] or '', start_time=row['task_id__start_time'],
+            total=row['total'], success=row['success'], failed=row['failed'], skipped=row['skipped'],
+            duration_sum=row['duration_sum'] or 0, duration_count=row['duration_count'],
+        )
+        for row in rows
+        if row['task_id'] not in frozen
+    ]
+    kept = list(TaskResultRollup.objects.filter(task_id__in=frozen, **group))
+    totals = {}
+    for task_rollup in task_rollups + kept:
+        feature_totals = totals.setdefault(task_rollup.feature_id, dict.fromkeys(SUM_FIELDS, 0))
+        for field in SUM_FIELDS:
+            feature_totals[field] += getattr(task_rollup, field)
+    modules = dict(Feature.objects.filter(id__in=list(totals)).values_list('id', 'module_id'))
+    rollups = [
+        DailyResultRollup(
+            day=day, suite_id=suite_id, env_id=env_id, feature_id=feature_id,
+            module_id=modules.get(feature_id) or '', **feature_totals
+        )
+        for feature_id, feature_totals in totals.items()
+    ]
+    with transaction.atomic():
+        TaskResultRollup.objects.filter(**group).exclude(task_id__in=frozen).delete()
+        TaskResultRollup.objects.bulk_create(task_rollups, batch_size=500)
+        DailyResultRollup.objects.filter(**group).delete()
+        DailyResultRollup.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def process_dirty(batch_size=None, max_batches=None):
+    """重算所有被标记的组
+
+    先删除标记再重算，重算期间写入的新结果会重新打上标记，由下一轮处理；重算失败时恢复标记。
+
+    Returns:
+        int: 重算的组数
+    """
+    if batch_size is None:
+        batch_size = int(getattr(settings, 'ROLLUP_BATCH_SIZE', 200))
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        marks = list(RollupDirtyMark.objects.order_by('id')[:batch_size])
+        if not marks:
+            break
+        RollupDirtyMark.objects.filter(id__in=[mark.id for mark in marks]).delete()
+        for mark in marks:
+            try:
+                rebuild_group(mark.day, mark.suite_id, mark.env_id)
+                processed += 1
+            except Exception as e:
+                logger.error(f'日汇总重算失败: {mark}, {str(e)}')
+                mark_dirty([(mark.day, mark.suite_id, mark.env_id)])
+        batches += 1
+    if processed:
+        logger.info(f'日汇总重算完成: {processed} 组')
+    return processed
+
+
+def mark_range(start_day, end_day):
+    """标记一段日期内所有有结果的组（用于首次上线或修复后的全量重建）"""
+    start, _ = day_range(start_day)
+    _, end = day_range(end_day)
+    groups = (
+        CaseResult.objects.filter(execute_time__gte=start, execute_time__lt=end)
+        .annotate(day=TruncDate('execute_time'))
+        .values_list('day', 'task_id__suite_id', 'task_id__env_id')
+        .distinct()
+    )
+    return mark_dirty(groups)
+
+
+def filter_rollups(suite_id=None, env_id=None, module_id=None, feature_id=None, start_day=None, end_day=None):
+    """按维度与日期范围过滤汇总行"""
+    rollups = DailyResultRollup.objects.all()
+    for field, value in (('suite_id', suite_id), ('env_id', env_id), ('module_id', module_id), ('feature_id', feature_id)):
+        if value:
+            rollups = rollups.filter(**{field: value})
+    if start_day:
+        rollups = rollups.filter(day__gte=start_day)
+    if end_day:
+        rollups = rollups.filter(day__lte=end_day)
+    return rollups
+
+
+def _with_rates(row):
+    """整理汇总字段，补充通过率与平均耗时"""
+    for field in SUM_FIELDS:
+        row[field] = row.pop(f'{field}__sum', None) or 0
+    row['pass_rate'] = round(row['success'] / row['total'] * 100, 2) if row['total'] else 0
+    row['avg_duration'] = round(row['duration_sum'] / row['duration_count'], 3) if row['duration_count'] else None
+    return row
+
+
+def _sums():
+    # 使用默认别名（如 total__sum），避免与汇总表字段同名
+    return [Sum(field) for field in SUM_FIELDS]
+
+
+def daily_trend(rollups):
+    """按日期汇总，返回按日期升序的列表"""
+    return [_with_rates(row) for row in rollups.values('day').annotate(*_sums()).order_by('day')]
+
+
+def summarize(rollups, group_by=None):
+    """汇总总数，group_by 不为空时同时按该维度分组
+
+    Returns:
+        dict: totals 与 groups
+    """
+    totals = _with_rates(rollups.aggregate(*_sums()))
+    groups = []
+    if group_by:
+        groups = [
+            _with_rates(row)
+            for row in rollups.values(group_by).annotate(*_sums()).order_by('-failed__sum', group_by)
+        ]
+    return {'totals': totals, 'groups': groups}
@@ -0,0 +1,333 @@
+"""用例日志全文索引
+
+任务结束后把各用例日志按行写入独立的 SQLite FTS5 索引库（LOG_SEARCH_INDEX_PATH，
+默认与 db.sqlite3 同目录），支持跨任务检索"哪些执行命中了某条断言"。
+
+- 增量：每个用例结果记录已索引到的字节偏移，日志追加后只索引新增部分，
+  日志被替换或截断时重建该结果的索引
+- 并行：日志读取、解码与分行在进程池中完成，主进程只负责写入索引库（SQLite 单写者）
+- 过滤：索引库中冗余保存任务、测试套、环境与执行时间，检索时直接按这些条件过滤
+- 只读取 CASE_LOG_ROOT 目录内的日志（经 log_reader.check_log_path 校验）
+"""
+import os
+import sqlite3
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from result_manager.log_compress import (
+    COMPACT_SUFFIX, CompressedLog, CompressedLogError, is_compressed, open_compressed
+)
+from result_manager.log_reader import LogAccessError, check_log_path
+
+logger = logging.getLogger('autotestweb')
+
+HIGHLIGHT_START = '[['
+HIGHLIGHT_END = ']]'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_result (
+    result_id TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    case_id TEXT NOT NULL,
+    suite_id TEXT NOT NULL,
+    env_id TEXT NOT NULL,
+    execute_time REAL NOT NULL,
+    log_path TEXT NOT NULL,
+    log_offset INTEGER NOT NULL DEFAULT 0,
+    line_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS indexed_result_task ON indexed_result (task_id);
+CREATE INDEX IF NOT EXISTS indexed_result_suite_time ON indexed_result (suite_id, execute_time);
+CREATE INDEX IF NOT EXISTS indexed_result_env_time ON indexed_result (env_id, execute_time);
+CREATE TABLE IF NOT EXISTS indexed_chunk (
+    result_id TEXT NOT NULL,
+    first_rowid INTEGER NOT NULL,
+    last_rowid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS indexed_chunk_result ON indexed_chunk (result_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS log_lines USING fts5 (
+    content,
+    result_id UNINDEXED,
+    line_no UNINDEXED,
+    tokenize = 'unicode61'
+);
+"""
+
+
+def _setting(name, default):
+    """读取全文索引相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+class SearchQueryError(Exception):
+    """检索表达式无效"""
+
+
+def index_path():
+    return str(_setting('LOG_SEARCH_INDEX_PATH', os.path.join(str(settings.BASE_DIR), 'log_search.sqlite3')))
+
+
+@contextmanager
+def connect():
+    """打开索引库，首次使用时建表"""
+    conn = sqlite3.connect(index_path(), timeout=30)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        yield conn
+    finally:
+        conn.close()
+
+
+def extract_lines(log_path, offset, start_line, max_line_length):
+    """读取日志 offset 之后的内容并拆分为行（在子进程中执行，不依赖 Django）
+
+    压缩日志只解压 offset 之后的帧。log_path 由主进程经 _log_source 校验。
+
+    Returns:
+        tuple: (新的偏移, 总行数, 非空行列表 [(行号, 内容)])，文件不存在时返回 (None, start_line, [])
+    """
+    try:
+        f = open_compressed(log_path) if is_compressed(log_path) else open(log_path, 'rb')
+    except (OSError, CompressedLogError):
+        return None, start_line, []
+    rows = []
+    line_no = start_line
+    with f:
+        f.seek(offset)
+        for raw in f:
+            line_no += 1
+            text = raw.rstrip(b'\r\n').decode('utf-8', errors='replace')[:max_line_length]
+            if text.strip():
+                rows.append((line_no, text))
+        new_offset = f.tell()
+    return new_offset, line_no, rows
+
+
+def _result_metadata(case_results):
+    """提取写入索引库的元数据"""
+    return {
+        result.id: (
+            result.id, result.task_id_id, result.case_id_id, result.task_id.suite_id_id,
+            result.task_id.env_id_id, result.execute_time.timestamp(), result.log_path,
+        )
+        for result in case_results
+    }
+
+
+def _log_source(log_path):
+    """返回实际读取的文件（真实路径）与日志原始大小，原始日志已压缩时读取压缩文件
+
+    Raises:
+        LogAccessError: 日志路径不在 CASE_LOG_ROOT 目录内
+    """
+    path = check_log_path(log_path)
+    try:
+        return path, os.path.getsize(path)
+    except OSError:
+        pass
+    compressed = check_log_path(log_path + COMPACT_SUFFIX)
+    with CompressedLog(compressed) as log:
+        return compressed, len(log)
+
+
+def _plan_jobs(conn, metadata):
+    """根据已索引的偏移计算每个结果需要索引的区间"""
+    state = {}
+    ids = list(metadata.keys())
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows = conn.execute(
+            f'SELECT result_id, log_path, log_offset, line_count FROM indexed_result '
+            f'WHERE result_id IN ({",".join("?" * len(chunk))})', chunk
+        )
+        state.update({row[0]: row[1:] for row in rows})
+
+    jobs = []
+    for result_id, meta in metadata.items():
+        log_path = meta[6]
+        try:
+            read_path, size = _log_source(log_path)
+        except LogAccessError as e:
+            logger.warning(f'跳过索引结果 {result_id} 的日志: {str(e)}')
+            continue
+        except (OSError, CompressedLogError):
+            continue
+        old_path, offset, line_count = state.get(result_id, (log_path, 0, 0))
+        reset = old_path != log_path or size < offset
+        if reset:
+            offset, line_count = 0, 0
+        if size == offset and result_id in state and not reset:
+            continue
+        jobs.append((result_id, read_path, offset, line_count, reset))
+    return jobs
+
+
+def _run_jobs(jobs, workers):
+    """在进程池中读取日志，无法创建子进程时（如 Celery prefork 工作进程）退回当前进程
+
+    按批提交，避免所有日志的行同时驻留内存。
+    """
+    max_line_length = int(_setting('LOG_SEARCH_MAX_LINE_LENGTH', 2000))
+    executor = None
+    if workers > 1 and len(jobs) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+    try:
+        batch_size = workers * 2
+        for i in range(0, len(jobs), batch_size):
+            batch = jobs[i:i + batch_size]
+            if executor is not None:
+                try:
+                    futures = [
+                        executor.submit(extract_lines, log_path, offset, line_count, max_line_length)
+                        for _, log_path, offset, line_count, _ in batch
+                    ]
+                    results = [future.result() for future in futures]
+                except (AssertionError, OSError, BrokenProcessPool) as e:
+                    logger.warning(f'日志索引进程池不可用，改为单进程处理: {str(e)}')
+                    executor.shutdown(wait=False)
+                    executor = None
+            if executor is None:
+                results = [
+                    extract_lines(log_path, offset, line_count, max_line_length)
+                    for _, log_path, offset, line_count, _ in batch
+                ]
+            yield from zip(batch, results)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _delete_result_rows(conn, result_ids):
+    """按记录的 rowid 区间删除结果的索引行，避免扫描整个全文表"""
+    for i in range(0, len(result_ids), 500):
+        chunk = result_ids[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        ranges = conn.execute(
+            f'SELECT first_rowid, last_rowid FROM indexed_chunk WHERE result_id IN ({placeholders})', chunk
+        ).fetchall()
+        conn.executemany('DELETE FROM log_lines WHERE rowid BETWEEN ? AND ?', ranges)
+        conn.execute(f'DELETE FROM indexed_chunk WHERE result_id IN ({placeholders})', chunk)
+
+
+def index_results(case_results, workers=None):
+    """增量索引一批用例结果的日志
+
+    Args:
+        case_results: CaseResult 列表（需预先 select_related('task_id')）
+        workers: 进程池大小，默认 LOG_SEARCH_WORKERS
+
+    Returns:
+        dict: indexed_results（有新增内容的结果数）, indexed_lines（新增行数）
+    """
+    if workers is None:
+        workers = int(_setting('LOG_SEARCH_WORKERS', os.cpu_count() or 1))
+    metadata = _result_metadata(case_results)
+    summary = {'indexed_results': 0, 'indexed_lines': 0}
+    if not metadata:
+        return summary
+
+    with connect() as conn:
+        jobs = _plan_jobs(conn, metadata)
+        # 先把读取任务全部提交到进程池，再按结果逐个写入，每个结果一个事务
+        for job, (new_offset, line_count, rows) in _run_jobs(jobs, workers):
+            result_id, _, _, _, reset = job
+            if new_offset is None:
+                continue
+            with conn:
+                # 立即取得写锁，其他进程不能在计算 rowid 区间与写入之间插入索引行
+                conn.execute('BEGIN IMMEDIATE')
+                if reset:
+                    _delete_result_rows(conn, [result_id])
+                if rows:
+                    first_rowid = conn.execute('SELECT coalesce(max(rowid), 0) + 1 FROM log_lines').fetchone()[0]
+                    conn.executemany(
+                        'INSERT INTO log_lines (rowid, content, result_id, line_no) VALUES (?, ?, ?, ?)',
+                        ((first_rowid + i, text, result_id, line_no) for i, (line_no, text) in enumerate(rows))
+                    )
+                    conn.execute(
+                        'INSERT INTO indexed_chunk (result_id, first_rowid, last_rowid) VALUES (?, ?, ?)',
+                        (result_id, first_rowid, first_rowid + len(rows) - 1)
+                    )
+                conn.execute(
+                    'INSERT OR REPLACE INTO indexed_result (result_id, task_id, case_id, suite_id, env_id, '
+                    'execute_time, log_path, log_offset, line_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    metadata[result_id] + (new_offset, line_count)
+                )
+            summary['indexed_results'] += 1
+            summary['indexed_lines'] += len(rows)
+    return summary
+
+
+def index_task_logs(task_id, workers=None):
+    """索引某个任务下所有用例结果的日志"""
+    from result_manager.models import CaseResult
+
+    case_results = list(CaseResult.objects.filter(task_id=task_id).select_related('task_id'))
+    summary = index_results(case_results, workers=workers)
+    logger.info(
+        f'任务 {task_id} 日志索引完成: {summary["indexed_results"]} 个用例结果, '
+        f'新增 {summary["indexed_lines"]} 行'
+    )
+    return summary
+
+
+def remove_results(result_ids):
+    """从索引中删除用例结果"""
+    result_ids = list(result_ids)
+    if not result_ids or not os.path.exists(index_path()):
+        return
+    with connect() as conn, conn:
+        _delete_result_rows(conn, result_ids)
+        for i in range(0, len(result_ids), 500):
+            chunk = result_ids[i:i + 500]
+            conn.execute(f'DELETE FROM indexed_result WHERE result_id IN ({",".join("?" * len(chunk))})', chunk)
+
+
+def search(query, suite_id=None, env_id=None, start_time=None, end_time=None, offset=0, limit=50):
+    """全文检索日志
+
+    Args:
+        query: FTS5 检索表达式，如 "assert failed"、"timeout AND slot"
+        suite_id / env_id: 按测试套、环境过滤
+        start_time / end_time: 按用例执行时间过滤（datetime）
+        offset / limit: 分页
+
+    Returns:
+        list: 命中行 (result_id, task_id, case_id, suite_id, env_id, execute_time, line_no, snippet)
+    """
+    if not query or not query.strip():
+        raise SearchQueryError('检索内容不能为空')
+    if not os.path.exists(index_path()):
+        return []
+
+    conditions = ['log_lines MATCH ?']
+    params = [query]
+    for column, value in (('suite_id', suite_id), ('env_id', env_id)):
+        if value:
+            conditions.append(f'r.{column} = ?')
+            params.append(value)
+    if start_time is not None:
+        conditions.append('r.execute_time >= ?')
+        params.append(start_time.timestamp())
+    if end_time is not None:
+        conditions.append('r.execute_time <= ?')
+        params.append(end_time.timestamp())
+
+    sql = (
+        'SELECT r.result_id, r.task_id, r.case_id, r.suite_id, r.env_id, r.execute_time, log_lines.line_no, '
+        f"snippet(log_lines, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '...', 24) "
+        'FROM log_lines JOIN indexed_result AS r ON r.result_id = log_lines.result_id '
+        f'WHERE {" AND ".join(conditions)} '
+        'ORDER BY r.execute_time DESC, log_lines.result_id, log_lines.line_no LIMIT ? OFFSET ?'
+    )
+    params += [limit, offset]
+    with connect() as conn:
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise SearchQueryError(f'检索表达式无效: {str(e)}')
@@ -1,9 +1,28 @@
 from rest_framework import serializers
-from .models import CaseResult
+import re
+from .models import CaseResult, FailureCluster, ClassificationRule, CaseFlakinessStat, DailyResultRollup, ReportExport
+from .flakiness import get_scores
+from .classifier import regex_prefilter_error
 from execution_manager.models import TaskExecution
 from feature_testcase.models import TestCase
 
 
+class CaseResultListSerializer(serializers.ListSerializer):
+    """用例结果列表序列化器，序列化前一次性查出所有结果的不稳定度，避免逐条查询"""
+    
+    def to_representation(self, data):
+        results = list(data.all() if hasattr(data, 'all') else data)
+        task_ids = {result.task_id_id for result in results}
+        env_types = dict(
+            TaskExecution.objects.filter(id__in=task_ids).values_list('id', 'env_id__type')
+        ) if task_ids else {}
+        self.context['task_env_types'] = env_types
+        self.context['flakiness_scores'] = get_scores(
+            (result.case_id_id, env_types.get(result.task_id_id)) for result in results
+        )
+        return super().to_representation(results)
+
+
 class CaseResultSerializer(serializers.ModelSerializer):
     """用例结果序列化器"""
     # 嵌套序列化关联的任务和测试用例信息
@@ -22,14 +41,25 @@ class CaseResultSerializer(serializers.ModelSerializer):
     task_name = serializers.SerializerMethodField()
     case_name = serializers.SerializerMethodField()
     case_description = serializers.SerializerMethodField()
+    flakiness_score = serializers.SerializerMethodField()
     
     class Meta:
         model = CaseResult
+        list_serializer_class = CaseResultListSerializer
         fields = [
             'id', 'task_id', 'task_name', 'case_id', 'case_name', 'case_description',
-            'status', 'mark_status', 'analysis_note', 'execute_time', 'log_path'
+            'status', 'mark_status', 'analysis_note', 'execute_time', 'duration', 'log_path', 'failure_signature',
+            'suggested_mark_status', 'suggested_note', 'suggested_rule_id', 'flakiness_score'
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'failure_signature', 'suggested_mark_status', 'suggested_note', 'suggested_rule_id']
+    
+    def get_fields(self):
+        """日志路径决定服务端读取与处理哪个文件，只允许管理员（执行机上报使用的账号）写入"""
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and not request.user.is_staff:
+            fields['log_path'].read_only = True
+        return fields
     
     def get_task_name(self, obj):
         """获取任务名称"""
@@ -53,6 +83,115 @@ class CaseResultSerializer(serializers.ModelSerializer):
             return obj.case_id.description if obj.case_id else ''
         except:
             return ''
+    
+    def get_flakiness_score(self, obj):
+        """获取用例在该环境类型上的不稳定度（列表由 CaseResultListSerializer 预先批量查询）"""
+        if 'flakiness_scores' in self.context:
+            env_type = self.context['task_env_types'].get(obj.task_id_id)
+            return self.context['flakiness_scores'].get((obj.case_id_id, env_type))
+        env_type = obj.task_id.env_id.type
+        return get_scores([(obj.case_id_id, env_type)]).get((obj.case_id_id, env_type))
+
+
+class FailureClusterSerializer(serializers.ModelSerializer):
+    """失败聚类序列化器"""
+    
+    class Meta:
+        model = FailureCluster
+        fields = [
+            'id', 'signature', 'sample_text', 'sample_result_id', 'result_count',
+            'first_seen', 'last_seen', 'last_task_id', 'mark_status', 'analysis_note',
+            'create_time', 'update_time'
+        ]
+        read_only_fields = fields
+
+
+class FailureClusterMarkSerializer(serializers.Serializer):
+    """失败聚类标记请求序列化器"""
+    mark_status = serializers.ChoiceField(choices=CaseResult.MARK_STATUS_CHOICES)
+    analysis_note = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    overwrite = serializers.BooleanField(required=False, default=False)
+
+
+class ClassificationRuleSerializer(serializers.ModelSerializer):
+    """失败分类规则序列化器"""
+    
+    class Meta:
+        model = ClassificationRule
+        fields = [
+            'id', 'name', 'match_type', 'pattern', 'ignore_case', 'mark_status', 'note',
+            'priority', 'is_active', 'creator', 'create_time', 'update_time'
+        ]
+        read_only_fields = ['id', 'creator', 'create_time', 'update_time']
+    
+    def validate(self, attrs):
+        """正则规则需能够编译，并且可以预过滤（避免对每行日志单独执行）"""
+        match_type = attrs.get('match_type', getattr(self.instance, 'match_type', 'keyword'))
+        pattern = attrs.get('pattern', getattr(self.instance, 'pattern', ''))
+        ignore_case = attrs.get('ignore_case', getattr(self.instance, 'ignore_case', True))
+        if match_type == 'regex':
+            flags = re.IGNORECASE if ignore_case else 0
+            try:
+                re.compile(pattern, flags)
+            except re.error as e:
+                raise serializers.ValidationError({'pattern': f'正则表达式无效: {str(e)}'})
+            error = regex_prefilter_error(pattern, flags)
+            if error:
+                raise serializers.ValidationError({'pattern': error})
+        return attrs
+
+
+class CaseFlakinessStatSerializer(serializers.ModelSerializer):
+    """用例稳定性统计序列化器"""
+    case_name = serializers.CharField(source='case_id.case_name', read_only=True)
+    
+    class Meta:
+        model = CaseFlakinessStat
+        fields = [
+            'id', 'case_id', 'case_name', 'env_type', 'window', 'flip_count', 'fail_count',
+            'flakiness_score', 'current_fail_streak', 'max_fail_streak', 'total_runs',
+            'last_status', 'last_result_id', 'last_execute_time', 'update_time'
+        ]
+        read_only_fields = fields
+
+
+class DailyResultRollupSerializer(serializers.ModelSerializer):
+    """用例结果日汇总序列化器"""
+    
+    class Meta:
+        model = DailyResultRollup
+        fields = [
+            'id', 'day', 'suite_id', 'env_id', 'module_id', 'feature_id', 'total', 'success', 'failed',
+            'skipped', 'duration_sum', 'duration_count', 'update_time'
+        ]
+        read_only_fields = fields
+
+
+class ReportExportSerializer(serializers.ModelSerializer):
+    """报告导出序列化器，完成且未过期时返回带签名的下载链接"""
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportExport
+        fields = [
+            'id', 'task_id', 'format', 'status', 'total_rows', 'processed_rows', 'progress', 'file_size',
+            'error_message', 'creator', 'create_time', 'finish_time', 'expire_time', 'download_url'
+        ]
+        read_only_fields = [
+            'id', 'status', 'total_rows', 'processed_rows', 'progress', 'file_size',
+            'error_message', 'creator', 'create_time', 'finish_time', 'expire_time'
+        ]
+    
+    def get_download_url(self, obj):
+        from django.urls import reverse
+        from django.utils import timezone
+        from .export import make_token
+        
+        if obj.status != 'success' or (obj.expire_time and obj.expire_time <= timezone.now()):
+            return None
+        url = f"{reverse('reportexport-download', args=[obj.id])}?token={make_token(obj.id)}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 
 class TestSuiteCaseResultsSerializer(serializers.Serializer):
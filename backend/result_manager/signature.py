@@ -0,0 +1,243 @@
+"""失败特征提取与聚类
+
+从失败用例日志末尾提取失败信息（错误、断言、异常等行），去除时间戳、地址、IP、ID、
+数字等每次执行都会变化的内容后计算哈希，作为失败特征。特征相同的失败结果归入同一个
+FailureCluster，按类统计出现次数与首次/最近出现时间，分析人员按类标记即可。
+
+聚类是增量的：结果入库时只处理新结果并对聚类计数做增量更新，不重新扫描历史结果；
+未经入库流程的失败结果由定时任务按主键分批补齐。结果被删除、归档或清理前由 release_results
+从所属聚类中扣除计数。
+
+日志暂时无法读取（尚未上传、存储不可用）的结果保持未提取状态，由补齐任务在
+FAILURE_SIGNATURE_RETRY_HOURS 内重试，超过后记为空特征不再处理。
+"""
+import os
+import re
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from result_manager.log_reader import open_log, resolve_log_path, LogReadError
+from result_manager.models import CaseResult, FailureCluster
+
+logger = logging.getLogger('autotestweb')
+
+FAILURE_LINE = re.compile(
+    r'(?i)(error|fail|exception|assert|traceback|timeout|timed out|fatal|panic|abort|core dump)'
+)
+
+# 归一化规则，按顺序替换（先替换长模式，最后替换剩余数字）
+NORMALIZERS = [
+    (re.compile(r'\d{4}[-/]\d{2}[-/]\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'), '<TS>'),
+    (re.compile(r'\d{4}[-/]\d{2}[-/]\d{2}'), '<DATE>'),
+    (re.compile(r'\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?\b'), '<TIME>'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<UUID>'),
+    (re.compile(r'\b0[xX][0-9a-fA-F]+\b'), '<ADDR>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    # 本系统生成的ID，如 task-1a2b3c4d、case-result-1a2b3c4d
+    (re.compile(r'\b[a-zA-Z]+(?:-[a-zA-Z]+)*-[0-9a-fA-F]{6,}\b'), '<ID>'),
+    (re.compile(r'\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{8,}\b'), '<HEX>'),
+    (re.compile(r'\d+'), '<N>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def _setting(name, default):
+    """读取失败聚类相关配置，未配置时使用默认值"""
+    return getattr(settings, name, default)
+
+
+def normalize(line):
+    """去除失败信息中每次执行都会变化的内容"""
+    for pattern, replacement in NORMALIZERS:
+        line = pattern.sub(replacement, line)
+    return line.strip()
+
+
+def extract_failure_text(log_path):
+    """从日志末尾提取归一化后的失败信息，日志为空时返回 None
+
+    Raises:
+        LogReadError: 日志无法读取
+    """
+    path = resolve_log_path(log_path)
+    tail_bytes = int(_setting('FAILURE_SIGNATURE_TAIL_BYTES', 64 * 1024))
+    max_lines = int(_setting('FAILURE_SIGNATURE_MAX_LINES', 3))
+    try:
+        with open_log(path) as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - tail_bytes, 0))
+            lines = f.read().decode('utf-8', errors='replace').splitlines()
+    except OSError as e:
+        raise LogReadError(f'读取日志失败: {str(e)}')
+    if size > tail_bytes and lines:
+        # 第一行可能是被截断的半行
+        lines = lines[1:]
+    lines = [line for line in lines if line.strip()]
+    failure_lines = [line for line in lines if FAILURE_LINE.search(line)] or lines
+    normalized = [normalize(line) for line in failure_lines[-max_lines:]]
+    text = '\n'.join(line for line in normalized if line)
+    return text or None
+
+
+def compute_signature(text):
+    """计算失败特征哈希"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _add_to_cluster(signature, group):
+    """把一组新结果计入聚类（不存在时创建），返回聚类"""
+    updated = FailureCluster.objects.filter(signature=signature).update(
+        result_count=F('result_count') + len(group['results']),
+        first_seen=Least(F('first_seen'), Value(group['first_seen'])),
+        # UPDATE 中各表达式都基于更新前的值计算，last_task_id 与 last_seen 保持一致
+        last_task_id=Case(
+            When(last_seen__lt=group['last_seen'], then=Value(group['last_task_id'])),
+            default=F('last_task_id')
+        ),
+        last_seen=Greatest(F('last_seen'), Value(group['last_seen'])),
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                FailureCluster.objects.create(
+                    signature=signature,
+                    sample_text=group['text'],
+                    sample_result_id=group['results'][0].id,
+                    result_count=len(group['results']),
+                    first_seen=group['first_seen'],
+                    last_seen=group['last_seen'],
+                    last_task_id=group['last_task_id'],
+                )
+        except IntegrityError:
+            # 并发创建了同一聚类，改为增量更新
+            return _add_to_cluster(signature, group)
+    return FailureCluster.objects.get(signature=signature)
+
+
+def assign_signatures(case_results):
+    """为一批失败结果提取失败特征并增量更新聚类
+
+    已有特征且未变化的结果不会重复计数；特征变化（如日志被重新上传）时从原聚类中扣除。
+    日志无法读取时保留原特征；尚未提取过的结果在重试期内保持未提取，超过重试期记为空特征。
+
+    Returns:
+        dict: 处理的结果数与涉及的聚类数
+    """
+    retry_since = timezone.now() - timedelta(hours=float(_setting('FAILURE_SIGNATURE_RETRY_HOURS', 72)))
+    groups = {}
+    removed = defaultdict(int)
+    changed = []
+    for result in case_results:
+        if result.status != 'failed':
+            continue
+        try:
+            text = extract_failure_text(result.log_path)
+        except LogReadError as e:
+            if result.failure_signature is not None or result.execute_time >= retry_since:
+                logger.info(f'结果 {result.id} 日志暂时无法读取，稍后重试提取失败特征: {str(e)}')
+                continue
+            text = None
+        signature = compute_signature(text) if text else ''
+        if signature == result.failure_signature:
+            continue
+        if result.failure_signature:
+            removed[result.failure_signature] += 1
+        result.failure_signature = signature
+        changed.append(result)
+        if not signature:
+            continue
+        group = groups.setdefault(signature, {
+            'text': text, 'results': [], 'first_seen': result.execute_time,
+            'last_seen': result.execute_time, 'last_task_id': result.task_id_id,
+        })
+        group['results'].append(result)
+        group['first_seen'] = min(group['first_seen'], result.execute_time)
+        if result.execute_time >= group['last_seen']:
+            group['last_seen'] = result.execute_time
+            group['last_task_id'] = result.task_id_id
+
+    with transaction.atomic():
+        if changed:
+            CaseResult.objects.bulk_update(changed, ['failure_signature'], batch_size=500)
+        # 首次/最近出现时间不回退，只扣减计数
+        for signature, count in removed.items():
+            FailureCluster.objects.filter(signature=signature).update(result_count=F('result_count') - count)
+        for signature, group in groups.items():
+            cluster = _add_to_cluster(signature, group)
+            # 已分析过的聚类，新归入的未标记结果直接继承标记
+            if cluster.mark_status != 'none':
+                CaseResult.objects.filter(
+                    id__in=[result.id for result in group['results']], mark_status='none'
+                ).update(mark_status=cluster.mark_status, analysis_note=cluster.analysis_note)
+    return {'results': len(changed), 'clusters': len(groups)}
+
+
+def release_results(results):
+    """结果删除（含归档、清理）前从所属聚类中扣除计数，调用方负责事务
+
+    Args:
+        results: 即将删除的结果查询集
+    """
+    counts = (
+        results.exclude(failure_signature__isnull=True).exclude(failure_signature='')
+        .order_by().values('failure_signature').annotate(total=Count('id'))
+    )
+    for row in counts:
+        FailureCluster.objects.filter(signature=row['failure_signature']).update(
+            result_count=F('result_count') - row['total']
+        )
+
+
+def cluster_pending(batch_size=None, max_batches=None):
+    """按主键分批处理尚未提取失败特征的失败结果
+
+    Returns:
+        int: 处理的结果数
+    """
+    if batch_size is None:
+        batch_size = int(_setting('FAILURE_CLUSTER_BATCH_SIZE', 1000))
+    processed = 0
+    batches = 0
+    last_id = ''
+    while max_batches is None or batches < max_batches:
+        batch = list(
+            CaseResult.objects.filter(status='failed', failure_signature__isnull=True, id__gt=last_id)
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            break
+        assign_signatures(batch)
+        processed += len(batch)
+        batches += 1
+        last_id = batch[-1].id
+    if processed:
+        logger.info(f'失败特征补齐完成: {processed} 个结果')
+    return processed
+
+
+def mark_cluster(cluster, mark_status, analysis_note=None, overwrite=False):
+    """标记聚类，并用一条 UPDATE 同步标记该类下的结果
+
+    Args:
+        overwrite: 是否覆盖已单独标记过的结果（默认只更新无标记或待分析的结果）
+
+    Returns:
+        int: 更新的结果数
+    """
+    with transaction.atomic():
+        cluster.mark_status = mark_status
+        if analysis_note is not None:
+            cluster.analysis_note = analysis_note
+        cluster.save(update_fields=['mark_status', 'analysis_note', 'update_time'])
+        results = CaseResult.objects.filter(failure_signature=cluster.signature)
+        if not overwrite:
+            results = results.filter(mark_status__in=['none', 'to_analyze'])
+        return results.update(mark_status=mark_status, analysis_note=cluster.analysis_note)
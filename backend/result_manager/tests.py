@@ -3,12 +3,35 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
-from .models import CaseResult
+from .models import (
+    CaseResult, FailureCluster, ClassificationRule, CaseFlakinessStat, SuiteCaseIndex, SuiteRunHistory,
+    DailyResultRollup, RollupDirtyMark, ReportExport, ArchivedTask, ArchivedLog,
+    TaskResultRollup,
+)
+from .serializers import CaseResultSerializer
 from execution_manager.models import TaskExecution
 from test_suite.models import TestSuite
-from feature_testcase.models import TestCase
+from feature_testcase.models import TestCase, Feature
 from env_manager.models import Environment
+from common.tasks import (
+    ingest_case_log_task, finalize_task_execution_task, rollup_results_task, cleanup_temp_files,
+    export_report_task, backfill_run_history_task,
+)
+from result_manager import (
+    log_reader, search_index, signature, classifier, history, diff, rollup, trend, export, archive, purge,
+)
+from django.core.management import call_command
+# feature_testcase.models.TestCase 与 django.test.TestCase 同名，使用别名区分
+from django.test import TestCase as DjangoTestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
 import datetime
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import zlib
 
 
 class CaseResultModelTestCase(TestCase):
@@ -282,3 +305,1290 @@ class CaseResultAPITestCase(TestCase):
         
         # 应该返回401未授权状态码
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CaseLogReaderTestCase(DjangoTestCase):
+    """用例日志分段读取的测试用例"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(CASE_LOG_ROOT=self.tmp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.log_path = os.path.join(self.tmp_dir, 'case.log')
+        with open(self.log_path, 'w') as f:
+            for i in range(1, 2501):
+                f.write(f'line {i}\n')
+        
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='loguser', password='testpassword')
+        environment = Environment.objects.create(id='env-log-1', name='日志环境', type='FPGA', owner='loguser')
+        suite = TestSuite.objects.create(name='日志测试套', visible_scope='private', creator='loguser')
+        task = TaskExecution.objects.create(
+            id='task-log-1', suite_id=suite, env_id=environment, package_info='pkg',
+            status='success', start_time=timezone.now(), executor='loguser'
+        )
+        test_case = TestCase.objects.create(
+            id='testcase-log-1', case_id='CASE-LOG', case_name='日志用例', feature_id='feature-1',
+            pre_condition='-', steps='-', expected_result='-', creator='loguser'
+        )
+        self.case_result = CaseResult.objects.create(
+            id='case-result-log-1', task_id=task, case_id=test_case, status='failed',
+            execute_time=timezone.now(), log_path=self.log_path
+        )
+        self.client.login(username='loguser', password='testpassword')
+        self.url = reverse('caseresult-log', args=[self.case_result.id])
+    
+    @override_settings(LOG_INDEX_STRIDE=100)
+    def test_index_persisted_and_extended(self):
+        """入库时生成索引文件，日志追加后增量更新"""
+        self.assertEqual(ingest_case_log_task(self.case_result.id)['total_lines'], 2500)
+        index = log_reader.LineIndex.load(self.log_path + '.idx')
+        self.assertEqual(index.newlines, 2500)
+        self.assertEqual(len(index.offsets), 26)
+        with open(self.log_path, 'a') as f:
+            f.write('line 2501\nline 2502')
+        result = log_reader.read_lines(self.log_path, 2500, 10)
+        self.assertEqual(result['lines'], ['line 2500', 'line 2501', 'line 2502'])
+        self.assertEqual(result['total_lines'], 2502)
+        self.assertIsNone(result['next_line'])
+    
+    @override_settings(LOG_INDEX_STRIDE=100)
+    def test_line_range_seeks_from_index(self):
+        """按行读取从最近的索引点开始，不扫描之前的内容"""
+        log_reader.build_index(self.log_path)
+        with patch('result_manager.log_reader.LineIndex.extend') as extend:
+            result = log_reader.read_lines(self.log_path, 1234, 3)
+        extend.assert_not_called()
+        self.assertEqual(result['lines'], ['line 1234', 'line 1235', 'line 1236'])
+        self.assertEqual(result['next_line'], 1237)
+    
+    def test_log_api_modes(self):
+        """日志接口支持行范围、字节范围和末尾读取"""
+        response = self.client.get(self.url, {'start_line': 10, 'lines': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['lines'], ['line 10', 'line 11'])
+        
+        response = self.client.get(self.url, {'offset': 7, 'length': 7})
+        self.assertEqual(response.data['data']['content'], 'line 2\n')
+        self.assertEqual(response.data['data']['next_offset'], 14)
+        
+        response = self.client.get(self.url, {'tail': 2})
+        self.assertEqual(response.data['data']['lines'], ['line 2499', 'line 2500'])
+        self.assertEqual(response.data['data']['start_line'], 2499)
+        
+        response = self.client.get(self.url, {'raw': 'true', 'offset': 0, 'length': 14})
+        self.assertEqual(b''.join(response.streaming_content), b'line 1\nline 2\n')
+    
+    def test_log_api_errors(self):
+        """日志不存在或路径越界时返回错误"""
+        response = self.client.get(self.url, {'tail': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(CASE_LOG_ROOT=os.path.join(self.tmp_dir, 'other')):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        CaseResult.objects.filter(id=self.case_result.id).update(log_path=self.log_path + '.missing')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # 未配置日志根目录时不读取任何日志
+        CaseResult.objects.filter(id=self.case_result.id).update(log_path=self.log_path)
+        with override_settings(CASE_LOG_ROOT=None):
+            response = self.client.get(self.url, {'raw': 'true'})
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+            self.assertIsNone(ingest_case_log_task(self.case_result.id).get('total_lines'))
+        self.assertFalse(os.path.exists(self.log_path + '.idx'))
+
+    def test_log_path_admin_only(self):
+        """普通用户不能写入日志路径"""
+        response = self.client.patch(
+            reverse('caseresult-detail', args=[self.case_result.id]), {'log_path': '/etc/passwd'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CaseResult.objects.get(id=self.case_result.id).log_path, self.log_path)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.patch(
+            reverse('caseresult-detail', args=[self.case_result.id]), {'log_path': self.log_path + '.new'}, format='json'
+        )
+        self.assertEqual(CaseResult.objects.get(id=self.case_result.id).log_path, self.log_path + '.new')
+
+    @override_settings(LOG_INDEX_STRIDE=100, LOG_COMPACT_FRAME_SIZE=1024, LOG_COMPACT_MIN_BYTES=0)
+    def test_compacted_log_reads(self):
+        """压缩后删除原始日志，按行、按字节、末尾与原始下载结果不变，按行读取只解压涉及的帧"""
+        with open(self.log_path, 'rb') as f:
+            original = f.read()
+        log_reader.build_index(self.log_path)
+        summary = log_reader.compact_task_logs('task-log-1')
+        self.assertEqual(summary['compacted'], 1)
+        self.assertEqual(summary['raw_bytes'], len(original))
+        self.assertLess(summary['compressed_bytes'] * 3, summary['raw_bytes'])
+        self.assertFalse(os.path.exists(self.log_path))
+        self.assertFalse(os.path.exists(self.log_path + '.idx'))
+        self.assertTrue(os.path.exists(self.log_path + '.atz'))
+
+        with patch('result_manager.log_compress.zlib.decompress', wraps=zlib.decompress) as decompress:
+            result = log_reader.read_lines(self.log_path, 1234, 3)
+        self.assertEqual(result['lines'], ['line 1234', 'line 1235', 'line 1236'])
+        self.assertEqual(result['total_lines'], 2500)
+        self.assertLessEqual(decompress.call_count, 2)
+
+        response = self.client.get(self.url, {'tail': 2})
+        self.assertEqual(response.data['data']['lines'], ['line 2499', 'line 2500'])
+        response = self.client.get(self.url, {'offset': 7, 'length': 7})
+        self.assertEqual(response.data['data']['content'], 'line 2\n')
+        self.assertEqual(response.data['data']['size'], len(original))
+        response = self.client.get(self.url, {'raw': 'true'})
+        self.assertEqual(b''.join(response.streaming_content), original)
+        response = self.client.get(self.url, {'raw': 'true', 'offset': 1020, 'length': 20})
+        self.assertEqual(b''.join(response.streaming_content), original[1020:1040])
+        self.assertEqual(signature.extract_failure_text(self.log_path), 'line <N>\nline <N>\nline <N>')
+
+        with override_settings(LOG_SEARCH_INDEX_PATH=os.path.join(self.tmp_dir, 'search.sqlite3')):
+            self.assertEqual(search_index.index_task_logs('task-log-1', workers=1)['indexed_lines'], 2500)
+            self.assertEqual([row[6] for row in search_index.search('"line 1999"')], [1999])
+        # 已压缩的日志不再处理
+        self.assertEqual(log_reader.compact_task_logs('task-log-1')['compacted'], 0)
+
+    @override_settings(LOG_COMPACT_MIN_BYTES=0)
+    def test_compaction_requires_log_root(self):
+        """未配置日志根目录或路径不在根目录内时不压缩、不删除原始日志"""
+        with override_settings(CASE_LOG_ROOT=None):
+            self.assertEqual(log_reader.compact_task_logs('task-log-1')['compacted'], 0)
+        with override_settings(CASE_LOG_ROOT=os.path.join(self.tmp_dir, 'other')):
+            with self.assertRaises(log_reader.LogAccessError):
+                log_reader.compact_log(self.log_path)
+        self.assertTrue(os.path.exists(self.log_path))
+        self.assertFalse(os.path.exists(self.log_path + '.atz'))
+
+    def test_compaction_skips_small_logs(self):
+        """小于 LOG_COMPACT_MIN_BYTES 的日志保持原样"""
+        with override_settings(LOG_SEARCH_INDEX_PATH=os.path.join(self.tmp_dir, 'search.sqlite3')):
+            summary = finalize_task_execution_task('task-log-1')
+        self.assertEqual(summary['log_compaction']['compacted'], 0)
+        self.assertTrue(os.path.exists(self.log_path))
+        self.assertFalse(os.path.exists(self.log_path + '.atz'))
+
+
+class CaseLogSearchTestCase(DjangoTestCase):
+    """用例日志全文索引的测试用例"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(
+            LOG_SEARCH_INDEX_PATH=os.path.join(self.tmp_dir, 'search.sqlite3'), CASE_LOG_ROOT=self.tmp_dir
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.client = APIClient()
+        User.objects.create_user(username='searchuser', password='testpassword')
+        self.client.login(username='searchuser', password='testpassword')
+        suite = TestSuite.objects.create(name='检索测试套', visible_scope='private', creator='searchuser')
+        test_case = TestCase.objects.create(
+            id='testcase-search-1', case_id='CASE-SEARCH', case_name='检索用例', feature_id='feature-1',
+            pre_condition='-', steps='-', expected_result='-', creator='searchuser'
+        )
+        self.results = []
+        for i in range(3):
+            environment = Environment.objects.create(
+                id=f'env-search-{i}', name=f'检索环境{i}', type='FPGA', owner='searchuser'
+            )
+            task = TaskExecution.objects.create(
+                id=f'task-search-{i}', suite_id=suite, env_id=environment, package_info='pkg',
+                status='failed', start_time=timezone.now(), executor='searchuser'
+            )
+            log_path = os.path.join(self.tmp_dir, f'case-{i}.log')
+            with open(log_path, 'w') as f:
+                f.write('setup board\n\nsend MML command\n')
+                if i < 2:
+                    f.write('AssertionError: slot 3 not ready\n')
+            self.results.append(CaseResult.objects.create(
+                id=f'case-result-search-{i}', task_id=task, case_id=test_case, status='failed',
+                execute_time=timezone.now() - datetime.timedelta(days=i), log_path=log_path
+            ))
+        self.url = reverse('caseresult-search')
+    
+    def test_search_across_tasks(self):
+        """任务结束后建立索引，检索返回命中的任务、用例与行号"""
+        for i in range(3):
+            finalize_task_execution_task(f'task-search-{i}')
+        response = self.client.get(self.url, {'q': 'AssertionError'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        matches = response.data['data']['matches']
+        self.assertEqual([m['task_id'] for m in matches], ['task-search-0', 'task-search-1'])
+        self.assertEqual(matches[0]['line_no'], 4)
+        self.assertEqual(matches[0]['case_name'], '检索用例')
+        self.assertIn('[[AssertionError]]', matches[0]['snippet'])
+        
+        response = self.client.get(self.url, {'q': 'AssertionError', 'env_id': 'env-search-1'})
+        self.assertEqual([m['result_id'] for m in response.data['data']['matches']], ['case-result-search-1'])
+        start = (timezone.now() - datetime.timedelta(hours=1)).isoformat()
+        response = self.client.get(self.url, {'q': 'AssertionError', 'start_time': start})
+        self.assertEqual([m['task_id'] for m in response.data['data']['matches']], ['task-search-0'])
+    
+    def test_incremental_and_process_pool(self):
+        """日志追加后只索引新增内容，日志被替换后重建"""
+        summary = search_index.index_results(
+            CaseResult.objects.select_related('task_id'), workers=2
+        )
+        self.assertEqual(summary, {'indexed_results': 3, 'indexed_lines': 8})
+        with open(self.results[2].log_path, 'a') as f:
+            f.write('AssertionError: timeout\n')
+        summary = search_index.index_task_logs('task-search-2', workers=1)
+        self.assertEqual(summary, {'indexed_results': 1, 'indexed_lines': 1})
+        rows = search_index.search('timeout')
+        self.assertEqual([(row[0], row[6]) for row in rows], [('case-result-search-2', 4)])
+        
+        with open(self.results[0].log_path, 'w') as f:
+            f.write('rewritten\n')
+        search_index.index_task_logs('task-search-0')
+        self.assertEqual(search_index.search('slot AND ready', suite_id=self.results[1].task_id.suite_id_id)[0][0],
+                         'case-result-search-1')
+        self.assertEqual(len(search_index.search('AssertionError')), 2)
+    
+    def test_log_outside_root_not_indexed(self):
+        """日志路径（含符号链接指向）不在 CASE_LOG_ROOT 内时不读取、不索引"""
+        outside_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside_dir)
+        outside = os.path.join(outside_dir, 'secret.log')
+        with open(outside, 'w') as f:
+            f.write('SECRET token\n')
+        link = os.path.join(self.tmp_dir, 'link.log')
+        os.symlink(outside, link)
+        CaseResult.objects.filter(id='case-result-search-1').update(log_path=outside)
+        CaseResult.objects.filter(id='case-result-search-2').update(log_path=link)
+        summary = search_index.index_results(CaseResult.objects.select_related('task_id'), workers=1)
+        self.assertEqual(summary['indexed_results'], 1)
+        self.assertEqual(search_index.search('SECRET'), [])
+    
+    def test_invalid_query_and_deleted_result(self):
+        """非法检索表达式返回 400，已删除的结果不再返回"""
+        finalize_task_execution_task('task-search-0')
+        response = self.client.get(self.url, {'q': '"unterminated'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('caseresult-detail', args=['case-result-search-0']))
+        self.assertEqual(search_index.search('AssertionError'), [])
+
+
+class FailureClusterTestCase(DjangoTestCase):
+    """失败特征提取与聚类的测试用例"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(CASE_LOG_ROOT=self.tmp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        User.objects.create_user(username='clusteruser', password='testpassword')
+        self.client.login(username='clusteruser', password='testpassword')
+        environment = Environment.objects.create(id='env-cluster-1', name='聚类环境', type='FPGA', owner='clusteruser')
+        suite = TestSuite.objects.create(name='聚类测试套', visible_scope='private', creator='clusteruser')
+        self.tasks = [
+            TaskExecution.objects.create(
+                id=f'task-cluster-{i}', suite_id=suite, env_id=environment, package_info='pkg',
+                status='failed', start_time=timezone.now(), executor='clusteruser'
+            )
+            for i in range(3)
+        ]
+        self.test_case = TestCase.objects.create(
+            id='testcase-cluster-1', case_id='CASE-CLUSTER', case_name='聚类用例', feature_id='feature-1',
+            pre_condition='-', steps='-', expected_result='-', creator='clusteruser'
+        )
+    
+    def _result(self, index, content, status='failed'):
+        log_path = os.path.join(self.tmp_dir, f'case-{index}.log')
+        with open(log_path, 'w') as f:
+            f.write(content)
+        return CaseResult.objects.create(
+            id=f'case-result-cluster-{index}', task_id=self.tasks[index % 3], case_id=self.test_case,
+            status=status, execute_time=timezone.now() + datetime.timedelta(minutes=index), log_path=log_path
+        )
+    
+    def test_normalize_volatile_content(self):
+        """时间戳、地址、IP、ID 和数字被归一化"""
+        self.assertEqual(
+            signature.normalize('2024-05-01 12:00:01.123 ERROR task-1a2b3c4d read 0x7ffe1234 from 10.0.0.5:23 failed 42'),
+            '<TS> ERROR <ID> read <ADDR> from <IP> failed <N>'
+        )
+    
+    def test_incremental_clustering(self):
+        """失败特征相同的结果归为一类，计数增量更新，重复处理不重复计数"""
+        first = self._result(0, 'boot ok\n10:00:01 ERROR slot 3 timeout at 0xdeadbeef\n')
+        second = self._result(1, 'boot ok\n11:22:33 ERROR slot 7 timeout at 0x12345678\n')
+        third = self._result(2, 'AssertionError: expected 1 got 2\n')
+        passed = self._result(3, 'ok\n', status='success')
+        for result in (first, second, third, passed):
+            ingest_case_log_task(result.id)
+        ingest_case_log_task(first.id)
+        
+        self.assertEqual(FailureCluster.objects.count(), 2)
+        cluster = FailureCluster.objects.get(signature=CaseResult.objects.get(id=first.id).failure_signature)
+        self.assertEqual(cluster.result_count, 2)
+        self.assertEqual(cluster.sample_text, '<TIME> ERROR slot <N> timeout at <ADDR>')
+        self.assertEqual(cluster.last_task_id, 'task-cluster-1')
+        self.assertIsNone(CaseResult.objects.get(id=passed.id).failure_signature)
+        
+        # 日志被替换后特征变化，从原聚类中扣除
+        with open(first.log_path, 'w') as f:
+            f.write('AssertionError: expected 5 got 6\n')
+        ingest_case_log_task(first.id)
+        cluster.refresh_from_db()
+        self.assertEqual(cluster.result_count, 1)
+        self.assertEqual(FailureCluster.objects.get(signature=CaseResult.objects.get(id=third.id).failure_signature)
+                         .result_count, 2)
+    
+    def test_cluster_pending_backfill(self):
+        """未经入库流程的失败结果由补齐任务分批处理，无法读取日志的结果在重试期内重试，之后不再处理"""
+        for i in range(5):
+            self._result(i, f'FATAL: link down on port {i}\n')
+        missing = CaseResult.objects.create(
+            id='case-result-cluster-missing', task_id=self.tasks[0], case_id=self.test_case, status='failed',
+            execute_time=timezone.now(), log_path=os.path.join(self.tmp_dir, 'missing.log')
+        )
+        self.assertEqual(signature.cluster_pending(batch_size=2), 6)
+        self.assertEqual(signature.cluster_pending(batch_size=2), 1)
+        self.assertEqual(FailureCluster.objects.get().result_count, 5)
+        self.assertIsNone(CaseResult.objects.get(id=missing.id).failure_signature)
+        
+        # 日志补传后重试成功
+        with open(missing.log_path, 'w') as f:
+            f.write('FATAL: link down on port 9\n')
+        self.assertEqual(signature.cluster_pending(batch_size=2), 1)
+        self.assertEqual(FailureCluster.objects.get().result_count, 6)
+        
+        CaseResult.objects.filter(id=missing.id).update(
+            failure_signature=None, log_path=os.path.join(self.tmp_dir, 'gone.log'),
+            execute_time=timezone.now() - datetime.timedelta(hours=73)
+        )
+        self.assertEqual(signature.cluster_pending(batch_size=2), 1)
+        self.assertEqual(signature.cluster_pending(batch_size=2), 0)
+        self.assertEqual(CaseResult.objects.get(id=missing.id).failure_signature, '')
+    
+    def test_count_released_on_delete(self):
+        """结果删除、归档、清理或随任务删除后从所属聚类中扣除计数"""
+        results = [self._result(i, 'ERROR: link down\n') for i in range(6)]
+        signature.cluster_pending()
+        cluster = FailureCluster.objects.get()
+        self.assertEqual(cluster.result_count, 6)
+        with self.settings(ARCHIVE_ROOT=os.path.join(self.tmp_dir, 'archive'),
+                           LOG_SEARCH_INDEX_PATH=os.path.join(self.tmp_dir, 'search.sqlite3')):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(reverse('caseresult-detail', args=[results[0].id]))
+            cluster.refresh_from_db()
+            self.assertEqual(cluster.result_count, 5)
+            archive.archive_task_results(self.tasks[1])
+            cluster.refresh_from_db()
+            self.assertEqual(cluster.result_count, 3)
+            purge.purge_task(self.tasks[2], batch_size=1, pause=0)
+            cluster.refresh_from_db()
+            self.assertEqual(cluster.result_count, 1)
+            self.client.delete(reverse('taskexecution-detail', args=[self.tasks[0].id]))
+        cluster.refresh_from_db()
+        self.assertEqual(cluster.result_count, 0)
+    
+    def test_mark_cluster_api(self):
+        """按聚类标记同步到该类下的结果，新归入的结果继承标记"""
+        first = self._result(0, 'ERROR: DSP BRD returned 1001\n')
+        self._result(1, 'ERROR: DSP BRD returned 1002\n')
+        CaseResult.objects.filter(id='case-result-cluster-1').update(mark_status='located')
+        signature.cluster_pending()
+        cluster = FailureCluster.objects.get()
+        
+        url = reverse('failurecluster-mark', args=[cluster.id])
+        response = self.client.post(url, {'mark_status': 'no_need', 'analysis_note': '已知单板问题'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['updated_results'], 1)
+        self.assertEqual(CaseResult.objects.get(id=first.id).mark_status, 'no_need')
+        self.assertEqual(CaseResult.objects.get(id='case-result-cluster-1').mark_status, 'located')
+        
+        third = self._result(2, 'ERROR: DSP BRD returned 1003\n')
+        ingest_case_log_task(third.id)
+        third.refresh_from_db()
+        self.assertEqual((third.mark_status, third.analysis_note), ('no_need', '已知单板问题'))
+        
+        response = self.client.get(reverse('failurecluster-results', args=[cluster.id]))
+        self.assertEqual(response.data['count'], 3)
+        response = self.client.post(url, {'mark_status': 'invalid'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ClassificationRuleTestCase(DjangoTestCase):
+    """失败自动分类规则引擎的测试用例"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(CASE_LOG_ROOT=self.tmp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        User.objects.create_superuser(username='ruleadmin', password='adminpassword')
+        self.client.login(username='ruleadmin', password='adminpassword')
+        environment = Environment.objects.create(id='env-rule-1', name='规则环境', type='FPGA', owner='ruleadmin')
+        suite = TestSuite.objects.create(name='规则测试套', visible_scope='private', creator='ruleadmin')
+        self.task = TaskExecution.objects.create(
+            id='task-rule-1', suite_id=suite, env_id=environment, package_info='pkg',
+            status='failed', start_time=timezone.now(), executor='ruleadmin'
+        )
+        self.test_case = TestCase.objects.create(
+            id='testcase-rule-1', case_id='CASE-RULE', case_name='规则用例', feature_id='feature-1',
+            pre_condition='-', steps='-', expected_result='-', creator='ruleadmin'
+        )
+    
+    def _rule(self, pattern, match_type='keyword', priority=0, mark_status='located', **kwargs):
+        return ClassificationRule.objects.create(
+            name=pattern, pattern=pattern, match_type=match_type, priority=priority,
+            mark_status=mark_status, note=f'命中 {pattern}', **kwargs
+        )
+    
+    def test_aho_corasick(self):
+        """自动机命中所有重叠的关键字"""
+        automaton = classifier.AhoCorasick([('he', 1), ('she', 2), ('his', 3), ('hers', 4)])
+        self.assertEqual(automaton.search('ushers'), {1, 2, 4})
+        self.assertEqual(automaton.search('nothing'), set())
+    
+    def test_regex_literal_prefilter(self):
+        """正则规则提取必须出现的字面量，分支结构不提取"""
+        self.assertEqual(classifier.analyze_regex(r'slot \d+ Timeout'), (' timeout', True))
+        self.assertEqual(classifier.analyze_regex(r'(oom|panic)'), (None, True))
+        self.assertEqual(classifier.analyze_regex(r'(?P<a>x)(?P=a)'), (None, False))
+        self.assertIsNone(classifier.regex_prefilter_error(r'(oom|panic)'))
+        self.assertIsNotNone(classifier.regex_prefilter_error(r'(?P<a>x)(?P=a)'))
+    
+    def test_inline_global_flags(self):
+        """开头带全局内联标志的正则移入分组标志后参与合并预过滤"""
+        url = reverse('classificationrule-list')
+        response = self.client.post(url, {
+            'name': '内联标志', 'match_type': 'regex', 'pattern': r'(?i)\w+\s+\d', 'mark_status': 'located'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        verbose = self._rule(r'(?x) \d{2} - \d{2}  # 槽位范围', match_type='regex', priority=5, ignore_case=False)
+        matcher = classifier.get_matcher()
+        self.assertEqual(matcher.match_lines(['boot', 'slots 03-04']), verbose)
+        self.assertEqual(matcher.match_lines(['ERROR 42']).name, '内联标志')
+        response = self.client.post(reverse('classificationrule-match'), {'text': 'link 7\n'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['name'], '内联标志')
+    
+    def test_unfilterable_rule_skipped(self):
+        """无法预过滤的已保存正则规则编译时跳过，不对每行单独执行"""
+        self._rule(r'(\w)\1', match_type='regex', priority=10)
+        rule = self._rule('link down', priority=1)
+        with self.assertLogs('autotestweb', level='WARNING'):
+            matcher = classifier.get_matcher()
+        self.assertEqual(matcher.match_lines(['aa', 'link down']), rule)
+    
+    def test_priority_and_matching(self):
+        """同一日志命中多条规则时取优先级最高的，区分大小写的关键字按原文确认"""
+        low = self._rule('link down', priority=1, mark_status='no_need')
+        high = self._rule(r'slot \d+ timeout', match_type='regex', priority=10)
+        self._rule('FATAL', ignore_case=False, priority=20)
+        self._rule(r'(oom|segfault)', match_type='regex', priority=5, mark_status='to_analyze')
+        matcher = classifier.get_matcher()
+        self.assertEqual(matcher.match_lines(['boot', 'Link Down on port 2']), low)
+        self.assertEqual(matcher.match_lines(['Link down', 'SLOT 3 TIMEOUT']), high)
+        self.assertIsNone(matcher.match_lines(['fatal error in lowercase', 'slot x timeout']))
+        self.assertEqual(matcher.match_lines(['kernel: segfault at 0']).mark_status, 'to_analyze')
+    
+    def test_matcher_recompiled_on_change(self):
+        """规则变更后重新编译"""
+        rule = self._rule('watchdog reset')
+        self.assertEqual(classifier.get_matcher().match_lines(['watchdog reset']), rule)
+        rule.soft_delete()
+        self.assertIsNone(classifier.get_matcher().match_lines(['watchdog reset']))
+    
+    def test_ingest_writes_suggestion(self):
+        """失败结果入库时写入建议标记，不覆盖人工标记"""
+        self._rule('DSP BRD returned', mark_status='no_need')
+        log_path = os.path.join(self.tmp_dir, 'case.log')
+        with open(log_path, 'w') as f:
+            f.write('setup\n' * 1000 + 'ERROR: DSP BRD returned 1001\n')
+        result = CaseResult.objects.create(
+            id='case-result-rule-1', task_id=self.task, case_id=self.test_case, status='failed',
+            execute_time=timezone.now(), log_path=log_path
+        )
+        ingest_case_log_task(result.id)
+        result.refresh_from_db()
+        self.assertEqual(result.suggested_mark_status, 'no_need')
+        self.assertEqual(result.suggested_note, '命中 DSP BRD returned')
+        self.assertEqual(result.mark_status, 'none')
+    
+    def test_rule_api(self):
+        """规则接口校验正则并支持调试匹配"""
+        url = reverse('classificationrule-list')
+        response = self.client.post(url, {
+            'name': '无效正则', 'match_type': 'regex', 'pattern': '(unclosed', 'mark_status': 'located'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {
+            'name': '重复字符', 'match_type': 'regex', 'pattern': r'(\w)\1', 'mark_status': 'located'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('固定文本', str(response.data['pattern']))
+        response = self.client.post(url, {
+            'name': '板卡超时', 'match_type': 'regex', 'pattern': r'slot \d+ timeout', 'mark_status': 'located'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creator'], 'ruleadmin')
+        response = self.client.post(reverse('classificationrule-match'), {'text': 'a\nslot 4 timeout\n'}, format='json')
+        self.assertEqual(response.data['data']['name'], '板卡超时')
+
+
+class CaseFlakinessTestCase(DjangoTestCase):
+    """用例稳定性统计的测试用例"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(username='flakyuser', password='testpassword')
+        self.client.login(username='flakyuser', password='testpassword')
+        suite = TestSuite.objects.create(name='稳定性测试套', visible_scope='private', creator='flakyuser')
+        self.tasks = {}
+        for env_type in ('FPGA', 'QEMU'):
+            environment = Environment.objects.create(
+                id=f'env-flaky-{env_type.lower()}', name=f'{env_type}环境', type=env_type, owner='flakyuser'
+            )
+            self.tasks[env_type] = TaskExecution.objects.create(
+                id=f'task-flaky-{env_type.lower()}', suite_id=suite, env_id=environment, package_info='pkg',
+                status='success', start_time=timezone.now(), executor='flakyuser'
+            )
+        self.cases = [
+            TestCase.objects.create(
+                id=f'testcase-flaky-{i}', case_id=f'CASE-FLAKY-{i}', case_name=f'稳定性用例{i}', feature_id='feature-1',
+                pre_condition='-', steps='-', expected_result='-', creator='flakyuser'
+            )
+            for i in range(2)
+        ]
+        self.sequence = 0
+    
+    def _ingest(self, case, statuses, env_type='FPGA'):
+        for result_status in statuses:
+            self.sequence += 1
+            result = CaseResult.objects.create(
+                id=f'case-result-flaky-{self.sequence}', task_id=self.tasks[env_type], case_id=case,
+                status=result_status, execute_time=timezone.now(), log_path='/nonexistent/case.log'
+            )
+            ingest_case_log_task(result.id, created=True)
+    
+    @override_settings(FLAKINESS_WINDOW=4)
+    def test_sliding_window(self):
+        """窗口淘汰旧结果时同步扣减翻转与失败次数"""
+        self._ingest(self.cases[0], ['success', 'failed', 'success', 'failed', 'skipped'])
+        stat = CaseFlakinessStat.objects.get(case_id=self.cases[0], env_type='FPGA')
+        self.assertEqual((stat.window, stat.flip_count, stat.flakiness_score), ('PFPF', 3, 1.0))
+        self._ingest(self.cases[0], ['failed', 'failed', 'failed'])
+        stat.refresh_from_db()
+        self.assertEqual((stat.window, stat.flip_count, stat.fail_count), ('FFFF', 0, 4))
+        self.assertEqual((stat.current_fail_streak, stat.max_fail_streak, stat.total_runs), (4, 4, 7))
+        self.assertEqual(stat.last_status, 'failed')
+        # 更新日志路径触发的重新处理不重复计数
+        ingest_case_log_task('case-result-flaky-1')
+        stat.refresh_from_db()
+        self.assertEqual(stat.total_runs, 7)
+    
+    def test_flakiest_cases_api_and_annotation(self):
+        """列出最不稳定的用例，结果列表带出不稳定度且不逐条查询"""
+        self._ingest(self.cases[0], ['success', 'failed'] * 3)
+        self._ingest(self.cases[1], ['success'] * 3 + ['failed'] * 3)
+        self._ingest(self.cases[0], ['success'] * 6, env_type='QEMU')
+        
+        response = self.client.get(reverse('caseflakiness-list'))
+        ranking = [(row['case_id'], row['env_type']) for row in response.data['results']]
+        self.assertEqual(ranking[0], ('testcase-flaky-0', 'FPGA'))
+        self.assertEqual(response.data['results'][0]['flakiness_score'], 1.0)
+        response = self.client.get(reverse('caseflakiness-list'), {'env_type': 'QEMU'})
+        self.assertEqual(response.data['count'], 1)
+        response = self.client.get(reverse('caseflakiness-list'), {'min_runs': 10})
+        self.assertEqual(response.data['count'], 0)
+        
+        results = CaseResult.objects.filter(id__in=['case-result-flaky-6', 'case-result-flaky-12', 'case-result-flaky-13'])
+        # 结果、任务环境类型、不稳定度各一次查询，每行另有任务名称、用例名称两次原有查询
+        with self.assertNumQueries(3 + 2 * 3):
+            data = CaseResultSerializer(results, many=True).data
+        scores = {row['id']: row['flakiness_score'] for row in data}
+        self.assertEqual(scores, {'case-result-flaky-6': 1.0, 'case-result-flaky-12': 0.2, 'case-result-flaky-13': 0.0})
+        response = self.client.get(reverse('caseresult-detail', args=['case-result-flaky-6']))
+        self.assertEqual(response.data['flakiness_score'], 1.0)
+
+
+class SuiteRunHistoryTestCase(DjangoTestCase):
+    """测试套执行历史矩阵的测试用例"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(username='historyuser', password='testpassword')
+        self.client.login(username='historyuser', password='testpassword')
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(
+            LOG_SEARCH_INDEX_PATH=os.path.join(self.tmp_dir, 'search.sqlite3'), CASE_LOG_ROOT=self.tmp_dir
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.suite = TestSuite.objects.create(name='历史测试套', visible_scope='private', creator='historyuser')
+        self.environment = Environment.objects.create(
+            id='env-history', name='历史环境', type='FPGA', owner='historyuser'
+        )
+        self.cases = [
+            TestCase.objects.create(
+                id=f'testcase-history-{i}', case_id=f'CASE-HISTORY-{i}', case_name=f'历史用例{i}',
+                feature_id='feature-1', pre_condition='-', steps='-', expected_result='-', creator='historyuser'
+            )
+            for i in range(4)
+        ]
+        self.start = timezone.now() - datetime.timedelta(days=1)
+    
+    def _run(self, index, statuses):
+        """创建一个已结束的任务，statuses 为 {用例下标: 状态}"""
+        task = TaskExecution.objects.create(
+            id=f'task-history-{index}', suite_id=self.suite, env_id=self.environment, package_info='pkg',
+            status='success', start_time=self.start + datetime.timedelta(hours=index), executor='historyuser'
+        )
+        for case_index, result_status in statuses.items():
+            CaseResult.objects.create(
+                id=f'case-result-history-{index}-{case_index}', task_id=task, case_id=self.cases[case_index],
+                status=result_status, execute_time=task.start_time, log_path='/nonexistent/case.log'
+            )
+        return task
+    
+    def test_pack_on_finalize(self):
+        """任务结束时写入历史行，新用例追加列位置，已有列位置不变"""
+        self._run(0, {1: 'success', 0: 'failed'})
+        summary = finalize_task_execution_task('task-history-0')
+        self.assertEqual(summary['history_columns'], 2)
+        self._run(1, {2: 'skipped', 0: 'success'})
+        finalize_task_execution_task('task-history-1')
+        
+        positions = dict(SuiteCaseIndex.objects.filter(suite_id=self.suite).values_list('case_id', 'position'))
+        self.assertEqual(positions, {'testcase-history-0': 0, 'testcase-history-1': 1, 'testcase-history-2': 2})
+        self.assertEqual(bytes(SuiteRunHistory.objects.get(task_id='task-history-0').statuses), b'\x02\x01')
+        self.assertEqual(bytes(SuiteRunHistory.objects.get(task_id='task-history-1').statuses), b'\x01\x00\x03')
+    
+    def test_matrix_api(self):
+        """矩阵按执行时间倒序返回，未写入历史的已结束任务由后台补齐，窗口内未执行的用例列被隐藏"""
+        self._run(0, {0: 'success', 3: 'failed'})
+        finalize_task_execution_task('task-history-0')
+        self._run(1, {0: 'failed', 1: 'success'})
+        self._run(2, {0: 'success', 1: 'skipped', 2: 'failed'})
+        for index in (1, 2):
+            finalize_task_execution_task(f'task-history-{index}')
+        # 任务 3 结束处理未执行，查询时不在请求中补齐，只提交后台任务
+        self._run(3, {1: 'failed'})
+        
+        url = reverse('caseresult-history-matrix', args=[self.suite.id])
+        with patch('result_manager.views.backfill_run_history_task.delay') as mock_backfill:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(url, {'runs': 3})
+        self.assertTrue(response.data['data']['backfilling'])
+        self.assertEqual([run['task_id'] for run in response.data['data']['runs']], ['task-history-2', 'task-history-1', 'task-history-0'])
+        mock_backfill.assert_called_once_with(self.suite.id)
+        self.assertFalse(SuiteRunHistory.objects.filter(task_id='task-history-3').exists())
+        
+        backfill_run_history_task(self.suite.id)
+        response = self.client.get(url, {'runs': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertFalse(data['backfilling'])
+        self.assertEqual([run['task_id'] for run in data['runs']], ['task-history-3', 'task-history-2', 'task-history-1'])
+        # 用例 3 只在最早的任务中执行过，不在最近 3 次的窗口内
+        self.assertEqual([case['case_id'] for case in data['cases']],
+                         ['testcase-history-0', 'testcase-history-1', 'testcase-history-2'])
+        self.assertEqual(data['cases'][0]['case_name'], '历史用例0')
+        self.assertEqual([run['cells'] for run in data['runs']], ['-F-', 'PSF', 'FP-'])
+        
+        response = self.client.get(url, {'all_cases': 'true'})
+        self.assertEqual([run['cells'] for run in response.data['data']['runs']], ['--F-', 'P-SF', 'F-P-', 'PF--'])
+        
+        # 历史写入后，矩阵查询的次数与执行次数、用例数无关
+        with self.assertNumQueries(3):
+            history.build_matrix(self.suite.id, runs=100)
+        
+        response = self.client.get(reverse('caseresult-history-matrix', args=['suite-missing']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaskDiffTestCase(DjangoTestCase):
+    """任务结果对比的测试用例"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(username='diffuser', password='testpassword')
+        self.client.login(username='diffuser', password='testpassword')
+        self.suite = TestSuite.objects.create(name='对比测试套', visible_scope='private', creator='diffuser')
+        self.environment = Environment.objects.create(id='env-diff', name='对比环境', type='FPGA', owner='diffuser')
+        self.cases = [
+            TestCase.objects.create(
+                id=f'testcase-diff-{i}', case_id=f'CASE-DIFF-{i}', case_name=f'对比用例{i}',
+                feature_id='feature-1', pre_condition='-', steps='-', expected_result='-', creator='diffuser'
+            )
+            for i in range(6)
+        ]
+        self.start = timezone.now() - datetime.timedelta(days=1)
+        self.url = reverse('caseresult-diff-tasks')
+    
+    def _run(self, index, statuses, task_status='success'):
+        task = TaskExecution.objects.create(
+            id=f'task-diff-{index}', suite_id=self.suite, env_id=self.environment, package_info='pkg',
+            status=task_status, start_time=self.start + datetime.timedelta(hours=index), executor='diffuser'
+        )
+        for case_index, result_status in statuses.items():
+            CaseResult.objects.create(
+                id=f'case-result-diff-{index}-{case_index}', task_id=task, case_id=self.cases[case_index],
+                status=result_status, execute_time=task.start_time, log_path='/nonexistent/case.log'
+            )
+        return task
+    
+    def test_categories(self):
+        """按用例最近一次结果归类，同一任务内重跑的用例以最后一次为准"""
+        self._run(0, {0: 'success', 1: 'failed', 2: 'failed', 3: 'success', 4: 'success'})
+        target = self._run(1, {0: 'failed', 1: 'success', 2: 'failed', 3: 'success', 5: 'success'})
+        CaseResult.objects.create(
+            id='case-result-diff-1-3-rerun', task_id=target, case_id=self.cases[3], status='failed',
+            execute_time=target.start_time + datetime.timedelta(minutes=5), log_path='/nonexistent/case.log'
+        )
+        result = diff.compute_diff('task-diff-0', 'task-diff-1')
+        categories = {name: [row[0] for row in rows] for name, rows in result['categories'].items()}
+        self.assertEqual(categories, {
+            'newly_failing': ['testcase-diff-0', 'testcase-diff-3'],
+            'newly_passing': ['testcase-diff-1'],
+            'still_failing': ['testcase-diff-2'],
+            'added': ['testcase-diff-5'],
+            'removed': ['testcase-diff-4'],
+        })
+        self.assertEqual(result['categories']['newly_failing'][1][3], 'case-result-diff-1-3-rerun')
+        self.assertEqual(result['unchanged'], 0)
+    
+    def test_diff_api_last_green_and_pagination(self):
+        """不传基准任务时与上一次全部通过的任务对比，每一类分别分页"""
+        self._run(0, {0: 'success', 1: 'success', 2: 'success'})
+        self._run(1, {0: 'failed', 1: 'success', 2: 'success'})
+        self._run(2, {0: 'failed', 1: 'failed', 2: 'failed'})
+        
+        response = self.client.get(self.url, {'target_task': 'task-diff-2', 'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['base_task']['id'], 'task-diff-0')
+        self.assertEqual(data['summary']['newly_failing'], 3)
+        newly_failing = data['categories']['newly_failing']
+        self.assertEqual((newly_failing['count'], newly_failing['has_more']), (3, True))
+        self.assertEqual(newly_failing['results'][0]['case_name'], '对比用例0')
+        
+        response = self.client.get(self.url, {
+            'target_task': 'task-diff-2', 'base_task': 'task-diff-1', 'category': 'newly_failing', 'page': 2, 'page_size': 1
+        })
+        data = response.data['data']
+        self.assertEqual(list(data['categories']), ['newly_failing'])
+        self.assertEqual(data['categories']['newly_failing']['results'][0]['case_id'], 'testcase-diff-2')
+        self.assertEqual(data['summary']['still_failing'], 1)
+        
+        response = self.client.get(self.url, {'target_task': 'task-diff-0'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.url, {'target_task': 'task-diff-2', 'category': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_only_finished_tasks(self):
+        """两个任务都已结束时缓存对比结果"""
+        base = self._run(0, {0: 'success'})
+        target = self._run(1, {0: 'failed'}, task_status='running')
+        self.assertEqual(len(diff.get_diff(base, target)['categories']['newly_failing']), 1)
+        self._run(2, {})
+        CaseResult.objects.create(
+            id='case-result-diff-1-1', task_id=target, case_id=self.cases[1], status='failed',
+            execute_time=target.start_time, log_path='/nonexistent/case.log'
+        )
+        # 运行中的任务不缓存，新结果立即可见
+        self.assertEqual(len(diff.get_diff(base, target)['categories']['added']), 1)
+        
+        target.status = 'failed'
+        target.save()
+        diff.get_diff(base, target)
+        with self.assertNumQueries(0):
+            cached = diff.get_diff(base, target)
+        self.assertEqual(len(cached['categories']['added']), 1)
+
+
+class DailyResultRollupTestCase(DjangoTestCase):
+    """用例结果日汇总的测试用例"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(username='rollupuser', password='testpassword')
+        self.client.login(username='rollupuser', password='testpassword')
+        self.suite = TestSuite.objects.create(name='汇总测试套', visible_scope='private', creator='rollupuser')
+        self.environment = Environment.objects.create(id='env-rollup', name='汇总环境', type='FPGA', owner='rollupuser')
+        self.task = TaskExecution.objects.create(
+            id='task-rollup', suite_id=self.suite, env_id=self.environment, package_info='pkg',
+            status='running', start_time=timezone.now(), executor='rollupuser'
+        )
+        for i, module_id in enumerate(('module-a', 'module-b')):
+            Feature.objects.create(id=f'feature-rollup-{i}', feature_name=f'汇总特性{i}', module_id=module_id, creator='rollupuser')
+        self.cases = [
+            TestCase.objects.create(
+                id=f'testcase-rollup-{i}', case_id=f'CASE-ROLLUP-{i}', case_name=f'汇总用例{i}',
+                feature_id=f'feature-rollup-{i % 2}', pre_condition='-', steps='-', expected_result='-',
+                creator='rollupuser'
+            )
+            for i in range(3)
+        ]
+        self.today = rollup.day_of(timezone.now())
+    
+    def _post(self, case_index, result_status, execute_time, duration=None):
+        response = self.client.post(reverse('caseresult-list'), {
+            'task_id': self.task.id, 'case_id': self.cases[case_index].id, 'status': result_status,
+            'execute_time': execute_time.isoformat(), 'log_path': '/nonexistent/case.log', 'duration': duration,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+    
+    def test_incremental_rollup_with_late_data(self):
+        """结果写入后标记所属分组，补传的历史结果与删除的结果都会重算对应日期"""
+        now = timezone.now()
+        self._post(0, 'success', now, duration=2.0)
+        self._post(1, 'failed', now, duration=4.0)
+        self._post(2, 'skipped', now)
+        self.assertEqual(RollupDirtyMark.objects.count(), 1)
+        self.assertEqual(rollup_results_task(), 1)
+        self.assertFalse(RollupDirtyMark.objects.exists())
+        
+        by_feature = {row.feature_id: row for row in DailyResultRollup.objects.filter(day=self.today)}
+        self.assertEqual(by_feature['feature-rollup-0'].module_id, 'module-a')
+        self.assertEqual((by_feature['feature-rollup-0'].total, by_feature['feature-rollup-0'].success,
+                          by_feature['feature-rollup-0'].skipped), (2, 1, 1))
+        self.assertEqual((by_feature['feature-rollup-1'].failed, by_feature['feature-rollup-1'].duration_sum), (1, 4.0))
+        
+        # 补传三天前的结果，只重算该日期
+        late_id = self._post(0, 'failed', now - datetime.timedelta(days=3))
+        self.assertEqual(rollup_results_task(), 1)
+        late_day = self.today - datetime.timedelta(days=3)
+        self.assertEqual(DailyResultRollup.objects.get(day=late_day).failed, 1)
+        
+        self.client.delete(reverse('caseresult-detail', args=[late_id]))
+        rollup_results_task()
+        self.assertFalse(DailyResultRollup.objects.filter(day=late_day).exists())
+    
+    def test_archived_and_purged_tasks_kept(self):
+        """结果已归档或任务已清理后重算同一分组，保留这些任务原有的汇总"""
+        now = timezone.now()
+        self._post(0, 'success', now, duration=2.0)
+        self._post(1, 'failed', now, duration=4.0)
+        rollup_results_task()
+        ArchivedTask.objects.create(task_id=self.task, results_file='results/task-rollup.jsonl.gz', result_count=2)
+        CaseResult.objects.filter(task_id=self.task.id).delete()
+        
+        # 同一分组中另一个任务写入新结果，触发重算
+        self.task = TaskExecution.objects.create(
+            id='task-rollup-2', suite_id=self.suite, env_id=self.environment, package_info='pkg',
+            status='running', start_time=now, executor='rollupuser'
+        )
+        self._post(0, 'success', now, duration=1.0)
+        rollup_results_task()
+        totals = rollup.summarize(rollup.filter_rollups(suite_id=self.suite.id))['totals']
+        self.assertEqual((totals['total'], totals['success'], totals['failed']), (3, 2, 1))
+        
+        # 任务被清理（结果随任务删除）后重算，汇总不变
+        TaskExecution.objects.filter(id='task-rollup-2').delete()
+        rollup.mark_dirty([(self.today, self.suite.id, self.environment.id)])
+        rollup_results_task()
+        totals = rollup.summarize(rollup.filter_rollups(suite_id=self.suite.id))['totals']
+        self.assertEqual((totals['total'], totals['success'], totals['failed']), (3, 2, 1))
+        self.assertEqual(
+            set(TaskResultRollup.objects.values_list('task_id', flat=True)), {'task-rollup', 'task-rollup-2'}
+        )
+    
+    def test_trend_and_dashboard_read_rollups(self):
+        """趋势与看板只读取汇总表"""
+        now = timezone.now()
+        for days_ago in range(3):
+            self._post(0, 'success', now - datetime.timedelta(days=days_ago), duration=1.0)
+            self._post(1, 'failed' if days_ago else 'success', now - datetime.timedelta(days=days_ago), duration=3.0)
+        rollup_results_task()
+        
+        with self.assertNumQueries(1):
+            trend = rollup.daily_trend(rollup.filter_rollups(suite_id=self.suite.id))
+        self.assertEqual([row['pass_rate'] for row in trend], [50.0, 50.0, 100.0])
+        self.assertEqual(trend[-1]['avg_duration'], 2.0)
+        
+        response = self.client.get(reverse('resultrollup-trend'), {
+            'suite_id': self.suite.id, 'start_day': str(self.today - datetime.timedelta(days=1))
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 2)
+        
+        response = self.client.get(reverse('resultrollup-dashboard'), {'group_by': 'module_id'})
+        data = response.data['data']
+        self.assertEqual((data['totals']['total'], data['totals']['failed']), (6, 2))
+        self.assertEqual([(row['module_id'], row['failed']) for row in data['groups']], [('module-b', 2), ('module-a', 0)])
+        
+        response = self.client.get(reverse('resultrollup-dashboard'), {'group_by': 'status'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('resultrollup-trend'), {'start_day': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PassRateTrendTestCase(DjangoTestCase):
+    """通过率趋势与降采样的测试用例"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(username='trenduser', password='testpassword')
+        self.client.login(username='trenduser', password='testpassword')
+        self.suite = TestSuite.objects.create(name='趋势测试套', visible_scope='private', creator='trenduser')
+        self.environment = Environment.objects.create(id='env-trend', name='趋势环境', type='FPGA', owner='trenduser')
+        self.cases = [
+            TestCase.objects.create(
+                id=f'testcase-trend-{i}', case_id=f'CASE-TREND-{i}', case_name=f'趋势用例{i}',
+                feature_id='feature-trend', pre_condition='-', steps='-', expected_result='-', creator='trenduser'
+            )
+            for i in range(2)
+        ]
+        self.start = timezone.now() - datetime.timedelta(days=30)
+    
+    def _points(self, pass_rates):
+        return [
+            {'time': self.start + datetime.timedelta(hours=i), 'pass_rate': rate, 'total': 2,
+             'success': int(rate // 50), 'failed': 2 - int(rate // 50), 'skipped': 0,
+             'duration_sum': 2.0, 'duration_count': 2, 'runs': 1, 'task_id': f'task-{i}'}
+            for i, rate in enumerate(pass_rates)
+        ]
+    
+    def test_lttb_keeps_extremes(self):
+        """LTTB 保留首尾点与孤立的失败尖峰"""
+        rates = [100.0] * 1000
+        rates[437] = 0.0
+        sampled = trend.lttb(self._points(rates), 50)
+        self.assertEqual(len(sampled), 50)
+        self.assertEqual((sampled[0]['task_id'], sampled[-1]['task_id']), ('task-0', 'task-999'))
+        self.assertIn('task-437', [point['task_id'] for point in sampled])
+        self.assertEqual(trend.lttb(self._points([100.0] * 10), 50), self._points([100.0] * 10))
+    
+    def test_bucket_merges_counts(self):
+        """按时间分桶时计数相加后重新计算通过率"""
+        sampled = trend.bucket(self._points([100.0, 0.0, 100.0, 100.0]), 2)
+        self.assertEqual(len(sampled), 2)
+        self.assertEqual((sampled[0]['total'], sampled[0]['success'], sampled[0]['runs']), (4, 2, 2))
+        self.assertEqual(sampled[0]['pass_rate'], 50.0)
+        self.assertNotIn('task_id', sampled[0])
+        self.assertEqual(sampled[1]['pass_rate'], 100.0)
+    
+    def test_trend_api(self):
+        """每个任务一个点（读取任务汇总），超过目标点数时降采样"""
+        for i in range(20):
+            task = TaskExecution.objects.create(
+                id=f'task-trend-{i}', suite_id=self.suite, env_id=self.environment, package_info='pkg',
+                status='success', start_time=self.start + datetime.timedelta(hours=i), executor='trenduser'
+            )
+            for j, case in enumerate(self.cases):
+                CaseResult.objects.create(
+                    id=f'case-result-trend-{i}-{j}', task_id=task, case_id=case,
+                    status='failed' if (i % 5 == 0 and j == 0) else 'success',
+                    execute_time=task.start_time, log_path='/nonexistent/case.log', duration=1.0 + j
+                )
+        rollup.mark_range(self.start.date(), (self.start + datetime.timedelta(hours=20)).date())
+        rollup_results_task()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(trend.run_series(suite_id=self.suite.id)), 20)
+        url = reverse('caseresult-pass-rate-trend')
+        response = self.client.get(url, {'suite_id': self.suite.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual((data['source_points'], len(data['points'])), (20, 20))
+        self.assertEqual(data['points'][0]['pass_rate'], 50.0)
+        self.assertEqual(data['points'][1]['avg_duration'], 1.5)
+        
+        response = self.client.get(url, {'feature_id': 'feature-trend', 'points': 5, 'method': 'bucket'})
+        data = response.data['data']
+        self.assertEqual(len(data['points']), 5)
+        self.assertEqual(sum(point['total'] for point in data['points']), 40)
+        
+        response = self.client.get(url, {'env_id': self.environment.id, 'points': 5})
+        self.assertEqual(len(response.data['data']['points']), 5)
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'suite_id': self.suite.id, 'granularity': 'hour'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReportExportTestCase(DjangoTestCase):
+    """任务报告导出的测试用例"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(MEDIA_ROOT=self.tmp_dir, EXPORT_PROGRESS_INTERVAL=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.client = APIClient()
+        User.objects.create_user(username='exportuser', password='testpassword')
+        User.objects.create_user(username='otheruser', password='testpassword')
+        self.client.login(username='exportuser', password='testpassword')
+        suite = TestSuite.objects.create(name='导出测试套', visible_scope='private', creator='exportuser')
+        environment = Environment.objects.create(id='env-export', name='导出环境', type='FPGA', owner='exportuser')
+        self.task = TaskExecution.objects.create(
+            id='task-export', suite_id=suite, env_id=environment, package_info='pkg',
+            status='success', start_time=timezone.now(), executor='exportuser'
+        )
+        case = TestCase.objects.create(
+            id='testcase-export', case_id='CASE-EXPORT', case_name='导出<用例>', feature_id='feature-1',
+            pre_condition='-', steps='-', expected_result='-', creator='exportuser'
+        )
+        for i in range(5):
+            CaseResult.objects.create(
+                id=f'case-result-export-{i}', task_id=self.task, case_id=case,
+                status='failed' if i == 3 else 'success', execute_time=timezone.now(),
+                log_path='/nonexistent/case.log', duration=1.5, analysis_note='含,逗号' if i == 0 else None
+            )
+    
+    def _export(self, report_format):
+        # 测试中没有消息队列，直接在当前进程执行导出任务
+        with patch('result_manager.views.export_report_task.delay', side_effect=export_report_task), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('reportexport-list'), {'task_id': self.task.id, 'format': report_format}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.get(reverse('reportexport-detail', args=[response.data['id']]))
+        self.assertEqual((response.data['status'], response.data['progress']), ('success', 100))
+        self.assertEqual(response.data['processed_rows'], 5)
+        return response.data
+    
+    def test_csv_export_and_signed_download(self):
+        """生成 gzip 压缩的 CSV，签名链接无需登录即可下载"""
+        data = self._export('csv')
+        self.client.logout()
+        response = self.client.get(data['download_url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        lines = content.splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[0].startswith('结果ID,用例ID,用例名称'))
+        self.assertIn('"含,逗号"', content)
+        
+        url = reverse('reportexport-download', args=[data['id']])
+        self.assertEqual(self.client.get(url, {'token': 'forged'}).status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(EXPORT_LINK_TTL_HOURS=0):
+            self.assertEqual(self.client.get(data['download_url']).status_code, status.HTTP_403_FORBIDDEN)
+        # 签名未过期，但导出记录已过期
+        ReportExport.objects.filter(id=data['id']).update(expire_time=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(self.client.get(data['download_url']).status_code, status.HTTP_403_FORBIDDEN)
+        ReportExport.objects.filter(id=data['id']).update(expire_time=timezone.now() + datetime.timedelta(hours=1))
+        
+        # 导出文件位于临时目录，由临时文件清理任务回收
+        cleanup_temp_files(0)
+        self.assertEqual(self.client.get(data['download_url']).status_code, status.HTTP_404_NOT_FOUND)
+    
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_rows_read_in_keyset_pages(self):
+        """按 (执行时间, 结果ID) 分页读取，执行时间相同的结果不重复、不遗漏"""
+        CaseResult.objects.update(execute_time=timezone.now())
+        # 一次检查是否已归档，之后每页一条查询
+        with self.assertNumQueries(4):
+            rows = list(export.iter_rows(self.task.id))
+        self.assertEqual([row[0] for row in rows], [f'case-result-export-{i}' for i in range(5)])
+    
+    def test_html_export_escapes_and_is_private(self):
+        """HTML 报告转义内容，其他用户看不到别人的导出"""
+        data = self._export('html')
+        response = self.client.get(data['download_url'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertIn('导出&lt;用例&gt;', content)
+        self.assertEqual(content.count('<tr>'), 6)
+        
+        self.client.login(username='otheruser', password='testpassword')
+        response = self.client.get(reverse('reportexport-detail', args=[data['id']]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StorageTieringTestCase(DjangoTestCase):
+    """用例结果与日志分层存储的测试用例"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(
+            ARCHIVE_ROOT=os.path.join(self.tmp_dir, 'archive'), MEDIA_ROOT=os.path.join(self.tmp_dir, 'media'),
+            LOG_SEARCH_INDEX_PATH=os.path.join(self.tmp_dir, 'search.sqlite3'), CASE_LOG_ROOT=self.tmp_dir,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.client = APIClient()
+        User.objects.create_user(username='archiveuser', password='testpassword')
+        self.client.login(username='archiveuser', password='testpassword')
+        self.suite = TestSuite.objects.create(name='归档测试套', visible_scope='private', creator='archiveuser')
+        self.environment = Environment.objects.create(
+            id='env-archive', name='归档环境', type='FPGA', owner='archiveuser'
+        )
+        self.cases = [
+            TestCase.objects.create(
+                id=f'testcase-archive-{i}', case_id=f'CASE-ARCHIVE-{i}', case_name=f'归档用例{i}',
+                feature_id='feature-1', pre_condition='-', steps='-', expected_result='-', creator='archiveuser'
+            )
+            for i in range(2)
+        ]
+    
+    def _task(self, name, days_ago, statuses):
+        task = TaskExecution.objects.create(
+            id=f'task-archive-{name}', suite_id=self.suite, env_id=self.environment, package_info='pkg',
+            status='success', start_time=timezone.now() - datetime.timedelta(days=days_ago), executor='archiveuser'
+        )
+        for i, result_status in enumerate(statuses):
+            log_path = os.path.join(self.tmp_dir, f'{name}-{i}.log')
+            with open(log_path, 'w') as f:
+                f.write(''.join(f'{name} case {i} line {n}\n' for n in range(1, 101)))
+            CaseResult.objects.create(
+                id=f'case-result-archive-{name}-{i}', task_id=task, case_id=self.cases[i], status=result_status,
+                execute_time=task.start_time, log_path=log_path
+            )
+        return task
+    
+    def test_tiering_and_transparent_reads(self):
+        """到期任务的日志进入冷层、结果进入温层，按任务读取结果与日志时透明回退"""
+        self._task('old', 400, ['success', 'failed'])
+        self._task('new', 1, ['failed', 'failed'])
+        summary = archive.run_tiering()
+        self.assertEqual(summary, {'log_tasks': 1, 'logs': 2, 'result_tasks': 1, 'results': 2})
+        self.assertFalse(CaseResult.objects.filter(task_id='task-archive-old').exists())
+        self.assertEqual(CaseResult.objects.filter(task_id='task-archive-new').count(), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'old-0.log')))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, 'new-0.log')))
+        archived = ArchivedTask.objects.get(task_id='task-archive-old')
+        self.assertEqual((archived.result_count, archived.log_count), (2, 2))
+        # 已归档的任务不再重复处理
+        self.assertEqual(archive.run_tiering()['result_tasks'], 0)
+        
+        response = self.client.get(reverse('caseresult-get-results-by-task', args=['task-archive-old']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual((data['total_cases'], data['success_cases'], data['failed_cases']), (2, 1, 1))
+        self.assertEqual([r['case_name'] for r in data['case_results']], ['归档用例0', '归档用例1'])
+        
+        url = reverse('caseresult-log', args=['case-result-archive-old-1'])
+        self.assertEqual(self.client.get(url, {'tail': 1}).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, {'tail': 1, 'task_id': 'task-archive-old'})
+        self.assertEqual(response.data['data']['lines'], ['old case 1 line 100'])
+        
+        result = diff.compute_diff('task-archive-old', 'task-archive-new')
+        self.assertEqual([row[0] for row in result['categories']['newly_failing']], ['testcase-archive-0'])
+        self.assertEqual([row[0] for row in result['categories']['still_failing']], ['testcase-archive-1'])
+        rows = list(export.iter_rows('task-archive-old'))
+        self.assertEqual([row[2] for row in rows], ['归档用例0', '归档用例1'])
+        # 读取温层结果时不再整文件计算校验和，逐块导出
+        with patch('result_manager.archive._sha256') as sha256:
+            self.assertEqual(archive.find_archived_result('task-archive-old', 'case-result-archive-old-0').status, 'success')
+            rows = list(archive.archived_values('task-archive-old', ['id', 'case_id__case_name'], chunk_size=1))
+        sha256.assert_not_called()
+        self.assertEqual([row[1] for row in rows], ['归档用例0', '归档用例1'])
+    
+    def test_archive_skips_logs_outside_root(self):
+        """日志路径不在 CASE_LOG_ROOT 内时不归档、不删除该文件"""
+        self._task('old', 400, ['success', 'failed'])
+        outside_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside_dir)
+        outside = os.path.join(outside_dir, 'settings.py')
+        with open(outside, 'w') as f:
+            f.write('keep\n')
+        CaseResult.objects.filter(id='case-result-archive-old-0').update(log_path=outside)
+        self.assertEqual(archive.archive_task_logs(TaskExecution.objects.get(id='task-archive-old')), 1)
+        self.assertTrue(os.path.exists(outside))
+        self.assertFalse(ArchivedLog.objects.filter(log_path=outside).exists())
+    
+    @override_settings(LOG_COMPACT_MIN_BYTES=0)
+    def test_cold_logs_restored_on_read(self):
+        """只有日志进入冷层时结果仍在数据库，压缩与未压缩的日志都可取回读取"""
+        self._task('cold', 120, ['success', 'failed'])
+        log_reader.compact_log(os.path.join(self.tmp_dir, 'cold-1.log'))
+        self.assertEqual(archive.run_tiering(), {'log_tasks': 1, 'logs': 2, 'result_tasks': 0, 'results': 0})
+        self.assertEqual(CaseResult.objects.filter(task_id='task-archive-cold').count(), 2)
+        self.assertTrue(ArchivedLog.objects.get(member__endswith='cold-1.log.atz').compressed)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'cold-1.log.atz')))
+        
+        for i in range(2):
+            result = log_reader.read_lines(os.path.join(self.tmp_dir, f'cold-{i}.log'), 50, 2)
+            self.assertEqual(result['lines'], [f'cold case {i} line 50', f'cold case {i} line 51'])
+        response = self.client.get(reverse('caseresult-log', args=['case-result-archive-cold-0']), {'raw': 'true'})
+        self.assertEqual(b''.join(response.streaming_content).count(b'\n'), 100)
+
+
+@override_settings(PURGE_PAUSE_SECONDS=0)
+class PurgeOldTasksTestCase(DjangoTestCase):
+    """过期任务分批清理的测试用例"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings_override = override_settings(
+            ARCHIVE_ROOT=os.path.join(self.tmp_dir, 'archive'), MEDIA_ROOT=os.path.join(self.tmp_dir, 'media'),
+            LOG_SEARCH_INDEX_PATH=os.path.join(self.tmp_dir, 'search.sqlite3'), CASE_LOG_ROOT=self.tmp_dir,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        suite = TestSuite.objects.create(name='清理测试套', visible_scope='private', creator='purgeuser')
+        environment = Environment.objects.create(id='env-purge', name='清理环境', type='FPGA', owner='purgeuser')
+        case = TestCase.objects.create(
+            id='testcase-purge', case_id='CASE-PURGE', case_name='清理用例', feature_id='feature-1',
+            pre_condition='-', steps='-', expected_result='-', creator='purgeuser'
+        )
+        self.log_paths = []
+        for index, days_ago in enumerate([800, 900, 1000, 10]):
+            task = TaskExecution.objects.create(
+                id=f'task-purge-{index}', suite_id=suite, env_id=environment, package_info='pkg', status='success',
+                start_time=timezone.now() - datetime.timedelta(days=days_ago), executor='purgeuser'
+            )
+            for i in range(3):
+                log_path = os.path.join(self.tmp_dir, f'purge-{index}-{i}.log')
+                with open(log_path, 'w') as f:
+                    f.write('log line\n')
+                self.log_paths.append(log_path)
+                CaseResult.objects.create(
+                    id=f'case-result-purge-{index}-{i}', task_id=task, case_id=case, status='success',
+                    execute_time=task.start_time, log_path=log_path
+                )
+    
+    def test_purge_in_batches(self):
+        """按批删除过期任务的结果、日志与任务本身，保留期内的任务不受影响，完成后清空断点"""
+        summary = purge.run_purge(batch_size=2)
+        self.assertEqual(summary, {'tasks': 3, 'results': 9, 'finished': True})
+        self.assertEqual(list(TaskExecution.objects.values_list('id', flat=True)), ['task-purge-3'])
+        self.assertEqual(CaseResult.objects.count(), 3)
+        self.assertEqual([os.path.exists(path) for path in self.log_paths], [False] * 9 + [True] * 3)
+        self.assertEqual(purge.load_checkpoint(), {})
+    
+    def test_purge_skips_files_outside_log_root(self):
+        """结果记录的日志路径不在 CASE_LOG_ROOT 内时只删除记录，不删除文件"""
+        outside_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside_dir)
+        outside = os.path.join(outside_dir, 'settings.py')
+        with open(outside, 'w') as f:
+            f.write('keep\n')
+        CaseResult.objects.filter(id='case-result-purge-0-0').update(log_path=outside)
+        self.assertEqual(purge.run_purge(batch_size=2)['results'], 9)
+        self.assertTrue(os.path.exists(outside))
+    
+    def test_resume_after_interruption(self):
+        """中途中断后保留断点，下一轮从未完成的任务继续"""
+        with patch('result_manager.purge.search_index.remove_results', side_effect=[None, None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                purge.run_purge(batch_size=2)
+        checkpoint = purge.load_checkpoint()
+        self.assertEqual((checkpoint['last_task_id'], checkpoint['tasks']), ('task-purge-0', 1))
+        self.assertEqual(CaseResult.objects.filter(task_id='task-purge-1').count(), 1)
+        
+        summary = purge.run_purge(batch_size=2)
+        self.assertEqual(summary, {'tasks': 2, 'results': 4, 'finished': True})
+        self.assertEqual(TaskExecution.objects.count(), 1)
+    
+    def test_command_archives_logs(self):
+        """管理命令以 archive 方式清理时日志先移入冷层"""
+        out = io.StringIO()
+        call_command('purge_old_tasks', '--log-mode', 'archive', '--batch-size', '5', stdout=out)
+        self.assertIn('删除任务 3 个', out.getvalue())
+        self.assertEqual(ArchivedLog.objects.count(), 9)
+        self.assertFalse(os.path.exists(self.log_paths[0]))
+        self.assertEqual(log_reader.read_lines(self.log_paths[0])['lines'], ['log line'])
+
@@ -0,0 +1,153 @@
+"""通过率趋势与降采样
+
+按测试套、环境或特性返回一段时间内的通过率、用例数与执行耗时序列，并在服务端降采样到
+目标点数，无论时间范围内有十次还是上万次执行，图表拿到的点数都在几百以内。
+
+- 粒度 run：每个任务一个点，只读任务汇总表（TaskResultRollup，与日汇总一起增量维护）
+- 粒度 day：每天一个点，只读日汇总表（DailyResultRollup）
+
+降采样方式：
+- lttb：Largest-Triangle-Three-Buckets，保留原始点，按通过率曲线的形状挑选，尖峰不会被抹平
+- bucket：按时间等分区间，区间内的点合并（计数相加后重新计算通过率与平均耗时）
+"""
+import logging
+from datetime import datetime
+
+from django.db.models import Sum
+
+from result_manager.models import TaskResultRollup
+from result_manager.rollup import daily_trend, filter_rollups, day_range
+
+logger = logging.getLogger('autotestweb')
+
+GRANULARITIES = ('run', 'day')
+METHODS = ('lttb', 'bucket')
+COUNT_FIELDS = ('total', 'success', 'failed', 'skipped', 'duration_sum', 'duration_count')
+
+
+def _finish(point):
+    """计算通过率与平均耗时"""
+    point['pass_rate'] = round(point['success'] / point['total'] * 100, 2) if point['total'] else 0
+    point['avg_duration'] = (
+        round(point['duration_sum'] / point['duration_count'], 3) if point['duration_count'] else None
+    )
+    return point
+
+
+def run_series(suite_id=None, env_id=None, feature_id=None, start_time=None, end_time=None):
+    """每个任务一个点，按任务开始时间升序，只读任务汇总表"""
+    rollups = TaskResultRollup.objects.filter(start_time__isnull=False)
+    for field, value in (('suite_id', suite_id), ('env_id', env_id), ('feature_id', feature_id)):
+        if value:
+            rollups = rollups.filter(**{field: value})
+    if start_time is not None:
+        rollups = rollups.filter(start_time__gte=start_time)
+    if end_time is not None:
+        rollups = rollups.filter(start_time__lte=end_time)
+    # 使用默认别名（如 total__sum），避免与汇总表字段同名
+    rows = (
+        rollups.values('task_id', 'start_time')
+        .annotate(*[Sum(field) for field in COUNT_FIELDS])
+        .order_by('start_time', 'task_id')
+    )
+    return [
+        _finish({
+            'time': row['start_time'],
+            'task_id': row['task_id'],
+            'runs': 1,
+            **{field: row[f'{field}__sum'] or 0 for field in COUNT_FIELDS},
+        })
+        for row in rows
+    ]
+
+
+def day_series(suite_id=None, env_id=None, feature_id=None, start_time=None, end_time=None):
+    """每天一个点，只读日汇总表"""
+    rollups = filter_rollups(
+        suite_id=suite_id, env_id=env_id, feature_id=feature_id,
+        start_day=start_time.date() if start_time else None,
+        end_day=end_time.date() if end_time else None,
+    )
+    points = []
+    for row in daily_trend(rollups):
+        point = {field: row[field] for field in COUNT_FIELDS}
+        point.update(time=day_range(row['day'])[0], day=row['day'], runs=None)
+        points.append(_finish(point))
+    return points
+
+
+def lttb(points, threshold, key='pass_rate'):
+    """Largest-Triangle-Three-Buckets 降采样，保留首尾点"""
+    if threshold >= len(points) or threshold < 3:
+        return points
+    xs = [point['time'].timestamp() for point in points]
+    ys = [point[key] for point in points]
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点作为三角形的第三个顶点
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def bucket(points, threshold):
+    """按时间等分区间合并点，区间内计数相加后重新计算通过率"""
+    if threshold >= len(points) or threshold < 1:
+        return points
+    first, last = points[0]['time'].timestamp(), points[-1]['time'].timestamp()
+    width = (last - first) / threshold or 1
+    buckets = {}
+    for point in points:
+        index = min(int((point['time'].timestamp() - first) / width), threshold - 1)
+        merged = buckets.get(index)
+        if merged is None:
+            buckets[index] = {**point, '_members': [point]}
+            continue
+        merged['_members'].append(point)
+        for field in COUNT_FIELDS:
+            merged[field] += point[field]
+        if merged.get('runs') is not None:
+            merged['runs'] += point['runs']
+    sampled = []
+    for index in sorted(buckets):
+        merged = buckets[index]
+        members = merged.pop('_members')
+        if len(members) > 1:
+            # 合并后的点放在区间内各点的平均时间上，不再对应单个任务
+            mean = sum(member['time'].timestamp() for member in members) / len(members)
+            merged['time'] = datetime.fromtimestamp(mean, tz=members[0]['time'].tzinfo)
+            merged.pop('task_id', None)
+            merged.pop('day', None)
+        sampled.append(_finish(merged))
+    return sampled
+
+
+def build_trend(granularity='run', method='lttb', points=300, **filters):
+    """获取降采样后的趋势
+
+    Returns:
+        dict: 粒度、降采样方式、原始点数与降采样后的序列
+    """
+    series = (run_series if granularity == 'run' else day_series)(**filters)
+    sampled = (lttb if method == 'lttb' else bucket)(series, points)
+    return {
+        'granularity': granularity,
+        'method': method,
+        'source_points': len(series),
+        'points': sampled,
+    }
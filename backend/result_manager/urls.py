@@ -1,10 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CaseResultViewSet
+from .views import (
+    CaseResultViewSet, FailureClusterViewSet, ClassificationRuleViewSet, CaseFlakinessStatViewSet,
+    DailyResultRollupViewSet, ReportExportViewSet,
+)
 
 # 创建路由器并注册视图集
 router = DefaultRouter()
 router.register(r'results', CaseResultViewSet, basename='caseresult')
+router.register(r'failure-clusters', FailureClusterViewSet, basename='failurecluster')
+router.register(r'classification-rules', ClassificationRuleViewSet, basename='classificationrule')
+router.register(r'case-flakiness', CaseFlakinessStatViewSet, basename='caseflakiness')
+router.register(r'result-rollups', DailyResultRollupViewSet, basename='resultrollup')
+router.register(r'report-exports', ReportExportViewSet, basename='reportexport')
 
 # 定义URL模式
 urlpatterns = [
@@ -1,12 +1,29 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, filters, mixins
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import CaseResult
-from .serializers import CaseResultSerializer, TestSuiteCaseResultsSerializer
+from .models import CaseResult, FailureCluster, ClassificationRule, CaseFlakinessStat, DailyResultRollup, ReportExport
+from .serializers import (
+    CaseResultSerializer, TestSuiteCaseResultsSerializer, FailureClusterSerializer, FailureClusterMarkSerializer,
+    ClassificationRuleSerializer, CaseFlakinessStatSerializer, DailyResultRollupSerializer, ReportExportSerializer,
+)
 from execution_manager.models import TaskExecution
 from test_suite.models import TestSuite
+from feature_testcase.models import TestCase
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from common.auth import CustomTokenAuthentication
+from common.tasks import ingest_case_log_task, export_report_task, backfill_run_history_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils import timezone
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse, Http404
+from . import log_reader, search_index, signature, classifier, history, diff, rollup, trend, export, archive
+from common.permissions import IsAdminOrReadOnly
+from common.utils import audit_log, get_current_user
+from datetime import datetime, time, timezone as dt_timezone
+import os
 
 
 class CaseResultViewSet(viewsets.ModelViewSet):
@@ -19,6 +36,191 @@ class CaseResultViewSet(viewsets.ModelViewSet):
     ordering_fields = ['execute_time']
     ordering = ['-execute_time']
     
+    def perform_create(self, serializer):
+        case_result = serializer.save()
+        rollup.mark_results([case_result])
+        # 事务提交后再处理日志，避免异步任务读不到刚创建的记录
+        transaction.on_commit(lambda: ingest_case_log_task.delay(case_result.id, created=True))
+    
+    def perform_update(self, serializer):
+        old_log_path = serializer.instance.log_path
+        # 执行时间或所属任务可能变化，修改前后所属的日汇总都需要重算
+        rollup.mark_results([serializer.instance])
+        case_result = serializer.save()
+        rollup.mark_results([case_result])
+        if case_result.log_path != old_log_path:
+            transaction.on_commit(lambda: ingest_case_log_task.delay(case_result.id))
+    
+    def perform_destroy(self, instance):
+        result_id = instance.id
+        rollup.mark_results([instance])
+        with transaction.atomic():
+            signature.release_results(CaseResult.objects.filter(pk=instance.pk))
+            instance.delete()
+        transaction.on_commit(lambda: search_index.remove_results([result_id]))
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        跨任务全文检索用例日志
+        URL路径: /api/results/search/?q=...
+        
+        查询参数:
+            q: 检索表达式（FTS5 语法，如 "assert failed"、timeout AND slot3）
+            suite_id, env_id: 按测试套、环境过滤
+            start_time, end_time: 按用例执行时间过滤（日期或日期时间）
+            page, page_size: 分页，page_size 最大 200
+        """
+        params = request.query_params
+        try:
+            start_time = self._parse_time(params.get('start_time'))
+            end_time = self._parse_time(params.get('end_time'), end_of_day=True)
+            page = max(1, int(params.get('page', 1)))
+            page_size = max(1, min(int(params.get('page_size', 50)), 200))
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '时间或分页参数格式错误'
+            }, status=400)
+        
+        try:
+            rows = search_index.search(
+                params.get('q', ''),
+                suite_id=params.get('suite_id'),
+                env_id=params.get('env_id'),
+                start_time=start_time,
+                end_time=end_time,
+                offset=(page - 1) * page_size,
+                limit=page_size
+            )
+        except search_index.SearchQueryError as e:
+            return Response({
+                'code': 400,
+                'message': str(e)
+            }, status=400)
+        
+        # 过滤掉索引之后已被删除的结果
+        case_names = dict(
+            CaseResult.objects.filter(id__in={row[0] for row in rows}).values_list('id', 'case_id__case_name')
+        )
+        matches = [
+            {
+                'result_id': result_id,
+                'task_id': task_id,
+                'case_id': case_id,
+                'case_name': case_names[result_id],
+                'suite_id': suite_id,
+                'env_id': env_id,
+                'execute_time': datetime.fromtimestamp(execute_time, tz=dt_timezone.utc),
+                'line_no': line_no,
+                'snippet': snippet,
+            }
+            for result_id, task_id, case_id, suite_id, env_id, execute_time, line_no, snippet in rows
+            if result_id in case_names
+        ]
+        return Response({
+            'code': 200,
+            'message': '获取成功',
+            'data': {
+                'page': page,
+                'page_size': page_size,
+                'has_more': len(rows) == page_size,
+                'matches': matches
+            }
+        })
+    
+    @staticmethod
+    def _parse_time(value, end_of_day=False):
+        """解析日期或日期时间参数"""
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(value)
+            parsed = datetime.combine(day, time.max if end_of_day else time.min)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+    
+    @action(detail=True, methods=['get'])
+    def log(self, request, pk=None):
+        """
+        分段读取用例日志，不会整文件加载
+        URL路径: /api/results/{id}/log/
+        
+        查询参数（按优先级）:
+            raw=true: 原始内容流式下载，可配合 offset/length 只下载一段
+            offset, length: 按字节范围读取
+            tail: 读取最后 N 行
+            start_line, lines: 按行范围读取（行号从 1 开始），默认从第 1 行读取
+            task_id: 结果已移入温层时需指定所属任务
+        """
+        params = request.query_params
+        try:
+            case_result = self.get_object()
+        except Http404:
+            case_result = archive.find_archived_result(params.get('task_id'), pk)
+            if case_result is None:
+                raise
+        try:
+            if params.get('raw', '').lower() in ('1', 'true'):
+                return self._raw_log_response(case_result, params)
+            if 'offset' in params or 'length' in params:
+                data = log_reader.read_range(
+                    case_result.log_path,
+                    int(params.get('offset', 0)),
+                    int(params.get('length', getattr(settings, 'LOG_READ_MAX_BYTES', 1024 * 1024)))
+                )
+            elif 'tail' in params:
+                data = log_reader.tail(case_result.log_path, int(params['tail']))
+            else:
+                data = log_reader.read_lines(
+                    case_result.log_path,
+                    int(params.get('start_line', 1)),
+                    int(params.get('lines', getattr(settings, 'LOG_READ_DEFAULT_LINES', 500)))
+                )
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '参数必须为整数'
+            }, status=400)
+        except log_reader.LogAccessError as e:
+            return Response({
+                'code': 403,
+                'message': str(e)
+            }, status=403)
+        except log_reader.LogNotFoundError as e:
+            return Response({
+                'code': 404,
+                'message': str(e)
+            }, status=404)
+        
+        return Response({
+            'code': 200,
+            'message': '获取成功',
+            'data': data
+        })
+    
+    def _raw_log_response(self, case_result, params):
+        """原始日志流式响应，未指定范围时交给文件包装器（可走 sendfile）"""
+        path = log_reader.resolve_log_path(case_result.log_path)
+        filename = f'{case_result.id}.log'
+        if 'offset' not in params and 'length' not in params:
+            return FileResponse(log_reader.open_log(path), as_attachment=True, filename=filename,
+                                content_type='text/plain; charset=utf-8')
+        offset = max(0, int(params.get('offset', 0)))
+        length = int(params['length']) if 'length' in params else None
+        if length is not None and length < 0:
+            raise ValueError('length')
+        response = StreamingHttpResponse(
+            log_reader.iter_range(case_result.log_path, offset, length),
+            content_type='text/plain; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
     @action(detail=False, methods=['get'], url_path='by-suite/(?P<suite_id>[^/]+)')
     def get_results_by_suite(self, request, suite_id=None):
         """
@@ -88,7 +290,7 @@ class CaseResultViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='by-task/(?P<task_id>[^/]+)')
     def get_results_by_task(self, request, task_id=None):
         """
-        通过任务ID获取该任务的所有测试用例结果
+        通过任务ID获取该任务的所有测试用例结果，结果已移入温层时从归档文件读取
         URL路径: /api/results/by-task/{task_id}/
         """
         try:
@@ -97,12 +299,20 @@ class CaseResultViewSet(viewsets.ModelViewSet):
             
             # 获取该任务下的所有测试用例结果
             case_results = CaseResult.objects.filter(task_id=task_id)
+            archived_results = None if case_results.exists() else archive.archived_results(task_id)
             
             # 统计结果
-            total_cases = case_results.count()
-            success_cases = case_results.filter(status='success').count()
-            failed_cases = case_results.filter(status='failed').count()
-            skipped_cases = case_results.filter(status='skipped').count()
+            if archived_results is not None:
+                case_results = archived_results
+                total_cases = len(case_results)
+                success_cases = sum(1 for result in case_results if result.status == 'success')
+                failed_cases = sum(1 for result in case_results if result.status == 'failed')
+                skipped_cases = sum(1 for result in case_results if result.status == 'skipped')
+            else:
+                total_cases = case_results.count()
+                success_cases = case_results.filter(status='success').count()
+                failed_cases = case_results.filter(status='failed').count()
+                skipped_cases = case_results.filter(status='skipped').count()
             
             # 获取关联的测试套信息
             test_suite = task_execution.suite_id
@@ -138,3 +348,510 @@ class CaseResultViewSet(viewsets.ModelViewSet):
                 'code': 500,
                 'message': f'获取测试用例结果失败: {str(e)}'
             }, status=500)
+
+    @action(detail=False, methods=['get'], url_path='trend')
+    def pass_rate_trend(self, request):
+        """
+        测试套、环境或特性的通过率趋势，服务端降采样
+        URL路径: /api/results/trend/?suite_id=...
+
+        查询参数:
+            suite_id, env_id, feature_id: 至少指定一个
+            start_time, end_time: 时间范围（日期或日期时间）
+            granularity: run（每个任务一个点，默认，读任务汇总表）/ day（每天一个点，读日汇总表）
+            method: lttb（默认）/ bucket
+            points: 目标点数，默认 TREND_DEFAULT_POINTS，最大 TREND_MAX_POINTS
+        """
+        params = request.query_params
+        dimensions = {name: params.get(name) for name in ('suite_id', 'env_id', 'feature_id')}
+        if not any(dimensions.values()):
+            return Response({
+                'code': 400,
+                'message': 'suite_id、env_id、feature_id 至少指定一个'
+            }, status=400)
+        granularity = params.get('granularity', 'run')
+        method = params.get('method', 'lttb')
+        if granularity not in trend.GRANULARITIES or method not in trend.METHODS:
+            return Response({
+                'code': 400,
+                'message': f'granularity 必须为 {"/".join(trend.GRANULARITIES)}，method 必须为 {"/".join(trend.METHODS)}'
+            }, status=400)
+        try:
+            start_time = self._parse_time(params.get('start_time'))
+            end_time = self._parse_time(params.get('end_time'), end_of_day=True)
+            points = int(params.get('points', getattr(settings, 'TREND_DEFAULT_POINTS', 300)))
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '时间或点数参数格式错误'
+            }, status=400)
+        points = max(3, min(points, int(getattr(settings, 'TREND_MAX_POINTS', 2000))))
+        return Response({
+            'code': 200,
+            'message': '获取成功',
+            'data': trend.build_trend(
+                granularity=granularity, method=method, points=points,
+                start_time=start_time, end_time=end_time, **dimensions
+            )
+        })
+
+    @action(detail=False, methods=['get'], url_path='diff')
+    def diff_tasks(self, request):
+        """
+        对比两个任务的用例结果
+        URL路径: /api/results/diff/?target_task=...&base_task=...
+
+        查询参数:
+            target_task: 目标任务ID（必填）
+            base_task: 基准任务ID，不传时与同一测试套上一次全部通过的任务对比
+            category: 只返回某一类（newly_failing/newly_passing/still_failing/added/removed）
+            page, page_size: 每一类分别分页，page_size 最大 500
+        """
+        params = request.query_params
+        category = params.get('category')
+        if category and category not in diff.CATEGORIES:
+            return Response({
+                'code': 400,
+                'message': f'category 必须为 {"/".join(diff.CATEGORIES)} 之一'
+            }, status=400)
+        try:
+            page = max(1, int(params.get('page', 1)))
+            page_size = max(1, min(int(params.get('page_size', 50)), 500))
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '分页参数格式错误'
+            }, status=400)
+
+        try:
+            target_task = TaskExecution.objects.get(id=params.get('target_task'))
+            if params.get('base_task'):
+                base_task = TaskExecution.objects.get(id=params['base_task'])
+            else:
+                base_task = diff.last_green_task(target_task)
+                if base_task is None:
+                    return Response({
+                        'code': 404,
+                        'message': '该测试套之前没有全部通过的任务'
+                    }, status=404)
+        except TaskExecution.DoesNotExist:
+            return Response({
+                'code': 404,
+                'message': '任务不存在'
+            }, status=404)
+        if base_task.id == target_task.id:
+            return Response({
+                'code': 400,
+                'message': '基准任务与目标任务不能相同'
+            }, status=400)
+
+        task_diff = diff.get_diff(base_task, target_task)
+        start = (page - 1) * page_size
+        pages = {
+            name: task_diff['categories'][name][start:start + page_size]
+            for name in ([category] if category else diff.CATEGORIES)
+        }
+        case_names = dict(TestCase.objects.filter(
+            id__in={row[0] for rows in pages.values() for row in rows}
+        ).values_list('id', 'case_name'))
+        return Response({
+            'code': 200,
+            'message': '获取成功',
+            'data': {
+                'base_task': {'id': base_task.id, 'status': base_task.status, 'start_time': base_task.start_time},
+                'target_task': {'id': target_task.id, 'status': target_task.status, 'start_time': target_task.start_time},
+                'summary': dict(
+                    {name: len(rows) for name, rows in task_diff['categories'].items()},
+                    unchanged=task_diff['unchanged']
+                ),
+                'page': page,
+                'page_size': page_size,
+                'categories': {
+                    name: {
+                        'count': len(task_diff['categories'][name]),
+                        'has_more': start + page_size < len(task_diff['categories'][name]),
+                        'results': [
+                            {
+                                'case_id': case_id,
+                                'case_name': case_names.get(case_id),
+                                'base_result_id': base_result_id,
+                                'base_status': base_status,
+                                'target_result_id': target_result_id,
+                                'target_status': target_status,
+                            }
+                            for case_id, base_result_id, base_status, target_result_id, target_status in rows
+                        ]
+                    }
+                    for name, rows in pages.items()
+                }
+            }
+        })
+
+    @action(detail=False, methods=['get'], url_path='history-matrix/(?P<suite_id>[^/]+)')
+    def history_matrix(self, request, suite_id=None):
+        """
+        获取测试套最近若干次执行 × 全部用例的状态矩阵
+        URL路径: /api/results/history-matrix/{suite_id}/?runs=100
+
+        查询参数:
+            runs: 最近执行次数，默认 HISTORY_MATRIX_DEFAULT_RUNS，最大 HISTORY_MATRIX_MAX_RUNS
+            env_id: 只看某个环境上的执行
+            all_cases: 为 true 时保留窗口内未执行过的用例列
+
+        每次执行的 cells 为状态字符串，第 i 个字符对应 cases 中第 i 个用例（P/F/S/-）
+        只返回已写入的执行历史；有尚未写入历史的已结束任务时提交后台补齐，backfilling 为 true
+        """
+        if not TestSuite.objects.filter(id=suite_id).exists():
+            return Response({
+                'code': 404,
+                'message': '测试套不存在'
+            }, status=404)
+        try:
+            runs = int(request.query_params.get('runs', getattr(settings, 'HISTORY_MATRIX_DEFAULT_RUNS', 100)))
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': 'runs 参数格式错误'
+            }, status=400)
+        runs = max(1, min(runs, int(getattr(settings, 'HISTORY_MATRIX_MAX_RUNS', 500))))
+        matrix = history.build_matrix(
+            suite_id,
+            runs=runs,
+            env_id=request.query_params.get('env_id'),
+            hide_unused=request.query_params.get('all_cases', '').lower() not in ('1', 'true')
+        )
+        matrix['backfilling'] = history.unpacked_tasks(suite_id, request.query_params.get('env_id')).exists()
+        # 同一测试套 5 分钟内只提交一次补齐任务
+        if matrix['backfilling'] and cache.add(f'history_backfill:{suite_id}', 1, timeout=300):
+            transaction.on_commit(lambda: backfill_run_history_task.delay(suite_id))
+        return Response({
+            'code': 200,
+            'message': '获取成功',
+            'data': matrix
+        })
+
+
+
+class FailureClusterViewSet(viewsets.ReadOnlyModelViewSet):
+    """失败聚类视图集，按聚类查看和标记失败结果"""
+    queryset = FailureCluster.objects.filter(result_count__gt=0)
+    serializer_class = FailureClusterSerializer
+    authentication_classes = [CustomTokenAuthentication, SessionAuthentication, BasicAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['mark_status', 'last_task_id']
+    ordering_fields = ['last_seen', 'first_seen', 'result_count']
+    ordering = ['-last_seen']
+    
+    @action(detail=True, methods=['get'])
+    def results(self, request, pk=None):
+        """
+        获取聚类下的用例结果
+        URL路径: /api/failure-clusters/{id}/results/
+        """
+        cluster = self.get_object()
+        queryset = CaseResult.objects.filter(
+            failure_signature=cluster.signature
+        ).select_related('task_id', 'case_id').order_by('-execute_time')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(CaseResultSerializer(page, many=True).data)
+        return Response(CaseResultSerializer(queryset, many=True).data)
+    
+    @action(detail=True, methods=['post'])
+    def mark(self, request, pk=None):
+        """
+        标记聚类，同时标记该类下的所有用例结果
+        URL路径: /api/failure-clusters/{id}/mark/
+        
+        请求参数:
+            mark_status: 标记状态（none/to_analyze/located/no_need）
+            analysis_note: 分析备注
+            overwrite: 是否覆盖已单独标记为已定位/无需处理的结果，默认 false
+        """
+        cluster = self.get_object()
+        serializer = FailureClusterMarkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'code': 400,
+                'message': '参数错误',
+                'errors': serializer.errors
+            }, status=400)
+        
+        old_data = {'mark_status': cluster.mark_status, 'analysis_note': cluster.analysis_note}
+        updated = signature.mark_cluster(
+            cluster,
+            serializer.validated_data['mark_status'],
+            serializer.validated_data.get('analysis_note'),
+            overwrite=serializer.validated_data['overwrite']
+        )
+        audit_log(
+            operation_type='mark_failure_cluster',
+            operation_desc=f'标记失败聚类: {cluster.id}，同步 {updated} 个用例结果',
+            operated_by=get_current_user(request),
+            request=request,
+            module_name='result_manager',
+            object_id=str(cluster.id),
+            old_data=old_data,
+            new_data={'mark_status': cluster.mark_status, 'analysis_note': cluster.analysis_note}
+        )
+        return Response({
+            'code': 200,
+            'message': '标记成功',
+            'data': {
+                'cluster': FailureClusterSerializer(cluster).data,
+                'updated_results': updated
+            }
+        })
+
+
+
+class ClassificationRuleViewSet(viewsets.ModelViewSet):
+    """失败分类规则视图集，管理员维护规则，认证用户只读"""
+    queryset = ClassificationRule.alive.all()
+    serializer_class = ClassificationRuleSerializer
+    authentication_classes = [CustomTokenAuthentication, SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['match_type', 'mark_status', 'is_active']
+    ordering_fields = ['priority', 'create_time']
+    ordering = ['-priority', 'create_time']
+    
+    def perform_create(self, serializer):
+        rule = serializer.save(creator=self.request.user.username)
+        audit_log(
+            operation_type='create_classification_rule',
+            operation_desc=f'创建失败分类规则: {rule.name}',
+            operated_by=get_current_user(self.request),
+            request=self.request,
+            module_name='result_manager',
+            object_id=str(rule.id),
+            new_data=serializer.data
+        )
+    
+    def perform_update(self, serializer):
+        old_data = ClassificationRuleSerializer(serializer.instance).data
+        rule = serializer.save()
+        audit_log(
+            operation_type='update_classification_rule',
+            operation_desc=f'更新失败分类规则: {rule.name}',
+            operated_by=get_current_user(self.request),
+            request=self.request,
+            module_name='result_manager',
+            object_id=str(rule.id),
+            old_data=old_data,
+            new_data=serializer.data
+        )
+    
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+        audit_log(
+            operation_type='delete_classification_rule',
+            operation_desc=f'删除失败分类规则: {instance.name}',
+            operated_by=get_current_user(self.request),
+            request=self.request,
+            module_name='result_manager',
+            object_id=str(instance.id)
+        )
+    
+    @action(detail=False, methods=['post'])
+    def match(self, request):
+        """
+        用当前启用的规则匹配一段文本，便于调试规则
+        URL路径: /api/classification-rules/match/
+        
+        请求参数:
+            text: 待匹配的日志内容（多行）
+        """
+        rule = classifier.get_matcher().match_lines(str(request.data.get('text', '')).splitlines())
+        return Response({
+            'code': 200,
+            'message': '匹配完成',
+            'data': ClassificationRuleSerializer(rule).data if rule else None
+        })
+
+
+
+class CaseFlakinessStatViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    用例稳定性统计视图集，默认按不稳定度从高到低列出用例
+    URL路径: /api/case-flakiness/
+    
+    查询参数:
+        env_type: 环境类型
+        case_id: 用例ID
+        min_runs: 最少执行次数，默认 FLAKINESS_MIN_RUNS，执行次数太少的用例翻转率没有参考意义
+    """
+    queryset = CaseFlakinessStat.objects.select_related('case_id')
+    serializer_class = CaseFlakinessStatSerializer
+    authentication_classes = [CustomTokenAuthentication, SessionAuthentication, BasicAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['env_type', 'case_id']
+    ordering_fields = ['flakiness_score', 'current_fail_streak', 'max_fail_streak', 'total_runs', 'last_execute_time']
+    ordering = ['-flakiness_score', '-total_runs']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            try:
+                min_runs = int(self.request.query_params.get('min_runs', getattr(settings, 'FLAKINESS_MIN_RUNS', 5)))
+            except ValueError:
+                min_runs = 0
+            queryset = queryset.filter(total_runs__gte=min_runs)
+        return queryset
+
+
+class DailyResultRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    用例结果日汇总视图集，趋势与看板只读取汇总表，不扫描 tb_case_result
+    URL路径: /api/result-rollups/
+    
+    查询参数（各接口通用）:
+        suite_id, env_id, module_id, feature_id: 维度过滤
+        start_day, end_day: 日期范围（YYYY-MM-DD）
+    """
+    queryset = DailyResultRollup.objects.all()
+    serializer_class = DailyResultRollupSerializer
+    authentication_classes = [CustomTokenAuthentication, SessionAuthentication, BasicAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['suite_id', 'env_id', 'module_id', 'feature_id', 'day']
+    ordering_fields = ['day', 'total', 'failed']
+    ordering = ['-day']
+    
+    def _filtered_rollups(self):
+        """按查询参数过滤汇总行，日期格式错误时抛出 ValueError"""
+        params = self.request.query_params
+        days = {}
+        for name in ('start_day', 'end_day'):
+            if params.get(name):
+                days[name] = parse_date(params[name])
+                if days[name] is None:
+                    raise ValueError(params[name])
+        return rollup.filter_rollups(
+            suite_id=params.get('suite_id'),
+            env_id=params.get('env_id'),
+            module_id=params.get('module_id'),
+            feature_id=params.get('feature_id'),
+            **days
+        )
+    
+    @action(detail=False, methods=['get'])
+    def trend(self, request):
+        """
+        按天的结果趋势
+        URL路径: /api/result-rollups/trend/
+        """
+        try:
+            rollups = self._filtered_rollups()
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '日期格式错误，应为 YYYY-MM-DD'
+            }, status=400)
+        return Response({
+            'code': 200,
+            'message': '获取成功',
+            'data': rollup.daily_trend(rollups)
+        })
+    
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """
+        看板汇总
+        URL路径: /api/result-rollups/dashboard/?group_by=suite_id
+        
+        查询参数:
+            group_by: 分组维度（suite_id/env_id/module_id/feature_id），不传时只返回总数
+        """
+        group_by = request.query_params.get('group_by')
+        if group_by and group_by not in rollup.GROUP_FIELDS:
+            return Response({
+                'code': 400,
+                'message': f'group_by 必须为 {"/".join(rollup.GROUP_FIELDS)} 之一'
+            }, status=400)
+        try:
+            rollups = self._filtered_rollups()
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '日期格式错误，应为 YYYY-MM-DD'
+            }, status=400)
+        return Response({
+            'code': 200,
+            'message': '获取成功',
+            'data': rollup.summarize(rollups, group_by=group_by)
+        })
+
+
+class ReportExportViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    任务报告导出视图集
+    URL路径: /api/report-exports/
+    
+    POST {"task_id": "...", "format": "csv/html"} 创建导出并在后台生成，
+    轮询详情获取进度，完成后返回带签名、会过期的 download_url。
+    普通用户只能看到自己创建的导出。
+    """
+    queryset = ReportExport.objects.all()
+    serializer_class = ReportExportSerializer
+    authentication_classes = [CustomTokenAuthentication, SessionAuthentication, BasicAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['task_id', 'status', 'format']
+    ordering_fields = ['create_time']
+    ordering = ['-create_time']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(creator=self.request.user.username)
+        return queryset
+    
+    def perform_create(self, serializer):
+        report_export = serializer.save(creator=self.request.user.username)
+        audit_log(
+            operation_type='export_report',
+            operation_desc=f'导出任务报告: {report_export.task_id_id}（{report_export.format}）',
+            operated_by=get_current_user(self.request),
+            request=self.request,
+            module_name='result_manager',
+            object_id=str(report_export.id)
+        )
+        transaction.on_commit(lambda: export_report_task.delay(report_export.id))
+    
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = 202
+        return response
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny], authentication_classes=[])
+    def download(self, request, pk=None):
+        """
+        通过签名链接下载报告，无需登录，链接过期后失效
+        URL路径: /api/report-exports/{id}/download/?token=...
+        """
+        if not export.check_token(pk, request.query_params.get('token', '')):
+            return Response({
+                'code': 403,
+                'message': '下载链接无效或已过期'
+            }, status=403)
+        report_export = ReportExport.objects.filter(id=pk, status='success').first()
+        if report_export is not None and report_export.expire_time and report_export.expire_time < timezone.now():
+            return Response({
+                'code': 403,
+                'message': '下载链接无效或已过期'
+            }, status=403)
+        if report_export is None or not os.path.exists(export.absolute_path(report_export)):
+            return Response({
+                'code': 404,
+                'message': '报告文件不存在或已被清理'
+            }, status=404)
+        filename = f'{report_export.task_id_id}-report.{report_export.format}.gz'
+        return FileResponse(
+            open(export.absolute_path(report_export), 'rb'),
+            as_attachment=True,
+            filename=filename,
+            content_type='application/gzip'
+        )
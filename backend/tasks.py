@@ -46,6 +46,66 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=3, minute=0),
         'args': (24,),  # 清理 24 小时前的临时文件
     },
+
+    # 每 30 秒探测一次环境连通性（与环境状态缓存过期时间一致）
+    'probe_environments': {
+        'task': 'probe_environments_task',
+        'schedule': 30.0,
+    },
+
+    # 每分钟补齐一次预热容器池（领用后也会立即触发补齐）
+    'replenish_warm_pool': {
+        'task': 'replenish_warm_pool_task',
+        'schedule': 60.0,
+    },
+
+    # 每 10 分钟补齐一次失败结果的失败特征（入库时已实时处理，这里兜底）
+    'cluster_failures': {
+        'task': 'cluster_failures_task',
+        'schedule': 600.0,
+    },
+
+    # 每 10 分钟补齐一次未写入执行历史的已结束任务（任务结束时已实时写入，这里兜底）
+    'backfill_run_history': {
+        'task': 'backfill_run_history_task',
+        'schedule': 600.0,
+    },
+
+    # 每 5 分钟重算一次被标记的用例结果日汇总（含补传的历史结果）
+    'rollup_results': {
+        'task': 'rollup_results_task',
+        'schedule': 300.0,
+    },
+
+    # 每天凌晨 4 点把到期任务的日志移入冷层、结果移入温层
+    'archive_storage': {
+        'task': 'archive_storage_task',
+        'schedule': crontab(hour=4, minute=0),
+    },
+
+    # 每 10 分钟分批清理一次过期任务（每轮有时间上限，批间暂停，可在工作时间运行）
+    'purge_old_tasks': {
+        'task': 'purge_old_tasks_task',
+        'schedule': 600.0,
+    },
+
+    # 每天凌晨 3 点半物理删除超过保留期的软删除记录
+    'purge_soft_deleted': {
+        'task': 'purge_soft_deleted_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+
+    # 每天凌晨 5 点校正冗余计数字段（增量维护遗漏的改动在这里修正）
+    'reconcile_counters': {
+        'task': 'reconcile_counters_task',
+        'schedule': crontab(hour=5, minute=0),
+    },
+
+    # 每小时从代码仓增量同步特性与用例
+    'sync_case_repository': {
+        'task': 'sync_case_repository_task',
+        'schedule': crontab(minute=0),
+    },
 }
 
 # 设置时区
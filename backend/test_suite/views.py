@@ -1,8 +1,11 @@
 from django.shortcuts import render
 
+from django.db import transaction
 from rest_framework import viewsets
 from .models import TestSuite
 from .serializers import TestSuiteSerializer
+from result_manager.models import CaseResult
+from result_manager.signature import release_results
 
 class TestSuiteViewSet(viewsets.ModelViewSet):
     """测试套视图集，提供标准的CRUD操作"""
@@ -29,3 +32,9 @@ class TestSuiteViewSet(viewsets.ModelViewSet):
         """更新测试套信息"""
         # 可以在这里添加更新前的验证逻辑
         serializer.save()
+
+    def perform_destroy(self, instance):
+        """删除测试套时级联删除的失败结果从所属聚类中扣除"""
+        with transaction.atomic():
+            release_results(CaseResult.objects.filter(task_id__suite_id=instance.id))
+            instance.delete()